@@ -0,0 +1,297 @@
+#
+# Copyright (C) Niel Clausen 2023. All rights reserved.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Headless batch analysis; runs an analyser script (the Recognise,
+Project and Quantify phases) over any number of logfiles, without
+the GUI. Logs are analysed in parallel, in a pool of worker
+processes. Run as:
+
+    nlv-analyse [-j N] [--report FILE] schema script log [log ...]
+
+The analysis databases are written to each log's session cache
+directory, exactly as the GUI does; the report (JSON) lists the
+databases and the time taken by each phase.
+"""
+
+# Python imports
+import argparse
+import concurrent.futures
+import json
+import logging
+import multiprocessing
+import os
+from pathlib import Path
+import sys
+import time
+
+# Application imports
+from .EventProjector import G_Analyser
+from .EventProjector import G_Quantifier
+from .Global import G_Global
+from .Global import G_PerfTimer
+from .Global import G_PerfTrace
+from .Logmeta import GetMetaStore
+from .Logmeta import InitMetaStore
+
+# Content provider interface
+import NlvLog
+
+
+
+## PRIVATE #################################################
+
+# per-process state, established by _InitProcess
+_Code = dict()
+
+
+#-----------------------------------------------------------
+def _DefaultConfigDir():
+    # match the GUI's data directory (wx.StandardPaths.GetUserDataDir)
+    appdata = os.environ.get("APPDATA")
+    if appdata is not None:
+        return Path(appdata) / "NLV"
+    return Path.home() / ".NLV"
+
+
+#-----------------------------------------------------------
+def _InitProcess(config_dir):
+    """Initialise the metadata store and NlvLog in a (worker) process"""
+    logging.basicConfig(level = logging.INFO, format = "%(process)d: %(levelname)s: %(message)s")
+    G_Global.ConfigDir = config_dir
+
+    def PerfTimerFactory(description, item_count):
+        return G_PerfTimer(description, item_count, native = True)
+
+    # a Logger has the debug/info/error interface NlvLog expects
+    NlvLog.Setup(logging.getLogger("NlvLog"), PerfTimerFactory)
+    InitMetaStore(config_dir, NlvLog.EnumStyle.UserFormatBase)
+
+    from .Extension import LoadExtensions
+    LoadExtensions(G_HeadlessContext, config_dir)
+
+
+#-----------------------------------------------------------
+def _CompileScript(script_path):
+    code = _Code.get(script_path)
+    if code is None:
+        src = Path(script_path).read_text()
+        code = _Code[script_path] = compile(src, script_path, "exec")
+    return code
+
+
+#-----------------------------------------------------------
+def _MakeDisplayTable(db_info):
+    """
+    Quantifiers read the "display" table, which the GUI builds from
+    the user's event filter; with no filter, display every event
+    """
+    with db_info.ConnectionManager() as connection:
+        cursor = connection.cursor()
+        cursor.execute("INSERT OR IGNORE INTO filter SELECT event_id FROM projection")
+        cursor.execute("DROP TABLE IF EXISTS display")
+        cursor.execute("""
+            CREATE TABLE
+                display
+            AS SELECT
+                projection.*
+            FROM
+                projection
+            JOIN
+                filter
+            ON
+                projection.event_id = filter.event_id""")
+        cursor.close()
+        connection.commit()
+
+
+#-----------------------------------------------------------
+def _AnalyseLog(script_path, schema_guid, log_path, session_guid):
+    """Worker process entry point; analyse a single log, and return a report"""
+    G_PerfTrace.Reset()
+    phases = dict()
+    last = time.perf_counter()
+
+    def EndPhase(name):
+        nonlocal last
+        now = time.perf_counter()
+        phases[name] = now - last
+        last = now
+
+    code = _CompileScript(script_path)
+    log_node = G_HeadlessLogNode(log_path, session_guid)
+    log_schema = GetMetaStore().GetLogSchema(schema_guid)
+    if log_schema is None:
+        raise RuntimeError("Log schema not registered: {}".format(schema_guid))
+
+    logfile = NlvLog.MakeLogfile(log_path, log_schema, lambda message: None)
+    if logfile is None:
+        raise RuntimeError("Unable to open logfile: {}".format(log_path))
+    EndPhase("open")
+
+    db_path = log_node.MakeSessionDir() / "{}(analysis).db".format(Path(script_path).stem)
+    analyser = G_Analyser(str(db_path), 1)
+    script_globals = analyser.SetEntryPoints(False, log_schema, logfile, log_node)
+    exec(code, script_globals)
+    results = analyser.Close()
+    EndPhase("analyse")
+
+    databases = [str(db_path)]
+    for projector in results.Projectors.values():
+        quantifiers = getattr(projector, "Quantifiers", dict())
+        if len(quantifiers) == 0:
+            continue
+
+        _MakeDisplayTable(projector.ProjectionDbInfo)
+        databases.append(projector.ProjectionDbInfo.Path)
+        for quantifier_info in quantifiers.values():
+            G_Quantifier(quantifier_info).Run(False)
+            databases.append(quantifier_info.MetricsDbInfo.Path)
+    EndPhase("quantify")
+
+    timers = [dict(name = name, count = count, p50_s = p50, p95_s = p95, max_s = longest)
+        for (name, count, p50, p95, longest) in G_PerfTrace.GetSummary()]
+
+    return dict(log = log_path, events = results.EventId - 1, databases = databases, phases_s = phases, timers = timers)
+
+
+
+## G_HeadlessLogNode #######################################
+
+class G_HeadlessLogNode:
+    """Stand-in for G_LogNode, providing the services used by G_Analyser"""
+
+    #-------------------------------------------------------
+    def __init__(self, log_path, session_guid):
+        self._LogPath = log_path
+        self._SessionGuid = session_guid
+
+
+    #-------------------------------------------------------
+    def MakeSessionDir(self):
+        return G_Global.MakeCacheDir(self._LogPath, self._SessionGuid)
+
+    def ListSubNodes(self, **kwargs):
+        return []
+
+
+
+## G_HeadlessContext #######################################
+
+class G_HeadlessContext:
+    """Interface between NLV plugins (extensions) and the analyser; only schemata are needed"""
+
+    #-------------------------------------------------------
+    def __init__(self, info):
+        self._Info = info
+
+    def RegisterLogSchemata(self, install_dir):
+        GetMetaStore().RegisterLogSchemata(install_dir)
+
+    def RegisterThemeDirectory(self, install_dir):
+        pass
+
+    def RegisterFileConverter(self, extension, converter):
+        pass
+
+    def RegisterDirectorySearch(self, searcher):
+        pass
+
+
+
+## MODULE ##################################################
+
+def FindSchemaGuid(schema):
+    """Accept a schema name or GUID"""
+    for (name, guid) in GetMetaStore().GetLogSchemataNames():
+        if schema in (name, guid):
+            return guid
+    return None
+
+
+def Analyse(script_path, schema_guid, log_paths, config_dir, session_guid, workers):
+    """Analyse each log; yields a report per log, as each completes"""
+    args = (script_path, schema_guid)
+
+    if workers == 1:
+        for log_path in log_paths:
+            try:
+                yield _AnalyseLog(*args, log_path, session_guid)
+            except Exception as ex:
+                yield dict(log = log_path, error = str(ex))
+        return
+
+    # workers must initialise from scratch; a forked worker would inherit the
+    # parent's "extensions loaded" state, so would not register the schemata
+    # in its own (new) metadata store
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(max_workers = workers, mp_context = context, initializer = _InitProcess, initargs = (config_dir,)) as executor:
+        futures = { executor.submit(_AnalyseLog, *args, log_path, session_guid): log_path for log_path in log_paths }
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as ex:
+                yield dict(log = futures[future], error = str(ex))
+
+
+def main():
+    parser = argparse.ArgumentParser(prog = "nlv-analyse", description = "NLV headless log analyser")
+    parser.add_argument("schema", help = "log schema name or GUID")
+    parser.add_argument("script", help = "analyser script (.py)")
+    parser.add_argument("logs", nargs = "+", help = "logfiles to analyse")
+    parser.add_argument("-c", "--config-dir", default = str(_DefaultConfigDir()), help = "NLV data directory")
+    parser.add_argument("-j", "--jobs", type = int, default = os.cpu_count(), help = "number of worker processes")
+    parser.add_argument("-s", "--session", default = "analyse", help = "session cache sub-directory name")
+    parser.add_argument("-r", "--report", help = "write a JSON report to this file")
+    args = parser.parse_args()
+
+    config_dir = Path(args.config_dir)
+    config_dir.mkdir(parents = True, exist_ok = True)
+    _InitProcess(config_dir)
+
+    schema_guid = FindSchemaGuid(args.schema)
+    if schema_guid is None:
+        logging.error("Unknown log schema: {}".format(args.schema))
+        return 2
+
+    script_path = str(Path(args.script).resolve())
+    log_paths = [str(Path(log).resolve()) for log in args.logs]
+    workers = max(1, min(args.jobs or 1, len(log_paths)))
+
+    start = time.perf_counter()
+    reports = []
+    for report in Analyse(script_path, schema_guid, log_paths, config_dir, args.session, workers):
+        if "error" in report:
+            logging.error("{}: {}".format(report["log"], report["error"]))
+        else:
+            phases = " ".join(["{}:{:.3f}s".format(name, secs) for (name, secs) in report["phases_s"].items()])
+            logging.info("{}: events:{} {}".format(report["log"], report["events"], phases))
+        reports.append(report)
+
+    elapsed = time.perf_counter() - start
+    logging.info("Analysed {} logs in {:.3f}s with {} workers".format(len(log_paths), elapsed, workers))
+
+    if args.report is not None:
+        with open(args.report, "w") as file:
+            json.dump(dict(elapsed_s = elapsed, workers = workers, logs = reports), file, indent = 1)
+
+    failed = [report for report in reports if "error" in report]
+    return 1 if len(failed) != 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
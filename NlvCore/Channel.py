@@ -16,24 +16,35 @@
 #
 
 # system imports
+import asyncio
+import json
 import logging
+import os
+from pathlib import Path
+import socket
+import sys
+import tempfile
+import threading
+import xml.etree.ElementTree as et
 
 # pywin32 imports
-import pywintypes
-import win32file
-import win32event
-import win32pipe
-import winerror
+if sys.platform == "win32":
+    import pywintypes
+    import win32file
+    import win32event
+    import win32pipe
+    import winerror
 
 
 
-## Channel #################################################
+## G_PipeTransport #########################################
 
-class Channel:
+class G_PipeTransport:
     """
-    Notify log file line navigation events to the NLV channel. Typically, the
-    channel listener will locate and display the source code which emitted
-    the log line.
+    Win32 named pipe transport, for the Visual Studio listener. Driven
+    synchronously from Notify, using overlapped I/O; a message which
+    arrives while the pipe is busy replaces any earlier unsent message.
+    Messages are encoded as XML.
     """
 
 
@@ -94,10 +105,8 @@ class Channel:
 
     def _WriteMessage(self):
         if self._NextMessage is not None:
-            byte_message = bytes(self._NextMessage, "utf-8")
+            byte_message = self._Encode(self._NextMessage)
             self._MessageLen = len(byte_message)
-
-            self._LastMessage = self._NextMessage
             self._NextMessage = None
 
             if self._MessageLen > self._MaxMessageSize:
@@ -121,6 +130,15 @@ class Channel:
         return False
 
 
+    @staticmethod
+    def _Encode(message):
+        root = et.Element("root")
+        for (key, value) in message.items():
+            et.SubElement(root, key).text = value
+
+        return et.tostring(root, encoding = "utf-8")
+
+
     def _Recover(self):
         win32pipe.DisconnectNamedPipe(self._Pipe)
         return self._SetState(__class__._StateConnect)
@@ -181,7 +199,6 @@ class Channel:
         self._State = __class__._StateNone
         self._IoError = winerror.ERROR_SUCCESS
         self._Pipe = win32file.INVALID_HANDLE_VALUE
-        self._LastMessage = None
         self._NextMessage = None
         self._Name = name
 
@@ -213,12 +230,8 @@ class Channel:
 
     
     #-------------------------------------------------------
-    def Notify(self, message):
-        """Send the message to the channel."""
-
-        if message == self._LastMessage:
-            return
-
+    def Send(self, message):
+        """Send the message (a dictionary) to the pipe"""
         self._NextMessage = message
         self._Run()
 
@@ -236,3 +249,235 @@ class Channel:
             pass
 
         logging.debug("Notifier: shut down: channel:'{}'".format(self._Name))
+
+
+
+## G_SocketTransport #######################################
+
+class G_SocketTransport:
+    """
+    Unix domain socket transport; any number of listeners may connect
+    to the socket. All I/O runs on an asyncio event loop in a background
+    thread, so Send never blocks the caller. Messages are coalesced by
+    kind (the latest message of each kind wins), and all pending messages
+    are written to each listener in a single batch.
+
+    Messages are framed as compact JSON, one message per line. A newly
+    connected listener is sent the most recent message of each kind.
+    """
+
+    # a listener with more than this amount of unsent data is too slow;
+    # messages to it are dropped until it catches up
+    _MaxBacklog = 64 * 1024
+
+
+    #-------------------------------------------------------
+    @staticmethod
+    def GetSocketPath(guid):
+        """
+        The socket lives in the user's runtime directory; failing that, in a
+        per-user directory below the (shared) temporary directory, so that
+        different users' channels cannot collide
+        """
+        runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+        if runtime_dir is None:
+            runtime_dir = Path(tempfile.gettempdir()) / "nlv-{}".format(os.getuid())
+        return Path(runtime_dir) / "nlv-{}.sock".format(guid)
+
+
+    @staticmethod
+    def _IsLive(path):
+        """Test whether a server is listening on the socket at path"""
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(path))
+            return True
+        except OSError:
+            return False
+        finally:
+            probe.close()
+
+
+    @staticmethod
+    def _Encode(message):
+        return (json.dumps(message, separators = (",", ":"), ensure_ascii = False) + "\n").encode("utf-8")
+
+
+    #-------------------------------------------------------
+    def _Flush(self):
+        """Event loop; write all pending messages to all listeners"""
+        with self._Lock:
+            pending = self._Pending
+            self._Pending = dict()
+
+        if len(pending) == 0:
+            return
+
+        self._Latest.update(pending)
+        data = b"".join([self._Encode(message) for message in pending.values()])
+
+        for writer in list(self._Writers):
+            if writer.transport.get_write_buffer_size() > self._MaxBacklog:
+                logging.debug("Notifier: slow listener, dropping messages: channel:'{}'".format(self._Name))
+            else:
+                writer.write(data)
+
+
+    #-------------------------------------------------------
+    async def _OnConnect(self, reader, writer):
+        """Event loop; service a listener connection until it closes"""
+        logging.info("Notifier: listener connected: channel:'{}'".format(self._Name))
+
+        task = asyncio.current_task()
+        self._Tasks.add(task)
+        self._Writers.add(writer)
+        if len(self._Latest) != 0:
+            writer.write(b"".join([self._Encode(message) for message in self._Latest.values()]))
+
+        try:
+            # listeners do not send data; just wait for the connection to close
+            while len(await reader.read(1024)) != 0:
+                pass
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._Tasks.discard(task)
+            self._Writers.discard(writer)
+            writer.close()
+
+        logging.info("Notifier: listener disconnected: channel:'{}'".format(self._Name))
+
+
+    async def _Start(self):
+        path = self._Path
+        runtime_dir = path.parent
+        if "XDG_RUNTIME_DIR" not in os.environ:
+            runtime_dir.mkdir(mode = 0o700, exist_ok = True)
+            if runtime_dir.stat().st_uid != os.getuid():
+                raise OSError("socket directory is owned by another user: '{}'".format(runtime_dir))
+
+        # only remove a stale socket; another instance may be serving this channel
+        if path.exists() or path.is_symlink():
+            if not path.is_socket():
+                raise OSError("socket path is in use by a non-socket: '{}'".format(path))
+            if self._IsLive(path):
+                raise OSError("channel is in use by another instance: '{}'".format(path))
+            path.unlink()
+
+        self._Server = await asyncio.start_unix_server(self._OnConnect, path = str(path))
+        self._Owned = True
+        logging.info("Notifier: started: channel:'{}' socket:'{}'".format(self._Name, path))
+
+
+    async def _Stop(self):
+        if self._Server is not None:
+            self._Server.close()
+
+        tasks = list(self._Tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions = True)
+
+
+    def _Run(self):
+        """Background thread"""
+        asyncio.set_event_loop(self._Loop)
+
+        try:
+            self._Loop.run_until_complete(self._Start())
+        except OSError as ex:
+            logging.error("Notifier: socket startup error: channel:'{}' error:'{}'".format(self._Name, str(ex)))
+            self._Loop.close()
+            return
+
+        self._Loop.run_forever()
+        self._Loop.run_until_complete(self._Stop())
+        self._Loop.close()
+
+
+    #-------------------------------------------------------
+    def __init__(self, name, guid):
+        self._Name = name
+        self._Path = self.GetSocketPath(guid)
+        self._Server = None
+        self._Owned = False
+        self._Writers = set()
+        self._Tasks = set()
+        self._Latest = dict()
+
+        # shared between the caller and the event loop
+        self._Lock = threading.Lock()
+        self._Pending = dict()
+
+        self._Loop = asyncio.new_event_loop()
+        self._Thread = threading.Thread(target = self._Run, name = "NLV-Channel-{}".format(name))
+        self._Thread.daemon = True
+        self._Thread.start()
+
+
+    #-------------------------------------------------------
+    def Send(self, message, kind = "line"):
+        """Queue the message (a dictionary) for sending; returns immediately"""
+        with self._Lock:
+            schedule = len(self._Pending) == 0
+            self._Pending[kind] = message
+
+        if schedule and not self._Loop.is_closed():
+            try:
+                self._Loop.call_soon_threadsafe(self._Flush)
+            except RuntimeError:
+                # the event loop has stopped
+                pass
+
+
+    #-------------------------------------------------------
+    def ShutDown(self):
+        if not self._Loop.is_closed():
+            self._Loop.call_soon_threadsafe(self._Loop.stop)
+            self._Thread.join(timeout = 2)
+
+        # leave a socket created by another instance alone
+        if self._Owned:
+            try:
+                self._Path.unlink()
+            except OSError:
+                pass
+
+        logging.debug("Notifier: shut down: channel:'{}'".format(self._Name))
+
+
+
+## Channel #################################################
+
+class Channel:
+    """
+    Notify log file line navigation events to the NLV channel. Typically, the
+    channel listener will locate and display the source code which emitted
+    the log line. Uses a named pipe on Windows, otherwise a Unix domain socket.
+    """
+
+    #-------------------------------------------------------
+    def __init__(self, name, guid):
+        self._LastMessage = None
+
+        if sys.platform == "win32":
+            self._Transport = G_PipeTransport(name, guid)
+        else:
+            self._Transport = G_SocketTransport(name, guid)
+
+
+    #-------------------------------------------------------
+    def Notify(self, message):
+        """Send the message (a dictionary of strings) to the channel"""
+
+        if message == self._LastMessage:
+            return
+
+        self._LastMessage = message
+        self._Transport.Send(message)
+
+
+    #-------------------------------------------------------
+    def ShutDown(self):
+        """Clean shutdown of the channel"""
+        self._Transport.ShutDown()
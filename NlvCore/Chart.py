@@ -19,6 +19,7 @@
 import json
 
 # Application imports
+from NlvCore.ChartData import G_ChartData
 from NlvCore.TangledTree import Tree
 
 
@@ -94,20 +95,21 @@ class Bar:
             """.format(category = ReduceFieldName(self._CategoryField), value = ReduceFieldName(self._ValueField)))
 
         selection = context.GetSelection()
-        data = []
+        rows = cursor.fetchall()
 
-        for row in cursor:
-            event_id = row[2]
-            selected = event_id in selection
-            data.append(dict(category = row[0], value = row[1], selected = selected, event_id = event_id))
+        data = G_ChartData(len(rows))
+        data.AddColumn("category", [row[0] for row in rows])
+        data.AddColumn("value", [row[1] for row in rows])
+        data.AddColumn("selected", [row[2] in selection for row in rows])
+        data.AddColumn("event_id", [row[2] for row in rows])
 
         # chart transition time in msec
         switch_time = 1000
         if len(selection) != 0:
             switch_time = 250
 
-        data_json = json.dumps(data)
-        context.CallJavaScript("CreateChart", name, self._CategoryField, self._ValueField, data_json, switch_time)
+        data_url = context.PublishData("bar", data)
+        context.CallJavaScript("CreateChartFromData", name, self._CategoryField, self._ValueField, data_url, switch_time)
 
 
 
@@ -273,8 +275,7 @@ class NetworkCore:
 
 
     #-----------------------------------------------------------
-    def CreateChart(self, connection, cursor, context):
-        node_fields = SqlColumnNames(cursor, "display", "main")
+    def QueryNodes(self, cursor):
         cursor.execute("""
             SELECT
                 *
@@ -282,11 +283,8 @@ class NetworkCore:
                 main.display
             """)
 
-        nodes = [dict(zip(node_fields, [_EscapeJsonField(field) for field in row])) for row in cursor]
-        if self._MaxSize is not None and len(nodes) > self._MaxSize:
-            return "Network chart not available - too many nodes found"
 
-        link_fields = SqlColumnNames(cursor, "display", "links")
+    def QueryLinks(self, cursor):
         cursor.execute("""
             SELECT
                 *
@@ -297,6 +295,20 @@ class NetworkCore:
                 target IN (SELECT event_id FROM main.display)
             """)
 
+
+    #-----------------------------------------------------------
+    def SendChart(self, connection, cursor, context):
+        """Send the network to the page as JSON; see Network for a faster alternative"""
+        node_fields = SqlColumnNames(cursor, "display", "main")
+        self.QueryNodes(cursor)
+
+        nodes = [dict(zip(node_fields, [_EscapeJsonField(field) for field in row])) for row in cursor]
+        if self._MaxSize is not None and len(nodes) > self._MaxSize:
+            return "Network chart not available - too many nodes found"
+
+        link_fields = SqlColumnNames(cursor, "display", "links")
+        self.QueryLinks(cursor)
+
         links = [dict(zip(link_fields, [_EscapeJsonField(field) for field in row])) for row in cursor]
         if self._MaxSize is not None and len(links) > self._MaxSize:
             return "Network chart not available - too many links found"
@@ -304,6 +316,13 @@ class NetworkCore:
         data_json = self.NetworkToJson(nodes, links)
         context.CallJavaScript("CreateChart", data_json, self.MakeOptions(context))
 
+
+    #-----------------------------------------------------------
+    def CreateChart(self, connection, cursor, context):
+        message = self.SendChart(connection, cursor, context)
+        if message is not None:
+            return message
+
         self.SetSelection(connection, cursor, context)
 
 
@@ -333,8 +352,25 @@ class Network(NetworkCore):
 
 
     #-----------------------------------------------------------
-    def NetworkToJson(self, nodes, links):
-        return json.dumps(dict(nodes = nodes, links = links))
+    def SendChart(self, connection, cursor, context):
+        """
+        Send the network to the page as binary column data; the page
+        fetches this directly from the HTTP server, so no escaping or
+        JSON decoding is needed
+        """
+        self.QueryNodes(cursor)
+        nodes = G_ChartData.FromCursor(cursor)
+        if self._MaxSize is not None and nodes.NumRows > self._MaxSize:
+            return "Network chart not available - too many nodes found"
+
+        self.QueryLinks(cursor)
+        links = G_ChartData.FromCursor(cursor)
+        if self._MaxSize is not None and links.NumRows > self._MaxSize:
+            return "Network chart not available - too many links found"
+
+        nodes_url = context.PublishData("nodes", nodes)
+        links_url = context.PublishData("links", links)
+        context.CallJavaScript("CreateChartFromData", nodes_url, links_url, self.MakeOptions(context))
 
 
     #-----------------------------------------------------------
@@ -360,12 +396,61 @@ class Network(NetworkCore):
 
 
 
+## ScalableNetwork #############################################
+
+class ScalableNetwork(Network):
+    """
+    Network chart for large (100k+ node) networks. Nodes are grouped,
+    initially by 'group_field', and the layout is calculated by NLV.
+    The page shows one level at a time, and fetches each expanded
+    group's content as the user clicks on it. 'max_size' limits the
+    number of items added by each expansion.
+    """
+
+    #-----------------------------------------------------------
+    def __init__(self, group_field = "type", setup_script = None, max_size = 200):
+        super().__init__(setup_script, max_size)
+        self._GroupField = group_field
+
+
+    #-----------------------------------------------------------
+    def DefineParameters(self, connection, cursor, context):
+        context.AddBool("show_link_labels", "Show relationship names", False)
+
+
+    #-----------------------------------------------------------
+    def MakeOptions(self, context):
+        options = dict(
+            show_link_labels = context.GetParameter("show_link_labels", False),
+            max_zoom = 64
+        )
+        return json.dumps(options)
+
+
+    #-----------------------------------------------------------
+    def SendChart(self, connection, cursor, context):
+        from NlvCore.NetworkLayout import G_LevelNetwork
+
+        self.QueryNodes(cursor)
+        node_fields = [desc[0] for desc in cursor.description]
+        node_rows = [tuple(row) for row in cursor.fetchall()]
+
+        self.QueryLinks(cursor)
+        link_fields = [desc[0] for desc in cursor.description]
+        link_rows = [tuple(row) for row in cursor.fetchall()]
+
+        network = G_LevelNetwork(node_fields, node_rows, link_fields, link_rows, self._GroupField, self._MaxSize)
+        level_url = context.PublishData("level", network)
+        context.CallJavaScript("CreateLevelChart", level_url, self.MakeOptions(context))
+
+
+
 ## TangledTree #################################################
 
 class TangledTree(NetworkCore):
 
     #-----------------------------------------------------------
-    def __init__(self, entity_name_field, setup_script = None, max_size = 1500):
+    def __init__(self, entity_name_field, setup_script = None, max_size = 10000):
         super().__init__("/Charts/TangledTree/TangledTree.html", setup_script, max_size)
         self._EntityNameField = entity_name_field
 
@@ -0,0 +1,316 @@
+#
+# Copyright (C) Niel Clausen 2020. All rights reserved.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+#
+# Chart datasets are sent to the embedded browser as compact, columnar,
+# binary blobs served by the local HTTP server (see Main.py). Layout:
+#
+#   magic (4 bytes) "NLVD"
+#   header size (uint32, little endian)
+#   header (ASCII JSON) - padded to an 8 byte boundary
+#   column blocks - each padded to an 8 byte boundary
+#
+# The header describes each column's type and block offsets; the
+# page side decoder is in Web/Charts/Chart.js (DecodeChartData).
+#
+
+# Python imports
+from array import array
+from collections import OrderedDict
+import json
+import math
+import logging
+import struct
+import sys
+import threading
+from urllib.parse import parse_qsl
+
+
+
+## Locals ##################################################
+
+_Magic = b"NLVD"
+_Alignment = 8
+_Int32Min = -(2 ** 31)
+_Int32Max = (2 ** 31) - 1
+
+
+def _Pad(size):
+    return b"\0" * (-size % _Alignment)
+
+
+def _ArrayBytes(typecode, values):
+    block = array(typecode, values)
+    if sys.byteorder != "little":
+        block.byteswap()
+    return block.tobytes()
+
+
+
+## G_ChartColumn ###########################################
+
+class G_ChartColumn:
+    """Encode a single column of chart data"""
+
+    #-------------------------------------------------------
+    def __init__(self, name, values):
+        self.Name = name
+        self.Type = self._CalcType(values)
+        self._Values = values
+
+
+    #-------------------------------------------------------
+    @staticmethod
+    def _CalcType(values):
+        types = set([type(value) for value in values if value is not None])
+        if len(types) == 0:
+            return "float64"
+
+        elif types == {bool}:
+            return "bool"
+
+        elif types == {int}:
+            if None not in values and _Int32Min <= min(values) and max(values) <= _Int32Max:
+                return "int32"
+            return "float64"
+
+        elif types <= {int, float}:
+            return "float64"
+
+        elif types == {str}:
+            return "text"
+
+        else:
+            return "json"
+
+
+    #-------------------------------------------------------
+    def _EncodeText(self, values, desc, blocks, offset):
+        nulls = [value is None for value in values]
+        texts = ["" if value is None else value for value in values]
+
+        encoded = [text.encode("utf-8") for text in texts]
+        offsets = [0]
+        for item in encoded:
+            offsets.append(offsets[-1] + len(item))
+
+        text_bytes = b"".join(encoded)
+        offset = self._AddBlock(desc, "offset", _ArrayBytes("I", offsets), blocks, offset)
+        offset = self._AddBlock(desc, "text_offset", text_bytes, blocks, offset)
+        desc["ascii"] = len(text_bytes) == sum([len(text) for text in texts])
+
+        if any(nulls):
+            offset = self._AddBlock(desc, "null_offset", _ArrayBytes("B", nulls), blocks, offset)
+
+        return offset
+
+
+    #-------------------------------------------------------
+    @staticmethod
+    def _AddBlock(desc, key, data, blocks, offset):
+        desc[key] = offset
+        desc[key.replace("offset", "size")] = len(data)
+        blocks.append(data)
+
+        padding = _Pad(len(data))
+        if padding:
+            blocks.append(padding)
+
+        return offset + len(data) + len(padding)
+
+
+    #-------------------------------------------------------
+    def Encode(self, blocks, offset):
+        """
+        Append the column's data blocks to 'blocks'. Returns the
+        column's header description and the next free offset.
+        """
+        desc = dict(name = self.Name, type = self.Type)
+        values = self._Values
+
+        if self.Type == "bool":
+            data = _ArrayBytes("B", [bool(value) for value in values])
+            offset = self._AddBlock(desc, "offset", data, blocks, offset)
+
+        elif self.Type == "int32":
+            offset = self._AddBlock(desc, "offset", _ArrayBytes("i", values), blocks, offset)
+
+        elif self.Type == "float64":
+            # NaN represents SQL NULL; SQLite cannot store NaN itself
+            data = _ArrayBytes("d", [math.nan if value is None else value for value in values])
+            offset = self._AddBlock(desc, "offset", data, blocks, offset)
+
+        elif self.Type == "text":
+            offset = self._EncodeText(values, desc, blocks, offset)
+
+        else:
+            offset = self._EncodeText([json.dumps(value) for value in values], desc, blocks, offset)
+
+        return desc, offset
+
+
+
+## G_ChartData #############################################
+
+class G_ChartData:
+    """A columnar dataset for transfer to a chart"""
+
+    #-------------------------------------------------------
+    def __init__(self, num_rows = 0):
+        self.NumRows = num_rows
+        self._Columns = []
+
+
+    #-------------------------------------------------------
+    @classmethod
+    def FromCursor(cls, cursor, convert = None):
+        """Build a dataset from the (executed) cursor's result set"""
+        names = [desc[0] for desc in cursor.description]
+        rows = cursor.fetchall()
+
+        data = cls(len(rows))
+        for idx, name in enumerate(names):
+            values = [row[idx] for row in rows]
+            if convert is not None:
+                values = [convert(value) for value in values]
+            data.AddColumn(name, values)
+
+        return data
+
+
+    #-------------------------------------------------------
+    def AddColumn(self, name, values):
+        if len(self._Columns) == 0 and self.NumRows == 0:
+            self.NumRows = len(values)
+
+        if len(values) != self.NumRows:
+            raise RuntimeError("Chart data column '{}' has {} rows; expected {}".format(name, len(values), self.NumRows))
+
+        self._Columns.append(G_ChartColumn(name, values))
+        return self
+
+
+    #-------------------------------------------------------
+    def Encode(self):
+        """Return the dataset as a list of byte blocks, ready to stream"""
+        blocks = []
+        offset = 0
+        columns = []
+
+        for column in self._Columns:
+            desc, offset = column.Encode(blocks, offset)
+            columns.append(desc)
+
+        header = json.dumps(dict(num_rows = self.NumRows, columns = columns)).encode("ascii")
+        header += b" " * (-(len(header) + 8) % _Alignment)
+
+        return [_Magic, struct.pack("<I", len(header)), header] + blocks
+
+
+
+## G_ChartDataStore ########################################
+
+class G_ChartDataStore:
+    """
+    Thread safe holder of encoded chart datasets. Datasets are
+    published on the UI thread and fetched by the browser through
+    the HTTP server's threads.
+    """
+
+    _Lock = threading.Lock()
+    _Entries = OrderedDict()
+
+    # (owner, name) to entry key, and the reverse
+    _Owners = dict()
+    _EntryOwners = dict()
+
+    _Serial = 0
+    _OwnerSerial = 0
+
+    # limit on the number of retained datasets
+    _MaxEntries = 64
+
+    # URL prefix understood by the HTTP request handler
+    UrlPrefix = "/chartdata/"
+
+
+    #-------------------------------------------------------
+    @classmethod
+    def MakeOwner(cls):
+        """
+        Allocate an owner token for Publish; unlike id(), a token
+        is never re-used by a later owner
+        """
+        with cls._Lock:
+            cls._OwnerSerial += 1
+            return "owner{}".format(cls._OwnerSerial)
+
+
+    #-------------------------------------------------------
+    @classmethod
+    def Publish(cls, owner, name, data):
+        """
+        Make the dataset available to the browser; returns the URL
+        to fetch it from. Publishing replaces any earlier dataset
+        with the same owner and name.
+
+        The data may also be a callable, which is passed the URL's
+        query parameters (as a dict) and returns a G_ChartData; it
+        is called on the HTTP server's threads, each time the data
+        is fetched.
+        """
+        blocks = data if callable(data) else data.Encode()
+
+        with cls._Lock:
+            cls._Serial += 1
+            key = "{}.{}.{}".format(owner, name, cls._Serial)
+
+            last_key = cls._Owners.get((owner, name))
+            if last_key is not None:
+                cls._Entries.pop(last_key, None)
+                cls._EntryOwners.pop(last_key, None)
+
+            cls._Owners[(owner, name)] = key
+            cls._EntryOwners[key] = (owner, name)
+            cls._Entries[key] = blocks
+
+            while len(cls._Entries) > cls._MaxEntries:
+                (evicted_key, evicted_blocks) = cls._Entries.popitem(last = False)
+                cls._Owners.pop(cls._EntryOwners.pop(evicted_key), None)
+
+        return cls.UrlPrefix + key
+
+
+    #-------------------------------------------------------
+    @classmethod
+    def Fetch(cls, path):
+        """Return the byte blocks for a URL path, or None"""
+        if not path.startswith(cls.UrlPrefix):
+            return None
+
+        key, sep, query = path[len(cls.UrlPrefix):].partition("?")
+        with cls._Lock:
+            blocks = cls._Entries.get(key)
+
+        if callable(blocks):
+            try:
+                blocks = blocks(dict(parse_qsl(query))).Encode()
+            except Exception as ex:
+                logging.error("Unable to generate chart data for '{}': {}".format(path, ex))
+                blocks = None
+
+        return blocks
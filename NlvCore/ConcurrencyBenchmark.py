@@ -0,0 +1,157 @@
+#
+# Copyright (C) Niel Clausen 2023. All rights reserved.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Concurrency benchmark; NlvLog releases the GIL in long running calls,
+so filters on two logs, run on two Python threads, should overlap.
+Each log is filtered one after the other, then both are filtered at
+the same time; fails (exit code 1) when the concurrent run is not
+faster than the serial run by the required speedup. Run as:
+
+    python -m NlvCore.ConcurrencyBenchmark [--speedup X] schema match log1 log2
+
+The logs should be large enough for a filter to take a noticeable
+time (say, 100ms or more), and the machine needs two or more cores.
+"""
+
+# Python imports
+import argparse
+import logging
+from pathlib import Path
+import sys
+import threading
+import time
+
+# Application imports
+from .Analyse import _DefaultConfigDir
+from .Analyse import _InitProcess
+from .Analyse import FindSchemaGuid
+from .Logmeta import GetMetaStore
+from .MatchItem import G_MatchItem
+
+# Content provider interface
+import NlvLog
+
+
+
+## G_FilterRun #############################################
+
+class G_FilterRun:
+    """Filter a single log view, recording when the filter ran"""
+
+    #-------------------------------------------------------
+    def __init__(self, logfile, match):
+        self._View = logfile.CreateLogView()
+        self._Match = match
+        self._Ok = False
+        self.Start = self.End = 0.0
+
+
+    #-------------------------------------------------------
+    def Run(self):
+        self.Start = time.perf_counter()
+        self._Ok = self._View.Filter(self._Match)
+        self.End = time.perf_counter()
+
+    def Check(self):
+        if not self._Ok:
+            raise RuntimeError("Filter failed: '{}'".format(self._Match.MatchText))
+        return self._View.GetNumLines()
+
+
+
+## MODULE ##################################################
+
+def Benchmark(logfiles, match, repeat = 3):
+    """
+    Filter the logs serially, then concurrently; returns the best
+    (serial, concurrent, overlap) times, in seconds
+    """
+    best_serial = best_concurrent = None
+    best_overlap = 0.0
+
+    for attempt in range(repeat):
+        runs = [G_FilterRun(logfile, match) for logfile in logfiles]
+        for run in runs:
+            run.Run()
+        serial = sum([run.End - run.Start for run in runs])
+        num_lines = [run.Check() for run in runs]
+
+        runs = [G_FilterRun(logfile, match) for logfile in logfiles]
+        threads = [threading.Thread(target = run.Run, name = "NLV-Filter-{}".format(idx)) for (idx, run) in enumerate(runs)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        concurrent = time.perf_counter() - start
+
+        if [run.Check() for run in runs] != num_lines:
+            raise RuntimeError("Concurrent filters gave different results")
+
+        # the time for which both filters were running
+        overlap = max(0.0, min([run.End for run in runs]) - max([run.Start for run in runs]))
+
+        if best_serial is None or serial < best_serial:
+            best_serial = serial
+        if best_concurrent is None or concurrent < best_concurrent:
+            best_concurrent = concurrent
+        best_overlap = max(best_overlap, overlap)
+
+    return (best_serial, best_concurrent, best_overlap)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog = "ConcurrencyBenchmark", description = "NLV concurrent filter benchmark")
+    parser.add_argument("schema", help = "log schema name or GUID")
+    parser.add_argument("match", help = "filter text")
+    parser.add_argument("logs", nargs = 2, help = "logfiles to filter")
+    parser.add_argument("-t", "--match-type", default = "Literal", help = "match type; e.g. 'Literal', 'LogView Filter'")
+    parser.add_argument("-c", "--config-dir", default = str(_DefaultConfigDir()), help = "NLV data directory")
+    parser.add_argument("-r", "--repeat", type = int, default = 3, help = "number of runs; the fastest is reported")
+    parser.add_argument("-s", "--speedup", type = float, default = 1.2, help = "required speedup of the concurrent run")
+    args = parser.parse_args()
+
+    config_dir = Path(args.config_dir)
+    config_dir.mkdir(parents = True, exist_ok = True)
+    _InitProcess(config_dir)
+
+    schema_guid = FindSchemaGuid(args.schema)
+    if schema_guid is None:
+        logging.error("Unknown log schema: {}".format(args.schema))
+        return 2
+
+    log_schema = GetMetaStore().GetLogSchema(schema_guid)
+    logfiles = [NlvLog.MakeLogfile(str(Path(log).resolve()), log_schema, lambda message: None) for log in args.logs]
+    if None in logfiles:
+        logging.error("Unable to open logfiles")
+        return 2
+
+    match = G_MatchItem(args.match_type, args.match, True)
+    (serial, concurrent, overlap) = Benchmark(logfiles, match, args.repeat)
+    speedup = serial / concurrent if concurrent > 0 else 0.0
+
+    print("serial:{:.3f}s concurrent:{:.3f}s overlap:{:.3f}s speedup:{:.2f} (required {:.2f})".format(serial, concurrent, overlap, speedup, args.speedup))
+    if speedup < args.speedup:
+        print("FAIL: filters on different logs did not run concurrently")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -17,19 +17,19 @@
 
 # Python imports
 import base64
+from collections import OrderedDict
 import html
 import json
 import io
 from pathlib import Path
+import threading
 from urllib.parse import urlparse
 
 # wxWidgets imports
 import wx
-import wx.html2
 
 # Application imports
 from .Global import G_Const
-from .Global import G_Global
 
 
 
@@ -67,50 +67,78 @@ def _MakeWebUrl(data_url):
 
 
 
-## G_DataExplorerPageCache #################################
+## G_DataExplorerPageStore #################################
 
-class G_DataExplorerPageCache:
-    _MaxHistory = 5
+class G_DataExplorerPageStore:
+    """
+    In memory, byte bounded, LRU store of generated pages, keyed by
+    data URL. Pages are stored on the UI thread and served by the HTTP
+    server's threads (see Main.py).
+    """
+
+    _Lock = threading.Lock()
+    _Pages = OrderedDict()
+    _NumBytes = 0
+
+    # limit on the retained page content; the most recent
+    # page is always retained
+    _MaxBytes = 4 * 1024 * 1024
 
 
     #-------------------------------------------------------
-    def __init__(self):
-        # ordered list of keys, first entry is oldest, last is newest
-        self._MRU = []
+    @classmethod
+    def Clear(cls):
+        with cls._Lock:
+            cls._Pages.clear()
+            cls._NumBytes = 0
 
 
     #-------------------------------------------------------
-    def Clear(self):
-        for key in self._MRU:
-            G_Global.MakeTempPath(key).unlink()
+    @classmethod
+    def Store(cls, data_url, page, valid_time = None):
+        """
+        Store a page; a page stored with a 'valid_time' may be
+        reused while its provider's navigation validity is unchanged
+        """
+        data = page.encode("utf-8")
 
-        self._MRU.clear()
+        with cls._Lock:
+            last = cls._Pages.pop(data_url, None)
+            if last is not None:
+                cls._NumBytes -= len(last[0])
 
+            cls._Pages[data_url] = (data, valid_time)
+            cls._NumBytes += len(data)
 
-    #-------------------------------------------------------
-    def Remove(self, key):
-        G_Global.MakeTempPath(key).unlink()
-        self._MRU.remove(key)
+            while cls._NumBytes > cls._MaxBytes and len(cls._Pages) > 1:
+                key, (old_data, old_valid_time) = cls._Pages.popitem(last = False)
+                cls._NumBytes -= len(old_data)
 
 
     #-------------------------------------------------------
-    def Prune(self):
-        while len(self._MRU) > self._MaxHistory:
-            self.Remove(self._MRU[0])
+    @classmethod
+    def Reuse(cls, data_url, valid_time):
+        """Test whether a page generated at 'valid_time' is available"""
+        with cls._Lock:
+            got = cls._Pages.get(data_url)
+            if got is None or got[1] is None or got[1] != valid_time:
+                return False
+
+            cls._Pages.move_to_end(data_url)
+            return True
 
 
     #-------------------------------------------------------
-    def Replace(self, key, data):
-        if key in self._MRU:
-            self.Remove(key)
-
-        self._MRU.append(key)
+    @classmethod
+    def Fetch(cls, path):
+        """Return the page content for a URL path, or None"""
+        with cls._Lock:
+            got = cls._Pages.get(path.lstrip("/"))
 
-        with open(str(G_Global.MakeTempPath(key)), 'w') as file:
-            file.write(data)
+        if got is None:
+            return None
+        return got[0]
 
-        self.Prune()
-    
 
 
 ## G_DataExplorerPageBuilder ###############################
@@ -121,6 +149,7 @@ class G_DataExplorerPageBuilder:
     #-------------------------------------------------------
     def __init__(self, data_explorer):
         self._DataExplorer = data_explorer
+        self.IsErrorPage = False
 
         self._HeaderHtmlStream = io.StringIO()
         self.AddHeaderText("""
@@ -207,6 +236,7 @@ class G_DataExplorerPageBuilder:
 
     #-------------------------------------------------------
     def MakeErrorPage(self, title, explanation, fields = []):
+        self.IsErrorPage = True
         self.AddPageHeading(title, style="color:darkred")
         self.AddFieldValue(explanation)
 
@@ -261,12 +291,12 @@ class G_DataExplorer:
     #-------------------------------------------------------
     def __init__(self, frame):
         self._Frame = frame
-        self._PageCache = G_DataExplorerPageCache()
         self._LastDataUrl = None
 
         parent = frame.GetDataExplorerPanel()
 
-        # create web control
+        # create web control; the web module is loaded on first use
+        import wx.html2
         self._WebView = wx.html2.WebView.New(parent, backend = wx.html2.WebViewBackendIE)
         self._WebView.EnableHistory(True)
         self._WebView.EnableContextMenu(False)
@@ -304,7 +334,7 @@ class G_DataExplorer:
 
     #-------------------------------------------------------
     def ClearHistory(self):
-        self._PageCache.Clear()
+        G_DataExplorerPageStore.Clear()
         self._WebView.ClearHistory()
 
 
@@ -348,6 +378,7 @@ class G_DataExplorer:
             next_location = _DataUrlToLocation(data_url)
             next_node = self.FindNode(next_location["node_id"])
             page_builder = G_DataExplorerPageBuilder(self)
+            valid_time = None
 
             if next_node is None:
                 page_builder.MakeErrorPage("View not found", "The view cannot be found. It has probably been deleted.")
@@ -357,9 +388,18 @@ class G_DataExplorer:
                     last_node.DataExplorerUnload(last_location)
 
                 self._LastDataUrl = data_url
+                valid_time = next_node.GetDataExplorerPageTime()
+
+                # re-use an unchanged page (e.g. on back/forward navigation)
+                if G_DataExplorerPageStore.Reuse(data_url, valid_time) and next_node.DataExplorerSync(next_location):
+                    return
+
                 next_node.DataExplorerLoad(page_builder, next_location)
 
-            self._PageCache.Replace(data_url, page_builder.Close())
+            if page_builder.IsErrorPage:
+                valid_time = None
+
+            G_DataExplorerPageStore.Store(data_url, page_builder.Close(), valid_time)
 
 
 
@@ -417,10 +457,11 @@ class G_DataExplorerChildNode(G_DataExplorerProvider):
 
 
     #-------------------------------------------------------
-    def SetupDataExplorer(self, on_load = None, on_unload = None):
+    def SetupDataExplorer(self, on_load = None, on_unload = None, on_sync = None):
         self._LastLocation = None
         self._DataExplorerLoad = on_load
         self._DataExplorerUnload = on_unload
+        self._DataExplorerSync = on_sync
         self.SetNavigationValidity("Initialisation")
 
 
@@ -431,6 +472,25 @@ class G_DataExplorerChildNode(G_DataExplorerProvider):
         if self._DataExplorerLoad is not None:
             self._DataExplorerLoad(sync, builder, location)
 
+    def GetDataExplorerPageTime(self):
+        """Navigation validity time of the node's data explorer content"""
+        return self.GetNavigationValidTime()
+
+    def DataExplorerSync(self, location):
+        """
+        Update the UI for a re-used (previously generated) page; returns
+        False if the page must be regenerated
+        """
+        if self._DataExplorerSync is None:
+            return False
+
+        sync = self._LastLocation != location
+        if not self._DataExplorerSync(sync, location):
+            return False
+
+        self._LastLocation = None
+        return True
+
     def DataExplorerUnload(self, location):
         if self._DataExplorerUnload is not None:
             self._DataExplorerUnload(location)
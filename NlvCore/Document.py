@@ -21,8 +21,16 @@ import types
 from weakref import ref as MakeWeakRef
 import xml.etree.ElementTree as et
 
-# Application imports
-from .Theme import GetThemeGallery
+
+
+## PRIVATE #################################################
+
+def _GetThemeGallery(theme_cls):
+    # the theme system is GUI based (wx), so is only loaded once a
+    # themed field is accessed; allows the document classes to be used
+    # by the headless analyser
+    from .Theme import GetThemeGallery
+    return GetThemeGallery(theme_cls)
 
 
 
@@ -169,24 +177,25 @@ class D_Base:
 
 
     #-------------------------------------------------------
-    def _GetThemeInfo(node, element):
-        """(Static) Identify the theme associated with a given field"""
+    def _GetThemeCls(element):
+        """(Static) Identify the theme class of a field currently subject to its theme"""
 
-        # if the override attribute is not present, the field has no theme
-        res = (None, None)
-        override = element.get("override")
-        if override is None:
-            return res
+        # if the override attribute is not present, the field has no theme;
+        # where present, but not "0", the value is not currently subject to
+        # the theme
+        if element.get("override") != "0":
+            return None
 
-        # where the override is present, but not "0", the value is not currently subject
-        # to the theme
-        if override != "0":
-            return res
+        return element.get("theme_cls")
+
+
+    #-------------------------------------------------------
+    def _GetThemeInfo(node, element):
+        """(Static) Identify the theme associated with a given field"""
 
-        # identify the theme's class
-        theme_cls = element.get("theme_cls")
+        theme_cls = __class__._GetThemeCls(element)
         if theme_cls is None:
-            return res
+            return (None, None)
 
         theme_id = __class__._LookupThemeId(node, theme_cls)
         return (theme_cls, theme_id)
@@ -194,15 +203,30 @@ class D_Base:
 
     #-------------------------------------------------------
     def GetThemeValue(node, element):
-        """(Static) Fetch the theme value for a given field"""
+        """
+        (Static) Fetch the theme value for a given field. Resolved values
+        are memoised by the theme gallery, keyed on node and field_id.
+        """
 
-        (theme_cls, theme_id) = __class__._GetThemeInfo(node, element)
+        theme_cls = __class__._GetThemeCls(element)
+        if theme_cls is None or node is None:
+            return None
 
-        if theme_id is not None:
-            field_id = element.get("field_id")
-            return GetThemeGallery(theme_cls)._GetThemeItemValue(theme_id, field_id)
+        field_id = element.get("field_id")
+        wnode = MakeWeakRef(node)
+        gallery = _GetThemeGallery(theme_cls)
 
-        return None
+        resolved = gallery._LookupResolvedValue(wnode, field_id)
+        if resolved is not None:
+            return resolved[1]
+
+        theme_id = __class__._LookupThemeId(node, theme_cls)
+        if theme_id is None:
+            return None
+
+        value = gallery._GetThemeItemValue(theme_id, field_id)
+        gallery._StoreResolvedValue(wnode, field_id, theme_id, value)
+        return value
 
 
     #-------------------------------------------------------
@@ -214,7 +238,7 @@ class D_Base:
         if theme_id is not None:
             field_id = element.get("field_id")
             value = element.text
-            GetThemeGallery(theme_cls)._SetThemeItemValue(theme_id, field_id, value)
+            _GetThemeGallery(theme_cls)._SetThemeItemValue(theme_id, field_id, value)
 
 
     #-------------------------------------------------------
@@ -506,4 +530,7 @@ D_Document.RegisterDocClass(D_Document.DocTypeArray, D_Array)
 ## GLOBAL ##################################################
 
 def GetThemeId(node, theme_cls):
-    return D_Base._LookupThemeId(node, theme_cls)
\ No newline at end of file
+    return D_Base._LookupThemeId(node, theme_cls)
+
+def InvalidateThemeValues(theme_cls, theme_id = None):
+    _GetThemeGallery(theme_cls).InvalidateResolved(theme_id)
\ No newline at end of file
@@ -31,6 +31,7 @@ import win32gui
 import winreg
 
 # Application imports 
+from .ChartData import G_ChartDataStore
 from .DataExplorer import G_DataExplorerProvider
 from .Logfile import G_DisplayControl
 from .Logfile import G_NotebookDisplayControl
@@ -46,7 +47,6 @@ from .Theme import GetThemeSupportFile
 
 # wxWidgets imports
 import wx
-import wx.html2
 
 # Content provider interface
 import NlvLog
@@ -442,14 +442,27 @@ class G_TableDataModel(wx.dataview.DataViewModel, G_DataExplorerProvider):
                             builder.AddField(field.Name, text)
                     
             self.UserDataExplorer(schema.UserDataExplorerClose, "DataExplorerClose", context, builder)
+            self.SyncDataExplorerLine(ctrl, sync, item)
 
-            if sync:
-                if self.SetDataExplorerLine(self.ItemToKey(item)):
-                    ctrl.UnselectAll()
-                    ctrl.EnsureVisible(item)
 
-            elif self.ClearDataExplorerLine():
-                ctrl.Refresh()
+    #-------------------------------------------------------
+    def SyncDataExplorerLine(self, ctrl, sync, item):
+        if sync:
+            if self.SetDataExplorerLine(self.ItemToKey(item)):
+                ctrl.UnselectAll()
+                ctrl.EnsureVisible(item)
+
+        elif self.ClearDataExplorerLine():
+            ctrl.Refresh()
+
+
+    def OnDataExplorerSync(self, ctrl, sync, location):
+        item = self.LookupEventId(location["event_id"])
+        if item is None:
+            return False
+
+        self.SyncDataExplorerLine(ctrl, sync, item)
+        return True
 
 
     #-------------------------------------------------------
@@ -1032,6 +1045,9 @@ class G_TableViewCtrl(G_DataViewCtrl, G_DisplayControl):
     def OnDataExplorerLoad(self, sync, builder, location, ui_node):
         self.GetModel().OnDataExplorerLoad(self, sync, builder, location, ui_node)
 
+    def OnDataExplorerSync(self, sync, location):
+        return self.GetModel().OnDataExplorerSync(self, sync, location)
+
     def OnDataExplorerUnload(self, location):
         self.GetModel().OnDataExplorerUnload(self)
 
@@ -1302,9 +1318,12 @@ class G_HtmlHostCtrl(wx.Panel):
         self._CreateContext = context
         self._ParameterValues = dict()
         self._DomUpdateQueue = []
+        self._ChartDataOwner = G_ChartDataStore.MakeOwner()
 
         self.InitCharting()
 
+        # the web module is loaded on first use
+        import wx.html2
         self._Figure = wx.html2.WebView.New(self, backend = wx.html2.WebViewBackendIE)
         self._Figure.EnableHistory(False)
         self._Figure.EnableContextMenu(False)
@@ -1341,6 +1360,9 @@ class G_HtmlHostCtrl(wx.Panel):
             def CallJavaScript(self, method, *args):
                 self._Host.CallJavaScript(method, *args)
 
+            def PublishData(self, name, data):
+                return self._Host.PublishData(name, data)
+
         self._ChartInfo.Builder.Setup(Context(self))
 
 
@@ -1422,6 +1444,14 @@ class G_HtmlHostCtrl(wx.Panel):
         self.EnqueueDomUpdate(G_UpdateDomCallJavaScript(script))
 
 
+    def PublishData(self, name, data):
+        """
+        Make a G_ChartData dataset available to the page over HTTP;
+        returns the URL for the page to fetch
+        """
+        return G_ChartDataStore.Publish(self._ChartDataOwner, name, data)
+
+
     def LoadScript(self, script_name):
         self.EnqueueDomUpdate(G_UpdateDomLoadScript(script_name))
 
@@ -1527,6 +1557,9 @@ class G_HtmlHostCtrl(wx.Panel):
             def CallJavaScript(self, method, *args):
                 self._Host.CallJavaScript(method, *args)
 
+            def PublishData(self, name, data):
+                return self._Host.PublishData(name, data)
+
 
         do_realize = False
         if data_changed:
@@ -25,11 +25,10 @@ import sqlite3
 from .Global import G_Global
 from .Global import G_PerfTimerScope
 from .Logmeta import G_FieldSchemata
-from .MatchNode import G_MatchItem
-from .Project import G_Project
+from .MatchItem import G_MatchItem
 
-# wxWidgets imports
-import wx
+# this module is shared with the headless analyser (Analyse.py), so
+# imports wxWidgets, and the GUI project, only on demand
 
 # Content provider interface
 import NlvLog
@@ -460,6 +459,7 @@ class G_ProjectionTypeManager:
 
 
     def _DisplayStringIcon(value, icon):
+        import wx.dataview
         return wx.dataview.DataViewIconText(value, icon)
 
     def _DisplayValue(value, icon):
@@ -476,13 +476,14 @@ class G_ProjectionTypeManager:
     _c_displayvalue_to_display = 1
     _c_data_view_renderer = 2
 
+    # renderers are named, and looked up in wx.dataview on use
     _TextModelInfo = [
-        ["string", _DisplayValue, wx.dataview.DataViewTextRenderer], # _c_without_icon
-        ["wxDataViewIconText", _DisplayStringIcon, wx.dataview.DataViewIconTextRenderer] # _c_with_icon
+        ["string", _DisplayValue, "DataViewTextRenderer"], # _c_without_icon
+        ["wxDataViewIconText", _DisplayStringIcon, "DataViewIconTextRenderer"] # _c_with_icon
     ]
     _BoolModelInfo = [
-        ["bool", _DisplayValue, wx.dataview.DataViewToggleRenderer], # _c_without_icon
-        ["bool", _DisplayValue, wx.dataview.DataViewToggleRenderer] # _c_with_icon
+        ["bool", _DisplayValue, "DataViewToggleRenderer"], # _c_without_icon
+        ["bool", _DisplayValue, "DataViewToggleRenderer"] # _c_with_icon
     ]
 
 
@@ -542,12 +543,16 @@ class G_ProjectionTypeManager:
 
     #-------------------------------------------------------
     def MakeDataViewColumn(schema, model_column):
+        import wx.dataview
+
         me = __class__
         me.ValidateType(schema.Type)
 
         model_info = me._FieldTypes[schema.Type][me._c_model_types][schema.IsFirst]
         varianttype = model_info[me._c_variant_type]
-        renderer = model_info[me._c_data_view_renderer](varianttype = varianttype)
+        renderer = getattr(wx.dataview, model_info[me._c_data_view_renderer])(varianttype = varianttype)
+
+        align = dict(left = wx.ALIGN_LEFT, right = wx.ALIGN_RIGHT).get(schema.Align, wx.ALIGN_CENTER)
 
         width = schema.Width
         if schema.IsFirst:
@@ -558,7 +563,7 @@ class G_ProjectionTypeManager:
             renderer,
             model_column,
             width = width,
-            align = schema.Align,
+            align = align,
             flags = wx.dataview.DATAVIEW_COL_RESIZABLE | wx.dataview.DATAVIEW_COL_SORTABLE | wx.dataview.DATAVIEW_COL_REORDERABLE
         )
 
@@ -571,9 +576,9 @@ class G_ProjectionFieldSchema:
 
     #-------------------------------------------------------
     def __init__(self, name, description, type, available, width = 0, align = None, view_formatter = None, data_col_offset = 0, scale_factor = None, initial_visibility = None, initial_colour = None, explorer_formatter = None):
-        # user data
+        # user data; align is one of "left", "centre" or "right"
         if align is None:
-            align = wx.ALIGN_CENTER
+            align = "centre"
 
         self.Name = name
         self.Description = description
@@ -644,11 +649,11 @@ class G_ProjectionSchema(G_FieldSchemata):
         al = None
 
         if align is not None and len(align) != 0:
-            al = wx.ALIGN_CENTER
+            al = "centre"
             if align[0] == "l":
-                al = wx.ALIGN_LEFT
+                al = "left"
             elif align[0] == "r":
-                al = wx.ALIGN_RIGHT
+                al = "right"
 
         if al is None and not allow_none:
             raise RuntimeError("Invalid alignment: {}".format(align))
@@ -835,11 +840,17 @@ class G_ProjectorInfo:
         self.ProjectionName = name
         self.ProjectionSchema = projection_schema
         self.ProjectionDbInfo = MakeRelatedDbInfo(analysis_db_info, name, "events")
-        self.DocumentNodeID = G_Project.NodeID_EventProjector
         self.Quantifiers = dict()
         self.Charts = []
 
 
+    #-------------------------------------------------------
+    @property
+    def DocumentNodeID(self):
+        from .Project import G_Project
+        return G_Project.NodeID_EventProjector
+
+
     #-------------------------------------------------------
     def Quantify(self, name, user_quantifier, metrics_schema):
         """Implements user analyse script Quantify() function"""
@@ -897,11 +908,17 @@ class G_NetworkInfo:
     def __init__(self, name, nodes_projector, links_projector, partitions):
         self.ProjectionName = name
         self.Charts = []
-        self.DocumentNodeID = G_Project.NodeID_NetworkProjector
         self.NetworkProjectors = [nodes_projector, links_projector]
         self.Partitions = partitions
 
 
+    #-------------------------------------------------------
+    @property
+    def DocumentNodeID(self):
+        from .Project import G_Project
+        return G_Project.NodeID_NetworkProjector
+
+
     #-------------------------------------------------------
     def Chart(self, name, want_selection, builder):
         nodes_db_info = self.NetworkProjectors[0].ProjectionDbInfo
@@ -967,6 +984,7 @@ class G_ProjectionContext:
     #-------------------------------------------------------
     # currently unused; may be bad design
     def FindDbFile(self, theme_id):
+        from .Project import G_Project
         for node in self._LogNode.ListSubNodes(factory_id = G_Project.NodeID_LogAnalysis, recursive = True):
             if node.GetCurrentThemeId("event") == theme_id:
                 return node.MakeTemporaryFilename(".db")
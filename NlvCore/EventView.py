@@ -69,7 +69,6 @@ from .Project import G_HideableTreeChildNode
 from .Project import G_WindowInfo
 from .Project import G_NodeFactory
 from .Project import G_Project
-from .PythonEditor import G_AnalyserScriptCtrl
 from .StyleNode import G_ColourNode
 from .StyleNode import G_EnabledColourNode
 from .Theme import G_ThemeNode
@@ -471,7 +470,8 @@ class G_LogAnalysisNode(G_DisplayNode, G_HideableTreeNode, G_TabContainerNode):
         self._Field.Add(str(uuid4()), "Guid", replace_existing = False)
         self._Field.Add(True, "AnalysisIsValid", replace_existing = False)
 
-        # setup UI
+        # setup UI; the editor module is loaded on first use
+        from .PythonEditor import G_AnalyserScriptCtrl
         display_notebook = self._DisplayNotebook = G_NotebookDisplayControl(self.GetAuiNotebook())
         script_ctrl = self._ScriptCtrl = G_AnalyserScriptCtrl(display_notebook)
         display_notebook.AddPage(script_ctrl, "Script")
@@ -1504,7 +1504,7 @@ class G_CoreProjectorNode(G_DisplayNode, G_LogAnalysisChildNode, G_HideableTreeC
 
     #-------------------------------------------------------
     def SetupTableCtrl(self, table_ctrl):
-        self.SetupDataExplorer(self.OnDataExplorerLoad, self.OnDataExplorerUnload)
+        self.SetupDataExplorer(self.OnDataExplorerLoad, self.OnDataExplorerUnload, self.OnDataExplorerSync)
         table_ctrl.SetSelectionhandler(self.OnTableSelectionChanged)
 
         inner_ctrl = table_ctrl.GetChildCtrl()
@@ -1540,6 +1540,17 @@ class G_CoreProjectorNode(G_DisplayNode, G_LogAnalysisChildNode, G_HideableTreeC
         if sync:
             self.MakeActive()
 
+    def GetDataExplorerPageTime(self):
+        return self.GetTableViewCtrl().GetModel().GetNavigationValidTime()
+
+    def OnDataExplorerSync(self, sync, location):
+        if not self.GetTableViewCtrl().OnDataExplorerSync(sync, location):
+            return False
+
+        if sync:
+            self.MakeActive()
+        return True
+
     def OnDataExplorerUnload(self, location):
         self.GetTableViewCtrl().OnDataExplorerUnload(location)
 
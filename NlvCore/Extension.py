@@ -16,7 +16,19 @@
 #
 
 # System imports
-from pkg_resources import iter_entry_points
+import json
+import logging
+import os
+from pathlib import Path
+import sys
+
+try:
+    from importlib.metadata import entry_points
+    from importlib.metadata import EntryPoint
+except ImportError:
+    from importlib_metadata import entry_points
+    from importlib_metadata import EntryPoint
+
 
 
 ## G_ExtensionInfo #########################################
@@ -29,6 +41,99 @@ class G_ExtensionInfo:
 
 
 
+## G_ExtensionRegistry #####################################
+
+class G_ExtensionRegistry:
+    """
+    Cached list of the "nlv.extensions" entry points. Discovery
+    requires a scan of the metadata of every installed distribution,
+    so the result is kept in the user's configuration directory and
+    re-used until a directory on sys.path is modified, i.e. until a
+    distribution is installed or removed.
+    """
+
+    Group = "nlv.extensions"
+    _Version = 1
+
+    #-------------------------------------------------------
+    def __init__(self, cache_dir = None):
+        self._Path = None
+        if cache_dir is not None:
+            self._Path = Path(cache_dir) / "extensions.cache"
+
+
+    #-------------------------------------------------------
+    @staticmethod
+    def _MakeStamp():
+        stamp = []
+        for entry in sys.path:
+            try:
+                stamp.append([entry, os.stat(entry or ".").st_mtime_ns])
+            except OSError:
+                stamp.append([entry, None])
+        return stamp
+
+
+    #-------------------------------------------------------
+    @classmethod
+    def _Discover(cls):
+        try:
+            found = entry_points(group = cls.Group)
+        except TypeError:
+            # older importlib.metadata; returns a dict of groups
+            found = entry_points().get(cls.Group, [])
+
+        # a distribution visible via more than one path entry is reported
+        # more than once; keep the first
+        entries = []
+        for entry_point in found:
+            entry = [entry_point.name, entry_point.value]
+            if entry not in entries:
+                entries.append(entry)
+
+        return entries
+
+
+    #-------------------------------------------------------
+    def _Read(self, stamp):
+        try:
+            with open(self._Path, "r") as file:
+                content = json.load(file)
+            if content["version"] == self._Version and content["stamp"] == stamp:
+                return content["entries"]
+        except FileNotFoundError:
+            pass
+        except Exception as ex:
+            logging.info("Ignoring extension cache '{}': {}".format(self._Path, ex))
+
+        return None
+
+    def _Write(self, stamp, entries):
+        try:
+            with open(self._Path, "w") as file:
+                json.dump(dict(version = self._Version, stamp = stamp, entries = entries), file)
+        except OSError as ex:
+            logging.info("Unable to save extension cache '{}': {}".format(self._Path, ex))
+
+
+    #-------------------------------------------------------
+    def GetEntryPoints(self):
+        """Fetch the list of extension entry points"""
+        entries = None
+
+        if self._Path is not None:
+            stamp = self._MakeStamp()
+            entries = self._Read(stamp)
+            if entries is None:
+                entries = self._Discover()
+                self._Write(stamp, entries)
+        else:
+            entries = self._Discover()
+
+        return [EntryPoint(name, value, self.Group) for (name, value) in entries]
+
+
+
 ## G_Extensions ############################################
 
 class G_Extensions:
@@ -43,19 +148,19 @@ class G_Extensions:
 
     #-------------------------------------------------------
     @classmethod
-    def LoadExtensions(cls, context_cls):
+    def LoadExtensions(cls, context_cls, cache_dir = None):
 
         #
         # references:
-        # http://setuptools.readthedocs.io/en/latest/pkg_resources.html
-        # https://docs.pylonsproject.org/projects/pylons-webframework/en/latest/advanced_pylons/entry_points_and_plugins.html
+        # https://docs.python.org/3/library/importlib.metadata.html#entry-points
+        # https://packaging.python.org/en/latest/specifications/entry-points/
         #
 
         if cls._ExtensionsValid:
             return cls._Extensions
 
         cls._ExtensionsValid = True
-        for entry_point in iter_entry_points(group = "nlv.extensions", name = None):
+        for entry_point in G_ExtensionRegistry(cache_dir).GetEntryPoints():
             info = G_ExtensionInfo(entry_point.name)
             context = context_cls(info)
             extension_func = entry_point.load()
@@ -68,5 +173,5 @@ class G_Extensions:
 
 ## MODULE ##################################################
 
-def LoadExtensions(context_cls):
-    return G_Extensions.LoadExtensions(context_cls)
+def LoadExtensions(context_cls, cache_dir = None):
+    return G_Extensions.LoadExtensions(context_cls, cache_dir)
@@ -16,15 +16,18 @@
 # 
 
 # Python imports
+from collections import deque
+import json
 import logging
 import os
 from pathlib import Path
 import sys
+import threading
 import time
 import traceback
 
-# wxWidgets imports
-import wx
+# wxWidgets is imported on demand; this module is also used by the
+# headless analyser (see Analyse.py)
 
 # Content provider interface
 import NlvLog
@@ -88,6 +91,7 @@ class G_ProgressMeter:
         if self._Dlg is None:
             now = time.perf_counter()
             if now - self._StartTime > 0.5:
+                import wx
                 self._Dlg = wx.ProgressDialog(self._Title, message,
                     style = wx.PD_APP_MODAL | wx.PD_AUTO_HIDE | wx.PD_ELAPSED_TIME
                 )
@@ -126,36 +130,212 @@ class G_ProgressMeterScope:
 
 
 
+## G_PerfTrace #############################################
+
+class G_PerfTrace:
+    """
+    Structured sink for G_PerfTimer results. Completed timer trees
+    can be written as JSON lines (one object per timer), or in the
+    Chrome trace_event format (load into chrome://tracing or Perfetto);
+    the format is chosen by the file extension: ".jsonl" for JSON lines,
+    anything else for trace_event. Tracing can be started and stopped
+    at any time.
+
+    Independently, a summary of all timings (count, p50, p95, max) by
+    description is accumulated for the lifetime of the application.
+    """
+
+    _Lock = threading.Lock()
+    _File = None
+    _Path = None
+    _Chrome = False
+    _Epoch = time.perf_counter()
+
+    # description -> recent durations (seconds) and total count
+    _MaxSamples = 4096
+    _Samples = dict()
+    _Counts = dict()
+
+
+    #-------------------------------------------------------
+    @classmethod
+    def Start(cls, path):
+        """Start writing trace events to path; replaces any existing trace"""
+        cls.Stop()
+
+        path = Path(path)
+        with cls._Lock:
+            cls._Chrome = path.suffix.lower() != ".jsonl"
+            cls._File = open(str(path), "w")
+            cls._Path = path
+
+            # the trace_event array may be left unterminated
+            if cls._Chrome:
+                cls._File.write("[\n")
+
+        logging.info("Performance trace started: {}".format(path))
+
+
+    #-------------------------------------------------------
+    @classmethod
+    def Stop(cls):
+        with cls._Lock:
+            file = cls._File
+            if file is None:
+                return
+
+            path = cls._Path
+            cls._File = cls._Path = None
+            file.close()
+
+        cls.WriteSummary(path.with_name(path.stem + ".summary.json"))
+        logging.info("Performance trace stopped: {}".format(path))
+
+
+    #-------------------------------------------------------
+    @classmethod
+    def IsActive(cls):
+        return cls._File is not None
+
+
+    #-------------------------------------------------------
+    @classmethod
+    def _MakeEvent(cls, timer, depth, parent):
+        ts = (timer._Start - cls._Epoch) * 1e6
+        dur = timer._Elapsed * 1e6
+        arguments = ", ".join(timer._Arguments)
+
+        if cls._Chrome:
+            return dict(name = timer._Description, cat = "nlv", ph = "X",
+                ts = round(ts, 1), dur = round(dur, 1), pid = os.getpid(), tid = timer._ThreadId,
+                args = dict(arguments = arguments, items = timer._ItemCount, per_item_us = timer._PerItem, depth = depth))
+        else:
+            return dict(name = timer._Description, ts_us = round(ts, 1), dur_us = round(dur, 1),
+                tid = timer._ThreadId, depth = depth, parent = parent, arguments = arguments,
+                items = timer._ItemCount, per_item_us = timer._PerItem)
+
+
+    #-------------------------------------------------------
+    @classmethod
+    def Record(cls, root):
+        """Record a completed (closed) tree of timers"""
+        lines = []
+        pending = [(root, 0, None)]
+
+        with cls._Lock:
+            while len(pending) != 0:
+                (timer, depth, parent) = pending.pop()
+
+                description = timer._Description
+                samples = cls._Samples.get(description)
+                if samples is None:
+                    samples = cls._Samples[description] = deque(maxlen = cls._MaxSamples)
+                samples.append(timer._Elapsed)
+                cls._Counts[description] = cls._Counts.get(description, 0) + 1
+
+                if cls._File is not None:
+                    lines.append(json.dumps(cls._MakeEvent(timer, depth, parent)))
+
+                pending.extend([(child, depth + 1, description) for child in reversed(timer._Children)])
+
+            if len(lines) != 0:
+                terminator = ",\n" if cls._Chrome else "\n"
+                cls._File.write(terminator.join(lines) + terminator)
+                cls._File.flush()
+
+
+    #-------------------------------------------------------
+    @classmethod
+    def Reset(cls):
+        """Discard the samples collected so far"""
+        with cls._Lock:
+            cls._Samples = dict()
+            cls._Counts = dict()
+
+
+    #-------------------------------------------------------
+    @classmethod
+    def GetSummary(cls):
+        """Fetch list of (description, count, p50, p95, max), durations in seconds"""
+        def Percentile(ordered, pct):
+            return ordered[min(len(ordered) - 1, int(pct * len(ordered)))]
+
+        summary = []
+        with cls._Lock:
+            for (description, samples) in cls._Samples.items():
+                ordered = sorted(samples)
+                summary.append((description, cls._Counts[description],
+                    Percentile(ordered, 0.5), Percentile(ordered, 0.95), ordered[-1]))
+
+        return sorted(summary)
+
+
+    #-------------------------------------------------------
+    @classmethod
+    def WriteSummary(cls, path):
+        summary = [dict(name = name, count = count, p50_s = p50, p95_s = p95, max_s = longest)
+            for (name, count, p50, p95, longest) in cls.GetSummary()]
+
+        with open(str(path), "w") as file:
+            json.dump(summary, file, indent = 1)
+
+
+    #-------------------------------------------------------
+    @classmethod
+    def LogSummary(cls):
+        for (name, count, p50, p95, longest) in cls.GetSummary():
+            logging.debug("G_PerfTrace: {}: count:{} p50:{:.3f}s p95:{:.3f}s max:{:.3f}s".format(name, count, p50, p95, longest))
+
+
+
 ## G_PerfTimer #############################################
            
 class G_PerfTimer:
-    """Support performance timing of call hierarchies"""
+    """
+    Support performance timing of call hierarchies; each thread has its
+    own hierarchy
+    """
 
-    _Last = None
+    # the innermost open timer, per thread
+    _Local = threading.local()
+
+    # called as each native (NlvLog) timer closes; see G_SamplingProfiler
+    _NativeHook = None
 
 
     #-------------------------------------------------------
     @classmethod
     def GetCurrent(cls):
-        return cls._Last
+        return getattr(cls._Local, "Last", None)
+
+    @classmethod
+    def SetNativeHook(cls, hook):
+        cls._NativeHook = hook
 
 
     #-------------------------------------------------------
-    def __init__(self, description = "", item_count = 0):
+    def __init__(self, description = "", item_count = 0, native = False):
         self._Description = description
+        self._Native = native
         self._Arguments = []
         self._ItemCount = item_count
         self._Timer = NlvLog.PerfTimer()
-        self._Parent = __class__._Last
+        self._Start = time.perf_counter()
+        self._ThreadId = threading.get_ident()
+        self._Parent = __class__.GetCurrent()
         self._Children = []
         self._Closed = False
+        self._Elapsed = 0.0
+        self._PerItem = 0
 
         if self._Parent is not None:
             self._Parent._AddChild(self)
 
-        __class__._Last = self
+        __class__._Local.Last = self
 
-        G_ProgressMeter.Pulse(description)
+        # the progress meter is a GUI element
+        if threading.current_thread() is threading.main_thread():
+            G_ProgressMeter.Pulse(description)
 
 
     #-------------------------------------------------------
@@ -165,8 +345,10 @@ class G_PerfTimer:
 
     #-------------------------------------------------------
     def _Report(self, indent = 0):
+        # a child left open (e.g. by an exception) has no timings
         if not self._Closed:
-            raise RuntimeError("TimeFunction failed")
+            logging.debug("G_PerfTimer: {}{}: not closed".format("|--" * indent, self._Description))
+            return
 
         args = ", ".join(self._Arguments)
 
@@ -192,6 +374,23 @@ class G_PerfTimer:
             child._Report(indent + 1)
 
 
+    #-------------------------------------------------------
+    def GetChildren(self):
+        return self._Children
+
+    def GetDescription(self):
+        return self._Description
+
+    def GetElapsed(self):
+        return self._Elapsed
+
+    def GetParent(self):
+        return self._Parent
+
+    def IsNative(self):
+        return self._Native
+
+
     #-------------------------------------------------------
     def SetItemCount(self, item_count):
         self._ItemCount = item_count
@@ -209,13 +408,35 @@ class G_PerfTimer:
 
             if item_count == 0:
                 item_count = self._ItemCount
+            self._ItemCount = item_count
 
             self._Elapsed = self._Timer.Overall()
             self._PerItem = self._Timer.PerItem(item_count)
-            __class__._Last = self._Parent
 
-            if self._Parent is None:
-                self._Report()
+            # timers close in order, except where an exception skipped a
+            # child's Close; unwind past any such child, and never disturb
+            # another thread's hierarchy
+            if threading.get_ident() == self._ThreadId:
+                timer = __class__.GetCurrent()
+                while timer is not None and timer is not self:
+                    timer = timer._Parent
+                if timer is self:
+                    __class__._Local.Last = self._Parent
+
+            # native timers close from NlvLog; errors must not propagate there
+            try:
+                hook = __class__._NativeHook
+                if self._Native and hook is not None:
+                    hook(self)
+
+                if self._Parent is None:
+                    self._Report()
+                    G_PerfTrace.Record(self)
+
+            except Exception:
+                if not self._Native:
+                    raise
+                logging.exception("G_PerfTimer: native timer close failed: {}".format(self._Description))
 
 
 
@@ -340,20 +561,24 @@ class G_Const:
 
     #-------------------------------------------------------
 
-    # application commands
-    ID_LOGFILE_NEW_VIEW = wx.ID_HIGHEST + 10
-    ID_LOGFILE_NEW_EVENTS = wx.ID_HIGHEST + 11
+    # application commands; allocated above wx.ID_HIGHEST (5999), which
+    # is written literally, as this module does not import wx
+    _ID_HIGHEST = 5999
+
+    ID_LOGFILE_NEW_VIEW = _ID_HIGHEST + 10
+    ID_LOGFILE_NEW_EVENTS = _ID_HIGHEST + 11
 
-    ID_NODE_DELETE = wx.ID_HIGHEST + 20
-    ID_NODE_SHOWHIDE = wx.ID_HIGHEST + 21
+    ID_NODE_DELETE = _ID_HIGHEST + 20
+    ID_NODE_SHOWHIDE = _ID_HIGHEST + 21
 
-    ID_SESSION_SAVE = wx.ID_HIGHEST + 30
-    ID_SESSION_SAVE_AS = wx.ID_HIGHEST + 31
+    ID_SESSION_SAVE = _ID_HIGHEST + 30
+    ID_SESSION_SAVE_AS = _ID_HIGHEST + 31
+    ID_SESSION_PROFILE = _ID_HIGHEST + 32
 
-    ID_THEME_ACTIVATE = wx.ID_HIGHEST + 42
-    ID_THEME_COPY = wx.ID_HIGHEST + 3
-    ID_THEME_DELETE = wx.ID_HIGHEST + 44
-    ID_THEME_RENAME = wx.ID_HIGHEST + 45
+    ID_THEME_ACTIVATE = _ID_HIGHEST + 42
+    ID_THEME_COPY = _ID_HIGHEST + 3
+    ID_THEME_DELETE = _ID_HIGHEST + 44
+    ID_THEME_RENAME = _ID_HIGHEST + 45
 
     #-------------------------------------------------------
     
@@ -369,6 +594,9 @@ class G_Global:
     #-------------------------------------------------------
     TempDir = None
 
+    # when set, overrides the wx configured data directory
+    ConfigDir = None
+
     @classmethod
     def MakeTempPath(cls, file):
         return cls.TempDir / file
@@ -379,6 +607,10 @@ class G_Global:
         return Path( __file__ ).parent
 
     def GetConfigDir():
+        if __class__.ConfigDir is not None:
+            return str(__class__.ConfigDir)
+
+        import wx
         return wx.ConfigBase.Get().Read("/NLV/DataDir")
 
 
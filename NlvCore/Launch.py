@@ -17,10 +17,15 @@
 
 # Python imports
 import argparse
+import concurrent.futures
 import json
+import logging
+import os
 import os.path
 from pathlib import Path
 import subprocess
+import threading
+import time
 
 # pywin32 imports
 import pywintypes
@@ -42,6 +47,200 @@ _Spacer = 10
 
 
 
+## G_Discovery #############################################
+
+class G_Discovery:
+    """
+    Asynchronous search for logfiles. Directories are walked, and
+    extension directory searchers run, in a thread pool; candidate
+    files are identified by sniffing their initial content against
+    each log schema. Results are streamed, in batches, to the
+    on_found callback, which is run on the UI thread. A discovery
+    can be cancelled at any time.
+    """
+
+    # bytes read from each file when sniffing
+    _SniffSize = 8 * 1024
+
+    # minimum fraction of matching lines for a schema to be proposed
+    _SniffThreshold = 0.5
+
+    # limit on the number of logfiles discovered
+    _MaxFiles = 500
+
+    # minimum interval (seconds) between result batches
+    _BatchInterval = 0.2
+
+
+    #-------------------------------------------------------
+    def __init__(self, paths, extensions, schemata, on_found):
+        self._Extensions = extensions
+        self._SchemataByExt = schemata
+
+        # a schema may be registered for several extensions; sniff it once
+        unique = dict()
+        for schema_list in schemata.values():
+            for schema in schema_list:
+                unique.setdefault(schema.Guid, schema)
+        self._Schemata = list(unique.values())
+        self._OnFound = on_found
+
+        self._Lock = threading.Lock()
+        self._Cancelled = threading.Event()
+        self._Pending = []
+        self._NumFound = 0
+        self._NumTasks = 0
+        self._LastPost = 0
+
+        self._Executor = concurrent.futures.ThreadPoolExecutor(max_workers = min(8, (os.cpu_count() or 1) + 4))
+        for p in paths:
+            path = Path(p)
+            if path.is_file():
+                self._Submit(self._SniffFiles, [path], True)
+            elif path.is_dir():
+                self._Submit(self._WalkDir, path)
+                for extension in extensions:
+                    for searcher in extension._DirectorySearch:
+                        self._Submit(self._RunSearcher, searcher, path)
+
+        # covers the case where there is nothing to do
+        self._Submit(lambda: None)
+
+
+    #-------------------------------------------------------
+    def _Submit(self, func, *args):
+        with self._Lock:
+            self._NumTasks += 1
+
+        try:
+            self._Executor.submit(self._RunTask, func, *args)
+        except RuntimeError:
+            # cancelled; the executor is shut down
+            with self._Lock:
+                self._NumTasks -= 1
+
+
+    def _RunTask(self, func, *args):
+        try:
+            if not self._Cancelled.is_set():
+                func(*args)
+        except Exception as ex:
+            logging.error("Discovery: error: {}".format(str(ex)))
+
+        with self._Lock:
+            self._NumTasks -= 1
+            done = self._NumTasks == 0
+
+        self._Post(done)
+
+
+    #-------------------------------------------------------
+    def _Found(self, path_descs):
+        with self._Lock:
+            path_descs = path_descs[:max(0, self._MaxFiles - self._NumFound)]
+            self._NumFound += len(path_descs)
+            self._Pending.extend(path_descs)
+            if self._NumFound >= self._MaxFiles:
+                self._Cancelled.set()
+
+        self._Post(False)
+
+
+    def _Post(self, done):
+        """Pass any pending results to the UI thread; batched to limit UI updates"""
+        with self._Lock:
+            now = time.perf_counter()
+            if not done and (now - self._LastPost) < self._BatchInterval:
+                return
+
+            self._LastPost = now
+            path_descs = self._Pending
+            self._Pending = []
+
+        if self._Cancelled.is_set() and self._NumFound < self._MaxFiles:
+            return
+
+        if len(path_descs) != 0 or done:
+            wx.CallAfter(self._OnFound, self, path_descs, done)
+
+
+    #-------------------------------------------------------
+    def _Sniff(self, path):
+        """Fetch the schemata which match the initial content of the file"""
+        from NlvCore.NlvLogPy import SniffLog
+
+        try:
+            with open(path, "rb") as file:
+                head = file.read(self._SniffSize)
+                at_eof = len(head) < self._SniffSize
+        except OSError:
+            return []
+
+        scores = []
+        for schema in self._Schemata:
+            score = SniffLog(head, schema, at_eof)
+            if score >= self._SniffThreshold:
+                scores.append((score, schema))
+
+        scores.sort(key = lambda item: item[0], reverse = True)
+        return [schema for (score, schema) in scores]
+
+
+    def _SniffFiles(self, paths, explicit = False):
+        path_descs = []
+        for path in paths:
+            if self._Cancelled.is_set():
+                return
+
+            # an explicitly chosen file may be opened with any schema for its extension
+            schemata = self._Sniff(path)
+            if len(schemata) == 0 and explicit:
+                schemata = self._SchemataByExt.get(path.suffix[1:], [])
+
+            if len(schemata) != 0:
+                path_descs.append((path, schemata))
+
+        if len(path_descs) != 0:
+            self._Found(path_descs)
+
+
+    #-------------------------------------------------------
+    def _WalkDir(self, dir):
+        """Sniff the files in a directory; sub-directories are walked in parallel"""
+        files = []
+        with os.scandir(str(dir)) as entries:
+            for entry in entries:
+                if self._Cancelled.is_set():
+                    return
+                if entry.is_dir(follow_symlinks = False):
+                    self._Submit(self._WalkDir, Path(entry.path))
+                elif entry.is_file():
+                    files.append(Path(entry.path))
+
+        self._SniffFiles(files)
+
+
+    def _RunSearcher(self, searcher, dir):
+        """Extension directory searchers may return a list, or an iterator"""
+        batch = []
+        for path_desc in searcher(dir):
+            if self._Cancelled.is_set():
+                return
+            batch.append(path_desc)
+            if len(batch) >= 16:
+                self._Found(batch)
+                batch = []
+
+        self._Found(batch)
+
+
+    #-------------------------------------------------------
+    def Cancel(self):
+        self._Cancelled.set()
+        self._Executor.shutdown(wait = False)
+
+
+
 ## G_FileDropTarget ########################################
 
 class G_FileDropTarget(wx.FileDropTarget):
@@ -293,6 +492,8 @@ class G_LaunchFrame(wx.Frame):
 
         self._Extensions = extensions
         self._Schemata = schemata
+        self._Discovery = None
+        self._PathDescs = dict()
 
         icon_path = G_Shell.GetLaunchIconPath()
         if icon_path.exists():
@@ -349,6 +550,7 @@ class G_LaunchFrame(wx.Frame):
             debug_ctrl = self._DebugCtrl = wx.StaticText(debug_window)
             debug_sizer.Add(debug_ctrl, flag = wx.ALL | wx.EXPAND, border = _Border)
 
+        self.Bind(wx.EVT_CLOSE, self.OnClose)
         self.CenterOnScreen()
 
 
@@ -372,67 +574,70 @@ class G_LaunchFrame(wx.Frame):
 
 
     #-------------------------------------------------------
-    def SearchDir(self, dir):
-        res = []
+    def AddAction(self, action):
+        self._Actions.Add(action, flag = wx.TOP | wx.BOTTOM | wx.EXPAND, border = _Border)
+
 
-        for extension in self._Extensions:
-            for searcher in extension._DirectorySearch:
-                res += searcher(dir)
+    def SetupActions(self, paths):
+        """Start discovery of the logfiles in the dropped paths; any earlier discovery is cancelled"""
+        if self._Discovery is not None:
+            self._Discovery.Cancel()
+
+        self.Reset()
+        self._PathDescs = dict()
+        self._PathCtrl.SetLabel("Searching ...")
+        self._Discovery = G_Discovery(paths, self._Extensions, self._Schemata, self.OnDiscovered)
 
-        return res
-            
 
     #-------------------------------------------------------
-    def ExpandPaths(self, paths):
+    def OnDiscovered(self, discovery, path_descs, done):
         """
-        Expand the list of paths (strings) to a list of path
-        descriptions. Each description is either a tuple containing
-        just a pathlib Path, or a tuple of a pathlib path, schema
-        GUID and builder GUID.
+        Discovery results; each path description is either a tuple of
+        a pathlib Path and a list of candidate schemata, or a tuple of
+        a pathlib path, schema GUID and builder GUID
         """
-        res = []
-
-        for p in paths:
-            path = Path(p)
-            if path.is_file():
-                res.append((path,))
-            elif path.is_dir():
-                res.extend(self.SearchDir(path))
+        if discovery is not self._Discovery:
+            return
 
-        return res
+        if done:
+            self._Discovery = None
 
+        for path_desc in path_descs:
+            # pre-determined schema/builder descriptions take precedence
+            last = self._PathDescs.get(path_desc[0])
+            if last is None or len(last) == 2:
+                self._PathDescs[path_desc[0]] = path_desc
 
-    #-------------------------------------------------------
-    def AddAction(self, action):
-        self._Actions.Add(action, flag = wx.TOP | wx.BOTTOM | wx.EXPAND, border = _Border)
+        if len(path_descs) != 0 or done:
+            self.ShowActions(done)
 
 
-    def SetupActions(self, paths):
+    def ShowActions(self, done):
         self.Reset()
 
-        path_descs = self.ExpandPaths(paths)
-        self.AddAction(G_SessionAction(self, path_descs))
+        path_descs = sorted(self._PathDescs.values(), key = lambda path_desc: str(path_desc[0]))
+        if len(path_descs) != 0:
+            self.AddAction(G_SessionAction(self, path_descs))
 
         actionable_paths = []
         for path_desc in path_descs:
             path = path_desc[0]
-            if len(path_desc) == 1:
+            actionable_paths.append(str(path))
+            if len(path_desc) == 2:
                 # normal case; user chooses schema and builder
-                suffix = path.suffix[1:]
-                schemata = self._Schemata.get(suffix)
-                if schemata is not None:
-                    actionable_paths.append(str(path))
-                    self.AddAction(G_LogUserAction(self, path, schemata))
+                self.AddAction(G_LogUserAction(self, path, path_desc[1]))
 
             else:
                 # special case; schema and builder are pre-determined
-                actionable_paths.append(str(path))
                 self.AddAction(G_LogFixedAction(self, path_desc))
 
         label = self._DropperText
         if len(actionable_paths) != 0:
             label = ",\n".join(actionable_paths)
+        if not done:
+            label += "\nSearching ..."
         self._PathCtrl.SetLabel(label)
+        self.GetSizer().Layout()
 
 
     #-------------------------------------------------------
@@ -442,6 +647,12 @@ class G_LaunchFrame(wx.Frame):
         return True
 
 
+    def OnClose(self, event):
+        if self._Discovery is not None:
+            self._Discovery.Cancel()
+        event.Skip()
+
+
     #-------------------------------------------------------
     def OnCloseCheck(self, event):
         self._CloseAfterLaunch = event.GetInt()
@@ -501,7 +712,7 @@ class G_LaunchApp(wx.App):
         self.SetAppName(appname)
 
         self.SetupMetaData(user_dir)
-        extensions = self.SetupExtensions()
+        extensions = self.SetupExtensions(user_dir)
         schemata = self.SetupSchemata()
 
         global _Args
@@ -520,7 +731,7 @@ class G_LaunchApp(wx.App):
 
 
     #-------------------------------------------------------
-    def SetupExtensions(self):
+    def SetupExtensions(self, user_dir):
         from NlvCore.Logmeta import GetMetaStore
 
         # Interface between NLV plugins (extensions) and the application
@@ -545,7 +756,7 @@ class G_LaunchApp(wx.App):
 
         # load site specific extensions
         from NlvCore.Extension import LoadExtensions
-        return LoadExtensions(Context)
+        return LoadExtensions(Context, user_dir)
 
 
     #-------------------------------------------------------
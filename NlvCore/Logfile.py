@@ -410,6 +410,14 @@ class G_DisplayNode(G_LogChildNode, G_DelayedSendFocus):
 
 
     #-------------------------------------------------------
+    # tracker refreshes are coalesced across all views; requests arriving
+    # within the delay are merged, and the latest tracker positions flushed
+    # to the other views just once
+    _TrackerDelayMs = 50
+    _TrackerTimer = None
+    _PendingLocal = dict()
+    _PendingGlobal = None
+
     def RefreshTrackers(self, update_local, update_global, originator):
         """Update all trackers in the session"""
 
@@ -418,10 +426,37 @@ class G_DisplayNode(G_LogChildNode, G_DelayedSendFocus):
         if originator is not None:
             originator.RefreshView()
 
-        # flush new tracker positions through to all other views
-        lognode = self.GetLogNode()
-        for view in self.GetSessionNode().ListSubNodes(factory_id = G_Project.NodeID_View, recursive = True):
-            if view is not originator:
+        # record the latest originator for each kind of update; it is the
+        # only view already up to date
+        cls = G_DisplayNode
+        if update_local:
+            cls._PendingLocal[self.GetLogNode()] = originator
+        if update_global:
+            cls._PendingGlobal = (originator,)
+
+        # flush new tracker positions through to all other views, later
+        if cls._TrackerTimer is None:
+            cls._TrackerTimer = wx.CallLater(cls._TrackerDelayMs, cls.FlushTrackers, MakeWeakRef(self.GetSessionNode()))
+
+
+    @classmethod
+    def FlushTrackers(cls, wsession):
+        pending_local = cls._PendingLocal
+        pending_global = cls._PendingGlobal
+
+        cls._TrackerTimer = None
+        cls._PendingLocal = dict()
+        cls._PendingGlobal = None
+
+        session = wsession()
+        if session is None:
+            return
+
+        for view in session.ListSubNodes(factory_id = G_Project.NodeID_View, recursive = True):
+            lognode = view.GetLogNode()
+            update_local = lognode in pending_local and view is not pending_local[lognode]
+            update_global = pending_global is not None and view is not pending_global[0]
+            if update_local or update_global:
                 view.RefreshTracker(lognode, update_local, update_global)
 
 
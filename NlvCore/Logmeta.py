@@ -16,8 +16,12 @@
 # 
 
 # Python imports
+from collections import OrderedDict
 import glob
+import logging
+import os
 from pathlib import Path
+import pickle
 import re
 import xml.etree.ElementTree as et
 
@@ -159,6 +163,9 @@ class G_LogSchema(G_FieldSchemata):
     Schema for a logfile
     """
 
+    # limit on the number of memoised source locators
+    _MaxLocators = 4096
+
     #-------------------------------------------------------
     # an extractor fetches a regular expression defined excerpt from a string
     class Extractor:
@@ -258,6 +265,10 @@ class G_LogSchema(G_FieldSchemata):
         self.ExtractorPathRE = __class__.Extractor(element.find("source_path"))
         self.ExtractorLineRE = __class__.Extractor(element.find("source_line"))
 
+        # emitter text -> (substituted emitter text, path, line); emitter
+        # values are highly repetitive, so most lookups hit
+        self._Locators = OrderedDict()
+
 
     #-------------------------------------------------------
     def GetBuilders(self):
@@ -307,21 +318,68 @@ class G_LogSchema(G_FieldSchemata):
         return desc
 
 
+    #-------------------------------------------------------
+    def _MakeSourceLocator(self, emitter_text):
+        """Compute the (substituted emitter text, path, line); uncached"""
+        text = emitter_text
+        for s in self._Substitutions:
+            text = s.Apply(text)
+
+        return (text, self.ExtractorPathRE.Apply(text), self.ExtractorLineRE.Apply(text))
+
+
+    def GetSourceLocator(self, emitter_text):
+        """Fetch the (substituted emitter text, path, line) for an emitter field value"""
+        locators = self._Locators
+        locator = locators.get(emitter_text)
+        if locator is not None:
+            locators.move_to_end(emitter_text)
+            return locator
+
+        locator = locators[emitter_text] = self._MakeSourceLocator(emitter_text)
+        if len(locators) > self._MaxLocators:
+            locators.popitem(last = False)
+
+        return locator
+
+
+    def GetSourceLocators(self, view):
+        """
+        Fetch the source (path, line) for every line in a view (or line
+        set); entries are None where a line has no emitter text
+        """
+        emitter_id = self.GetEmitterId()
+        if emitter_id < 0:
+            return []
+
+        # the LRU is sized for navigation; a view can have many more
+        # distinct emitters, so use a local memo here, and leave the
+        # LRU untouched
+        memo = dict()
+        locators = []
+        for line_no in range(view.GetNumLines()):
+            emitter_text = view.GetFieldText(line_no, emitter_id)
+            locator = memo.get(emitter_text)
+            if locator is None and emitter_text != "":
+                locator = memo[emitter_text] = self._MakeSourceLocator(emitter_text)[1:]
+            locators.append(locator)
+
+        return locators
+
+
     #-------------------------------------------------------
     def CreateLineNotificationMessage(self, log_line, emitter_text):
         """Create a channel notification message for the supplied log line"""
 
-        # build the message
-        for s in self._Substitutions:
-            emitter_text = s.Apply(emitter_text)
-
-        root = et.Element("root")
-        et.SubElement(root, "path").text = self.ExtractorPathRE.Apply(emitter_text)
-        et.SubElement(root, "line").text = self.ExtractorLineRE.Apply(emitter_text)
-        et.SubElement(root, "log").text = log_line
-        et.SubElement(root, "emitter").text = emitter_text
+        (emitter_text, path, line) = self.GetSourceLocator(emitter_text)
 
-        return et.tostring(root, encoding="unicode")
+        # the channel's transport determines the encoding
+        return dict(
+            path = path,
+            line = line,
+            log = log_line,
+            emitter = emitter_text
+        )
 
 
 
@@ -437,6 +495,79 @@ class G_Formatter(list):
 
 
 
+## G_MetaCache ##############################################
+
+class G_MetaCache:
+    """
+    Persistent cache of the top-level XML elements parsed from the
+    metadata files. Entries are validated against each file's
+    modification time and size, so edited files are re-parsed.
+    """
+
+    _Version = 1
+
+    #-------------------------------------------------------
+    def __init__(self, config_dir = None):
+        self._Entries = dict()
+        self._Used = set()
+        self._Dirty = False
+
+        self._Path = None
+        if config_dir is not None:
+            self._Path = Path(config_dir) / "metadata.cache"
+            self._Load()
+
+
+    #-------------------------------------------------------
+    def _Load(self):
+        try:
+            with open(self._Path, "rb") as file:
+                (version, entries) = pickle.load(file)
+            if version == self._Version:
+                self._Entries = entries
+        except FileNotFoundError:
+            pass
+        except Exception as ex:
+            logging.info("Ignoring metadata cache '{}': {}".format(self._Path, ex))
+
+
+    #-------------------------------------------------------
+    def Save(self):
+        """Write the cache, retaining only entries used this session"""
+        if not self._Dirty or self._Path is None:
+            return
+
+        entries = { key: value for (key, value) in self._Entries.items() if key in self._Used }
+        try:
+            temp_path = self._Path.with_suffix(".tmp")
+            with open(temp_path, "wb") as file:
+                pickle.dump((self._Version, entries), file, protocol = pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self._Path)
+            self._Dirty = False
+        except OSError as ex:
+            logging.info("Unable to save metadata cache '{}': {}".format(self._Path, ex))
+
+
+    #-------------------------------------------------------
+    def GetElements(self, file, store_name):
+        """Fetch the store_name elements held in the XML file"""
+        stat = os.stat(file)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+
+        key = (str(file), store_name)
+        self._Used.add(key)
+
+        entry = self._Entries.get(key)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+
+        elements = et.parse(file).getroot().findall(store_name)
+        self._Entries[key] = (stamp, elements)
+        self._Dirty = True
+        return elements
+
+
+
 ## G_XmlStore ###############################################
 
 class G_XmlStore:
@@ -447,10 +578,17 @@ class G_XmlStore:
     """
 
     #-------------------------------------------------------
-    def __init__(self, store_name, factory, config_dir = None):
+    def __init__(self, store_name, factory, config_dir = None, cache = None):
         # cached list of objects corresponding to XML elements
         self._Objects = dict()
 
+        # guid -> element index, and (name, guid) list sorted by name
+        self._Elements = dict()
+        self._NameGuidList = None
+
+        # parsed file cache; optional
+        self._Cache = cache
+
         # the store_name is both the root of the filename and the
         # top level XML element name within the file
         self._StoreName = store_name
@@ -472,12 +610,15 @@ class G_XmlStore:
         level XML elements into the store.
         """
 
-        store = self._XmlTree
         store_name = self._StoreName
         file_glob = store_name + "*.xml"
 
         for file in glob.glob(str(directory / file_glob)):
-            store.extend(et.parse(file).getroot().findall(store_name))
+            if self._Cache is not None:
+                elements = self._Cache.GetElements(file, store_name)
+            else:
+                elements = et.parse(file).getroot().findall(store_name)
+            self._Extend(elements)
 
 
     #-------------------------------------------------------
@@ -485,15 +626,25 @@ class G_XmlStore:
         """
         Add an XML element from some other XML file to this store
         """
-        store = self._XmlTree
-        store_name = self._StoreName
-        store.extend(element.findall(store_name))
+        self._Extend(element.findall(self._StoreName))
+
+
+    #-------------------------------------------------------
+    def _Extend(self, elements):
+        self._XmlTree.extend(elements)
+
+        # as with a search of the tree, the first element with
+        # a given guid wins
+        index = self._Elements
+        for element in elements:
+            index.setdefault(element.get("guid"), element)
+
+        self._NameGuidList = None
 
 
     #-------------------------------------------------------
     def GetElementByGuid(self, guid):
-        xpath = "./{}[@guid='{}']".format(self._StoreName, guid)
-        return self._XmlTree.find(xpath)
+        return self._Elements.get(guid)
  
 
    #-------------------------------------------------------
@@ -513,12 +664,15 @@ class G_XmlStore:
 
    #-------------------------------------------------------
     def GetNameGuidList(self):
-        """Fetch list of pairs (name, guid), sorted by name"""
-        def Key(element):
-            return element.get("name")
+        """Fetch list of pairs (name, guid), sorted by name; do not modify"""
+        if self._NameGuidList is None:
+            def Key(element):
+                return element.get("name")
+
+            self._NameGuidList = [(e.get("name"), e.get("guid"))
+                 for e in sorted(self._XmlTree.iterfind(self._StoreName), key = Key)]
 
-        return [(e.get("name"), e.get("guid"))
-             for e in sorted(self._XmlTree.iterfind(self._StoreName), key = Key)]
+        return self._NameGuidList
 
 
 
@@ -531,11 +685,13 @@ class G_MetaStore:
 
     #-------------------------------------------------------
     def __init__(self, config_dir):
+        self._Cache = cache = G_MetaCache(config_dir)
         self._XmlDb = {
-            "schema": G_XmlStore("schema", G_LogSchema, config_dir),
-            "styleset": G_XmlStore("styleset", G_StyleSet, config_dir),
-            "formatter": G_XmlStore("formatter", G_Formatter, config_dir)
+            "schema": G_XmlStore("schema", G_LogSchema, config_dir, cache),
+            "styleset": G_XmlStore("styleset", G_StyleSet, config_dir, cache),
+            "formatter": G_XmlStore("formatter", G_Formatter, config_dir, cache)
         }
+        cache.Save()
 
 
     #-------------------------------------------------------
@@ -551,6 +707,7 @@ class G_MetaStore:
     def RegisterLogSchemata(self, directory):
         for store in self._XmlDb.values():
             store.AppendDir(directory)
+        self._Cache.Save()
 
 
     def GetLogSchemataNames(self):
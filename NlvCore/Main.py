@@ -45,33 +45,24 @@ import wx.lib.agw.aui as aui
 import wx.lib.newevent as newevent
 
 # Application imports
+from NlvCore.ChartData import G_ChartDataStore
+from NlvCore.DataExplorer import G_DataExplorerPageStore
 from NlvCore.Global import G_ChannelLogFilter
 from NlvCore.Global import G_Global
 from NlvCore.Global import G_PerfTimerScope
-import NlvCore.Session
-import NlvCore.Logfile
-import NlvCore.View
-import NlvCore.EventView
+from NlvCore.Global import G_PerfTrace
 from NlvCore.Project import G_Project
 from NlvCore.Shell import G_Shell
 from NlvCore.Version import NLV_VERSION
 
-# Enable/disable profiling (VisualStudio tools not working ...)
-_G_WantProfiling = False
-_G_Profiler = None
-
-if _G_WantProfiling:
-    import cProfile
-    _G_Profiler = cProfile.Profile()
-
-
-
 ## COMMAND LINE ############################################
 
 _Parser = argparse.ArgumentParser( prog = "nlv", description = "NLV" )
 _Parser.add_argument( "-i", "--integration", action = "store_true", help = "integrate NLV into the shell" )
 _Parser.add_argument( "-l", "--log", action = "append", help = "add a logfile to the session; log specified as 'path@schema'" )
 _Parser.add_argument( "-n", "--new", type = str, default = None, help = "create new session document" )
+_Parser.add_argument( "--profile", action = "store_true", help = "start the sampling profiler; the profile is written to the session's .nlvc directory" )
+_Parser.add_argument( "--perf-trace", type = str, default = None, help = "write performance timings to a trace file (.json for trace_event, .jsonl for JSON lines); 'off' stops tracing" )
 _Parser.add_argument( "-r", "--recent", action = "store_true", help = "open most recently accessed session" )
 _Parser.add_argument( "-s", "--session", type = str, default = None, help = "open session document" )
 
@@ -116,6 +107,39 @@ class HttpRequestHandler(http.server.SimpleHTTPRequestHandler):
         super().end_headers()
 
 
+    #-------------------------------------------------------
+    def SendBlocks(self, blocks, content_type):
+        if blocks is None:
+            return False
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(sum([len(block) for block in blocks])))
+        self.end_headers()
+
+        # stream the data a block at a time; avoids building
+        # one large copy of the data
+        for block in blocks:
+            self.wfile.write(block)
+
+        return True
+
+
+    def SendChartData(self):
+        return self.SendBlocks(G_ChartDataStore.Fetch(self.path), "application/octet-stream")
+
+
+    def SendDataExplorerPage(self):
+        page = G_DataExplorerPageStore.Fetch(self.path)
+        return self.SendBlocks(None if page is None else [page], "text/html; charset=utf-8")
+
+
+    #-------------------------------------------------------
+    def do_GET(self):
+        if not self.SendChartData() and not self.SendDataExplorerPage():
+            super().do_GET()
+
+
     #-------------------------------------------------------
     def translate_path(self, path):
         web_dir = G_Global.GetInstallDir() / "Web"
@@ -369,6 +393,20 @@ class G_AuiNotebook(aui.AuiNotebook):
 
 
 
+## PerfTrace ###############################################
+
+def SetupPerfTrace(args):
+    """Start/stop performance tracing, as requested on the command line"""
+    if args.perf_trace is None:
+        return
+
+    if args.perf_trace.lower() == "off":
+        G_PerfTrace.Stop()
+    else:
+        G_PerfTrace.Start(Path(args.perf_trace).absolute())
+
+
+
 ## G_LogViewFrame ##########################################
 
 class G_LogViewFrame(wx.Frame):
@@ -529,16 +567,17 @@ class G_LogViewFrame(wx.Frame):
     def OnIpcCommand(self, event):
         logging.info("Running launch request")
         args = _Parser.parse_args(event.cmds)
+        SetupPerfTrace(args)
         self._Project.OpenSession(args, False)
 
 
     #-------------------------------------------------------
     def OnCloseWindow(self, event):
-        global _G_Profiler
-        if _G_Profiler is not None:
-            _G_Profiler.disable()
-            _G_Profiler.create_stats()
-            _G_Profiler.dump_stats("cprofile.dat")
+        from NlvCore.Session import GetSessionManager
+        GetSessionManager().StopProfiler()
+
+        G_PerfTrace.Stop()
+        G_PerfTrace.LogSummary()
 
         self.Freeze()
         self._ConsoleLog.Close()
@@ -574,8 +613,14 @@ class G_LogViewApp(wx.App):
 
         user_dir = self.SetupApplicationConfiguration()
         self.SetupLogging(user_dir)
+        SetupPerfTrace(_Args)
+        if _Args.profile:
+            from NlvCore.Profiler import G_SamplingProfiler
+            G_SamplingProfiler.Start()
+
         self.SetupMetaData(user_dir)
-        self.SetupExtensions()
+        self.SetupExtensions(user_dir)
+        self.SetupNodeFactories()
 
         # startup the GUI window
         frame = G_LogViewFrame(None, appname)
@@ -614,6 +659,18 @@ class G_LogViewApp(wx.App):
         # see G_ConsoleLog
 
 
+    #-------------------------------------------------------
+    def SetupNodeFactories(self):
+        # the node modules register their factories with G_Project on import;
+        # deferred to here, so that a second instance, or shell integration,
+        # does not pay for them
+        with G_PerfTimerScope("SetupNodeFactories"):
+            import NlvCore.Session
+            import NlvCore.Logfile
+            import NlvCore.View
+            import NlvCore.EventView
+
+
     #-------------------------------------------------------
     def SetupMetaData(self, user_dir):
         import NlvLog
@@ -624,7 +681,7 @@ class G_LogViewApp(wx.App):
 
 
     #-------------------------------------------------------
-    def SetupExtensions(self):
+    def SetupExtensions(self, user_dir):
         from NlvCore.Logmeta import GetMetaStore
         from NlvCore.Theme import GetThemeStore
 
@@ -649,7 +706,7 @@ class G_LogViewApp(wx.App):
         # load site specific extensions
         from NlvCore.Extension import LoadExtensions
         with G_PerfTimerScope("LoadExtensions"):
-            LoadExtensions(Context)
+            LoadExtensions(Context, user_dir)
 
 
 
@@ -668,9 +725,5 @@ def main():
             G_LogViewApp().MainLoop()
 
 
-if _G_Profiler is not None:
-    _G_Profiler.enable()
-
-
 if __name__ == "__main__":
     main()
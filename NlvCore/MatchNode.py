@@ -26,156 +26,11 @@ import wx.dataview
 import wx.html
 
 # Application imports
-from .Document import D_Document
 from .Global import G_Const
 from .Global import G_Global
+from .MatchItem import G_MatchItem
 from .Project import G_WindowInfo
 
-# Content provider interface
-import NlvLog
-
-
-
-## G_MatchItemMetaData #####################################
-
-class G_MatchItemMetaData:
-    """Descriptive information for the various match item types"""
-
-    #-------------------------------------------------------
-    def __init__(self, name, abbreviation, use_case, use_search_ctrl, selector_id):
-        self.Name = name
-        self.Abbreviation = abbreviation
-        self.UseCase = use_case
-        self.UseSearchCtrl = use_search_ctrl
-        self.SelectorId = selector_id
-
-
-
-## G_MatchItem #############################################
-
-class G_MatchItem(D_Document.D_Value):
-    """Definition (and 'state') of a text search, match, or filter"""
-
-    #-------------------------------------------------------
-    _MetaData = [
-        G_MatchItemMetaData("Literal", "lit", True, True, NlvLog.EnumSelector.Literal),
-        G_MatchItemMetaData("Regular Expression", "re", True, True, NlvLog.EnumSelector.RegularExpression),
-        G_MatchItemMetaData("LogView Filter", "LVF", False, False, NlvLog.EnumSelector.LogviewFilter),
-        G_MatchItemMetaData("LogView Analyser", "LVA", False, False, NlvLog.EnumSelector.LogviewFilter)
-    ]
-
-
-    #-------------------------------------------------------
-    def GetMatchType(abbreviation):
-        """(Static) Convert a type abbreviation back to a full match type"""
-
-        # backwards compatibility
-        if abbreviation == "LFL":
-            abbreviation = "LVF"
-
-        me = __class__
-        for meta in me._MetaData:
-            if meta.Abbreviation == abbreviation:
-                return meta.Name
-
-        raise RuntimeError
-
-
-    #-------------------------------------------------------
-    def GetMetaDataForType(match_type):
-        """(Static) Fetch metadata for the supplied type"""
-
-        for meta in __class__._MetaData:
-            if meta.Name == match_type:
-                return meta
-
-        raise RuntimeError("Unrecognised match item type: {}".format(match_type))
-
-
-    #-------------------------------------------------------
-    def GetMetaNames(with_filter):
-        """(Static) Fetch a list of match item types"""
-
-        # fetch all metadata names
-        me = __class__
-        names = [meta.Name for meta in me._MetaData]
-
-        # determine the number of names to return: 2 for no filter support, otherwise, 3
-        num_names = 2
-        if with_filter:
-            num_names = 3
-
-        return names[0:num_names]
-
-
-    #-------------------------------------------------------
-    def MakeMatchItem(match_like_item):
-        """(Static) Copy construct a real G_MatchItem from a G_MatchItem-like object"""
-        item = G_MatchItem()
-        item.MatchType = match_like_item.MatchType
-        item.MatchText = match_like_item.MatchText
-        item.MatchCase = match_like_item.MatchCase
-
-        # confirm the MatchType is valid
-        item.GetMetaData()
-
-        return item
-
-
-    #-------------------------------------------------------
-    def __init__(self, match_type = "Literal", match_text = "", match_case = True):
-        if type(match_text) is not str:
-            raise TypeError
-
-        self.MatchType = match_type
-        self.MatchText = match_text
-        self.MatchCase = match_case
-        self.HasDataPartition = False
-        self.DataPartition = 0
-
-        # confirm the MatchType is valid
-        self.GetMetaData()
-
-
-    #-------------------------------------------------------
-    def __eq__(self, other):
-        return self.MatchText == other.MatchText and self.MatchType == other.MatchType and self.MatchCase == other.MatchCase
-
-
-    #-------------------------------------------------------
-    def GetMetaData(self):
-        # backwards compatibility
-        if self.MatchType == "LogView Filter Language":
-            self.MatchType = "LogView Filter"
-    
-        return G_MatchItem.GetMetaDataForType(self.MatchType)
-
-
-    #-------------------------------------------------------
-    def GetSelectorId(self):
-        return self.GetMetaData().SelectorId
-
-
-    #-------------------------------------------------------
-    def IsEmpty(self):
-        """Return True if the match has no content"""
-        return len(self.MatchText) == 0
-
-
-    #-------------------------------------------------------
-    def GetDescription(self):
-        """Determine a representatitive description of the filter"""
-        if self.IsEmpty():
-            return "Cleared"
-        else:
-            return "{type}=[{text}]".format(type = self.MatchType, text = self.MatchText)
-
-
-    #-------------------------------------------------------
-    def SetDataPartition(self, partition):
-        self.HasDataPartition = True
-        self.DataPartition = partition
-
 
 
 ## G_MatchAllHistoryStore ##################################
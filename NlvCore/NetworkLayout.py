@@ -0,0 +1,373 @@
+#
+# Copyright (C) Niel Clausen 2020. All rights reserved.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+#
+# Server side layout for large networks. The network is organised as a
+# hierarchy of groups; the page displays one "level" - a set of groups
+# and individual nodes which together cover the whole network - and
+# expands groups on demand. Every expansion lays out at most a bounded
+# number of items, so the cost is independent of the network's size.
+#
+
+# Python imports
+from collections import deque
+import math
+import threading
+
+# Application imports
+from .ChartData import G_ChartData
+
+# Extension imports
+import numpy as np
+
+
+
+## ForceLayout #############################################
+
+def ForceLayout(num_items, sources, targets, weights = None, iterations = 80, seed = 1):
+    """
+    Vectorised force directed (Fruchterman-Reingold) layout. Returns
+    an array of (x, y) positions within the unit circle.
+    """
+    if num_items <= 1:
+        return np.zeros((num_items, 2))
+
+    sources = np.asarray(sources, dtype = np.intp)
+    targets = np.asarray(targets, dtype = np.intp)
+    if weights is None:
+        weights = np.ones(len(sources))
+    else:
+        weights = np.log1p(np.asarray(weights, dtype = np.float64))
+
+    rng = np.random.RandomState(seed)
+    pos = rng.uniform(-1.0, 1.0, (num_items, 2))
+
+    # ideal inter-item distance within a [-1, 1] square
+    k = 2.0 / math.sqrt(num_items)
+    temperature = 0.2
+    cooling = temperature / (iterations + 1)
+
+    for iteration in range(iterations):
+        # repulsion between all pairs
+        delta = pos[:, np.newaxis, :] - pos[np.newaxis, :, :]
+        dist2 = np.maximum((delta ** 2).sum(axis = 2), 1e-6)
+        np.fill_diagonal(dist2, np.inf)
+        disp = ((k * k / dist2)[:, :, np.newaxis] * delta).sum(axis = 1)
+
+        # attraction along links
+        if len(sources) != 0:
+            delta = pos[sources] - pos[targets]
+            dist = np.sqrt((delta ** 2).sum(axis = 1))
+            force = (dist * weights / k)[:, np.newaxis] * delta
+            np.subtract.at(disp, sources, force)
+            np.add.at(disp, targets, force)
+
+        # weak gravity keeps disjoint components together
+        disp -= pos * (k * 0.5)
+
+        length = np.maximum(np.sqrt((disp ** 2).sum(axis = 1)), 1e-9)
+        pos += disp * (np.minimum(length, temperature) / length)[:, np.newaxis]
+        temperature -= cooling
+
+    pos -= pos.mean(axis = 0)
+    scale = np.sqrt((pos ** 2).sum(axis = 1)).max()
+    if scale > 0:
+        pos /= scale
+
+    return pos
+
+
+
+## G_NetworkItem ###########################################
+
+class G_NetworkItem:
+    """A node or group of nodes within a network level"""
+
+    __slots__ = ("Path", "Parent", "Members", "Label", "EventId", "X", "Y", "Radius", "Children")
+
+    #-------------------------------------------------------
+    def __init__(self, path, parent, members, label = None, event_id = None):
+        self.Path = path
+        self.Parent = parent
+        self.Members = members
+        self.Label = label
+        self.EventId = event_id
+        self.X = 0.0
+        self.Y = 0.0
+        self.Radius = 1.0
+        self.Children = None
+
+
+    #-------------------------------------------------------
+    def IsGroup(self):
+        return self.Label is not None
+
+
+
+## G_LevelNetwork ##########################################
+
+class G_LevelNetwork:
+    """
+    A large network, displayed a level at a time. Instances are
+    published as chart data providers (see G_ChartDataStore), and
+    are queried from the HTTP server's threads with:
+
+      expanded - comma separated list of expanded group paths
+      part - "nodes" or "links"
+    """
+
+    #-------------------------------------------------------
+    def __init__(self, node_fields, node_rows, link_fields, link_rows, group_field = None, max_items = 200):
+        self._Lock = threading.Lock()
+        self._MaxItems = max(2, max_items)
+        self._NodeFields = node_fields
+        self._NodeRows = node_rows
+        self._LinkFields = link_fields
+        self._LinkRows = link_rows
+        self._NextGroupId = -1
+
+        event_id_idx = node_fields.index("event_id")
+        self._EventIds = np.array([row[event_id_idx] for row in node_rows], dtype = np.int64)
+        node_map = dict([(event_id, idx) for idx, event_id in enumerate(self._EventIds.tolist())])
+
+        source_idx = link_fields.index("source")
+        target_idx = link_fields.index("target")
+        self._Sources = np.array([node_map[row[source_idx]] for row in link_rows], dtype = np.intp)
+        self._Targets = np.array([node_map[row[target_idx]] for row in link_rows], dtype = np.intp)
+
+        self._GroupValues = None
+        if group_field is not None and group_field in node_fields:
+            group_idx = node_fields.index(group_field)
+            self._GroupValues = [row[group_idx] for row in node_rows]
+
+        self._Root = G_NetworkItem("", None, np.arange(len(node_rows)), "")
+
+
+    #-------------------------------------------------------
+    def _MakeGroup(self, parent, idx, label, members):
+        path = str(idx) if parent.Path == "" else "{}.{}".format(parent.Path, idx)
+        group = G_NetworkItem(path, parent, np.asarray(members, dtype = np.intp), label, self._NextGroupId)
+        self._NextGroupId -= 1
+        return group
+
+
+    #-------------------------------------------------------
+    def _SplitByValue(self, parent):
+        groups = dict()
+        for member in parent.Members.tolist():
+            groups.setdefault(self._GroupValues[member], []).append(member)
+
+        if len(groups) <= 1 or len(groups) > self._MaxItems:
+            return None
+
+        keys = sorted(groups.keys(), key = lambda key: str(key))
+        return [self._MakeGroup(parent, idx, "{} ({})".format(key, len(groups[key])), groups[key]) for idx, key in enumerate(keys)]
+
+
+    #-------------------------------------------------------
+    def _SplitByLocality(self, parent):
+        """Chunk the members in breadth first order, so that connected nodes share a group"""
+        members = parent.Members
+        local = np.full(len(self._EventIds), -1, dtype = np.intp)
+        local[members] = np.arange(len(members))
+
+        src = local[self._Sources]
+        tgt = local[self._Targets]
+        keep = (src >= 0) & (tgt >= 0)
+        src = src[keep]
+        tgt = tgt[keep]
+
+        # compressed (CSR) undirected adjacency
+        ends = np.concatenate((src, tgt))
+        others = np.concatenate((tgt, src))
+        order = np.argsort(ends, kind = "stable")
+        neighbours = others[order].tolist()
+        starts = np.searchsorted(ends[order], np.arange(len(members) + 1)).tolist()
+
+        visited = bytearray(len(members))
+        ordered = []
+        for seed in range(len(members)):
+            if visited[seed]:
+                continue
+
+            visited[seed] = 1
+            queue = deque([seed])
+            while queue:
+                node = queue.popleft()
+                ordered.append(node)
+                for other in neighbours[starts[node]:starts[node + 1]]:
+                    if not visited[other]:
+                        visited[other] = 1
+                        queue.append(other)
+
+        ordered = members[np.array(ordered, dtype = np.intp)]
+        chunk = -(-len(ordered) // self._MaxItems)
+        chunks = [ordered[start:start + chunk] for start in range(0, len(ordered), chunk)]
+        return [self._MakeGroup(parent, idx, "{} nodes".format(len(nodes)), nodes) for idx, nodes in enumerate(chunks)]
+
+
+    #-------------------------------------------------------
+    def _Place(self, parent, children):
+        if len(children) == 0:
+            return
+
+        owner = np.full(len(self._EventIds), -1, dtype = np.intp)
+        for idx, child in enumerate(children):
+            owner[child.Members] = idx
+
+        src = owner[self._Sources]
+        tgt = owner[self._Targets]
+        keep = (src >= 0) & (tgt >= 0) & (src != tgt)
+        pairs, counts = np.unique(np.minimum(src[keep], tgt[keep]) * len(children) + np.maximum(src[keep], tgt[keep]), return_counts = True)
+
+        pos = ForceLayout(len(children), pairs // len(children), pairs % len(children), counts)
+        radius = parent.Radius * 0.45 / math.sqrt(len(children))
+        for idx, child in enumerate(children):
+            child.X = parent.X + pos[idx, 0] * parent.Radius
+            child.Y = parent.Y + pos[idx, 1] * parent.Radius
+            child.Radius = radius
+
+
+    #-------------------------------------------------------
+    def _GetChildren(self, group):
+        if group.Children is None:
+            children = None
+            if group is self._Root and self._GroupValues is not None:
+                children = self._SplitByValue(group)
+
+            if children is None and len(group.Members) > self._MaxItems:
+                children = self._SplitByLocality(group)
+
+            if children is None:
+                children = [G_NetworkItem(None, group, np.array([member], dtype = np.intp)) for member in group.Members.tolist()]
+
+            self._Place(group, children)
+            group.Children = children
+
+        return group.Children
+
+
+    #-------------------------------------------------------
+    def GetLevel(self, expanded):
+        """Return the items displayed when the listed groups are expanded"""
+        expanded = set(expanded)
+        items = []
+
+        with self._Lock:
+            pending = deque(self._GetChildren(self._Root))
+            while pending:
+                item = pending.popleft()
+                if item.IsGroup() and item.Path in expanded:
+                    pending.extend(self._GetChildren(item))
+                else:
+                    items.append(item)
+
+        return items
+
+
+    #-------------------------------------------------------
+    def MakeNodesData(self, items):
+        fields = list(self._NodeFields)
+        for extra in ["title", "type", "size"]:
+            if extra not in fields:
+                fields.append(extra)
+
+        columns = [[] for field in fields]
+        event_id_idx = fields.index("event_id")
+        title_idx = fields.index("title")
+        type_idx = fields.index("type")
+        size_idx = fields.index("size")
+        num_node_fields = len(self._NodeFields)
+
+        for item in items:
+            if item.IsGroup():
+                row = [None] * len(fields)
+                row[event_id_idx] = item.EventId
+                row[title_idx] = item.Label
+                row[type_idx] = "cluster"
+                row[size_idx] = len(item.Members)
+            else:
+                row = list(self._NodeRows[item.Members[0]])
+                row.extend([None] * (len(fields) - num_node_fields))
+
+            for column, value in zip(columns, row):
+                column.append(value)
+
+        data = G_ChartData(len(items))
+        for field, column in zip(fields, columns):
+            data.AddColumn(field, column)
+
+        return (data
+            .AddColumn("x", [item.X for item in items])
+            .AddColumn("y", [item.Y for item in items])
+            .AddColumn("radius", [item.Radius for item in items])
+            .AddColumn("cluster", [item.Path if item.IsGroup() else None for item in items])
+            .AddColumn("parent", [item.Parent.Path for item in items])
+            .AddColumn("count", [len(item.Members) for item in items]))
+
+
+    #-------------------------------------------------------
+    def MakeLinksData(self, items):
+        owner = np.full(len(self._EventIds), -1, dtype = np.intp)
+        for idx, item in enumerate(items):
+            owner[item.Members] = idx
+
+        src = owner[self._Sources]
+        tgt = owner[self._Targets]
+
+        # links within a group are hidden, but a node's link to itself is kept
+        leaf = np.array([not item.IsGroup() for item in items], dtype = bool)
+        link_ids = np.nonzero((src != tgt) | leaf[src])[0]
+        pairs, first, counts = np.unique(src[link_ids] * len(items) + tgt[link_ids], return_index = True, return_counts = True)
+
+        event_id_idx = self._LinkFields.index("event_id")
+        source_idx = self._LinkFields.index("source")
+        target_idx = self._LinkFields.index("target")
+        columns = [[] for field in self._LinkFields]
+
+        next_event_id = -1
+        for pair, link_id, count in zip(pairs.tolist(), link_ids[first].tolist(), counts.tolist()):
+            source = items[pair // len(items)]
+            target = items[pair % len(items)]
+
+            if count == 1 and not source.IsGroup() and not target.IsGroup():
+                row = self._LinkRows[link_id]
+            else:
+                row = [None] * len(self._LinkFields)
+                row[event_id_idx] = next_event_id
+                row[source_idx] = source.EventId if source.IsGroup() else self._EventIds[source.Members[0]].item()
+                row[target_idx] = target.EventId if target.IsGroup() else self._EventIds[target.Members[0]].item()
+                next_event_id -= 1
+
+            for column, value in zip(columns, row):
+                column.append(value)
+
+        data = G_ChartData(len(pairs))
+        for field, column in zip(self._LinkFields, columns):
+            data.AddColumn(field, column)
+
+        return data.AddColumn("count", counts.tolist())
+
+
+    #-------------------------------------------------------
+    def __call__(self, query):
+        expanded = [path for path in query.get("expanded", "").split(",") if path != ""]
+        items = self.GetLevel(expanded)
+
+        if query.get("part") == "links":
+            return self.MakeLinksData(items)
+        return self.MakeNodesData(items)
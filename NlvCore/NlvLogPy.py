@@ -0,0 +1,1238 @@
+#
+# Copyright (C) Niel Clausen 2023. All rights reserved.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Portable reference implementation of the NlvLog interface, in Python
+and NumPy. Covers the subset used by the analysers (EventProjector,
+Chart and the analyser scripts): MakeLogfile, Logfile.CreateLineSet
+(literal, regular expression and LVF selectors) and the LineSet field,
+line translation and timecode accessors. Log views, event views and
+annotations are not supported.
+
+The native (C++) NlvLog remains the default; to select this module,
+set NLV_LOG_ACCESSOR=python before NlvCore is imported (see
+NlvCore/__init__.py). Results are intended to match the native
+engine, which makes the module useful both for testing on platforms
+without the DLL, and as a performance baseline.
+"""
+
+# Python imports
+from array import array
+import calendar
+from enum import IntEnum
+import logging
+import mmap
+import re
+import time
+
+# numerical imports
+import numpy as np
+
+
+
+## Enumerations ############################################
+
+# values match the native module
+
+class EnumSelector(IntEnum):
+    Literal = 0
+    RegularExpression = 1
+    LogviewFilter = 2
+
+class EnumMarker(IntEnum):
+    StandardBase = 0
+    TrackerBase = 8
+    History = 16
+
+class EnumStyle(IntEnum):
+    AnnotationBase = 40
+    Default = 50
+    FieldBase = 51
+    UserFormatBase = 80
+
+class EnumMarginType(IntEnum):
+    Empty = 0
+    LineNumber = 1
+    Offset = 2
+
+class EnumMarginPrecision(IntEnum):
+    MsecDotNsec = 0
+    Usec = 1
+    Msec = 2
+    Sec = 3
+    MinSec = 4
+    HourMinSec = 5
+    DayHourMinSec = 6
+
+
+
+## PerfTimer ###############################################
+
+class PerfTimer:
+    """Elapsed time measurement, as used by G_PerfTimer"""
+
+    #-------------------------------------------------------
+    def __init__(self):
+        self._Start = time.perf_counter()
+        self._Overall = None
+
+
+    #-------------------------------------------------------
+    def _Close(self):
+        if self._Overall is None:
+            self._Overall = time.perf_counter() - self._Start
+
+
+    #-------------------------------------------------------
+    def Overall(self):
+        """Elapsed time, in seconds; the timer stops on first use"""
+        self._Close()
+        return self._Overall
+
+    def PerItem(self, item_count):
+        """Elapsed time per item, in microseconds"""
+        self._Close()
+        if item_count == 0:
+            return 0.0
+        return self._Overall * 1e6 / item_count
+
+
+
+## PRIVATE #################################################
+
+_Logger = logging.getLogger("NlvLog")
+_PerfTimerFactory = None
+
+_NanoSecond = 1000000000
+_UInt64Range = 1 << 64
+_Int64Max = (1 << 63) - 1
+
+
+#-----------------------------------------------------------
+class _PerfTimer:
+    """Feed timings to the application, as the native module does"""
+
+    def __init__(self, description):
+        self._Timer = None
+        if _PerfTimerFactory is not None:
+            self._Timer = _PerfTimerFactory(description, 0)
+
+    def AddArgument(self, arg):
+        if self._Timer is not None:
+            self._Timer.AddArgument(arg)
+
+    def Close(self, item_count):
+        if self._Timer is not None:
+            self._Timer.Close(item_count)
+
+
+#-----------------------------------------------------------
+def _ToUnsigned(value):
+    return int(value) % _UInt64Range
+
+def _ToSigned(value):
+    value = int(value) % _UInt64Range
+    return value - _UInt64Range if value > _Int64Max else value
+
+_Converters = dict(u = _ToUnsigned, s = _ToSigned, f = float)
+
+
+
+## Timecode ################################################
+
+class TimecodeBase:
+    """The timecode field and the UTC time from which its values are measured"""
+
+    #-------------------------------------------------------
+    def __init__(self, utc_datum = 0, field_id = 0):
+        self._UtcDatum = utc_datum
+        self._FieldId = field_id
+
+    def GetUtcDatum(self):
+        return self._UtcDatum
+
+    def GetFieldId(self):
+        return self._FieldId
+
+
+
+class Timecode:
+    """A UTC time in whole seconds, plus a nanosecond offset"""
+
+    #-------------------------------------------------------
+    def __init__(self, utc_datum = 0, offset_ns = 0):
+        self._UtcDatum = utc_datum
+        self._OffsetNs = offset_ns
+
+    def GetUtcDatum(self):
+        return self._UtcDatum
+
+    def GetOffsetNs(self):
+        return self._OffsetNs
+
+
+    #-------------------------------------------------------
+    def Normalise(self):
+        # C++ semantics; division truncates towards zero
+        whole = abs(self._OffsetNs) // _NanoSecond
+        if self._OffsetNs < 0:
+            whole = -whole
+        self._UtcDatum += whole
+        self._OffsetNs -= whole * _NanoSecond
+
+    def Subtract(self, rhs):
+        return (_NanoSecond * (self._UtcDatum - rhs._UtcDatum)) + (self._OffsetNs - rhs._OffsetNs)
+
+
+
+## Field conversion ########################################
+
+def _MonthFromAbbr(abbr):
+    # deliberately as lax as the native converter
+    (ch0, ch1, ch2) = abbr[0].upper(), abbr[1], abbr[2]
+    if ch0 == "J":
+        return 1 if ch1 == "a" else 6 if ch2 == "n" else 7 if ch2 == "l" else 0
+    elif ch0 == "M":
+        return 3 if ch2 == "r" else 5 if ch2 == "y" else 0
+    elif ch0 == "A":
+        return 4 if ch2 == "r" else 8 if ch2 == "g" else 0
+    return dict(F = 2, S = 9, O = 10, N = 11, D = 12).get(ch0, 0)
+
+
+def _FractionAsNs(text):
+    if not text:
+        return 0
+    return int(text[:9].ljust(9, "0"))
+
+
+def _AmPmHour(hour, am_pm):
+    if am_pm == "P":
+        return hour if hour == 12 else hour + 12
+    return 0 if hour == 12 else hour
+
+
+#-----------------------------------------------------------
+class _DateTimeFormat:
+    """Convert date/time text to (UTC seconds, ns); the native "datetime_*" field types"""
+
+    # two character numbers may have a leading space
+    _N2 = r"([ \d]\d)"
+    _N4 = r"([ \d]\d{3})"
+    _Frac = r"(?:\.(\d*))?"
+
+    #-------------------------------------------------------
+    def __init__(self, field_type):
+        n2 = self._N2
+        n4 = self._N4
+        frac = self._Frac
+
+        now = time.gmtime()
+        self._AssumedDate = (now.tm_year, now.tm_mon, now.tm_mday)
+
+        if field_type == "datetime_unix":
+            pattern = r"(...) {n2} {n2}:{n2}:{n2}"
+            self._Convert = self._ConvertUnix
+        elif field_type == "datetime_us_std":
+            pattern = r"(\d\d?)/(\d\d?)/{n4} (\d\d?):{n2}:{n2}{frac} ([AP])M"
+            self._Convert = self._ConvertUsStd
+        elif field_type.startswith("datetime_tracefmt_") and field_type != "datetime_tracefmt_no_date":
+            pattern = r"{n2}/{n2}/{n4}-{n2}:{n2}:{n2}\.(\d{{3}})"
+            if field_type.endswith("_hires"):
+                pattern += r"\.(\d{{6}})"
+            self._International = "_int_" in field_type
+            self._Convert = self._ConvertTraceFmt
+        elif field_type == "datetime_web_utc":
+            pattern = r"{n4}-{n2}-{n2}[T ]{n2}:{n2}:{n2}{frac}Z"
+            self._Convert = self._ConvertWebUtc
+        elif field_type == "datetime_tracefmt_no_date":
+            pattern = r"{n2}:{n2}:{n2}{frac}"
+            self._Convert = self._ConvertNoDate
+        else:
+            raise ValueError("Unknown date/time type: {}".format(field_type))
+
+        self._RE = re.compile(pattern.format(n2 = n2, n4 = n4, frac = frac))
+
+
+    #-------------------------------------------------------
+    def _ConvertUnix(self, groups):
+        month = _MonthFromAbbr(groups[0])
+        return (self._AssumedDate[0], month, int(groups[1]), int(groups[2]), int(groups[3]), int(groups[4])), 0
+
+    def _ConvertUsStd(self, groups):
+        hour = _AmPmHour(int(groups[3]), groups[7])
+        return (int(groups[2]), int(groups[0]), int(groups[1]), hour, int(groups[4]), int(groups[5])), _FractionAsNs(groups[6])
+
+    def _ConvertTraceFmt(self, groups):
+        (day, month) = (groups[0], groups[1]) if self._International else (groups[1], groups[0])
+        ns = 1000000 * int(groups[6])
+        if len(groups) > 7:
+            ns += int(groups[7])
+        return (int(groups[2]), int(month), int(day), int(groups[3]), int(groups[4]), int(groups[5])), ns
+
+    def _ConvertWebUtc(self, groups):
+        return tuple([int(g) for g in groups[0:6]]), _FractionAsNs(groups[6])
+
+    def _ConvertNoDate(self, groups):
+        return self._AssumedDate + (int(groups[0]), int(groups[1]), int(groups[2])), _FractionAsNs(groups[3])
+
+
+    #-------------------------------------------------------
+    def Convert(self, text):
+        """Fetch (utc, ns), or None where the text is not a date/time"""
+        match = self._RE.fullmatch(text)
+        if match is None:
+            return None
+
+        (tm, ns) = self._Convert(match.groups())
+        if not (1 <= tm[1] <= 12) or ns >= _NanoSecond:
+            return None
+
+        # like _mkgmtime, out of range days/hours etc. are normalised
+        return calendar.timegm(tm + (0, 0, 0)), ns
+
+
+#-----------------------------------------------------------
+class _FieldInfo:
+    """Field conversion information; one per log schema field"""
+
+    _IntRE = re.compile(rb"\s*([+-]?)(0[xX][0-9a-fA-F]+|0[0-7]*|[1-9][0-9]*)")
+    _FloatRE = re.compile(rb"\s*[+-]?((\d+\.?\d*|\.\d+)([eE][+-]?\d+)?|inf(inity)?|nan)", re.IGNORECASE)
+    _BoolRE = re.compile(rb"[01]|[tT](?:rue|RUE)|[fF](?:alse|ALSE)")
+
+    # field type -> (kind, bits); kind is "u"nsigned, "s"igned, "f"loat,
+    # "e"num, "d"ate/time or "t"ext
+    _Types = dict(
+        bool = ("u", 1),
+        uint08 = ("u", 8), uint16 = ("u", 16), uint32 = ("u", 32), uint64 = ("u", 64),
+        int08 = ("s", 8), int16 = ("s", 16), int32 = ("s", 32), int64 = ("s", 64),
+        float32 = ("f", 32), float64 = ("f", 64),
+        enum08 = ("e", 8), enum16 = ("e", 16),
+        emitter = ("t", 0), text = ("t", 0)
+    )
+
+    #-------------------------------------------------------
+    def __init__(self, field_schema):
+        self.Name = field_schema.Name
+        self.Type = field_schema.Type
+        self.Available = getattr(field_schema, "Available", True)
+        self.DataColumnOffset = getattr(field_schema, "DataColumnOffset", 0)
+        self.Separator = field_schema.Separator.encode("utf-8") if field_schema.Separator else b""
+        self.SeparatorCount = field_schema.SeparatorCount
+        self.MinWidth = field_schema.MinWidth
+        self.LeftTrim = field_schema.LeftTrim
+        self.RightTrim = field_schema.RightTrim
+
+        self.DateTime = None
+        if self.Type.startswith("datetime_"):
+            self.DateTime = _DateTimeFormat(self.Type)
+            (self.Kind, self._Bits) = ("d", 64)
+        elif self.Type in self._Types:
+            (self.Kind, self._Bits) = self._Types[self.Type]
+        else:
+            raise ValueError("Unknown field type: {}".format(self.Type))
+
+        self.EnumNames = ["!INVALID!"]
+        self._EnumIds = dict()
+
+
+    #-------------------------------------------------------
+    def GetValueType(self):
+        """Fetch the value type: "u"nsigned, "s"igned, "f"loat or None (text)"""
+        return dict(u = "u", e = "u", s = "s", d = "s", f = "f").get(self.Kind)
+
+    def GetArrayTypeCode(self):
+        return dict(u = "Q", s = "q", f = "d").get(self.GetValueType())
+
+
+    #-------------------------------------------------------
+    def _ConvertInteger(self, text, signed):
+        match = self._IntRE.fullmatch(text)
+        if match is None:
+            return None
+
+        digits = match.group(2)
+        if digits[:2] in (b"0x", b"0X"):
+            value = int(digits, 16)
+        elif len(digits) > 1 and digits[:1] == b"0":
+            value = int(digits, 8)
+        else:
+            value = int(digits)
+
+        if match.group(1) == b"-":
+            value = -value
+
+        if signed:
+            limit = 1 << (self._Bits - 1)
+            return value if -limit <= value < limit else None
+
+        # strtoull negates in the unsigned domain
+        value %= _UInt64Range
+        return value if value < (1 << self._Bits) else None
+
+
+    def _ConvertEnum(self, text):
+        enum_id = self._EnumIds.get(text)
+        if enum_id is None:
+            if len(self.EnumNames) >= (1 << self._Bits) - 1:
+                return None
+            enum_id = self._EnumIds[text] = len(self.EnumNames)
+            self.EnumNames.append(text.decode("utf-8", "replace"))
+        return enum_id
+
+
+    def Convert(self, text, datum):
+        """
+        Convert the field text to a value; datum is a single item list
+        holding the log's UTC datum (0 until the first date is seen).
+        Returns None where the text cannot be converted.
+        """
+        kind = self.Kind
+        if kind == "t":
+            return 0
+
+        elif kind == "e":
+            return self._ConvertEnum(text)
+
+        elif kind == "d":
+            try:
+                utc_ns = self.DateTime.Convert(text.decode("ascii"))
+            except UnicodeDecodeError:
+                utc_ns = None
+
+            if utc_ns is None:
+                return None
+
+            (utc, ns) = utc_ns
+            if datum[0] == 0:
+                datum[0] = utc
+            return max(0, (_NanoSecond * (utc - datum[0])) + ns)
+
+        elif kind == "f":
+            if self._FloatRE.fullmatch(text) is None:
+                return None
+            value = float(text)
+            if self._Bits == 32 and abs(value) > 3.4028234663852886e38 and value != float("inf"):
+                return None
+            return value
+
+        elif self.Type == "bool":
+            if self._BoolRE.fullmatch(text) is None:
+                return None
+            return 1 if text[:1] in b"1tT" else 0
+
+        else:
+            return self._ConvertInteger(text, kind == "s")
+
+
+
+## G_LineParser ############################################
+
+class G_LineParser:
+    """Locate and convert the fields in a log line, as described by a log schema"""
+
+    #-------------------------------------------------------
+    def __init__(self, log_schema):
+        self.Fields = [_FieldInfo(field_schema) for field_schema in log_schema]
+
+        regex_text = getattr(log_schema, "RegexText", "")
+        self._Regex = re.compile(regex_text.encode("utf-8")) if regex_text else None
+        self.Split = self._SplitRegex if self._Regex is not None else self._SplitSeparated
+
+
+    #-------------------------------------------------------
+    def _SplitSeparated(self, line):
+        """Locate the fields in a line using the field separator information"""
+        spans = []
+        size = len(line)
+        at = 0
+
+        for field in self.Fields:
+            separator = field.Separator
+            field_begin = at
+            field_end = at + field.MinWidth
+            if field_end >= size:
+                return None, 0
+
+            for i in range(field.SeparatorCount):
+                if i != 0:
+                    field_end += len(separator)
+                field_end = line.find(separator, field_end)
+                if field_end < 0:
+                    return None, 0
+
+            at = field_end + len(separator)
+            if at >= size:
+                return None, 0
+
+            if field.LeftTrim:
+                while field_begin < field_end and line[field_begin] in (0x20, 0x09):
+                    field_begin += 1
+
+            if field.RightTrim:
+                while field_end > field_begin and line[field_end - 1] in (0x20, 0x09):
+                    field_end -= 1
+
+            spans.append((field_begin, field_end))
+
+        return spans, at
+
+
+    def _SplitRegex(self, line):
+        """Locate the fields in a line using a regular expression"""
+        match = self._Regex.search(line)
+        if match is None or (match.re.groups + 1) != len(self.Fields):
+            return None, 0
+
+        end = match.end()
+        spans = [match.span(i) if match.start(i) >= 0 else (end, end) for i in range(len(self.Fields))]
+        return spans, end
+
+
+    #-------------------------------------------------------
+    def Parse(self, line, datum):
+        """
+        Fetch the (field spans, non-field text offset, field values) for a
+        line; None for an irregular line
+        """
+        (spans, remainder) = self.Split(line)
+        if spans is None:
+            return None
+
+        values = []
+        for (field, (lower, upper)) in zip(self.Fields, spans):
+            value = field.Convert(line[lower : upper], datum)
+            if value is None:
+                return None
+            values.append(value)
+
+        return spans, remainder, values
+
+
+
+## G_LogIndex ##############################################
+
+class G_LogIndex:
+    """
+    Line and field index for a memory mapped logfile. All offsets
+    are absolute positions in the file.
+    """
+
+    # newline search block size; bounds temporary memory use
+    _BlockSize = 1 << 26
+
+    #-------------------------------------------------------
+    def __init__(self, log_map, log_schema, progress):
+        self._Map = log_map
+        self._Parser = G_LineParser(log_schema)
+        self.Fields = self._Parser.Fields
+        self.NumLines = 0
+
+        timer = _PerfTimer("G_LogIndex.IndexLines")
+        try:
+            self._IndexLines()
+        finally:
+            timer.Close(self.NumLines)
+
+        timer = _PerfTimer("G_LogIndex.IndexFields")
+        try:
+            self._IndexFields(progress)
+        finally:
+            timer.Close(self.NumLines)
+
+
+    #-------------------------------------------------------
+    def _IndexLines(self):
+        """Vectorised search for line endings"""
+        log_map = self._Map
+        size = len(log_map)
+        data = np.frombuffer(log_map, dtype = np.uint8)
+
+        # silently strip any UTF-8 BOM
+        start = 3 if log_map[0:3] == b"\xef\xbb\xbf" else 0
+
+        # cope with the mess of pre OSX Mac ("\r"), DOS ("\r\n") and Unix ("\n")
+        # line endings; a "\r" ends a line unless followed by "\n", or is the
+        # last character in the file
+        ends = []
+        for lower in range(start, size, self._BlockSize):
+            block = data[lower : lower + self._BlockSize]
+            ends.append(np.flatnonzero(block == 10) + lower)
+
+            cr = np.flatnonzero(block == 13) + lower
+            cr = cr[cr < size - 1]
+            ends.append(cr[data[cr + 1] != 10])
+
+        del data, block
+
+        ends = np.sort(np.concatenate(ends)) + 1
+        offsets = np.concatenate((np.array([start], dtype = np.int64), ends.astype(np.int64)))
+        if offsets[-1] != size:
+            offsets = np.append(offsets, size)
+
+        self.LineOffsets = offsets
+        self.NumLines = len(offsets) - 1
+
+
+    #-------------------------------------------------------
+    def _IndexFields(self, progress):
+        log_map = self._Map
+        offsets = self.LineOffsets.tolist()
+        fields = self.Fields
+        num_fields = len(fields)
+        parse = self._Parser.Parse
+
+        regular = bytearray(self.NumLines)
+        non_field = array("q")
+        field_offsets = array("q")
+        values = [array(field.GetArrayTypeCode() or "q") for field in fields]
+        irregular_offsets = [0] * (2 * num_fields)
+        datum = [0]
+
+        next_progress = progress_size = 1024 * 1024
+        for line_no in range(self.NumLines):
+            begin = offsets[line_no]
+            line = log_map[begin : offsets[line_no + 1]]
+
+            if begin > next_progress and progress is not None:
+                progress("Creating index: {}".format(begin // progress_size))
+                next_progress += progress_size
+
+            parsed = parse(line, datum)
+            if parsed is None:
+                # irregular ("continuation") line; the whole line is non-field text
+                non_field.append(begin)
+                field_offsets.extend([begin] * len(irregular_offsets))
+                for field_values in values:
+                    field_values.append(0)
+                continue
+
+            (spans, remainder, line_values) = parsed
+            regular[line_no] = 1
+            non_field.append(begin + remainder)
+            for (lower, upper) in spans:
+                field_offsets.append(begin + lower)
+                field_offsets.append(begin + upper)
+            for (field_values, value) in zip(values, line_values):
+                field_values.append(value)
+
+        self.Regular = np.frombuffer(bytes(regular), dtype = np.uint8).astype(bool)
+
+        # map each line to its nearest regular line, at or before it; -1 for none
+        self.NearestRegular = np.maximum.accumulate(np.where(self.Regular, np.arange(self.NumLines, dtype = np.int64), -1))
+        self.NonFieldOffsets = np.frombuffer(non_field, dtype = np.int64)
+        self.FieldOffsets = np.frombuffer(field_offsets, dtype = np.int64).reshape((self.NumLines, num_fields, 2))
+        self.Values = [np.frombuffer(field_values, dtype = np.dtype(field.GetArrayTypeCode())) if field.GetValueType() is not None else None
+            for (field, field_values) in zip(fields, values)]
+
+        # the first date/time field is "the" timecode field
+        self.TimecodeFieldId = 0
+        for (field_id, field) in enumerate(fields):
+            if field.Kind == "d":
+                self.TimecodeFieldId = field_id
+                break
+        self.UtcDatum = datum[0]
+
+
+    #-------------------------------------------------------
+    def GetNonFieldText(self, line_no):
+        return self._Map[self.NonFieldOffsets[line_no] : self.LineOffsets[line_no + 1]]
+
+    def GetFieldText(self, line_no, field_id):
+        (lower, upper) = self.FieldOffsets[line_no, field_id]
+        return self._Map[lower : upper]
+
+    def GetFieldValue(self, line_no, field_id):
+        values = self.Values[field_id]
+        if values is None:
+            raise RuntimeError("Invalid convert")
+        return values[line_no].item()
+
+
+    #-------------------------------------------------------
+    def FindLiteral(self, literal, match_case):
+        """Vectorised search of the non-field text of all lines; returns a line mask"""
+        flags = 0 if match_case else re.IGNORECASE
+        finder = re.compile(b"(?=" + re.escape(literal) + b")", flags)
+        found = np.fromiter((match.start() for match in finder.finditer(self._Map)), dtype = np.int64)
+
+        mask = np.zeros(self.NumLines, dtype = bool)
+        if len(found) != 0:
+            line_nos = np.searchsorted(self.LineOffsets, found, side = "right") - 1
+            line_nos = np.minimum(line_nos, self.NumLines - 1)
+            inside = (found >= self.NonFieldOffsets[line_nos]) & ((found + len(literal)) <= self.LineOffsets[line_nos + 1])
+            mask[line_nos[inside]] = True
+        return mask
+
+
+    def FindText(self, hit, field_id = None):
+        """Apply a text predicate to the (field or non-field) text of each regular line"""
+        mask = np.zeros(self.NumLines, dtype = bool)
+        get_text = self.GetNonFieldText if field_id is None else lambda line_no: self.GetFieldText(line_no, field_id)
+        for line_no in np.flatnonzero(self.Regular).tolist():
+            if hit(get_text(line_no)):
+                mask[line_no] = True
+        return mask
+
+
+
+## G_TextMatch #############################################
+
+class G_TextMatch:
+    """Literal or regular expression text matching; the native Selector"""
+
+    #-------------------------------------------------------
+    def __init__(self, selector_id, text, match_case):
+        self.IsLiteral = selector_id == EnumSelector.Literal
+        self.Text = text.encode("utf-8")
+        self.MatchCase = match_case
+
+        if self.IsLiteral:
+            upper = self.Text.upper()
+            self.Hit = (lambda data: self.Text in data) if match_case else (lambda data: upper in data.upper())
+        else:
+            self.Hit = re.compile(self.Text, 0 if match_case else re.IGNORECASE).search
+
+
+    #-------------------------------------------------------
+    def FindLines(self, index, field_id = None):
+        if self.IsLiteral and field_id is None:
+            return index.FindLiteral(self.Text, self.MatchCase)
+        return index.FindText(self.Hit, field_id)
+
+
+
+## G_LvfParser #############################################
+
+class G_LvfParser:
+    """
+    Recursive descent parser for the LogView Filter (LVF) language;
+    mirrors the native grammar. Expressions are evaluated over the
+    whole log at once, yielding a NumPy mask of matching lines.
+    """
+
+    _FieldNameRE = re.compile(r"[_a-zA-Z][_a-zA-Z0-9]*")
+    _DateRE = re.compile(r"(\d+)/(\d+)(?:/(\d+))?")
+    _TimeRE = re.compile(r"(\d+):(\d+):(\d+)(?:\.(\d+))?")
+    _HexRE = re.compile(r"0x([0-9a-fA-F]+)")
+    _RealRE = re.compile(r"[+-]?(\d+\.\d+|\.\d+)([eE][+-]?\d+)?")
+    _DecRE = re.compile(r"[+-]?\d+")
+
+    _CompareOps = [
+        ("==", np.equal), ("!=", np.not_equal), ("<=", np.less_equal), (">=", np.greater_equal),
+        ("=", np.equal), ("<", np.less), (">", np.greater)
+    ]
+
+    #-------------------------------------------------------
+    def __init__(self, text, index):
+        self._Text = text
+        self._At = 0
+        self._Index = index
+
+        self._Tree = self._ParseOrExpr()
+        self._SkipSpace()
+        if self._At != len(text):
+            self._Error("Unable to parse trailing text")
+
+
+    #-------------------------------------------------------
+    def _Error(self, message):
+        raise ValueError("{}: at:{} text:{{{}...}}".format(message, self._At, self._Text[self._At : self._At + 16]))
+
+    def _SkipSpace(self):
+        text = self._Text
+        while self._At < len(text) and text[self._At].isspace():
+            self._At += 1
+
+    def _Accept(self, literal):
+        self._SkipSpace()
+        if self._Text.startswith(literal, self._At):
+            self._At += len(literal)
+            return True
+        return False
+
+    def _AcceptWord(self, word):
+        self._SkipSpace()
+        end = self._At + len(word)
+        if self._Text.startswith(word, self._At) and not self._Text[end : end + 1].isidentifier():
+            self._At = end
+            return True
+        return False
+
+    def _Expect(self, literal):
+        if not self._Accept(literal):
+            self._Error("Expected '{}'".format(literal))
+
+    def _AcceptRE(self, regex):
+        self._SkipSpace()
+        match = regex.match(self._Text, self._At)
+        if match is not None:
+            self._At = match.end()
+        return match
+
+
+    #-------------------------------------------------------
+    def _ParseOrExpr(self):
+        terms = [self._ParseAndExpr()]
+        while self._Accept("||") or self._AcceptWord("or"):
+            terms.append(self._ParseAndExpr())
+        return ("or", terms)
+
+    def _ParseAndExpr(self):
+        terms = [self._ParseNotExpr()]
+        while self._Accept("&&") or self._AcceptWord("and"):
+            terms.append(self._ParseNotExpr())
+        return ("and", terms)
+
+    def _ParseNotExpr(self):
+        if self._Accept("!") or self._AcceptWord("not"):
+            return ("not", self._ParsePrimaryExpr())
+        return self._ParsePrimaryExpr()
+
+    def _ParsePrimaryExpr(self):
+        if self._Accept("("):
+            expr = self._ParseOrExpr()
+            self._Expect(")")
+            return expr
+        return self._ParseMatchClause()
+
+
+    #-------------------------------------------------------
+    def _ParseMatchClause(self):
+        for adornment in ("annotated", "bookmarked"):
+            if self._AcceptWord(adornment):
+                return ("adornment", adornment)
+
+        match = self._AcceptRE(self._FieldNameRE)
+        if match is None:
+            self._Error("Expected a field name")
+        name = match.group(0)
+
+        if self._Accept("~="):
+            return ("text", name, self._ParseTextValue())
+
+        if self._AcceptWord("in"):
+            self._Expect("[")
+            items = [self._ParseRangeItem()]
+            while self._Accept(","):
+                items.append(self._ParseRangeItem())
+            self._Expect("]")
+            return ("in", name, items)
+
+        for (op, func) in self._CompareOps:
+            if self._Accept(op):
+                return ("compare", name, func, self._ParseFieldValue())
+
+        self._Error("Expected a match clause")
+
+
+    def _ParseRangeItem(self):
+        exclude = self._Accept("^")
+        lower = self._ParseFieldValue()
+        upper = self._ParseFieldValue() if self._Accept("..") else None
+        return (exclude, lower, upper)
+
+
+    #-------------------------------------------------------
+    def _ParseTextValue(self):
+        self._SkipSpace()
+        text = self._Text
+        raw = text.startswith("r", self._At) and text[self._At + 1 : self._At + 2] in ('"', '/')
+        if raw:
+            self._At += 1
+
+        quote = text[self._At : self._At + 1]
+        if quote not in ('"', '/') or quote == "":
+            self._Error("Expected a text value")
+        self._At += 1
+
+        if raw:
+            paren = text.find("(", self._At)
+            if paren < 0:
+                self._Error("Expected '('")
+            tail = ")" + text[self._At : paren] + quote
+            self._At = paren + 1
+        else:
+            tail = quote
+
+        end = text.find(tail, self._At)
+        if end <= self._At:
+            self._Error("Expected the closing '{}'".format(tail))
+
+        value = text[self._At : end]
+        self._At = end + len(tail)
+
+        match_case = True
+        if text.startswith("i", self._At):
+            self._At += 1
+            match_case = False
+
+        selector_id = EnumSelector.Literal if quote == '"' else EnumSelector.RegularExpression
+        return ("textvalue", G_TextMatch(selector_id, value, match_case))
+
+
+    def _ParseFieldValue(self):
+        # date/time; a date and/or a time
+        date = self._AcceptRE(self._DateRE)
+        if date is not None:
+            return ("datetime", date.groups(), self._AcceptRE(self._TimeRE))
+        timeofday = self._AcceptRE(self._TimeRE)
+        if timeofday is not None:
+            return ("datetime", None, timeofday)
+
+        match = self._AcceptRE(self._HexRE)
+        if match is not None:
+            return ("number", "u", int(match.group(1), 16))
+
+        match = self._AcceptRE(self._RealRE)
+        if match is not None:
+            return ("number", "f", float(match.group(0)))
+
+        match = self._AcceptRE(self._DecRE)
+        if match is not None:
+            return ("number", "s", int(match.group(0)))
+
+        return self._ParseTextValue()
+
+
+    #-------------------------------------------------------
+    def _GetFieldId(self, name):
+        """Case insensitive, unique, partial match of the field name"""
+        match = name.upper()
+        found = [field_id + field.DataColumnOffset for (field_id, field) in enumerate(self._Index.Fields)
+            if field.Available and match in field.Name.upper()]
+
+        if len(found) == 0:
+            raise ValueError("Unrecognised field name:{{{}}}".format(name))
+        elif len(found) != 1:
+            raise ValueError("Name:{{{}}} matched multiple field names".format(name))
+        return found[0]
+
+
+    def _GetValues(self, field_id, value):
+        """Convert a parsed field value to a list of values of the field's type"""
+        field = self._Index.Fields[field_id]
+        value_type = field.GetValueType()
+        if value_type is None:
+            raise ValueError("Field:{{{}}} has no numeric value".format(field.Name))
+        convert = _Converters[value_type]
+
+        if value[0] == "number":
+            return [convert(value[2])]
+
+        elif value[0] == "datetime":
+            return [convert(self._DateTimeToOffset(value[1], value[2]))]
+
+        # enumeration names matched by the text value
+        text_match = value[1]
+        found = [enum_id for (enum_id, enum_name) in enumerate(field.EnumNames)
+            if enum_id != 0 and text_match.Hit(enum_name.encode("utf-8"))]
+
+        # re-purpose "case insensitive" to mean "invalid names are accepted"
+        if len(found) == 0:
+            if text_match.MatchCase:
+                raise ValueError("Unrecognised enumeration value:{{{}}}".format(text_match.Text.decode("utf-8")))
+            found = [0]
+
+        return found
+
+
+    def _DateTimeToOffset(self, date, timeofday):
+        # default to the date of the log's datum; dates in "C" locale (m/d/y) order
+        datum = time.gmtime(self._Index.UtcDatum)
+        tm = [datum.tm_year, datum.tm_mon, datum.tm_mday, 0, 0, 0]
+
+        if date is not None:
+            (month, day) = (int(date[0]), int(date[1]))
+            if not (1 <= month <= 12):
+                raise ValueError("Month value out of range:{{{}}}".format(month))
+            tm[1:3] = [month, day]
+            if date[2] is not None:
+                year = int(date[2])
+                tm[0] = year + 2000 if year < 70 else year
+
+        ns = 0
+        if timeofday is not None:
+            (hours, minutes, seconds, fraction) = timeofday.groups()
+            tm[3:6] = [int(hours), int(minutes), int(seconds)]
+            if fraction is not None:
+                if len(fraction) > 9:
+                    raise ValueError("Oversized fraction:{{{}}}".format(fraction))
+                ns = _FractionAsNs(fraction)
+
+        utc = calendar.timegm(tuple(tm) + (0, 0, 0))
+        return max(0, (_NanoSecond * (utc - self._Index.UtcDatum)) + ns)
+
+
+    #-------------------------------------------------------
+    def _Evaluate(self, node):
+        index = self._Index
+        kind = node[0]
+
+        if kind == "or":
+            return np.logical_or.reduce([self._Evaluate(term) for term in node[1]])
+
+        elif kind == "and":
+            return np.logical_and.reduce([self._Evaluate(term) for term in node[1]])
+
+        elif kind == "not":
+            return ~self._Evaluate(node[1])
+
+        elif kind == "adornment":
+            # no annotations or bookmarks in this implementation
+            return np.zeros(index.NumLines, dtype = bool)
+
+        elif kind == "text":
+            name = node[1]
+            text_match = node[2][1]
+            if name == "log":
+                return text_match.FindLines(index)
+            elif name in ("anno", "annotation"):
+                return np.zeros(index.NumLines, dtype = bool)
+            return text_match.FindLines(index, self._GetFieldId(name))
+
+        field_id = self._GetFieldId(node[1])
+        values = index.Values[field_id]
+        if values is None:
+            raise ValueError("Field:{{{}}} has no numeric value".format(node[1]))
+
+        def Scalar(value):
+            return np.array(value, dtype = values.dtype)
+
+        if kind == "compare":
+            targets = self._GetValues(field_id, node[3])
+            if len(targets) != 1:
+                raise ValueError("Name:{{{}}} matched multiple enumeration values".format(node[1]))
+            return node[2](values, Scalar(targets[0]))
+
+        # kind == "in"; matched by any included value/range, and no excluded value/range
+        included = np.zeros(index.NumLines, dtype = bool)
+        excluded = np.zeros(index.NumLines, dtype = bool)
+        have_includes = False
+
+        for (exclude, lower, upper) in node[2]:
+            lower_values = self._GetValues(field_id, lower)
+            if upper is None:
+                mask = np.isin(values, np.array(lower_values, dtype = values.dtype))
+            else:
+                if len(lower_values) > 1:
+                    raise ValueError("Field range lower_bound matched more than one enumeration value")
+                (low, high) = (lower_values[0], self._GetValues(field_id, upper)[0])
+                if low >= high:
+                    raise ValueError("Field range lower_bound:{{{}}} not lower than upper_bound:{{{}}}".format(low, high))
+                mask = (values >= Scalar(low)) & (values <= Scalar(high))
+
+            if exclude:
+                excluded |= mask
+            else:
+                included |= mask
+                have_includes = True
+
+        if not have_includes:
+            included[:] = True
+        return included & ~excluded
+
+
+    def FindLines(self):
+        return self._Evaluate(self._Tree)
+
+
+
+## LineSet #################################################
+
+class LineSet:
+    """The log lines matched by a selector"""
+
+    #-------------------------------------------------------
+    def __init__(self, logfile, line_map):
+        self._Logfile = logfile
+        self._Index = logfile._Index
+        self._LineMap = line_map
+
+
+    #-------------------------------------------------------
+    def GetNumLines(self):
+        return len(self._LineMap)
+
+    def ViewLineToLogLine(self, view_line_no):
+        return int(self._LineMap[view_line_no])
+
+    def LogLineToViewLine(self, log_line_no, exact):
+        """Fetch the view line at or after the supplied log line; otherwise -1"""
+        line_map = self._LineMap
+        num_lines = len(line_map)
+        if num_lines == 0:
+            return -1
+
+        view_line_no = max(0, int(np.searchsorted(line_map, log_line_no, side = "right")) - 1)
+        if exact and line_map[view_line_no] != log_line_no:
+            return -1
+
+        if line_map[view_line_no] < log_line_no:
+            view_line_no += 1
+        return -1 if view_line_no >= num_lines else view_line_no
+
+
+    #-------------------------------------------------------
+    def GetNonFieldText(self, line_no):
+        return self._Index.GetNonFieldText(self.ViewLineToLogLine(line_no)).decode("utf-8", "replace")
+
+    def GetFieldText(self, line_no, field_no):
+        return self._Index.GetFieldText(self.ViewLineToLogLine(line_no), field_no).decode("utf-8", "replace")
+
+    def GetFieldValueUnsigned(self, line_no, field_no):
+        return _ToUnsigned(self._Index.GetFieldValue(self.ViewLineToLogLine(line_no), field_no))
+
+    def GetFieldValueSigned(self, line_no, field_no):
+        return _ToSigned(self._Index.GetFieldValue(self.ViewLineToLogLine(line_no), field_no))
+
+    def GetFieldValueFloat(self, line_no, field_no):
+        return float(self._Index.GetFieldValue(self.ViewLineToLogLine(line_no), field_no))
+
+
+    #-------------------------------------------------------
+    def GetNearestTimecodeLine(self, line_no):
+        """Fetch the nearest view line, at or before line_no, which has a timecode; else -1"""
+        log_line_no = self.ViewLineToLogLine(line_no)
+        regular_log_line_no = int(self._Index.NearestRegular[log_line_no])
+        if regular_log_line_no == log_line_no or regular_log_line_no < 0:
+            return line_no if regular_log_line_no == log_line_no else -1
+
+        # the regular line may be filtered out of the set; then no line
+        # between it and line_no has a timecode either
+        view_line_no = int(np.searchsorted(self._LineMap, regular_log_line_no, side = "right")) - 1
+        while view_line_no >= 0 and not self._Index.Regular[self._LineMap[view_line_no]]:
+            view_line_no -= 1
+        return view_line_no
+
+    def GetNearestUtcTimecode(self, line_no):
+        line_no = max(self.GetNearestTimecodeLine(line_no), 0)
+        return self._Logfile.GetUtcTimecode(self.ViewLineToLogLine(line_no))
+
+
+
+## Logfile #################################################
+
+class Logfile:
+    """A memory mapped, indexed, logfile"""
+
+    #-------------------------------------------------------
+    def __init__(self, path, log_schema, progress):
+        self._TzOffset = 0
+        with open(path, "rb") as file:
+            self._Map = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+
+        self._Index = G_LogIndex(self._Map, log_schema, progress)
+
+
+    #-------------------------------------------------------
+    def SetTimezoneOffset(self, offset_sec):
+        self._TzOffset = offset_sec
+
+    def GetTimecodeBase(self):
+        return TimecodeBase(self._Index.UtcDatum, self._Index.TimecodeFieldId)
+
+    def GetUtcTimecode(self, log_line_no):
+        index = self._Index
+        values = index.Values[index.TimecodeFieldId]
+        offset = int(values[log_line_no]) if values is not None and log_line_no < index.NumLines else 0
+        return Timecode(index.UtcDatum - self._TzOffset, offset)
+
+
+    #-------------------------------------------------------
+    def CreateLineSet(self, match):
+        """Create a LineSet of the (regular) lines matched by the match object; None on error"""
+        timer = _PerfTimer("Logfile.CreateLineSet")
+        index = self._Index
+
+        try:
+            selector_id = match.GetSelectorId()
+            text = match.MatchText
+
+            if len(text) == 0:
+                mask = np.ones(index.NumLines, dtype = bool)
+            elif selector_id == EnumSelector.LogviewFilter:
+                mask = G_LvfParser(text, index).FindLines()
+            else:
+                mask = G_TextMatch(selector_id, text, match.MatchCase).FindLines(index)
+
+            line_map = np.flatnonzero(mask & index.Regular)
+            return LineSet(self, line_map)
+
+        except (ValueError, re.error) as ex:
+            _Logger.error("Unable to create selector: '{}' info:'{}'".format(match.MatchText, str(ex)))
+            return None
+
+        finally:
+            timer.Close(index.NumLines)
+
+
+
+## MODULE ##################################################
+
+def Setup(logger, perf_timer_factory):
+    global _Logger, _PerfTimerFactory
+    _Logger = logger if logger is not None else logging.getLogger("NlvLog")
+    _PerfTimerFactory = perf_timer_factory
+
+
+def MakeLogfile(path, log_schema, progress):
+    """Open and index a logfile; None on error"""
+    timer = _PerfTimer("MakeLogfile")
+    timer.AddArgument(path)
+    num_lines = 0
+
+    try:
+        logfile = Logfile(path, log_schema, progress)
+        num_lines = logfile._Index.NumLines
+        return logfile
+
+    except (OSError, ValueError) as ex:
+        _Logger.error("Unable to open logfile: '{}' info:'{}'".format(path, str(ex)))
+        return None
+
+    finally:
+        timer.Close(num_lines)
+
+
+def SniffLog(head, log_schema, at_eof = False):
+    """
+    Fetch the fraction of complete lines, in the initial bytes of a
+    logfile, which match the schema; a cheap schema detector
+    """
+    lines = head.splitlines()
+    if not at_eof and len(lines) > 1:
+        lines = lines[:-1]
+
+    lines = [line for line in lines if len(line) != 0]
+    if len(lines) == 0:
+        return 0.0
+
+    if lines[0].startswith(b"\xef\xbb\xbf"):
+        lines[0] = lines[0][3:]
+
+    parser = G_LineParser(log_schema)
+    datum = [0]
+
+    # the native line splitter includes the terminator; a field
+    # followed by a separator must not end the line
+    num_regular = sum([1 for line in lines if parser.Parse(line + b"\n", datum) is not None])
+    return num_regular / len(lines)
+
+
+def SetGlobalTracker(tracker_idx, timecode):
+    # global trackers are a log view feature; not supported
+    pass
@@ -0,0 +1,204 @@
+#
+# Copyright (C) Niel Clausen 2023. All rights reserved.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+# Python imports
+import logging
+import os
+from pathlib import Path
+import sys
+import threading
+import time
+
+# Application imports
+from .Global import G_PerfTimer
+
+
+
+## G_SamplingProfiler ######################################
+
+class G_SamplingProfiler:
+    """
+    Low overhead statistical profiler. A background thread samples
+    the Python stacks of all other threads (the wx main thread, the
+    HTTP server threads etc.) at a fixed interval; each sample is
+    weighted by the elapsed time since the previous one.
+
+    Time spent inside NlvLog is sampled as part of the calling Python
+    stack; the engine releases the GIL during long running calls, and
+    otherwise the next sample is weighted by the time taken. For a
+    breakdown within NlvLog, the PerfTimer hook records the exclusive
+    time of each C++ timer as it closes; these are kept separately,
+    so that NlvLog time is not counted twice.
+
+    Results are written in the "collapsed stack" format, which can
+    be loaded into speedscope (https://www.speedscope.app) or used
+    to generate flame graphs. Weights are in microseconds.
+    """
+
+    _Lock = threading.Lock()
+    _Thread = None
+    _StopEvent = None
+    _Stacks = dict()
+    _NativeStacks = dict()
+    _Interval = 0.005
+
+
+    #-------------------------------------------------------
+    @staticmethod
+    def _FrameName(code):
+        name = "{} ({}:{})".format(code.co_name, os.path.basename(code.co_filename), code.co_firstlineno)
+
+        # ';' separates frames in the output format
+        return name.replace(";", ":")
+
+
+    #-------------------------------------------------------
+    @classmethod
+    def _MakeStack(cls, thread_name, frame):
+        names = []
+        while frame is not None:
+            names.append(cls._FrameName(frame.f_code))
+            frame = frame.f_back
+
+        names.append(thread_name)
+        names.reverse()
+        return names
+
+
+    #-------------------------------------------------------
+    @classmethod
+    def _Add(cls, stack, weight_us, stacks = None):
+        key = ";".join(stack)
+        with cls._Lock:
+            if stacks is None:
+                stacks = cls._Stacks
+            stacks[key] = stacks.get(key, 0) + weight_us
+
+
+    #-------------------------------------------------------
+    @classmethod
+    def _Run(cls, stop_event, interval):
+        own_id = threading.get_ident()
+        last = time.perf_counter()
+
+        while not stop_event.wait(interval):
+            now = time.perf_counter()
+            weight_us = (now - last) * 1e6
+            last = now
+
+            names = { thread.ident: thread.name for thread in threading.enumerate() }
+            for (thread_id, frame) in sys._current_frames().items():
+                if thread_id != own_id:
+                    thread_name = names.get(thread_id, "Thread-{}".format(thread_id))
+                    cls._Add(cls._MakeStack(thread_name, frame), weight_us)
+
+
+    #-------------------------------------------------------
+    @classmethod
+    def RecordNative(cls, timer):
+        """G_PerfTimer hook; record a closed C++ timer in the NlvLog breakdown"""
+        exclusive = timer.GetElapsed() - sum([child.GetElapsed() for child in timer.GetChildren()])
+        if exclusive <= 0:
+            return
+
+        # frame 0 is this function, frame 1 is G_PerfTimer.Close, called from
+        # NlvLog; so frame 2 is the Python code that called into NlvLog; there
+        # is none when the timer closes on an NlvLog worker thread
+        try:
+            frame = sys._getframe(2)
+        except ValueError:
+            frame = None
+        stack = cls._MakeStack(threading.current_thread().name, frame)
+
+        natives = []
+        while timer is not None and timer.IsNative():
+            natives.append("[NlvLog] " + timer.GetDescription().replace(";", ":"))
+            timer = timer.GetParent()
+
+        natives.reverse()
+        cls._Add(stack + natives, exclusive * 1e6, cls._NativeStacks)
+
+
+    #-------------------------------------------------------
+    @classmethod
+    def IsRunning(cls):
+        return cls._Thread is not None
+
+
+    #-------------------------------------------------------
+    @classmethod
+    def Start(cls, interval = None):
+        if cls.IsRunning():
+            return
+
+        if interval is not None:
+            cls._Interval = interval
+
+        with cls._Lock:
+            cls._Stacks = dict()
+            cls._NativeStacks = dict()
+
+        G_PerfTimer.SetNativeHook(cls.RecordNative)
+
+        stop_event = cls._StopEvent = threading.Event()
+        thread = cls._Thread = threading.Thread(target = cls._Run, args = (stop_event, cls._Interval), name = "NLV-Profiler")
+        thread.daemon = True
+        thread.start()
+
+        logging.info("Profiler started")
+
+
+    #-------------------------------------------------------
+    @staticmethod
+    def _Write(path, stacks):
+        with open(str(path), "w", encoding = "utf-8") as file:
+            for (key, weight_us) in sorted(stacks.items()):
+                weight_us = int(weight_us)
+                if weight_us != 0:
+                    file.write("{} {}\n".format(key, weight_us))
+
+
+    #-------------------------------------------------------
+    @classmethod
+    def Stop(cls, output_dir):
+        """
+        Stop sampling and write the profile to output_dir, and the NlvLog
+        breakdown alongside it; returns the profile's file path
+        """
+        if not cls.IsRunning():
+            return None
+
+        G_PerfTimer.SetNativeHook(None)
+
+        cls._StopEvent.set()
+        cls._Thread.join()
+        cls._Thread = cls._StopEvent = None
+
+        with cls._Lock:
+            stacks = cls._Stacks
+            native_stacks = cls._NativeStacks
+            cls._Stacks = dict()
+            cls._NativeStacks = dict()
+
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = Path(output_dir) / "profile-{}.collapsed.txt".format(stamp)
+        native_path = Path(output_dir) / "profile-{}.nlvlog.collapsed.txt".format(stamp)
+        cls._Write(path, stacks)
+        cls._Write(native_path, native_stacks)
+
+        logging.info("Profiler stopped; profile written to: {} (NlvLog breakdown: {})".format(path, native_path))
+        return path
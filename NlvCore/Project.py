@@ -176,6 +176,7 @@ class G_Node:
     """Base class for application data held in the project"""
 
     _GetThemeId = None
+    _InvalidateThemeValues = None
     _NodeCount = 100
 
 
@@ -677,6 +678,12 @@ class G_Node:
         Recommended that the caller hold a frame lock to prevent
         UI flicker.
         """
+        if G_Node._InvalidateThemeValues is None:
+            from .Document import InvalidateThemeValues
+            G_Node._InvalidateThemeValues = InvalidateThemeValues
+
+        G_Node._InvalidateThemeValues(theme_cls, theme_id)
+
         for node in self.ListSubNodes(recursive = True):
             node.OnThemeChange(theme_cls, theme_id)
 
@@ -1550,7 +1557,7 @@ class G_Project(wx.SplitterWindow, G_ContainerMenu):
 
         # integrate Python/C++ performance timing systems
         def PerfTimerFactory(description, item_count):
-            return G_PerfTimer(description, item_count)
+            return G_PerfTimer(description, item_count, native = True)
 
         # feed NlvLog logging back to the application
         _LogForwarder = LogForwarder()
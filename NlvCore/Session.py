@@ -33,6 +33,7 @@ from .Global import G_Const
 from .Global import G_FrozenWindow
 from .Global import G_Global
 from .Logmeta import GetMetaStore
+from .Profiler import G_SamplingProfiler
 from .Project import G_TabContainerNode
 from .Project import G_TabContainedNode
 from .Project import G_NodeFactory
@@ -413,6 +414,29 @@ class G_SessionManager:
             self.GetSessionNode().SetTreeLabel(str(Path(new_path).name))
 
 
+    #-------------------------------------------------------
+    def IsProfiling(self):
+        return G_SamplingProfiler.IsRunning()
+
+    def StopProfiler(self):
+        """Stop the profiler, if running; the profile is written to the session directory"""
+        if not self.IsProfiling():
+            return
+
+        if self.IsValid():
+            output_dir = self.MakeSessionDir()
+        else:
+            output_dir = Path(G_Global.GetConfigDir())
+
+        G_SamplingProfiler.Stop(output_dir)
+
+    def OnCmdSessionProfile(self, event = None):
+        if self.IsProfiling():
+            self.StopProfiler()
+        else:
+            G_SamplingProfiler.Start()
+
+
     #-------------------------------------------------------
     def OnDropFiles(self, files):
         if len(files) > 1:
@@ -1195,6 +1219,10 @@ class G_SessionNode(G_TabContainerNode):
         menu.Append(G_Const.ID_SESSION_SAVE_AS, "Save As ...")
         handlers[G_Const.ID_SESSION_SAVE_AS] = manager.OnCmdSessionSaveAs
 
+        menu.AppendSeparator()
+        menu.AppendCheckItem(G_Const.ID_SESSION_PROFILE, "Profile").Check(manager.IsProfiling())
+        handlers[G_Const.ID_SESSION_PROFILE] = manager.OnCmdSessionProfile
+
         return menu
 
 
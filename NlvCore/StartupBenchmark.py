@@ -0,0 +1,119 @@
+#
+# Copyright (C) Niel Clausen 2023. All rights reserved.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""
+Startup benchmark; measures the import time of the application's
+entry modules with "python -X importtime", and fails (exit code 1)
+when the cumulative time exceeds a budget. Run as:
+
+    python -m NlvCore.StartupBenchmark [--budget MS] [module ...]
+"""
+
+# Python imports
+import argparse
+import subprocess
+import sys
+
+
+
+## PRIVATE #################################################
+
+# default modules and budget (milliseconds); the budget is deliberately
+# generous, it is there to catch regressions such as an eager import
+# of a web/chart/editor module, not to measure small changes
+_DefaultModules = ["NlvCore.Main"]
+_DefaultBudget = 1500
+
+
+
+## G_ImportTiming ##########################################
+
+class G_ImportTiming:
+    """Import times for a single interpreter run"""
+
+    #-------------------------------------------------------
+    def __init__(self, module):
+        self._Module = module
+        self._Self = dict()
+        self._Cumulative = dict()
+
+        cmd = [sys.executable, "-X", "importtime", "-c", "import {}".format(module)]
+        res = subprocess.run(cmd, stdout = subprocess.DEVNULL, stderr = subprocess.PIPE, universal_newlines = True)
+        if res.returncode != 0:
+            raise RuntimeError("Unable to import '{}':\n{}".format(module, res.stderr))
+
+        # lines are of the form:
+        #   import time: self [us] | cumulative | imported package
+        for line in res.stderr.splitlines():
+            if not line.startswith("import time:"):
+                continue
+
+            fields = line[len("import time:"):].split("|")
+            if len(fields) != 3 or not fields[0].strip().isdigit():
+                continue
+
+            name = fields[2].strip()
+            self._Self[name] = int(fields[0])
+            self._Cumulative[name] = int(fields[1])
+
+
+    #-------------------------------------------------------
+    def GetTotalMs(self):
+        return self._Cumulative.get(self._Module, 0) / 1000
+
+    def GetSlowest(self, count):
+        """Fetch the (self time ms, name) of the most expensive modules"""
+        slowest = sorted(self._Self.items(), key = lambda item: item[1], reverse = True)[:count]
+        return [(us / 1000, name) for (name, us) in slowest]
+
+
+
+## MODULE ##################################################
+
+def Benchmark(modules, budget, repeat = 3, show = 10):
+    """Time each module's import; return True if within budget"""
+    ok = True
+
+    for module in modules:
+        # the first run warms the filesystem and bytecode caches
+        timings = [G_ImportTiming(module) for run in range(repeat)]
+        best = min(timings, key = lambda timing: timing.GetTotalMs())
+        total = best.GetTotalMs()
+
+        print("{}: {:.1f}ms (budget {}ms)".format(module, total, budget))
+        for (ms, name) in best.GetSlowest(show):
+            print("  {:8.1f}ms {}".format(ms, name))
+
+        if total > budget:
+            print("FAIL: {} exceeds the startup budget".format(module))
+            ok = False
+
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(prog = "StartupBenchmark", description = "NLV startup import benchmark")
+    parser.add_argument("-b", "--budget", type = float, default = _DefaultBudget, help = "budget in milliseconds, per module")
+    parser.add_argument("-r", "--repeat", type = int, default = 3, help = "number of runs; the fastest is reported")
+    parser.add_argument("modules", nargs = "*", default = _DefaultModules, help = "modules to import")
+    args = parser.parse_args()
+
+    return 0 if Benchmark(args.modules, args.budget, args.repeat) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -19,7 +19,12 @@
 # Motivated by https://observablehq.com/@nitaku/tangled-tree-visualization-ii
 #
 
+from collections import deque
+import heapq
 import json
+import random
+import sys
+import time
 
 
 
@@ -669,13 +674,414 @@ class Layout:
 
 
 
+## D_NodeRecord ###########################################
+
+class D_NodeRecord:
+    "Array engine entity record; relationships are held as entity/bundle indices"
+
+    __slots__ = ("Id", "Name", "Properties", "Parents", "HasChildren", "ParentBundle", "ChildBundles", "Level", "X", "Y", "BundleHeight")
+
+    #-------------------------------------------------------
+    def __init__(self, name, properties):
+        self.Id = properties["event_id"]
+        self.Name = name
+        self.Properties = properties
+        self.Parents = []
+        self.HasChildren = False
+        self.ParentBundle = None
+        self.ChildBundles = []
+        self.Level = None
+        self.X = self.Y = self.BundleHeight = 0
+
+
+
+## D_BundleRecord #########################################
+
+class D_BundleRecord:
+    "Array engine bundle record; relationships are held as entity/bundle indices"
+
+    __slots__ = ("Key", "Name", "Parents", "Children", "ParentBundles", "ChildBundles", "Generation", "Level", "Links")
+
+    #-------------------------------------------------------
+    def __init__(self, key, name, parents):
+        self.Key = key
+        self.Name = name
+        self.Parents = parents
+        self.Children = []
+        self.ParentBundles = []
+        self.ChildBundles = []
+        self.Generation = None
+        self.Level = None
+        self.Links = None
+
+
+
+## G_TreeLayout ############################################
+
+class G_TreeLayout:
+    """
+    Array backed tangled tree layout. Produces the same layout as the
+    object based engine (D_Network/Layout), but entities and bundles
+    are referenced by integer index, and generations are assigned by
+    relaxing bundles in topological order, rather than by recursion.
+    """
+
+    #-------------------------------------------------------
+    def __init__(self):
+        self.Nodes = []
+        self.NodeMap = dict()
+        self.Links = dict()
+
+
+    #-------------------------------------------------------
+    def AddEntity(self, name, properties):
+        node = D_NodeRecord(name, properties)
+        idx = self.NodeMap.get(node.Id)
+        if idx is None:
+            self.NodeMap[node.Id] = len(self.Nodes)
+            self.Nodes.append(node)
+        else:
+            self.Nodes[idx] = node
+
+
+    def AddRelationship(self, parent_id, child_id, link_id):
+        parent_idx = self.NodeMap[parent_id]
+        child_idx = self.NodeMap[child_id]
+        self.Links[(parent_idx, child_idx)] = link_id
+        self.Nodes[child_idx].Parents.append(parent_idx)
+        self.Nodes[parent_idx].HasChildren = True
+
+
+    #-------------------------------------------------------
+    def CreateBundles(self):
+        nodes = self.Nodes
+        bundles = self.Bundles = []
+        bundle_map = dict()
+
+        for idx, node in enumerate(nodes):
+            if not node.Parents:
+                continue
+
+            key = "-".join(sorted([str(nodes[parent].Id) for parent in node.Parents]))
+            bundle_idx = bundle_map.get(key)
+            if bundle_idx is None:
+                bundle_idx = bundle_map[key] = len(bundles)
+                name = "-".join(sorted([nodes[parent].Name for parent in node.Parents]))
+                parents = sorted(node.Parents, key = lambda parent: nodes[parent].Id)
+                bundles.append(D_BundleRecord(key, name, parents))
+
+            node.ParentBundle = bundle_idx
+            bundles[bundle_idx].Children.append(idx)
+
+        for idx, bundle in enumerate(bundles):
+            parent_bundles = set([nodes[parent].ParentBundle for parent in bundle.Parents])
+            parent_bundles.discard(None)
+            bundle.ParentBundles = sorted(parent_bundles)
+            for parent_bundle in bundle.ParentBundles:
+                bundles[parent_bundle].ChildBundles.append(idx)
+
+            for parent in bundle.Parents:
+                nodes[parent].ChildBundles.append(idx)
+
+        # bundles are ordered by their key
+        order = sorted(range(len(bundles)), key = lambda idx: bundles[idx].Key)
+        rank = self.BundleRank = [0] * len(bundles)
+        for pos, idx in enumerate(order):
+            rank[idx] = pos
+
+        for node in nodes:
+            node.ChildBundles.sort(key = lambda idx: rank[idx])
+
+
+    #-------------------------------------------------------
+    def CalcTopologicalOrder(self):
+        "Kahn's algorithm; any cycles are broken in index order"
+        bundles = self.Bundles
+        in_degree = [len(bundle.ParentBundles) for bundle in bundles]
+        ready = deque([idx for idx, degree in enumerate(in_degree) if degree == 0])
+        order = []
+
+        while len(order) != len(bundles):
+            if not ready:
+                ready.append(next(idx for idx, degree in enumerate(in_degree) if degree > 0))
+                in_degree[ready[0]] = 0
+
+            idx = ready.popleft()
+            order.append(idx)
+            for child in bundles[idx].ChildBundles:
+                if in_degree[child] > 0:
+                    in_degree[child] -= 1
+                    if in_degree[child] == 0:
+                        ready.append(child)
+
+        position = self.TopoPosition = [0] * len(bundles)
+        for pos, idx in enumerate(order):
+            position[idx] = pos
+
+        self.TopoOrder = order
+
+
+    #-------------------------------------------------------
+    def Relax(self, sources, discovered, descend):
+        """
+        Propagate generations from the sources; toward descendents the
+        generation must increase, toward ancestors it must decrease.
+        Bundles are visited in (reverse) topological order, so each is
+        relaxed once, with its final generation.
+        """
+        bundles = self.Bundles
+        position = self.TopoPosition
+        order = self.TopoOrder
+        sign = 1 if descend else -1
+
+        heap = list(set([sign * position[source] for source in sources]))
+        queued = set(heap)
+        heapq.heapify(heap)
+
+        while heap:
+            key = heapq.heappop(heap)
+            bundle = bundles[order[sign * key]]
+            generation = bundle.Generation + sign
+            neighbours = bundle.ChildBundles if descend else bundle.ParentBundles
+
+            for neighbour in neighbours:
+                neighbour_key = sign * position[neighbour]
+                if neighbour_key <= key:
+                    # cycle
+                    continue
+
+                other = bundles[neighbour]
+                if other.Generation is None or sign * (generation - other.Generation) > 0:
+                    other.Generation = generation
+                    discovered.add(neighbour)
+                    if neighbour_key not in queued:
+                        queued.add(neighbour_key)
+                        heapq.heappush(heap, neighbour_key)
+
+
+    def AssignGeneration(self, idx, generation):
+        self.Bundles[idx].Generation = generation
+        ancestors, descendents = set(), set()
+        self.Relax([idx], ancestors, False)
+        self.Relax([idx], descendents, True)
+
+        while ancestors or descendents:
+            next_ancestors, next_descendents = set(), set()
+            self.Relax(ancestors, next_descendents, True)
+            self.Relax(descendents, next_ancestors, False)
+            ancestors, descendents = next_ancestors, next_descendents
+
+
+    #-------------------------------------------------------
+    def CalcLevels(self):
+        bundles = self.Bundles
+        nodes = self.Nodes
+
+        if bundles:
+            self.CalcTopologicalOrder()
+
+            for idx, bundle in enumerate(bundles):
+                if bundle.Generation is None and not bundle.ParentBundles and bundle.ChildBundles:
+                    self.AssignGeneration(idx, 0)
+
+            discovered_generations = [bundle.Generation for bundle in bundles if bundle.Generation is not None]
+            discovered_generations.append(0)
+            min_generation = min(discovered_generations)
+
+            for idx, bundle in enumerate(bundles):
+                if bundle.Generation is None:
+                    self.AssignGeneration(idx, min_generation)
+
+            for bundle in bundles:
+                bundle.Level = bundle.Generation - min_generation
+
+        for node in nodes:
+            if node.ParentBundle is not None:
+                node.Level = bundles[node.ParentBundle].Level + 1
+            else:
+                node.Level = min([bundles[bundle].Level for bundle in node.ChildBundles])
+
+
+    #-------------------------------------------------------
+    def MakeNetwork(self):
+        # loose disconnected entities
+        nodes = [node for node in self.Nodes if node.Parents or node.HasChildren]
+        if len(nodes) != len(self.Nodes):
+            remap = dict([(self.NodeMap[node.Id], idx) for idx, node in enumerate(nodes)])
+            for node in nodes:
+                node.Parents = [remap[parent] for parent in node.Parents]
+
+            self.Links = dict([((remap[parent], remap[child]), link_id) for (parent, child), link_id in self.Links.items()])
+            self.NodeMap = dict([(node.Id, idx) for idx, node in enumerate(nodes)])
+            self.Nodes = nodes
+
+        self.CreateBundles()
+        self.CalcLevels()
+
+
+    #-------------------------------------------------------
+    def MakeLinks(self, bundle_idx):
+        bundle = self.Bundles[bundle_idx]
+        if bundle.Links is None:
+            nodes = self.Nodes
+            links = bundle.Links = []
+            for parent in bundle.Parents:
+                parent_bundle_no = nodes[parent].ChildBundles.index(bundle_idx)
+                for child in bundle.Children:
+                    links.append((parent, child, self.Links[(parent, child)], parent_bundle_no))
+
+        return bundle.Links
+
+
+    #-------------------------------------------------------
+    def OrderLevel(self, level, level_nodes):
+        nodes = self.Nodes
+        bundles = self.Bundles
+        rank = self.BundleRank
+        node_id = lambda idx: nodes[idx].Id
+
+        level_bundles = set()
+        for idx in level_nodes:
+            for bundle in nodes[idx].ChildBundles:
+                if bundles[bundle].Level == level:
+                    level_bundles.add(bundle)
+
+        level_bundles = sorted(level_bundles, key = lambda idx: rank[idx])
+        for bundle in level_bundles:
+            self.MakeLinks(bundle)
+
+        assigned_nodes = set()
+        ordered_nodes = []
+
+        def AddNode(idx):
+            if idx not in assigned_nodes:
+                assigned_nodes.add(idx)
+                ordered_nodes.append(idx)
+
+        # put nodes with non-local children first
+        non_local_nodes = dict()
+        for idx in level_nodes:
+            child_bundles = nodes[idx].ChildBundles
+            if child_bundles:
+                max_child_level = max([bundles[bundle].Level for bundle in child_bundles])
+                if max_child_level != level:
+                    non_local_nodes.setdefault(max_child_level, []).append(idx)
+
+        for key in sorted(non_local_nodes.keys(), reverse = True):
+            for idx in sorted(non_local_nodes[key], key = node_id):
+                AddNode(idx)
+
+        num_nonlocal_nodes = len(ordered_nodes)
+
+        # and the rest in bundle order (keeps a bundle's parents together)
+        for bundle in level_bundles:
+            for parent in bundles[bundle].Parents:
+                if nodes[parent].Level == level:
+                    AddNode(parent)
+
+        ordered_nodes.extend(sorted([idx for idx in level_nodes if idx not in assigned_nodes], key = node_id))
+
+        index_limit_node = None
+        if num_nonlocal_nodes != 0:
+            index_limit_node = min(num_nonlocal_nodes, len(ordered_nodes) - 1)
+
+        return ordered_nodes, level_bundles, index_limit_node
+
+
+    #-------------------------------------------------------
+    def Layout(self, config):
+        nodes = self.Nodes
+        bundles = self.Bundles
+
+        num_levels = len(set([bundle.Level for bundle in bundles]))
+        num_levels = max([num_levels] + [node.Level for node in nodes])
+        level_nodes = [[] for level in range(num_levels + 1)]
+        for idx, node in enumerate(nodes):
+            level_nodes[node.Level].append(idx)
+
+        levels = self.Levels = [self.OrderLevel(level, members) for level, members in enumerate(level_nodes)]
+
+        # positions; link records become [parent, child, link_id, y, x]
+        x, y = config.Border, config.Border
+        for ordered_nodes, level_bundles, index_limit_node in levels:
+            for idx in ordered_nodes:
+                node = nodes[idx]
+                node.BundleHeight = max(0, len(node.ChildBundles) - 1) * config.OutboundBundleSpacing
+                node.X, node.Y = x, y
+                y += config.NodeSpacing + node.BundleHeight
+
+            x += config.NodeWidth + config.BundleWidth
+            for bundle in reversed(level_bundles):
+                bundles[bundle].Links = [[parent, child, link_id, bundle_no * config.OutboundBundleSpacing, x] for parent, child, link_id, bundle_no in bundles[bundle].Links]
+                x += config.BundleWidth
+
+            x += config.BundleWidth
+
+        # vertical adjustment
+        limit, delta = None, 0
+        for ordered_nodes, level_bundles, index_limit_node in levels:
+            if limit is not None and ordered_nodes:
+                clip = nodes[ordered_nodes[0]].Y + delta - limit
+                if clip < 0:
+                    delta -= clip
+
+            for idx in ordered_nodes:
+                nodes[idx].Y += delta
+
+            delta = -1000000
+            for bundle in level_bundles:
+                for parent, child, link_id, link_y, link_x in bundles[bundle].Links:
+                    vertical = nodes[child].Y - (nodes[parent].Y + link_y)
+                    delta = max(delta, config.MinLevelOffset - vertical)
+
+            limit = None
+            if index_limit_node is not None:
+                limit = nodes[ordered_nodes[index_limit_node]].Y + config.NodeSpacing
+
+
+    #-------------------------------------------------------
+    def Extract(self):
+        config = G_LayoutConfig()
+        self.MakeNetwork()
+        self.Layout(config)
+
+        nodes = self.Nodes
+        bundles = self.Bundles
+
+        node_data, bundle_data = [], []
+        for ordered_nodes, level_bundles, index_limit_node in self.Levels:
+            for idx in ordered_nodes:
+                node = nodes[idx]
+                graph = dict(x = node.X, y = node.Y, bundle_height = node.BundleHeight, title = node.Name)
+                graph.update(node.Properties)
+                node_data.append(graph)
+
+            for bundle in level_bundles:
+                links = [dict(event_id = link_id, px = nodes[parent].X, py = nodes[parent].Y + link_y, x = link_x, cx = nodes[child].X, cy = nodes[child].Y)
+                    for parent, child, link_id, link_y, link_x in bundles[bundle].Links]
+                bundle_data.append(dict(id = bundles[bundle].Name, links = links))
+
+        mx = my = 0
+        for graph in node_data:
+            mx = max(mx, graph["x"])
+            my = max(my, graph["y"])
+
+        mx += config.NodeWidth
+
+        # compact (unindented) JSON; the indented form is several times slower to produce
+        data = dict(nodes = node_data, bundles = bundle_data, config = config.Extract(mx, my))
+        return json.dumps(data, sort_keys = True)
+
+
+
 ## GLOBAL ##################################################
 
 class Tree:
 
     #-------------------------------------------------------
-    def __init__(self):
-        self.Builder = D_Network()
+    def __init__(self, reference = False):
+        "Use the reference (object based) layout engine if 'reference' is set"
+        self.Builder = D_Network() if reference else G_TreeLayout()
 
 
     #-------------------------------------------------------
@@ -692,5 +1098,54 @@ class Tree:
 
     #-------------------------------------------------------
     def Extract(self):
+        if isinstance(self.Builder, G_TreeLayout):
+            return self.Builder.Extract()
+
         network = self.Builder.MakeNetwork()
         return Layout(network).Extract()
+
+
+
+## Benchmark ###############################################
+
+def MakeSyntheticDag(num_entities, max_parents = 3, window = 50, seed = 1):
+    "Random DAG; each entity's parents are drawn from the preceding 'window' entities"
+    rng = random.Random(seed)
+    entities = [("entity{}".format(idx), dict(event_id = idx)) for idx in range(num_entities)]
+    relationships = []
+
+    for child in range(1, num_entities):
+        for parent in rng.sample(range(max(0, child - window), child), min(child, rng.randint(0, max_parents))):
+            relationships.append(dict(source = parent, target = child, event_id = len(relationships)))
+
+    rng.shuffle(entities)
+    return entities, relationships
+
+
+def Benchmark(sizes = (10000, 20000, 50000, 100000), reference_limit = 20000):
+    "Time both layout engines on synthetic DAGs, and check they agree"
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 100000))
+
+    for size in sizes:
+        entities, relationships = MakeSyntheticDag(size)
+        results = []
+
+        for reference in ([False, True] if size <= reference_limit else [False]):
+            start = time.perf_counter()
+            tree = Tree(reference)
+            for name, properties in entities:
+                tree.AddEntity(name, properties)
+            for properties in relationships:
+                tree.AddRelationship(properties)
+
+            text = tree.Extract()
+            results.append((time.perf_counter() - start, json.loads(text)))
+
+        line = "entities:{} links:{} array:{:.2f}s".format(size, len(relationships), results[0][0])
+        if len(results) == 2:
+            line += " reference:{:.2f}s match:{}".format(results[1][0], results[0][1] == results[1][1])
+        print(line)
+
+
+if __name__ == "__main__":
+    Benchmark()
@@ -48,6 +48,10 @@ class D_ThemeGallery:
     Holds an array of themes of a particular class; provides
     support for copying, removing and renaming individual themes,
     and their backing files.
+
+    Themes and their items are indexed by GUID/field_id, and field
+    values resolved through the theme are memoised per node; see
+    _LookupResolvedValue.
     """
 
     #-------------------------------------------------------
@@ -57,6 +61,13 @@ class D_ThemeGallery:
         self._InUse = {}
         self._Root = et.Element("root")
 
+        # theme_id -> theme element, and theme_id -> {field_id -> item element}
+        self._Themes = {}
+        self._ThemeItems = {}
+
+        # field_id -> {weak node reference -> (theme_id, value)}
+        self._Resolved = {}
+
         file_match = "theme.{}.*.xml".format(theme_cls)
         for dir in directories:
             for file in glob(str(dir / file_match)):
@@ -79,11 +90,21 @@ class D_ThemeGallery:
     #-------------------------------------------------------
     def _GetTheme(self, theme_id):
         """Fetch a theme's XML element"""
-        return self._Root.find("./theme[@guid='{}']".format(theme_id))
+        return self._Themes.get(theme_id)
 
     def _GetThemeItem(self, theme_id, field_id):
         """Getch a theme item's XML element"""
-        return self._GetTheme(theme_id).find("./item[@field_id='{}']".format(field_id))
+        return self._ThemeItems[theme_id].get(field_id)
+
+
+    #-------------------------------------------------------
+    def _IndexTheme(self, theme_id, element):
+        self._Themes[theme_id] = element
+        self._ThemeItems[theme_id] = { item.get("field_id"): item for item in element.iterfind("item") }
+
+    def _UnindexTheme(self, theme_id):
+        del self._Themes[theme_id]
+        del self._ThemeItems[theme_id]
 
 
     #-------------------------------------------------------
@@ -105,6 +126,8 @@ class D_ThemeGallery:
             element.set("read_only", "0")
             save = True
 
+        self._IndexTheme(theme_id, element)
+
         info = D_ThemeInfo(root, path)
         self._ThemeInfoMap.update([(theme_id, info)])
 
@@ -119,12 +142,8 @@ class D_ThemeGallery:
         the id of the first available theme. Use to validate theme_ids
         in a document.
         """
-        theme = self._GetTheme(theme_id)
-
-        if theme is None:
-            element = self._Root.find("./theme")
-            if element is not None:
-                theme_id = element.get("guid")
+        if theme_id not in self._Themes:
+            theme_id = next(iter(self._Themes), theme_id)
 
         return theme_id
 
@@ -152,8 +171,10 @@ class D_ThemeGallery:
             self._InUse[theme_id] -= 1
 
     def SwitchUse(self, from_theme_id, to_theme_id):
+        """A theme gallery node is changing theme; nodes below it resolved through from_theme_id"""
         self.DecUse(from_theme_id)
         self.IncUse(to_theme_id)
+        self.InvalidateResolved(from_theme_id)
 
 
     #-------------------------------------------------------
@@ -163,6 +184,8 @@ class D_ThemeGallery:
         if self.CanDelete(theme_id):
             element = self._GetTheme(theme_id)
             self._Root.remove(element)
+            self._UnindexTheme(theme_id)
+            self.InvalidateResolved(theme_id)
 
             del_path = Path(self._ThemeInfoMap[theme_id]._Path)
             del_path.unlink()
@@ -194,8 +217,8 @@ class D_ThemeGallery:
         """Map the theme to plain text."""
 
         fields = []
-        for item in self._GetTheme(theme_id).iterfind("item"):
-            fields.append([item.get("field_id"), item.text])
+        for (field_id, item) in self._ThemeItems[theme_id].items():
+            fields.append([field_id, item.text])
 
         text = GetThemeStore().GetFieldsAsText(fields)
 
@@ -210,7 +233,7 @@ class D_ThemeGallery:
         """Fetch list of pairs (name, theme_id), sorted by name"""
         def Key(element):
             return element.get("name")
-        return [(e.get("name"), e.get("guid")) for e in sorted(self._Root.iterfind("theme"), key = Key)]
+        return [(e.get("name"), e.get("guid")) for e in sorted(self._Themes.values(), key = Key)]
 
 
     #-------------------------------------------------------
@@ -245,6 +268,44 @@ class D_ThemeGallery:
         """Save the theme value for the supplied GUID"""
         self._GetThemeItem(theme_id, field_id).text = value
 
+        resolved = self._Resolved.get(field_id)
+        if resolved is not None:
+            for (wnode, entry) in list(resolved.items()):
+                if entry[0] == theme_id:
+                    del resolved[wnode]
+
+
+    #-------------------------------------------------------
+    def _LookupResolvedValue(self, wnode, field_id):
+        """
+        Fetch the memoised (theme_id, value) for a node's themed field,
+        or None if the node's theme has not yet been resolved.
+        """
+        resolved = self._Resolved.get(field_id)
+        if resolved is not None:
+            return resolved.get(wnode)
+        return None
+
+    def _StoreResolvedValue(self, wnode, field_id, theme_id, value):
+        resolved = self._Resolved.get(field_id)
+        if resolved is None:
+            resolved = self._Resolved[field_id] = {}
+        resolved[wnode] = (theme_id, value)
+
+    def InvalidateResolved(self, theme_id = None):
+        """
+        Discard memoised field values; either all of them, or only
+        those resolved through the identified theme.
+        """
+        if theme_id is None:
+            self._Resolved.clear()
+            return
+
+        for resolved in self._Resolved.values():
+            for (wnode, entry) in list(resolved.items()):
+                if entry[0] == theme_id:
+                    del resolved[wnode]
+
 
 
 ## D_ThemeStore ############################################
@@ -644,6 +705,10 @@ class G_ThemeGalleryNode(G_ThemeManagerNode):
 
         theme_gallery.IncUse(actual_theme_id)
 
+        # nodes below this gallery may have resolved their themed fields
+        # before the gallery's theme was established
+        theme_gallery.InvalidateResolved()
+
 
     #-------------------------------------------------------
     def ActivateThemeGallery(self):
@@ -691,7 +756,10 @@ class G_ThemeGalleryNode(G_ThemeManagerNode):
     def DoClose(self, delete):
         """Release all resources owned by the gallery"""
 
-        self.GetThemeGallery().DecUse(self._Field.CurrentThemeId.Value)
+        theme_id = self._Field.CurrentThemeId.Value
+        theme_gallery = self.GetThemeGallery()
+        theme_gallery.DecUse(theme_id)
+        theme_gallery.InvalidateResolved(theme_id)
 
         super().DoClose(delete)
 
@@ -897,7 +897,7 @@ class G_ViewNode(G_DisplayNode, G_HideableTreeNode, G_TabContainerNode):
         # track our position in the project tree
         G_DisplayNode.__init__(self)
         G_TabContainerNode.__init__(self, factory, wproject, witem)
-        self.SetupDataExplorer(self.OnDataExplorerLoad, self.OnDataExplorerUnload)
+        self.SetupDataExplorer(self.OnDataExplorerLoad, self.OnDataExplorerUnload, self.OnDataExplorerSync)
 
         self._CursorLine = -1
         self._AutoHiliteText = ""
@@ -1168,15 +1168,28 @@ class G_ViewNode(G_DisplayNode, G_HideableTreeNode, G_TabContainerNode):
                 builder.AddField(name, view.GetFieldText(view_line_no, field_id))
 
             builder.AddField("Line", view.GetNonFieldText(view_line_no))
+            self.SyncDataExplorerLine(sync, view_line_no)
 
-            if sync:
-                self.MakeActive()
-                view.SetHistoryLine(view_line_no)
-                self.ScrollToLine(view_line_no)
-            else:
-                view.SetHistoryLine(-1)
+        self.RefreshView()
+
+
+    def SyncDataExplorerLine(self, sync, view_line_no):
+        if sync:
+            self.MakeActive()
+            self._N_View.SetHistoryLine(view_line_no)
+            self.ScrollToLine(view_line_no)
+        else:
+            self._N_View.SetHistoryLine(-1)
 
+
+    def OnDataExplorerSync(self, sync, location):
+        view_line_no = self._N_View.LogLineToViewLine(location["log_line_no"], True)
+        if view_line_no < 0:
+            return False
+
+        self.SyncDataExplorerLine(sync, view_line_no)
         self.RefreshView()
+        return True
 
 
     def OnDataExplorerUnload(self, location):
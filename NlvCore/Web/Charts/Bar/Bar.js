@@ -226,3 +226,17 @@ function CreateChart(title, x_label_text, y_label_text, data_json, switch_time)
     g_y_label_text = y_label_text;
     DoCreateChart(switch_time);
 }
+
+function CreateChartFromData(title, x_label_text, y_label_text, data_url, switch_time) {
+    const fetched = FetchChartRows(data_url);
+
+    WhenChartReady(function () {
+        return fetched.then(function (rows) {
+            g_data = rows;
+            g_title_text = title;
+            g_x_label_text = x_label_text;
+            g_y_label_text = y_label_text;
+            DoCreateChart(switch_time);
+        });
+    });
+}
@@ -42,6 +42,137 @@ function CallPython(target_node_id, method, args_object) {
 }
 
 
+//----------------------------------------------------------
+
+//
+// Chart data sent as binary columns; see NlvCore/ChartData.py for
+// the layout. Avoids script injection and JSON decoding of large
+// datasets.
+//
+
+function DecodeText(bytes, start, end) {
+    var text = "";
+    for (var pos = start; pos < end; pos += 4096) {
+        text += String.fromCharCode.apply(null, bytes.subarray(pos, Math.min(end, pos + 4096)));
+    }
+
+    // bytes are UTF-8; re-interpret any multi-byte sequences
+    return /[\x80-\xff]/.test(text) ? decodeURIComponent(escape(text)) : text;
+}
+
+function DecodeTextColumn(buffer, base, column, num_rows) {
+    const offsets = new Uint32Array(buffer, base + column.offset, num_rows + 1);
+    const bytes = new Uint8Array(buffer, base + column.text_offset, column.text_size);
+    const nulls = ("null_offset" in column) ? new Uint8Array(buffer, base + column.null_offset, num_rows) : null;
+    var values = new Array(num_rows);
+
+    if (column.ascii) {
+        // one decode for the whole column
+        const text = DecodeText(bytes, 0, column.text_size);
+        for (var idx = 0; idx < num_rows; ++idx) {
+            values[idx] = text.substring(offsets[idx], offsets[idx + 1]);
+        }
+    }
+    else {
+        for (var idx = 0; idx < num_rows; ++idx) {
+            values[idx] = DecodeText(bytes, offsets[idx], offsets[idx + 1]);
+        }
+    }
+
+    if (column.type == "json") {
+        for (var idx = 0; idx < num_rows; ++idx) {
+            values[idx] = JSON.parse(values[idx]);
+        }
+    }
+
+    if (nulls !== null) {
+        for (var idx = 0; idx < num_rows; ++idx) {
+            if (nulls[idx])
+                values[idx] = null;
+        }
+    }
+
+    return values;
+}
+
+function DecodeColumn(buffer, base, column, num_rows) {
+    if (column.type == "int32") {
+        return new Int32Array(buffer, base + column.offset, num_rows);
+    }
+    else if (column.type == "float64") {
+        const raw = new Float64Array(buffer, base + column.offset, num_rows);
+        var values = new Array(num_rows);
+        for (var idx = 0; idx < num_rows; ++idx) {
+            values[idx] = isNaN(raw[idx]) ? null : raw[idx];
+        }
+        return values;
+    }
+    else if (column.type == "bool") {
+        const raw = new Uint8Array(buffer, base + column.offset, num_rows);
+        var values = new Array(num_rows);
+        for (var idx = 0; idx < num_rows; ++idx) {
+            values[idx] = raw[idx] != 0;
+        }
+        return values;
+    }
+    else {
+        return DecodeTextColumn(buffer, base, column, num_rows);
+    }
+}
+
+// returns { num_rows: N, columns: { name: values[] } }
+function DecodeChartData(buffer) {
+    const header_size = new DataView(buffer).getUint32(4, true);
+    const header_bytes = new Uint8Array(buffer, 8, header_size);
+    const header = JSON.parse(DecodeText(header_bytes, 0, header_size));
+    const base = 8 + header_size;
+
+    var columns = {};
+    header.columns.forEach(function (column) {
+        columns[column.name] = DecodeColumn(buffer, base, column, header.num_rows);
+    });
+
+    return { num_rows: header.num_rows, columns: columns };
+}
+
+// convert decoded column data to an array of row objects
+function ChartDataToRows(data) {
+    const names = Object.keys(data.columns);
+    var rows = new Array(data.num_rows);
+
+    for (var idx = 0; idx < data.num_rows; ++idx) {
+        var row = {};
+        names.forEach(function (name) {
+            row[name] = data.columns[name][idx];
+        });
+        rows[idx] = row;
+    }
+
+    return rows;
+}
+
+// fetch chart data from the NLV HTTP server; returns a
+// Promise yielding an array of row objects
+function FetchChartRows(data_url) {
+    return d3.buffer(data_url)
+        .then(function (buffer) {
+            return ChartDataToRows(DecodeChartData(buffer));
+        });
+}
+
+// charts fetch their data asynchronously; anything that depends
+// on the chart existing should be chained from here
+var g_chart_ready = Promise.resolve();
+
+function WhenChartReady(func) {
+    g_chart_ready = g_chart_ready
+        .then(func)
+        .catch(function (error) {
+            console.error(error);
+        });
+}
+
+
 //----------------------------------------------------------
 function OnResize() {
     ResetTip();
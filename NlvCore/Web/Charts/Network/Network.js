@@ -17,13 +17,30 @@
 
 //----------------------------------------------------------
 function OnNodeClick(node) {
-    if (!node.dragged) {
+    if (node.dragged) {
+        return;
+    }
+
+    // in level charts, clicking a group expands it, and shift-click
+    // collapses the group containing the node
+    if (g_level_url !== null && (node.cluster || d3.event.shiftKey)) {
+        if (node.cluster) {
+            ExpandGroup(node.cluster);
+        }
+        else if (node.parent) {
+            CollapseGroup(node.parent);
+        }
+    }
+    else if (node.event_id >= 0) {
         CallPython(g_nodes_table_node_id, "OnChartSelection", { event_id: node.event_id, ctrl_key: d3.event.ctrlKey });
     }
 }
 
 function OnLinkClick(link) {
-    CallPython(g_links_table_node_id, "OnChartSelection", { event_id: link.event_id, ctrl_key: d3.event.ctrlKey });
+    // aggregated links (in level charts) have no event
+    if (link.event_id >= 0) {
+        CallPython(g_links_table_node_id, "OnChartSelection", { event_id: link.event_id, ctrl_key: d3.event.ctrlKey });
+    }
 }
 
 
@@ -309,7 +326,7 @@ function DoCreateChart(data) {
 
     g_svg
        .call(d3.zoom()
-            .scaleExtent([1, 8])
+            .scaleExtent([1, ("max_zoom" in g_options) ? g_options.max_zoom : 8])
             .wheelDelta(function wheelDelta() {
                 // d3.event here is the underlying WheelEvent
                 // fixed step per event; avoids magic numbers like this:
@@ -361,15 +378,22 @@ function DoCreateChart(data) {
                 node_data.dragged = false;
             })
             .on("drag", function (node_data) {
-                if (!node_data.dragged)
+                if (!node_data.dragged && g_simulation !== null)
                     g_simulation.alphaTarget(0.3).restart();
                 // map SVG coord system back to model coord system
                 node_data.fx += d3.event.dx / g_curZoom;
                 node_data.fy += d3.event.dy / g_curZoom;
                 node_data.dragged = true;
+
+                // without a simulation, move the node directly
+                if (g_simulation === null) {
+                    node_data.x = node_data.fx;
+                    node_data.y = node_data.fy;
+                    Layout();
+                }
             })
             .on("end", function (node_data) {
-                if (node_data.dragged)
+                if (node_data.dragged && g_simulation !== null)
                     g_simulation.alphaTarget(0);
                 node_data.fx = null;
                 node_data.fy = null;
@@ -409,8 +433,108 @@ function CreateChart(data_json, options_json) {
     data = JSON.parse(data_json);
     g_options = JSON.parse(options_json);
 
+    WhenChartReady(function () {
+        DoCreateChart(data);
+        DoSimulation(data);
+    });
+}
+
+
+function CreateChartFromData(nodes_url, links_url, options_json) {
+    const fetched = Promise.all([FetchChartRows(nodes_url), FetchChartRows(links_url)]);
+
+    WhenChartReady(function () {
+        return fetched.then(function (results) {
+            data = { nodes: results[0], links: results[1] };
+            g_options = JSON.parse(options_json);
+
+            DoCreateChart(data);
+            DoSimulation(data);
+        });
+    });
+}
+
+
+//----------------------------------------------------------
+
+//
+// level charts display large networks; NLV calculates the layout,
+// and supplies one level of groups and nodes at a time. Node
+// positions are supplied in the unit circle, plus:
+//
+//  nodes[]
+//    cluster - path of the group; null for individual nodes
+//    parent - path of the group containing the node
+//    count - number of network nodes represented
+//
+//  links[]
+//    count - number of network links represented
+//
+var g_level_url = null;
+var g_expanded = [];
+
+
+function FetchLevel() {
+    const url = g_level_url + "?expanded=" + encodeURIComponent(g_expanded.join(","));
+    return Promise.all([FetchChartRows(url + "&part=nodes"), FetchChartRows(url + "&part=links")]);
+}
+
+
+function ShowLevel(results) {
+    const scale = Math.min(GetWindowWidth(), GetWindowHeight()) * 0.45;
+    const centre_x = GetWindowWidth() / 2;
+    const centre_y = GetWindowHeight() / 2;
+
+    var node_map = new Map();
+    results[0].forEach(function (node_data) {
+        node_data.x = centre_x + node_data.x * scale;
+        node_data.y = centre_y + node_data.y * scale;
+        node_map.set(node_data.event_id, node_data);
+    });
+
+    results[1].forEach(function (link_data) {
+        link_data.source = node_map.get(link_data.source);
+        link_data.target = node_map.get(link_data.target);
+    });
+
+    data = { nodes: results[0], links: results[1] };
+    g_simulation = null;
+
     DoCreateChart(data);
-    DoSimulation(data);
+    Layout();
+    DoSetSelection();
+}
+
+
+function UpdateLevel() {
+    const fetched = FetchLevel();
+
+    WhenChartReady(function () {
+        return fetched.then(ShowLevel);
+    });
+}
+
+
+function CreateLevelChart(level_url, options_json) {
+    g_level_url = level_url;
+    g_expanded = [];
+    g_options = JSON.parse(options_json);
+    UpdateLevel();
+}
+
+
+function ExpandGroup(path) {
+    g_expanded.push(path);
+    UpdateLevel();
+}
+
+
+function CollapseGroup(path) {
+    // also collapse any nested groups
+    g_expanded = g_expanded.filter(function (expanded) {
+        return expanded !== path && expanded.indexOf(path + ".") !== 0;
+    });
+    UpdateLevel();
 }
 
 
@@ -425,6 +549,13 @@ function DoSetSelection() {
 
 
 function SetSelection(selection_json, options_json) {
+    WhenChartReady(function () {
+        DoUpdateSelection(selection_json, options_json);
+    });
+}
+
+
+function DoUpdateSelection(selection_json, options_json) {
     selection = JSON.parse(selection_json);
     g_options = JSON.parse(options_json);
 
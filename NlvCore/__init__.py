@@ -0,0 +1,26 @@
+#
+# Copyright (C) Niel Clausen 2023. All rights reserved.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+# Python imports
+import os
+import sys
+
+# select the log accessor implementation; the portable Python
+# implementation stands in for the native NlvLog module
+if os.environ.get("NLV_LOG_ACCESSOR", "").lower() == "python":
+    from . import NlvLogPy
+    sys.modules.setdefault("NlvLog", NlvLogPy)
@@ -41,6 +41,51 @@ selector_ptr_t MakeSelector( boost::python::object match, bool empty_selects_all
 
 
 
+/*-----------------------------------------------------------------------
+ * PythonGilRelease
+ -----------------------------------------------------------------------*/
+
+// release the Python GIL for the lifetime of the object, so other Python threads
+// can run during a long running engine call; the call must not touch any Python
+// objects; does nothing if the calling thread does not hold the GIL
+class PythonGilRelease
+{
+private:
+	// the saved PyThreadState
+	void * m_ThreadState;
+
+public:
+	PythonGilRelease( void );
+	~PythonGilRelease( void );
+
+	PythonGilRelease( const PythonGilRelease & ) = delete;
+	PythonGilRelease & operator = ( const PythonGilRelease & ) = delete;
+};
+
+
+
+/*-----------------------------------------------------------------------
+ * PythonGilAcquire
+ -----------------------------------------------------------------------*/
+
+// acquire the Python GIL for the lifetime of the object; for engine call-backs
+// into Python, which may run on any thread, with or without the GIL held
+class PythonGilAcquire
+{
+private:
+	// the PyGILState_STATE to restore
+	int m_State;
+
+public:
+	PythonGilAcquire( void );
+	~PythonGilAcquire( void );
+
+	PythonGilAcquire( const PythonGilAcquire & ) = delete;
+	PythonGilAcquire & operator = ( const PythonGilAcquire & ) = delete;
+};
+
+
+
 /*-----------------------------------------------------------------------
  * MarkerNumber
  -----------------------------------------------------------------------*/
@@ -242,9 +287,10 @@ private:
 	// auto-markers (derived via line selection)
 	std::vector<selector_ptr_t> m_AutoMarkers;
 
-	// user specified markers (aka "bookmarks")
-	using UserMarkers = std::set<vint_t>;
+	// user specified markers (aka "bookmarks"); a sorted vector of log line numbers
+	using UserMarkers = std::vector<vint_t>;
 	UserMarkers m_UserMarkers;
+	ChangeTracker m_UserMarkersTracker{ true };
 
 	// tracked line marker
 	vint_t m_LocalTrackerLine{ -1 };
@@ -286,6 +332,14 @@ public:
 	void ToggleUsermark( vint_t log_line_no );
 	vint_t GetNextUsermark( vint_t log_line_no, bool forward );
 
+	const UserMarkers & GetUsermarks( void ) const {
+		return m_UserMarkers;
+	}
+
+	const ChangeTracker & GetUsermarksTracker( void ) const {
+		return m_UserMarkersTracker;
+	}
+
 	using NStateManager::GetState;
 	using NStateManager::PutState;
 };
@@ -575,6 +629,10 @@ private:
 	// interfaces
 	const ViewMap * m_ViewMap;
 	const ViewLineTranslation * m_ViewLineTranslation;
+	const ViewProvenance * m_ViewProvenance;
+
+	// merged views also show lines from these (secondary) logfiles
+	std::vector<logfile_ptr_t> m_MergedLogfiles;
 
 	// virtualised cell buffer
 	SViewCellBuffer m_CellBuffer;
@@ -587,6 +645,18 @@ private:
 	lineannotation_ptr_t m_LineAnnotation;
 	contractionstate_ptr_t m_ContractionState;
 
+	// the view lines holding a logfile adornment (bookmark or annotation), in
+	// line order; rebuilt when the view is filtered or the adornments change
+	struct VisibleAdornments
+	{
+		ChangeTracker f_ViewTracker;
+		ChangeTracker f_AdornmentsTracker;
+		std::vector<vint_t> f_ViewLines;
+	};
+
+	VisibleAdornments m_VisibleUsermarks;
+	VisibleAdornments m_VisibleAnnotations;
+
 	// helper to update Scintilla when document contents change
 	class NTextChanged
 	{
@@ -613,7 +683,9 @@ private:
 
 private:
 	adornments_ptr_t GetAdornments( void );
-	vint_t GetNextVisibleLine( vint_t view_line_no, bool forward, vint_t( NAdornments::*get_next_log_line )(vint_t, bool) );
+
+	template<typename T_LOG_LINES>
+	vint_t GetNextVisibleLine( vint_t view_line_no, bool forward, VisibleAdornments & visible, const ChangeTracker & adornments_tracker, T_LOG_LINES get_log_lines );
 
 protected:
 	// VContent interfaces
@@ -631,7 +703,7 @@ protected:
 	void __stdcall Notify_StartDrawLine( vint_t line_no ) override;
 
 public:
-	NLogView( logfile_ptr_t logfile, viewaccessor_ptr_t view_accessor );
+	NLogView( logfile_ptr_t logfile, viewaccessor_ptr_t view_accessor, const std::vector<logfile_ptr_t> & merged_logfiles = {} );
 
 public:
 	// Python interfaces
@@ -713,6 +785,10 @@ public:
 
 	// View management
 	logview_ptr_t CreateLogView( void );
+
+	// the merged view is built lazily, as its lines are requested
+	logview_ptr_t CreateMergedLogView( boost::python::object logfiles );
+
 	eventview_ptr_t CreateEventView( void );
 	lineset_ptr_t CreateLineSet( boost::python::object match );
 
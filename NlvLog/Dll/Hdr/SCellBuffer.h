@@ -44,6 +44,12 @@ private:
 	// to actual positions/lines in an underlying logfile
 	const ViewMap * m_ViewMap{ nullptr };
 
+	// the view's change tracker, used to refresh m_ViewMapIndex
+	const ViewProperties * m_ViewProperties{ nullptr };
+
+	// accelerated position to line lookup
+	mutable ViewMapIndex m_ViewMapIndex;
+
 protected:
 	// convert a view position into a view line number and an offset within that line
 	void PositionToInfo( vint_t pos, vint_t *view_line_no, vint_t *offset ) const {
@@ -72,7 +78,7 @@ public:
 
 	SViewCellBuffer( void ) {}
 	SViewCellBuffer( viewaccessor_ptr_t accessor )
-		: m_ViewMap{ accessor->GetMap() }
+		: m_ViewMap{ accessor->GetMap() }, m_ViewProperties{ accessor->GetProperties() }
 	{
 		if( !m_ViewMap )
 			throw std::runtime_error{ "ViewAccessor has no ViewMap" };
@@ -24,6 +24,7 @@
 #include <scintilla/src/PerLine.h>
 
 // C++ includes
+#include <array>
 #include <unordered_map>
 
 // Application includes
@@ -49,6 +50,7 @@ private:
 	viewaccessor_ptr_t m_ViewAccessor;
 	const ViewMap * m_ViewMap;
 	const ViewLineTranslation * m_ViewLineTranslation;
+	const ViewProvenance * m_ViewProvenance;
 
 protected:
 	vint_t HistoryLineMarkValue( vint_t view_line_no );
@@ -60,7 +62,8 @@ public:
 		m_Adornments{ adornments },
 		m_ViewAccessor{ view_accessor },
 		m_ViewMap{ view_accessor->GetMap() },
-		m_ViewLineTranslation{ view_accessor->GetLineTranslation() }
+		m_ViewLineTranslation{ view_accessor->GetLineTranslation() },
+		m_ViewProvenance{ view_accessor->GetProvenance() }
 	{
 		if( !m_ViewMap )
 			throw std::runtime_error{ "ViewAccessor has no ViewMap" };
@@ -188,37 +191,76 @@ private:
 	// view data
 	viewaccessor_ptr_t m_ViewAccessor;
 	const ViewLineTranslation * m_ViewLineTranslation;
+	const ViewProvenance * m_ViewProvenance;
 	const unsigned m_DateFieldId;
 
 protected:
-	using create_offsettext_func = void (*)(int64_t sec, int64_t nsec, std::ostringstream & strm);
-	static void CreateOffsetText_MsecDotNsec( int64_t sec, int64_t nsec, std::ostringstream & strm );
-	static void CreateOffsetText_Usec( int64_t sec, int64_t nsec, std::ostringstream & strm );
-	static void CreateOffsetText_Msec( int64_t sec, int64_t nsec, std::ostringstream & strm );
-	static void CreateOffsetText_Sec( int64_t sec, int64_t nsec, std::ostringstream & strm );
-	static void CreateOffsetText_MinSec( int64_t sec, int64_t nsec, std::ostringstream & strm );
-	static void CreateOffsetText_HourMinSec( int64_t sec, int64_t nsec, std::ostringstream & strm );
-	static void CreateOffsetText_DayHourMinSec( int64_t sec, int64_t nsec, std::ostringstream & strm );
+	// fixed capacity, NUL terminated, text; formatted without heap allocation
+	struct MarginText
+	{
+		static constexpr unsigned c_Capacity{ 64 };
+		char f_Text[ c_Capacity ]{};
+		unsigned f_Length{ 0 };
+
+		void Clear( void ) {
+			f_Length = 0;
+			f_Text[ 0 ] = '\0';
+		}
+
+		void Append( char ch ) {
+			if( f_Length + 1 < c_Capacity )
+			{
+				f_Text[ f_Length++ ] = ch;
+				f_Text[ f_Length ] = '\0';
+			}
+		}
+
+		// decimal value, zero padded to the given width
+		void Append( int64_t value, unsigned width = 0 );
+	};
+
+	using create_offsettext_func = void (*)(int64_t sec, int64_t nsec, MarginText & text);
+	static void CreateOffsetText_MsecDotNsec( int64_t sec, int64_t nsec, MarginText & text );
+	static void CreateOffsetText_Usec( int64_t sec, int64_t nsec, MarginText & text );
+	static void CreateOffsetText_Msec( int64_t sec, int64_t nsec, MarginText & text );
+	static void CreateOffsetText_Sec( int64_t sec, int64_t nsec, MarginText & text );
+	static void CreateOffsetText_MinSec( int64_t sec, int64_t nsec, MarginText & text );
+	static void CreateOffsetText_HourMinSec( int64_t sec, int64_t nsec, MarginText & text );
+	static void CreateOffsetText_DayHourMinSec( int64_t sec, int64_t nsec, MarginText & text );
 	create_offsettext_func m_CreateOffsetTextFunc{ nullptr };
 
-	using create_text_func = void (SLineMarginText::*)(vint_t line, std::ostringstream & strm) const;
-	void CreateLineNumberText( vint_t line, std::ostringstream & strm ) const;
-	void CreateOffsetText( vint_t line, std::ostringstream & strm ) const;
+	using create_text_func = void (SLineMarginText::*)(vint_t line, MarginText & text) const;
+	void CreateLineNumberText( vint_t line, MarginText & text ) const;
+	void CreateOffsetText( vint_t line, MarginText & text ) const;
 	create_text_func m_CreateTextFunc{ nullptr };
 
 protected:
-	// one line text cache
-	mutable vint_t m_LineNumber;
-	mutable std::string m_LineText;
+	// ring cache of margin texts; a line's entry is at (line % c_CacheSize), so
+	// any run of c_CacheSize consecutive lines, i.e. the visible lines plus a
+	// scrolling band, is held without collision
+	struct CacheEntry
+	{
+		vint_t f_Line{ -1 };
+		MarginText f_Text;
+	};
+
+	static constexpr size_t c_CacheSize{ 256 };
+	mutable std::array<CacheEntry, c_CacheSize> m_Cache;
+	static CacheStatistics s_CacheStats;
 
-	void UpdateLineText( vint_t line ) const;
-	const std::string & GetLineText( vint_t line ) const;
+	// the cache is discarded when the view (i.e. line numbering) changes
+	ChangeTracker m_ViewTracker;
+
+	void InvalidateCache( void ) const;
+	void CreateLineText( vint_t line, MarginText & text ) const;
+	const MarginText & GetLineText( vint_t line ) const;
 
 public:
 	SLineMarginText( viewaccessor_ptr_t view_accessor, unsigned date_field_id )
 		:
 		m_ViewAccessor{ view_accessor },
 		m_ViewLineTranslation{ view_accessor->GetLineTranslation() },
+		m_ViewProvenance{ view_accessor->GetProvenance() },
 		m_DateFieldId{ date_field_id }
 	{
 		if( !m_ViewLineTranslation )
@@ -286,6 +328,7 @@ private:
 	// view data
 	viewaccessor_ptr_t m_ViewAccessor;
 	const ViewLineTranslation * m_ViewLineTranslation;
+	const ViewProvenance * m_ViewProvenance;
 	ChangeTracker m_ViewTracker;
 
 protected:
@@ -296,7 +339,8 @@ public:
 		:
 		m_LogAnnotations{ log_annotations },
 		m_ViewAccessor{ view_accessor },
-		m_ViewLineTranslation{ view_accessor->GetLineTranslation() }
+		m_ViewLineTranslation{ view_accessor->GetLineTranslation() },
+		m_ViewProvenance{ view_accessor->GetProvenance() }
 	{
 		if( !m_ViewLineTranslation )
 			throw std::runtime_error{ "ViewAccessor has no ViewLineTranslation" };
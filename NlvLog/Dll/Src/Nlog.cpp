@@ -22,9 +22,12 @@
 
 // Boost includes
 #include <boost/lexical_cast.hpp>
+#include <boost/python/extract.hpp>
 #include <boost/python/object.hpp>
+#include <boost/python/stl_iterator.hpp>
 
 // C++ includes
+#include <algorithm>
 #include <string>
 
 
@@ -177,6 +180,8 @@ void NAnnotations::PutState( const json & store )
 
 		m_AnnotationMap[ line_no ] = annotation;
 	}
+
+	m_Tracker.RecordEvent();
 }
 
 
@@ -257,7 +262,11 @@ void NAdornments::GetState( json & store ) const
 void NAdornments::PutState( const json & store )
 {
 	for( const json & elem : store )
-		m_UserMarkers.insert( elem.get<vint_t>() );
+		m_UserMarkers.push_back( elem.get<vint_t>() );
+
+	std::sort( m_UserMarkers.begin(), m_UserMarkers.end() );
+	m_UserMarkers.erase( std::unique( m_UserMarkers.begin(), m_UserMarkers.end() ), m_UserMarkers.end() );
+	m_UserMarkersTracker.RecordEvent();
 }
 
 
@@ -277,7 +286,7 @@ int NAdornments::LogMarkValue( vint_t log_line_no, const LineAccessor & line )
 	}
 
 	// user marker is last - has highest precedence
-	if( m_UserMarkers.find( log_line_no ) != m_UserMarkers.end() )
+	if( HasUsermark( log_line_no ) )
 		res |= bit;
 
 	// marker for the tracked line is managed from a different marker range
@@ -300,15 +309,17 @@ bool NAdornments::SetAutoMarker( unsigned marker, boost::python::object match, l
 
 bool NAdornments::HasUsermark( vint_t log_line_no ) const
 {
-	return m_UserMarkers.find( log_line_no ) != m_UserMarkers.end();
+	return std::binary_search( m_UserMarkers.begin(), m_UserMarkers.end(), log_line_no );
 }
 
 
 void NAdornments::ToggleUsermark( vint_t log_line_no )
 {
-	UserMarkers::iterator iline{ m_UserMarkers.find( log_line_no ) };
-	if( iline == m_UserMarkers.end() )
-		m_UserMarkers.insert( log_line_no );
+	m_UserMarkersTracker.RecordEvent();
+
+	UserMarkers::iterator iline{ std::lower_bound( m_UserMarkers.begin(), m_UserMarkers.end(), log_line_no ) };
+	if( (iline == m_UserMarkers.end()) || (*iline != log_line_no) )
+		m_UserMarkers.insert( iline, log_line_no );
 	else
 		m_UserMarkers.erase( iline );
 }
@@ -316,7 +327,7 @@ void NAdornments::ToggleUsermark( vint_t log_line_no )
 
 vint_t NAdornments::GetNextUsermark( vint_t log_line_no, bool forward )
 {
-	return NLine::GetNextLine( m_UserMarkers, log_line_no, forward );
+	return m_UserMarkers.empty() ? -1 : NLine::GetNextLine( m_UserMarkers, log_line_no, forward );
 }
 
 
@@ -377,6 +388,8 @@ void NHiliter::SetupMatchedLines( void )
 	else
 	{
 		NLineAdornmentsProvider adornments_provider{ m_Logfile->GetAdornments() };
+
+		PythonGilRelease nogil;
 		m_MatchedLines = m_ViewAccessor->Search( m_Selector, &adornments_provider );
 	}
 }
@@ -418,6 +431,8 @@ NViewCore::NViewCore( logfile_ptr_t logfile, viewaccessor_ptr_t view_accessor )
 void NViewCore::Filter( selector_ptr_a selector, bool add_irregular )
 {
 	NLineAdornmentsProvider adornments_provider{ m_Logfile->GetAdornments() };
+
+	PythonGilRelease nogil;
 	m_ViewAccessor->Filter( selector, &adornments_provider, add_irregular );
 }
 
@@ -582,7 +597,10 @@ void NEventView::Sort( unsigned col_num, int direction )
 {
 	SortControl * sort_control{ m_ViewAccessor->GetSortControl() };
 	if( sort_control )
+	{
+		PythonGilRelease nogil;
 		sort_control->SetSort( col_num, direction );
+	}
 }
 
 
@@ -621,7 +639,7 @@ int NEventView::LookupEventId( int64_t event_id )
 
  // Note: field 0 is an internal (hidden) field, so the public field
  // 0 is actually field 1
-NLogView::NLogView( logfile_ptr_t logfile, viewaccessor_ptr_t view_accessor )
+NLogView::NLogView( logfile_ptr_t logfile, viewaccessor_ptr_t view_accessor, const std::vector<logfile_ptr_t> & merged_logfiles )
 	:
 	NViewCore{ logfile, view_accessor },
 	m_CellBuffer{ view_accessor },
@@ -632,7 +650,9 @@ NLogView::NLogView( logfile_ptr_t logfile, viewaccessor_ptr_t view_accessor )
 	m_LineAnnotation{ new SLineAnnotation{ logfile->GetAdornments(), view_accessor } },
 	m_ContractionState{ new SContractionState{ m_LineAnnotation, view_accessor } },
 	m_ViewMap{ view_accessor->GetMap() },
-	m_ViewLineTranslation{ view_accessor->GetLineTranslation() }
+	m_ViewLineTranslation{ view_accessor->GetLineTranslation() },
+	m_ViewProvenance{ view_accessor->GetProvenance() },
+	m_MergedLogfiles{ merged_logfiles }
 {
 	if( !m_ViewMap )
 		throw std::runtime_error{ "ViewAccessor has no ViewMap" };
@@ -745,7 +765,8 @@ void NLogView::SetFieldMask( uint64_t field_mask )
 void NLogView::ToggleBookmarks( vint_t view_fm_line, vint_t view_to_line )
 {
 	for( int line_no = view_fm_line; line_no <= view_to_line; ++line_no )
-		GetAdornments()->ToggleUsermark( m_ViewLineTranslation->ViewLineToLogLine( line_no ) );
+		if( ViewProvenance::IsPrimary( m_ViewProvenance, line_no ) )
+			GetAdornments()->ToggleUsermark( m_ViewLineTranslation->ViewLineToLogLine( line_no ) );
 }
 
 
@@ -755,38 +776,55 @@ adornments_ptr_t NLogView::GetAdornments( void )
 }
 
 
-// find the next visible view line for the source "get_next_log_line"
-vint_t NLogView::GetNextVisibleLine( vint_t view_line_no, bool forward, vint_t( NAdornments::*get_next_log_line )(vint_t, bool) )
+// find the next visible view line holding an adornment; the adorned log lines
+// (from "get_log_lines") are translated to view lines once per view/adornment
+// change, after which each step is a binary search
+template<typename T_LOG_LINES>
+vint_t NLogView::GetNextVisibleLine( vint_t view_line_no, bool forward, VisibleAdornments & visible, const ChangeTracker & adornments_tracker, T_LOG_LINES get_log_lines )
 {
-	vint_t log_line_no{ m_ViewLineTranslation->ViewLineToLogLine( view_line_no ) };
-	while( true )
-	{
-		log_line_no = (GetAdornments().get()->*get_next_log_line)(log_line_no, forward);
-		if( log_line_no < 0 )
-			return log_line_no;
+	const bool view_changed{ visible.f_ViewTracker.CompareTo( m_ViewAccessor->GetProperties()->GetTracker() ) };
+	const bool adornments_changed{ visible.f_AdornmentsTracker.CompareTo( adornments_tracker ) };
 
-		view_line_no = m_ViewLineTranslation->LogLineToViewLine( log_line_no, true );
-		if( view_line_no >= 0 )
-			return view_line_no;
+	if( view_changed || adornments_changed )
+	{
+		visible.f_ViewLines.clear();
+		get_log_lines( [&visible, this] ( vint_t log_line_no ) {
+			const vint_t visible_line_no{ m_ViewLineTranslation->LogLineToViewLine( log_line_no, true ) };
+			if( (visible_line_no >= 0) && ViewProvenance::IsPrimary( m_ViewProvenance, visible_line_no ) )
+				visible.f_ViewLines.push_back( visible_line_no );
+		} );
+
+		std::sort( visible.f_ViewLines.begin(), visible.f_ViewLines.end() );
 	}
+
+	return visible.f_ViewLines.empty() ? -1 : NLine::GetNextLine( visible.f_ViewLines, view_line_no, forward );
 }
 
 
 vint_t NLogView::GetNextBookmark( vint_t view_line_no, bool forward )
 {
-	return GetNextVisibleLine( view_line_no, forward, &NAdornments::GetNextUsermark );
+	adornments_ptr_t adornments{ GetAdornments() };
+	return GetNextVisibleLine( view_line_no, forward, m_VisibleUsermarks, adornments->GetUsermarksTracker(), [&adornments] ( auto add_line ) {
+		for( vint_t log_line_no : adornments->GetUsermarks() )
+			add_line( log_line_no );
+	} );
 }
 
 
 vint_t NLogView::GetNextAnnotation( vint_t view_line_no, bool forward )
 {
-	return GetNextVisibleLine( view_line_no, forward, &NAdornments::GetNextAnnotation );
+	adornments_ptr_t adornments{ GetAdornments() };
+	return GetNextVisibleLine( view_line_no, forward, m_VisibleAnnotations, adornments->GetTracker(), [&adornments] ( auto add_line ) {
+		for( const annotationsizes_list_t::value_type & elem : adornments->GetAnnotationSizes() )
+			add_line( elem.first );
+	} );
 }
 
 
 void NLogView::SetLocalTrackerLine( vint_t line_no )
 {
-	GetAdornments()->SetLocalTrackerLine( m_ViewLineTranslation->ViewLineToLogLine( line_no ) );
+	if( ViewProvenance::IsPrimary( m_ViewProvenance, line_no ) )
+		GetAdornments()->SetLocalTrackerLine( m_ViewLineTranslation->ViewLineToLogLine( line_no ) );
 }
 
 
@@ -802,42 +840,7 @@ vint_t NLogView::GetGlobalTrackerLine( unsigned tracker_idx )
 	if( !tracker.IsInUse() )
 		return -1;
 
-	const NTimecode & target{ tracker.GetUtcTimecode() };
-	const ViewMap * view_map{ m_ViewMap };
-
-	vint_t low_idx{ 0 }, high_idx{ view_map->m_NumLinesOrOne - 1 };
-	do
-	{
-		const vint_t sample_idx{ (high_idx + low_idx + 1) / 2 }; 	// Round high
-		vint_t usable_idx{ sample_idx };
-
-		while( !m_ViewTimecode->HasTimeCode(usable_idx) )
-			usable_idx -= 1;
-		
-		if(usable_idx < 0 )
-			break;
-		
-		if (usable_idx <= low_idx)
-		{
-			// back to where we started
-			low_idx = sample_idx;
-			continue;
-		}
-
-		const NTimecode value{ m_ViewTimecode->GetUtcTimecode(usable_idx) };
-		if( target < value )
-			high_idx = usable_idx - 1;
-		else
-			low_idx = usable_idx;
-	} while( low_idx < high_idx );
-
-	while (!m_ViewTimecode->HasTimeCode(low_idx))
-		low_idx -= 1;
-
-	if( tracker.IsNearest( low_idx, view_map->m_NumLinesOrOne, m_ViewTimecode ) )
-		return low_idx;
-	else
-		return low_idx + 1;
+	return m_ViewTimecode->GetNearestUtcLine( tracker.GetUtcTimecode() );
 }
 
 
@@ -858,50 +861,11 @@ void NLogView::SetupMarginText( SLineMarginText::Type type, SLineMarginText::Pre
  * GlobalTracker
  -----------------------------------------------------------------------*/
 
-bool GlobalTracker::IsNearest( int line_no, int max_line_no, const ViewTimecode * timecode_accessor ) const
+bool GlobalTracker::IsNearest( int line_no, const ViewTimecode * timecode_accessor ) const
 {
-	if( !timecode_accessor->HasTimeCode( line_no ) )
-		return false;
-
-	const NTimecode timecode{ timecode_accessor->GetUtcTimecode( line_no ) };
-	const int64_t delta{ timecode - f_UtcTimecode };
-
-	const bool tracker_at_or_before{ delta >= 0 };
-	const bool tracker_at_or_after{ delta <= 0 };
-
-	// first line
-	if( line_no == 0 )
-		return tracker_at_or_before;
-
-	// last line
-	if( line_no == max_line_no )
-		return tracker_at_or_after;
-
-	// tracker is at, or before, this line
-	if( tracker_at_or_before )
-	{
-		const NTimecode prev_timecode{ timecode_accessor->GetNearestUtcTimecode( line_no - 1 ) };
-		const int64_t prev_delta{ prev_timecode - f_UtcTimecode };
-		const bool tracker_at_or_before_prev{ prev_delta >= 0 };
-
-		if( tracker_at_or_before_prev )
-			return false;
-
-		return delta < -prev_delta;
-	}
-
-	// tracker is after this line
-	else
-	{
-		const NTimecode next_timecode{ timecode_accessor->GetNearestUtcTimecode( line_no + 1 ) };
-		const int64_t next_delta{ next_timecode - f_UtcTimecode };
-		const bool tracker_at_or_after_next{ next_delta <= 0 };
-
-		if( tracker_at_or_after_next )
-			return false;
-
-		return -delta < next_delta;
-	}
+	// the view's timecode index caches recent lookups, so this is cheap
+	// enough to call for every displayed line
+	return timecode_accessor->GetNearestUtcLine( f_UtcTimecode ) == line_no;
 }
 
 
@@ -988,6 +952,60 @@ logview_ptr_t NLogfile::CreateLogView( void )
 }
 
 
+// create a view which merges this logfile's lines with those of the supplied
+// logfiles, in UTC timecode order; all must share the same field schema; the
+// merge is lazy, so creating and filtering the view only merges the first lines
+logview_ptr_t NLogfile::CreateMergedLogView( boost::python::object logfiles )
+{
+	try
+	{
+		const LogSchemaAccessor * schema{ GetSchema() };
+
+		std::vector<MergeViewSource> sources;
+		sources.push_back( MergeViewSource{ GetLogAccessor()->CreateViewAccessor(), nullptr, schema } );
+
+		std::vector<logfile_ptr_t> merged_logfiles;
+		boost::python::stl_input_iterator<boost::python::object> end;
+		for( auto ilogfile = boost::python::stl_input_iterator<boost::python::object>{ logfiles }; ilogfile != end; ++ilogfile )
+		{
+			logfile_ptr_t logfile{ &boost::python::extract<NLogfile &>( *ilogfile )() };
+
+			const LogSchemaAccessor * other_schema{ logfile->GetSchema() };
+			bool same_schema{ other_schema->GetNumFields() == schema->GetNumFields() };
+			for( unsigned field_id = 0; same_schema && (field_id < schema->GetNumFields()); ++field_id )
+				same_schema = other_schema->GetFieldType( field_id ) == schema->GetFieldType( field_id );
+
+			if( !same_schema )
+				throw std::runtime_error{ "Merged logfiles must share the same field schema" };
+
+			// filtering and searching a secondary logfile uses its own adornments
+			// and schema
+			sources.push_back( MergeViewSource{
+				logfile->GetLogAccessor()->CreateViewAccessor(),
+				std::make_shared<NLineAdornmentsProvider>( logfile->GetAdornments() ),
+				other_schema
+			} );
+
+			merged_logfiles.push_back( logfile );
+		}
+
+		viewaccessor_ptr_t merged;
+		{
+			PythonGilRelease nogil;
+			merged = MakeMergeViewAccessor( sources );
+		}
+
+		return new NLogView{ logfile_ptr_t{ this }, merged, merged_logfiles };
+	}
+	catch( const std::exception & ex )
+	{
+		TraceError( e_CreateLogView, "Exception: '%s'", ex.what() );
+	}
+
+	return logview_ptr_t{};
+}
+
+
 bool  NLogfile::SetAutoMarker( unsigned marker, boost::python::object match )
 {
 	return m_Adornments->SetAutoMarker( marker, match, logfile_ptr_t{ this } );
@@ -33,7 +33,7 @@
 
 vint_t SViewCellBuffer::PositionToViewLine( vint_t want_pos ) const
 {
-	return NLine::Lookup( m_ViewMap->m_Lines, m_ViewMap->m_NumLinesOrOne, want_pos );
+	return m_ViewMapIndex.PositionToLine( *m_ViewMap, m_ViewProperties->GetTracker(), want_pos );
 }
 
 
@@ -131,7 +131,10 @@ vint_t SViewCellBuffer::LineStart( vint_t line ) const
 		return m_ViewMap->m_TextLen;
 
 	else
+	{
+		m_ViewMap->ExtendToLine( line );
 		return m_ViewMap->m_Lines[line];
+	}
 }
 
 
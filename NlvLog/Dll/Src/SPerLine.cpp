@@ -36,12 +36,11 @@ int SLineMarkers::ViewMarkValue( vint_t view_line_no )
 	int res{ 0 }, bit{ 0x1 << MarkerNumber::e_MarkerNumberTrackerBase };
 
 	const ViewTimecode * timecode_accessor{ m_ViewAccessor->GetTimecode() };
-	const vint_t max_line_no{ m_ViewMap->m_NumLinesOrOne - 1 };
 
 	for( const GlobalTracker & tracker : GlobalTrackers::GetTrackers() )
 	{
 		bit <<= 1;
-		if( tracker.IsInUse() && tracker.IsNearest( view_line_no, max_line_no, timecode_accessor ) )
+		if( tracker.IsInUse() && tracker.IsNearest( view_line_no, timecode_accessor ) )
 			res |= bit;
 	}
 
@@ -50,12 +49,16 @@ int SLineMarkers::ViewMarkValue( vint_t view_line_no )
 
 vint_t SLineMarkers::MarkValue( vint_t view_line_no )
 {
-	// most markers come from the logfile
-	const vint_t log_line_no{ m_ViewLineTranslation->ViewLineToLogLine( view_line_no ) };
+	// most markers come from the logfile; merged views only carry the
+	// primary logfile's markers
 	int log_markers{ 0 };
-	m_ViewAccessor->VisitLine( view_line_no, [&log_markers, log_line_no, this] ( const LineAccessor & line ) {
-		log_markers = m_Adornments->LogMarkValue( log_line_no, line );
-	} );
+	if( ViewProvenance::IsPrimary( m_ViewProvenance, view_line_no ) )
+	{
+		const vint_t log_line_no{ m_ViewLineTranslation->ViewLineToLogLine( view_line_no ) };
+		m_ViewAccessor->VisitLine( view_line_no, [&log_markers, log_line_no, this] ( const LineAccessor & line ) {
+			log_markers = m_Adornments->LogMarkValue( log_line_no, line );
+		} );
+	}
 	
 	// the global timecode markers
 	const int global_markers{ ViewMarkValue( view_line_no ) };
@@ -71,52 +74,83 @@ vint_t SLineMarkers::MarkValue( vint_t view_line_no )
  * SLineMarginText
  -----------------------------------------------------------------------*/
 
-void SLineMarginText::CreateOffsetText_MsecDotNsec( int64_t sec, int64_t nsec, std::ostringstream & strm )
+CacheStatistics SLineMarginText::s_CacheStats{ "MarginTextCache" };
+
+
+void SLineMarginText::MarginText::Append( int64_t value, unsigned width )
+{
+	// digits are generated least significant first
+	char digits[ 20 ];
+	unsigned num_digits{ 0 };
+	uint64_t magnitude{ (value < 0) ? (0 - static_cast<uint64_t>( value )) : static_cast<uint64_t>( value ) };
+	do
+	{
+		digits[ num_digits++ ] = static_cast<char>( '0' + (magnitude % 10) );
+		magnitude /= 10;
+	} while( magnitude != 0 );
+
+	if( value < 0 )
+		Append( '-' );
+
+	for( ; width > num_digits; --width )
+		Append( '0' );
+
+	while( num_digits != 0 )
+		Append( digits[ --num_digits ] );
+}
+
+
+void SLineMarginText::CreateOffsetText_MsecDotNsec( int64_t sec, int64_t nsec, MarginText & text )
 {
 	constexpr int64_t c_Million{ 1'000'000 };
 	const int64_t msec{ nsec / c_Million };
 	nsec -= msec * c_Million;
 
-	strm << std::setfill( '0' ) << sec << '.'
-		<< std::setw( 3 ) << msec << '.'
-		<< std::setw( 6 ) << nsec;
+	text.Append( sec );
+	text.Append( '.' );
+	text.Append( msec, 3 );
+	text.Append( '.' );
+	text.Append( nsec, 6 );
 }
 
 
-void SLineMarginText::CreateOffsetText_Usec( int64_t sec, int64_t nsec, std::ostringstream & strm )
+void SLineMarginText::CreateOffsetText_Usec( int64_t sec, int64_t nsec, MarginText & text )
 {
 	const int64_t usec{ nsec / 1'000 };
-	strm << std::setfill( '0' ) << sec << '.'
-		<< std::setw( 6 ) << usec;
+	text.Append( sec );
+	text.Append( '.' );
+	text.Append( usec, 6 );
 }
 
 
-void SLineMarginText::CreateOffsetText_Msec( int64_t sec, int64_t nsec, std::ostringstream & strm )
+void SLineMarginText::CreateOffsetText_Msec( int64_t sec, int64_t nsec, MarginText & text )
 {
 	constexpr int64_t c_Million{ 1'000'000 };
 	const int64_t msec{ nsec / c_Million };
-	strm << std::setfill( '0' ) << sec << '.'
-		<< std::setw( 3 ) << msec;
+	text.Append( sec );
+	text.Append( '.' );
+	text.Append( msec, 3 );
 }
 
 
-void SLineMarginText::CreateOffsetText_Sec( int64_t sec, int64_t nsec, std::ostringstream & strm )
+void SLineMarginText::CreateOffsetText_Sec( int64_t sec, int64_t nsec, MarginText & text )
 {
-	strm << sec;
+	text.Append( sec );
 }
 
 
-void SLineMarginText::CreateOffsetText_MinSec( int64_t sec, int64_t nsec, std::ostringstream & strm )
+void SLineMarginText::CreateOffsetText_MinSec( int64_t sec, int64_t nsec, MarginText & text )
 {
 	const int64_t min{ sec / 60 };
 	sec -= min * 60;
 
-	strm << std::setfill( '0' ) << min << ':'
-		<< std::setw( 2 ) << sec;
+	text.Append( min );
+	text.Append( ':' );
+	text.Append( sec, 2 );
 }
 
 
-void SLineMarginText::CreateOffsetText_HourMinSec( int64_t sec, int64_t nsec, std::ostringstream & strm )
+void SLineMarginText::CreateOffsetText_HourMinSec( int64_t sec, int64_t nsec, MarginText & text )
 {
 	const int64_t hour{ sec / (60 * 60) };
 	sec -= hour * (60 * 60);
@@ -124,13 +158,15 @@ void SLineMarginText::CreateOffsetText_HourMinSec( int64_t sec, int64_t nsec, st
 	const int64_t min{ sec / 60 };
 	sec -= min * 60;
 
-	strm << std::setfill( '0' ) << hour << ':'
-		<< std::setw( 2 ) << min << ':'
-		<< std::setw( 2 ) << sec;
+	text.Append( hour );
+	text.Append( ':' );
+	text.Append( min, 2 );
+	text.Append( ':' );
+	text.Append( sec, 2 );
 }
 
 
-void SLineMarginText::CreateOffsetText_DayHourMinSec( int64_t sec, int64_t nsec, std::ostringstream & strm )
+void SLineMarginText::CreateOffsetText_DayHourMinSec( int64_t sec, int64_t nsec, MarginText & text )
 {
 	const int64_t day{ sec / (24 * 60 * 60) };
 	sec -= day * (24 * 60 * 60);
@@ -141,20 +177,23 @@ void SLineMarginText::CreateOffsetText_DayHourMinSec( int64_t sec, int64_t nsec,
 	const int64_t min{ sec / 60 };
 	sec -= min * 60;
 
-	strm << std::setfill( '0' ) << day << ':' 
-		<< std::setw( 2 ) << hour << ':'
-		<< std::setw( 2 ) << min << ':'
-		<< std::setw( 2 ) << sec;
+	text.Append( day );
+	text.Append( ':' );
+	text.Append( hour, 2 );
+	text.Append( ':' );
+	text.Append( min, 2 );
+	text.Append( ':' );
+	text.Append( sec, 2 );
 }
 
 
-void SLineMarginText::CreateLineNumberText( vint_t line, std::ostringstream & strm ) const
+void SLineMarginText::CreateLineNumberText( vint_t line, MarginText & text ) const
 {
-	strm << line;
+	text.Append( line );
 }
 
 
-void SLineMarginText::CreateOffsetText( vint_t line, std::ostringstream & strm ) const
+void SLineMarginText::CreateOffsetText( vint_t line, MarginText & text ) const
 {
 	int64_t offset{ 0 };
 
@@ -168,20 +207,33 @@ void SLineMarginText::CreateOffsetText( vint_t line, std::ostringstream & strm )
 		const int64_t sec{ offset / c_Billion };
 		const int64_t nsec{ offset - (sec * c_Billion) };
 
-		(*m_CreateOffsetTextFunc)(sec, nsec, strm);
+		(*m_CreateOffsetTextFunc)(sec, nsec, text);
 	}
 }
 
 
-void SLineMarginText::UpdateLineText( vint_t line ) const
+void SLineMarginText::CreateLineText( vint_t line, MarginText & text ) const
 {
-	if( m_CreateTextFunc != nullptr )
+	text.Clear();
+
+	// merged views identify the logfile each line came from
+	if( m_ViewProvenance != nullptr )
 	{
-		std::ostringstream strm;
-		(this->*m_CreateTextFunc)(line, strm);
-		m_LineNumber = line;
-		m_LineText = strm.str();
+		text.Append( '[' );
+		text.Append( static_cast<int64_t>( m_ViewProvenance->GetSource( line ) ) );
+		text.Append( ']' );
+		text.Append( ' ' );
 	}
+
+	if( m_CreateTextFunc != nullptr )
+		(this->*m_CreateTextFunc)(line, text);
+}
+
+
+void SLineMarginText::InvalidateCache( void ) const
+{
+	for( CacheEntry & entry : m_Cache )
+		entry.f_Line = -1;
 }
 
 
@@ -191,7 +243,6 @@ void SLineMarginText::Setup( Type type, Precision prec )
 	{
 	case Type::e_None:
 		m_CreateTextFunc = nullptr;
-		m_LineText = "";
 		break;
 
 	case Type::e_LineNumber:
@@ -233,14 +284,29 @@ void SLineMarginText::Setup( Type type, Precision prec )
 		}
 		break;
 	}
+
+	// discard the cached text
+	InvalidateCache();
 }
 
 
-const std::string & SLineMarginText::GetLineText( vint_t line ) const
+const SLineMarginText::MarginText & SLineMarginText::GetLineText( vint_t line ) const
 {
-	if( line != m_LineNumber )
-		UpdateLineText( line );
-	return m_LineText;
+	// a filter or field mask change alters the line numbering
+	if( m_ViewTracker.CompareTo( m_ViewAccessor->GetProperties()->GetTracker() ) )
+		InvalidateCache();
+
+	s_CacheStats.Lookup();
+
+	CacheEntry & entry{ m_Cache[ static_cast<size_t>( line ) % c_CacheSize ] };
+	if( entry.f_Line != line )
+	{
+		s_CacheStats.Miss();
+		CreateLineText( line, entry.f_Text );
+		entry.f_Line = line;
+	}
+
+	return entry.f_Text;
 }
 
 
@@ -253,13 +319,13 @@ vint_t SLineMarginText::Style( vint_t line ) const
 
 const char *SLineMarginText::Text( vint_t line ) const
 {
-	return GetLineText( line ).c_str();
+	return GetLineText( line ).f_Text;
 }
 
 
 vint_t SLineMarginText::Length( vint_t line ) const
 {
-	return vint_cast( GetLineText( line ).size() );
+	return vint_cast( GetLineText( line ).f_Length );
 }
 
 
@@ -290,7 +356,7 @@ annotationsizes_list_t SLineAnnotation::GetAnnotationSizes( void ) const
 		const vint_t nearest_view_line{ m_ViewLineTranslation->LogLineToViewLine( log_line ) };
 		const vint_t nearest_log_line{ m_ViewLineTranslation->ViewLineToLogLine( nearest_view_line ) };
 
-		if( nearest_log_line == log_line )
+		if( (nearest_log_line == log_line) && ViewProvenance::IsPrimary( m_ViewProvenance, nearest_view_line ) )
 			// the log file annotation is visible in this view
 			view_sizes.emplace_back( nearest_view_line, elem.second );
 	}
@@ -301,6 +367,9 @@ annotationsizes_list_t SLineAnnotation::GetAnnotationSizes( void ) const
 
 const NAnnotation * SLineAnnotation::GetAnnotation( vint_t line ) const
 {
+	if( !ViewProvenance::IsPrimary( m_ViewProvenance, line ) )
+		return nullptr;
+
 	return m_LogAnnotations->GetAnnotation( m_ViewLineTranslation->ViewLineToLogLine( line ) );
 }
 
@@ -319,7 +388,8 @@ vint_t SLineAnnotation::Style( vint_t line ) const
 
 void SLineAnnotation::SetStyle( vint_t line, vint_t style )
 {
-	m_LogAnnotations->SetAnnotationStyle( m_ViewLineTranslation->ViewLineToLogLine( line ), style );
+	if( ViewProvenance::IsPrimary( m_ViewProvenance, line ) )
+		m_LogAnnotations->SetAnnotationStyle( m_ViewLineTranslation->ViewLineToLogLine( line ), style );
 }
 
 
@@ -337,7 +407,8 @@ const char *SLineAnnotation::Text( vint_t line ) const
 
 void SLineAnnotation::SetText( vint_t line, const char * text )
 {
-	m_LogAnnotations->SetAnnotationText( m_ViewLineTranslation->ViewLineToLogLine( line ), text );
+	if( ViewProvenance::IsPrimary( m_ViewProvenance, line ) )
+		m_LogAnnotations->SetAnnotationText( m_ViewLineTranslation->ViewLineToLogLine( line ), text );
 }
 
 
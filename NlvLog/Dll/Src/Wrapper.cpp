@@ -28,6 +28,36 @@ using namespace boost::python;
 
 
 
+/*-------------------------------------------------------------------------
+ * GIL
+ ------------------------------------------------------------------------*/
+
+PythonGilRelease::PythonGilRelease( void )
+	: m_ThreadState{ PyGILState_Check() ? PyEval_SaveThread() : nullptr }
+{
+}
+
+
+PythonGilRelease::~PythonGilRelease( void )
+{
+	if( m_ThreadState != nullptr )
+		PyEval_RestoreThread( static_cast<PyThreadState *>( m_ThreadState ) );
+}
+
+
+PythonGilAcquire::PythonGilAcquire( void )
+	: m_State{ PyGILState_Ensure() }
+{
+}
+
+
+PythonGilAcquire::~PythonGilAcquire( void )
+{
+	PyGILState_Release( static_cast<PyGILState_STATE>( m_State ) );
+}
+
+
+
 /*-------------------------------------------------------------------------
  * Tracing
  ------------------------------------------------------------------------*/
@@ -38,7 +68,8 @@ namespace
 	object g_Logger;
 
 
-	// tracing can be sent to Python for distribution and storage
+	// tracing can be sent to Python for distribution and storage; may be
+	// called from any thread, including the TBB workers
 	void TraceToPython( Error error, const std::string & message )
 	{
 		const char * method{ "error" };
@@ -47,6 +78,7 @@ namespace
 		else if( error == e_TraceInfo )
 			method = "info";
 
+		PythonGilAcquire gil;
 		g_Logger.attr( method )(message);
 	}
 }
@@ -62,26 +94,62 @@ namespace
 	// timer factory object to call-back into Python
 	object g_PerfTimerFactory;
 
+	// timers are used within GIL released engine calls, so the GIL is acquired
+	// for every call into Python, including release of the Python timer object;
+	// timing is advisory, so Python errors are discarded rather than allowed to
+	// escape into the timed (native) code
 	struct FullPerfTimer : public PythonPerfTimerImpl
 	{
-		object m_PythonPerfTimer;
+		// null if the Python timer could not be created
+		std::unique_ptr<object> m_PythonPerfTimer;
+
+		template<typename T_CALL>
+		void CallPython( T_CALL call ) {
+			PythonGilAcquire gil;
+			try
+			{
+				call();
+			}
+			catch( error_already_set & )
+			{
+				PyErr_Clear();
+			}
+		}
 
 		FullPerfTimer( const char * description, size_t item_count ) {
-			m_PythonPerfTimer = g_PerfTimerFactory( description, item_count );
+			CallPython( [&] () {
+				m_PythonPerfTimer = std::make_unique<object>( g_PerfTimerFactory( description, item_count ) );
+			} );
+		}
+
+		~FullPerfTimer( void ) {
+			CallPython( [&] () {
+				m_PythonPerfTimer.reset();
+			} );
 		}
 
 		void AddArgument( const char * arg ) override {
-			m_PythonPerfTimer.attr( "AddArgument" )(arg);
+			CallPython( [&] () {
+				if( m_PythonPerfTimer )
+					m_PythonPerfTimer->attr( "AddArgument" )(arg);
+			} );
 		}
 
 		void AddArgument( const wchar_t * arg ) override {
 			using converter_t = std::wstring_convert<std::codecvt_utf8<wchar_t>>;
 			std::string utf8{ converter_t{}.to_bytes( arg ) };
-			m_PythonPerfTimer.attr( "AddArgument" )(utf8);
+
+			CallPython( [&] () {
+				if( m_PythonPerfTimer )
+					m_PythonPerfTimer->attr( "AddArgument" )(utf8);
+			} );
 		}
 
 		void Close( size_t item_count ) override {
-			m_PythonPerfTimer.attr( "Close" )(item_count);
+			CallPython( [&] () {
+				if( m_PythonPerfTimer )
+					m_PythonPerfTimer->attr( "Close" )(item_count);
+			} );
 		}
 	};
 
@@ -251,7 +319,9 @@ logfile_ptr_t MakeLogfile( const std::string & nlog_path, object log_schema, obj
 		PythonProgress( object & progress )
 			: f_Progress{ progress } {}
 
+		// indexing runs with the GIL released
 		void Pulse( const std::string & message ) override {
+			PythonGilAcquire gil;
 			if( f_Enabled && !f_Progress.is_none() )
 				f_Progress( message );
 		}
@@ -261,7 +331,12 @@ logfile_ptr_t MakeLogfile( const std::string & nlog_path, object log_schema, obj
 	TraceDebug( "path:'%S'", wnlog_path.c_str() );
 
 	logfile_ptr_t logfile{ new NLogfile{ std::move( MakeLogAccessor( log_schema ) ) } };
-	const Error error{ logfile->Open( wnlog_path, &meter ) };
+	Error error{ e_OK };
+	{
+		PythonGilRelease nogil;
+		error = logfile->Open( wnlog_path, &meter );
+	}
+
 	if( !Ok( error ) )
 		logfile.reset();
 
@@ -433,6 +508,7 @@ BOOST_PYTHON_MODULE( NlvLog )
 		.def( "PutState", &NLogfile::PutState )
 		.def( "CreateLineSet", &NLogfile::CreateLineSet )
 		.def( "CreateLogView", &NLogfile::CreateLogView )
+		.def( "CreateMergedLogView", &NLogfile::CreateMergedLogView )
 		.def( "CreateEventView", &NLogfile::CreateEventView )
 		.def( "SetNumAutoMarker", &NLogfile::SetNumAutoMarker )
 		.def( "SetAutoMarker", &NLogfile::SetAutoMarker )
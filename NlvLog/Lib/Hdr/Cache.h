@@ -152,6 +152,23 @@ public:
 		}
 	}
 
+	void Erase( const key_t & key )
+	{
+		m_Map.erase( key );
+	}
+
+	template<typename T_PREDICATE>
+	void EraseIf( T_PREDICATE predicate )
+	{
+		for( map_t::iterator ientry{ m_Map.begin() }; ientry != m_Map.end(); )
+		{
+			if( predicate( ientry->first ) )
+				ientry = m_Map.erase( ientry );
+			else
+				++ientry;
+		}
+	}
+
 	void Clear( void )
 	{
 		m_Map.clear();
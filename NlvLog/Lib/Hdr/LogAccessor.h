@@ -201,6 +201,101 @@ struct LogSchemaAccessor
 
 	// misc logfile info; timecode field index and UTC datum for the log file
 	virtual const NTimecodeBase & GetTimecodeBase( void ) const = 0;
+
+	// identifies the schema instance for the life of the process; enumeration
+	// values and the UTC datum are specific to each logfile, so the schema's
+	// GUID is not sufficient to identify its field values
+	const uint64_t m_SchemaId{ MakeSchemaId() };
+
+	static uint64_t MakeSchemaId( void );
+
+	// releases any cached selectors compiled against the schema
+	~LogSchemaAccessor( void );
+};
+
+
+
+/*-----------------------------------------------------------------------
+ * LineBitmap
+ -----------------------------------------------------------------------*/
+
+// a set of line numbers, held as a bitmap
+class LineBitmap
+{
+private:
+	std::vector<uint64_t> m_Words;
+	nlineno_t m_NumLines{ 0 };
+
+	// clear the unused bits in the last word
+	void Trim( void );
+
+public:
+	LineBitmap( void ) {}
+	LineBitmap( nlineno_t num_lines, bool value );
+
+	nlineno_t GetNumLines( void ) const {
+		return m_NumLines;
+	}
+
+	bool IsEmpty( void ) const;
+	nlineno_t Count( void ) const;
+
+	bool Test( nlineno_t line_no ) const {
+		return ((m_Words[ line_no >> 6 ] >> (line_no & 63)) & 1) != 0;
+	}
+
+	void Set( nlineno_t line_no ) {
+		m_Words[ line_no >> 6 ] |= uint64_t{ 1 } << (line_no & 63);
+	}
+
+	// set the lines [first, last)
+	void SetRange( nlineno_t first, nlineno_t last );
+
+	LineBitmap & operator &= ( const LineBitmap & rhs );
+	LineBitmap & operator |= ( const LineBitmap & rhs );
+};
+
+
+
+/*-----------------------------------------------------------------------
+ * FieldIndex
+ -----------------------------------------------------------------------*/
+
+// secondary index for a single field, covering the logfile's regular lines; an
+// enumeration field records the lines holding each value (posting lists), any
+// other numeric field records the range of values in each zone of lines
+struct FieldIndex
+{
+	// lines per zone
+	static const nlineno_t c_ZoneShift{ 10 };
+
+	struct Zone
+	{
+		fieldvalue_t f_Min;
+		fieldvalue_t f_Max;
+
+		// the zone holds no regular lines
+		bool f_Empty{ true };
+
+		// the zone holds values which do not order; e.g. NaN
+		bool f_Unordered{ false };
+	};
+
+	nlineno_t f_NumLines{ 0 };
+
+	// enumeration fields; the (ascending) lines holding each enumeration value
+	std::vector<std::vector<nlineno_t>> f_Postings;
+
+	// other numeric fields
+	std::vector<Zone> f_Zones;
+};
+
+
+// access to a logfile's field indexes, which are built on demand
+struct FieldIndexAccessor
+{
+	// fetch the field's index; nullptr if the field is not indexable
+	virtual const FieldIndex * GetFieldIndex( unsigned field_id ) const = 0;
 };
 
 
@@ -322,12 +417,53 @@ struct ViewMap
 	// this flag disambiguates the two cases
 	bool m_IsEmpty{ true };
 
+	// a lazily built map (see MakeMergeViewAccessor) holds the start locations
+	// of a prefix of its lines only; the prefix is extended on demand, to hold
+	// the given line, or the line containing the given position
+	virtual bool IsComplete( void ) const {
+		return true;
+	}
+	virtual void ExtendToLine( nlineno_t line_no ) const {}
+	virtual void ExtendToPosition( nlineno_t pos ) const {}
+
 	virtual nlineno_t GetLineLength( nlineno_t line_no ) const = 0;
 	virtual const LineBuffer & GetLine( e_LineData type, nlineno_t line_no ) const = 0;
 };
 
 
 
+// position to line lookup for a ViewMap; a sampled table holds the line
+// containing the start of each c_BucketSize bytes of text, so a lookup need
+// only search the few lines within a bucket. The most recent line is also
+// cached, as Scintilla's accesses are largely sequential.
+class ViewMapIndex
+{
+private:
+	static constexpr unsigned c_BucketShift{ 12 };
+	static constexpr nlineno_t c_BucketSize{ 1 << c_BucketShift };
+
+	// the line containing the first character of each bucket
+	std::vector<nlineno_t> m_Buckets;
+
+	// the index is rebuilt whenever the view records a change
+	ChangeTracker m_ViewTracker;
+
+	// last found line
+	nlineno_t m_LastLine{ 0 };
+
+	bool InLine( const ViewMap & map, nlineno_t line_no, nlineno_t pos ) const {
+		return (map.m_Lines[ line_no ] <= pos) && (pos < map.m_Lines[ line_no + 1 ]);
+	}
+
+	void Build( const ViewMap & map );
+
+public:
+	// same result as NLine::Lookup over the map's lines
+	nlineno_t PositionToLine( const ViewMap & map, const ChangeTracker & view_tracker, nlineno_t pos );
+};
+
+
+
 /*-----------------------------------------------------------------------
  * ViewLineTranslation
  -----------------------------------------------------------------------*/
@@ -365,6 +501,25 @@ struct HierarchyAccessor
 
 
 
+/*-----------------------------------------------------------------------
+ * ViewProvenance
+ -----------------------------------------------------------------------*/
+
+// views which combine lines from several logfiles identify each line's source
+struct ViewProvenance
+{
+	// index of the source holding the line; zero is the primary source, whose
+	// logfile line numbers are used for line translation
+	virtual unsigned GetSource( nlineno_t line_no ) const = 0;
+
+	// true where the line's logfile line number refers to the primary logfile
+	static bool IsPrimary( const ViewProvenance * provenance, nlineno_t line_no ) {
+		return (provenance == nullptr) || (provenance->GetSource( line_no ) == 0);
+	}
+};
+
+
+
 /*-----------------------------------------------------------------------
  * ViewAccessor
  -----------------------------------------------------------------------*/
@@ -428,4 +583,32 @@ struct ViewAccessor
 	virtual const ViewTimecode * GetTimecode( void ) {
 		return nullptr;
 	}
+
+	virtual const ViewProvenance * GetProvenance( void ) {
+		return nullptr;
+	}
 };
+
+
+
+/*-----------------------------------------------------------------------
+ * MergeViewAccessor
+ -----------------------------------------------------------------------*/
+
+// a source for a merged view; where set, the source's own adornments are used
+// when filtering or searching it, and logview filters are compiled against the
+// source's own schema
+struct MergeViewSource
+{
+	viewaccessor_ptr_t f_View;
+	std::shared_ptr<LineAdornmentsProvider> f_Adornments;
+	const LogSchemaAccessor * f_Schema{ nullptr };
+};
+
+// create a view which merges the lines of several (timecoded) views into UTC
+// time order; the sources are expected to have the same fields, though their
+// enumeration values and UTC datums may differ
+//
+// note - the merge is lazy; lines are merged as they are requested, though a
+// search, or a time or log line lookup, may merge up to the line it finds
+viewaccessor_ptr_t MakeMergeViewAccessor( const std::vector<MergeViewSource> & sources );
@@ -17,6 +17,7 @@
 #pragma once
 
 // C++ includes
+#include <cstdint>
 #include <string>
 #include <memory>
 
@@ -112,10 +113,13 @@ struct Match
 struct Selector;
 struct LineAccessor;
 struct LogSchemaAccessor;
-using selector_ptr_t = std::unique_ptr<Selector>;
+struct FieldIndexAccessor;
+class LineBitmap;
+using selector_ptr_t = std::shared_ptr<const Selector>;
 using selector_ptr_a = const selector_ptr_t &;
 
-// general interface for identifying lines which match a criterion
+// general interface for identifying lines which match a criterion; selectors
+// are shared (see MakeSelector), so must be immutable once constructed
 struct Selector
 {
 	const Match m_Match;
@@ -129,6 +133,12 @@ struct Selector
 	virtual bool Hit( const LineAccessor & line ) const;
 	virtual bool Hit( const LineAccessor & line, const LineAdornmentsAccessor & adornments ) const;
 
+	// use the field indexes to find the lines which may be hit; no line outside
+	// candidates is hit; returns false where the lines cannot be narrowed
+	virtual bool FindCandidates( const FieldIndexAccessor & index, int num_lines, LineBitmap * candidates ) const {
+		return false;
+	}
+
 	const std::pair<bool, int> GetDataPartition( void ) const {
 		return std::make_pair( m_Match.m_HasDataPartition, m_Match.m_DataPartition );
 	}
@@ -137,11 +147,20 @@ struct Selector
 	{
 		virtual void Action( const char * found, size_t length ) = 0;
 	};
-	virtual void Visit( const char *first, const char *last, Visitor & visitor )
+	virtual void Visit( const char *first, const char *last, Visitor & visitor ) const
 	{
 		return;
 	}
 
-	// factory
+	// factory; compiled selectors are cached, and the same selector may be
+	// returned to any number of callers
 	static selector_ptr_t MakeSelector( const Match & match, bool empty_selects_all, const LogSchemaAccessor * schema = nullptr );
+
+	// release the cached selectors which reference a schema; called as the
+	// schema is destroyed
+	static void ForgetSchema( uint64_t schema_id );
+
+private:
+	// throws on error
+	static selector_ptr_t CreateSelector( const Match & match, bool empty_selects_all, const LogSchemaAccessor * schema );
 };
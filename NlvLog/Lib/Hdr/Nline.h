@@ -56,44 +56,24 @@ namespace NLine
 	}
 
 	// given a map or set of line numbers find the line which follows (or precedes)
-	// the supplied line_no
+	// the supplied line_no; line_no need not be in the container
 	template<typename T_CONTAINER, typename T_KEY = typename T_CONTAINER::key_type>
 	static T_KEY GetNextLine( const T_CONTAINER & container, T_KEY line_no, bool forward )
 	{
 		using container_t = T_CONTAINER;
-		using key_t = T_KEY;
 		using const_iterator = typename container_t::const_iterator;
-		const_iterator ibegin{ container.begin() };
-		const_iterator iend{ container.end() };
 
-		const_iterator iline{ container.find( line_no ) };
-		if( iline != iend )
+		if( forward )
 		{
-			// the current line is in the container; move iterator "forwards"
-			if( forward )
-			{
-				++iline;
-				return (iline == iend) ? -1 : GetKeyValue<container_t>( iline );
-			}
-			else
-				return (iline == ibegin) ? -1 : GetKeyValue<container_t>( --iline );
+			// first line after line_no
+			const_iterator iline{ container.upper_bound( line_no ) };
+			return (iline == container.end()) ? -1 : GetKeyValue<container_t>( iline );
 		}
 		else
 		{
-			// line_no wasn't in the container, so do linear search to find it
-			key_t ret{ -1 };
-			for( iline = ibegin; iline != iend; ++iline )
-			{
-				ret = GetKeyValue<container_t>( iline );
-				if( ret >= line_no )
-				{
-					if( forward )
-						return ret;
-					else
-						return (iline == ibegin) ? -1 : GetKeyValue<container_t>( --iline );
-				}
-			}
-			return forward ? -1 : ret;
+			// last line before line_no
+			const_iterator iline{ container.lower_bound( line_no ) };
+			return (iline == container.begin()) ? -1 : GetKeyValue<container_t>( --iline );
 		}
 	}
 
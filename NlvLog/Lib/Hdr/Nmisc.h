@@ -158,6 +158,8 @@ public:
 
 struct PythonPerfTimerImpl
 {
+	virtual ~PythonPerfTimerImpl( void ) {}
+
 	static std::unique_ptr<PythonPerfTimerImpl> Create( const char * description, size_t item_count );
 	virtual void AddArgument( const char * arg ) = 0;
 	virtual void AddArgument( const wchar_t * arg ) = 0;
@@ -17,6 +17,7 @@
 #pragma once
 
 // C++ includes
+#include <algorithm>
 #include <vector>
 #include <memory>
 
@@ -123,11 +124,78 @@ struct ViewTimecode
 	virtual bool HasTimeCode( int line_no ) const = 0;
 	virtual NTimecode GetUtcTimecode( int line_no ) const = 0;
 
-	NTimecode GetNearestUtcTimecode( int line_no ) const {
-		while( (line_no > 0) && !HasTimeCode( line_no ) )
+	// fetch the nearest line, at or before line_no, which has a timecode;
+	// else -1; accessors with an index should override the linear search
+	virtual int GetNearestTimecodeLine( int line_no ) const {
+		while( (line_no >= 0) && !HasTimeCode( line_no ) )
 			line_no -= 1;
-		return GetUtcTimecode( line_no );
+		return line_no;
+	}
+
+	NTimecode GetNearestUtcTimecode( int line_no ) const {
+		return GetUtcTimecode( std::max( GetNearestTimecodeLine( line_no ), 0 ) );
+	}
+
+	// fetch the timecoded line whose timecode is nearest to utc; else -1
+	virtual int GetNearestUtcLine( const NTimecode & utc ) const = 0;
+};
+
+
+
+/*-----------------------------------------------------------------------
+ * ViewTimecodeIndex
+ -----------------------------------------------------------------------*/
+
+// time ordered secondary index over a view's lines, supporting an O(log n)
+// nearest time search; the view is split into runs of lines with non-decreasing
+// timecodes, each of which is binary searched in place; a badly disordered
+// view (too many runs) is instead fully sorted
+class ViewTimecodeIndex
+{
+private:
+	// a run of lines with non-decreasing timecodes; the first line is timecoded
+	struct Run
+	{
+		int f_FirstLine, f_LastLine, f_LastTimecodeLine;
+		NTimecode f_FirstTimecode, f_LastTimecode;
+	};
+
+	static constexpr size_t c_MaxRuns{ 64 };
+	std::vector<Run> m_Runs;
+
+	// fallback; timecoded lines sorted by their (ns) offset to m_Datum
+	std::vector<std::pair<int64_t, int>> m_Sorted;
+
+	// the index is rebuilt if the line count or first timecode
+	// (i.e. the timezone) change
+	bool m_Valid{ false };
+	int m_NumLines{ 0 };
+	int m_DatumLine{ -1 };
+	NTimecode m_Datum;
+
+	// recent lookups; typically, one per global tracker
+	struct Recent
+	{
+		bool f_InUse;
+		NTimecode f_Target;
+		int f_Line;
+	};
+
+	static constexpr size_t c_NumRecent{ 4 };
+	Recent m_Recent[ c_NumRecent ]{};
+	size_t m_NextRecent{ 0 };
+
+	bool IsCurrent( const ViewTimecode & timecode, int num_lines ) const;
+	void Build( const ViewTimecode & timecode, int num_lines );
+	int SearchRuns( const ViewTimecode & timecode, const NTimecode & target ) const;
+	int SearchSorted( const NTimecode & target ) const;
+
+public:
+	void Invalidate( void ) {
+		m_Valid = false;
 	}
+
+	int GetNearestLine( const ViewTimecode & timecode, int num_lines, const NTimecode & target );
 };
 
 
@@ -143,7 +211,7 @@ private:
 	NTimecode f_UtcTimecode;
 
 public:
-	bool IsNearest( int line_no, int max_line_no, const ViewTimecode * timecode_accessor ) const;
+	bool IsNearest( int line_no, const ViewTimecode * timecode_accessor ) const;
 
 	void SetUtcTimecode( const NTimecode & timecode ) {
 		f_InUse = true;
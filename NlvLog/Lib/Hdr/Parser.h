@@ -38,5 +38,9 @@ private:
 public:
 	SelectorLogviewFilter( const Match & match, const LogSchemaAccessor & schema );
 	bool Hit( const LineAccessor & line, const LineAdornmentsAccessor & adornments ) const override;
+	bool FindCandidates( const FieldIndexAccessor & index, int num_lines, LineBitmap * candidates ) const override;
+
+	// reference (syntax tree walking) implementation of Hit
+	bool HitSyntaxTree( const LineAccessor & line, const LineAdornmentsAccessor & adornments ) const;
 };
 
@@ -24,6 +24,9 @@
 // Intel TBB includes
 #include <tbb/flow_graph.h>
 
+// C++ includes
+#include <mutex>
+
 // force link this module
 void force_link_mapaccessor_module() {}
 
@@ -84,7 +87,7 @@ void LineFormatter::Apply( const LineBuffer & text, LineBuffer * fmt ) const
 struct Visitor;
 
 // the default log accessor is based on file mapping; the log must be entirely static
-class MapLogAccessor : public LogAccessor, public LogSchemaAccessor
+class MapLogAccessor : public LogAccessor, public LogSchemaAccessor, public FieldIndexAccessor
 {
 private:
 	// the logfile's text
@@ -115,6 +118,15 @@ private:
 	// line formatting
 	LineFormatter m_LineFormatters;
 
+	// secondary field indexes; built on demand
+	mutable std::mutex m_FieldIndexesMutex;
+	mutable std::map<unsigned, std::unique_ptr<FieldIndex>> m_FieldIndexes;
+
+	std::unique_ptr<FieldIndex> MakeFieldIndex( unsigned field_id ) const;
+
+	template<typename T_VALUE>
+	void MakeFieldZones( unsigned field_id, FieldIndex * field_index ) const;
+
 protected:
 	std::filesystem::path CalcIndexPath( const std::filesystem::path & file_path );
 
@@ -167,6 +179,11 @@ public:
 		return m_Index->GetTimecodeBase();
 	}
 
+public:
+	// FieldIndexAccessor interfaces
+
+	const FieldIndex * GetFieldIndex( unsigned field_id ) const override;
+
 public:
 	// MapLineAccessor interfaces
 
@@ -180,6 +197,11 @@ public:
 		return m_Index->IsLineRegular( line_no );
 	}
 
+	// fetch the nearest regular line at or before line_no; else -1
+	nlineno_t GetNearestRegularLine( nlineno_t line_no ) const {
+		return m_Index->GetNearestRegularLine( line_no );
+	}
+
 	nlineno_t GetLineLength( nlineno_t line_no, uint64_t field_mask = 0 ) const {
 		return m_Index->GetLineLength( line_no, field_mask );
 	}
@@ -256,6 +278,9 @@ private:
 	// list of fields (columns) to display/search
 	uint64_t m_FieldViewMask{ 0 };
 
+	// time ordered index of the view's lines; built on demand
+	mutable ViewTimecodeIndex m_TimecodeIndex;
+
 public:
 	MapViewAccessor( MapLogAccessor * accessor )
 		: m_LogAccessor{ accessor }
@@ -319,6 +344,32 @@ public:
 		return m_LogAccessor->GetUtcTimecode( ViewLineToLogLine( line_no ) );
 	}
 
+	int GetNearestTimecodeLine( int line_no ) const override {
+		const nlineno_t log_line_no{ ViewLineToLogLine( line_no ) };
+		const nlineno_t regular_log_line_no{ m_LogAccessor->GetNearestRegularLine( log_line_no ) };
+		if( regular_log_line_no == log_line_no )
+			return line_no;
+		else if( regular_log_line_no < 0 )
+			return -1;
+
+		// usually, continuation lines immediately follow their regular line in the view
+		const nlineno_t guess_line_no{ line_no - (log_line_no - regular_log_line_no) };
+		if( (guess_line_no >= 0) && (ViewLineToLogLine( guess_line_no ) == regular_log_line_no) )
+			return guess_line_no;
+
+		// otherwise, the regular line is filtered out of the view; any view lines
+		// after it (and before line_no) are irregular, so search from there
+		const nlineno_t view_line_no{ LogLineToViewLine( regular_log_line_no ) };
+		if( (view_line_no < 0) || (ViewLineToLogLine( view_line_no ) > regular_log_line_no) )
+			return -1;
+
+		return ViewTimecode::GetNearestTimecodeLine( view_line_no );
+	}
+
+	int GetNearestUtcLine( const NTimecode & utc ) const override {
+		return m_TimecodeIndex.GetNearestLine( *this, GetNumLines(), utc );
+	}
+
 
 public:
 	// ViewAccessor interface
@@ -501,6 +552,109 @@ const LineBuffer & MapLogAccessor::GetLine( e_LineData type, nlineno_t line_no,
 }
 
 
+// record the range of the field's values within each zone of lines
+template<typename T_VALUE>
+void MapLogAccessor::MakeFieldZones( unsigned field_id, FieldIndex * field_index ) const
+{
+	const nlineno_t zone_size{ nlineno_t{ 1 } << FieldIndex::c_ZoneShift };
+	field_index->f_Zones.resize( (field_index->f_NumLines + zone_size - 1) / zone_size );
+
+	for( nlineno_t line_no = 0; line_no < field_index->f_NumLines; ++line_no )
+	{
+		if( !IsLineRegular( line_no ) )
+			continue;
+
+		FieldIndex::Zone & zone{ field_index->f_Zones[ line_no >> FieldIndex::c_ZoneShift ] };
+		const bool first_value{ zone.f_Empty };
+		zone.f_Empty = false;
+		if( zone.f_Unordered )
+			continue;
+
+		const fieldvalue_t value{ GetFieldValue( line_no, field_id ) };
+		const T_VALUE native_value{ value.As<T_VALUE>() };
+
+		// NaN
+		if( native_value != native_value )
+			zone.f_Unordered = true;
+
+		else if( first_value )
+			zone.f_Min = zone.f_Max = value;
+
+		else if( native_value < zone.f_Min.As<T_VALUE>() )
+			zone.f_Min = value;
+
+		else if( native_value > zone.f_Max.As<T_VALUE>() )
+			zone.f_Max = value;
+	}
+}
+
+
+// enumeration fields are indexed with posting lists, other numeric fields
+// with zone maps; text only fields have no index
+std::unique_ptr<FieldIndex> MapLogAccessor::MakeFieldIndex( unsigned field_id ) const
+{
+	const FieldValueType type{ GetFieldType( field_id ) };
+	if( type == FieldValueType::invalid )
+		return nullptr;
+
+	PythonPerfTimer timer{ __FUNCTION__ };
+
+	std::unique_ptr<FieldIndex> field_index{ std::make_unique<FieldIndex>() };
+	field_index->f_NumLines = GetNumLines();
+
+	const uint16_t enum_count{ GetFieldEnumCount( field_id ) };
+	if( enum_count != 0 )
+	{
+		std::vector<std::vector<nlineno_t>> & postings{ field_index->f_Postings };
+		postings.resize( enum_count );
+
+		for( nlineno_t line_no = 0; line_no < field_index->f_NumLines; ++line_no )
+			if( IsLineRegular( line_no ) )
+			{
+				// tolerate values outside the enumeration; each line must be posted
+				const uint64_t value{ GetFieldValue( line_no, field_id ).As<uint64_t>() };
+				if( value >= postings.size() )
+					postings.resize( value + 1 );
+
+				postings[ value ].push_back( line_no );
+			}
+	}
+
+	else
+	{
+		switch( type )
+		{
+		case FieldValueType::unsigned64:
+			MakeFieldZones<uint64_t>( field_id, field_index.get() );
+			break;
+
+		case FieldValueType::signed64:
+			MakeFieldZones<int64_t>( field_id, field_index.get() );
+			break;
+
+		case FieldValueType::float64:
+			MakeFieldZones<double>( field_id, field_index.get() );
+			break;
+		}
+	}
+
+	timer.Close( field_index->f_NumLines );
+	return field_index;
+}
+
+
+const FieldIndex * MapLogAccessor::GetFieldIndex( unsigned field_id ) const
+{
+	std::lock_guard<std::mutex> lock{ m_FieldIndexesMutex };
+
+	auto it{ m_FieldIndexes.find( field_id ) };
+	if( it == m_FieldIndexes.end() )
+		it = m_FieldIndexes.emplace( field_id, MakeFieldIndex( field_id ) ).first;
+
+	return it->second.get();
+}
+
+
 
 /*-----------------------------------------------------------------------
  * MapViewAccessor, definitions
@@ -887,6 +1041,9 @@ struct FilterData
 	bool f_AddIrregular;
 	selector_ptr_a f_Selector;
 	LineAdornmentsProvider * f_LineAdornmentsProvider;
+
+	// where known, the only lines which may be selected
+	const LineBitmap * f_Candidates;
 };
 
 
@@ -909,6 +1066,9 @@ struct FilterTask : public Task
 	void Action( const LineAccessor & line ) override
 	{
 		nlineno_t log_line_no{ line.GetLineNo() };
+		if( (f_FilterData.f_Candidates != nullptr) && !f_FilterData.f_Candidates->Test( log_line_no ) )
+			return;
+
 		LineAdornmentsAccessor adornments{ f_FilterData.f_LineAdornmentsProvider, log_line_no };
 		if( !f_FilterData.f_Selector->Hit( line, adornments ) )
 			return;
@@ -988,11 +1148,16 @@ void MapViewAccessor::Filter( selector_ptr_a selector, LineAdornmentsProvider *
 {
 	PythonPerfTimer timer{ __FUNCTION__ };
 
+	// where the selector can use the field indexes, only visit the candidate lines
+	LineBitmap candidates;
+	const bool use_candidates{ selector->FindCandidates( *m_LogAccessor, m_LogAccessor->GetNumLines(), &candidates ) };
+
 	FilterData filter_data
 	{
 		add_irregular,
 		selector,
-		adornments_provider
+		adornments_provider,
+		use_candidates ? &candidates : nullptr
 	};
 
 	FilterVisitor visitor{ filter_data };
@@ -1009,6 +1174,7 @@ void MapViewAccessor::Filter( selector_ptr_a selector, LineAdornmentsProvider *
 	// set to one for either empty, or a real line count of one ...
 	// use m_IsEmpty to distinguish the two cases
 	m_NumLinesOrOne = nlineno_cast( !m_IsEmpty ? m_LineMap.size() - 1 : 1 );
+	m_TimecodeIndex.Invalidate();
 
 	// record the change
 	m_Tracker.RecordEvent();
@@ -441,6 +441,7 @@ private:
 
 protected:
 	bool IsLineRegular( nlineno_t line_no ) const override;
+	nlineno_t GetNearestRegularLine( nlineno_t line_no ) const override;
 	nlineno_t GetLineLength( nlineno_t line_no, uint64_t field_mask ) const override;
 	void CopyLine( nlineno_t line_no, uint64_t field_mask, const char * log_text, LineBuffer * line_buffer ) const override;
 	void CopyStyle( nlineno_t line_no, uint64_t field_mask, LineBuffer * line_buffer ) const override;
@@ -466,6 +467,23 @@ bool LogIndexAccessorFull<T_FIELD_TEXTOFFSETS>::IsLineRegular( nlineno_t line_no
 }
 
 
+// irregular lines record the last regular line preceding them (or -1)
+// when the index is written, so this is a constant time lookup
+template<typename T_FIELD_TEXTOFFSETS>
+nlineno_t LogIndexAccessorFull<T_FIELD_TEXTOFFSETS>::GetNearestRegularLine( nlineno_t line_no ) const
+{
+	if( line_no >= m_NumLines )
+		return line_no;
+
+	const uint8_t * line_data{ GetLineData( line_no ) };
+	if( m_FieldTextOffsets->IsRegular( line_data ) )
+		return line_no;
+
+	const int64_t last_regular{ m_FieldTextOffsets->LastRegularLine( line_data ) };
+	return (last_regular < line_no) ? nlineno_cast( last_regular ) : -1;
+}
+
+
 template<typename T_FIELD_TEXTOFFSETS>
 nlineno_t LogIndexAccessorFull<T_FIELD_TEXTOFFSETS>::GetLineLength( nlineno_t line_no, uint64_t field_mask ) const
 {
@@ -257,6 +257,7 @@ public:
 	Error Load( const std::filesystem::path & file_path, FILETIME modified_time, const std::string & guid );
 
 	virtual bool IsLineRegular( nlineno_t line_no ) const = 0;
+	virtual nlineno_t GetNearestRegularLine( nlineno_t line_no ) const = 0;
 	virtual nlineno_t GetLineLength( nlineno_t line_no, uint64_t field_mask ) const = 0;
 	virtual void CopyLine( nlineno_t line_no, uint64_t field_mask, const char * log_text, LineBuffer * line_buffer ) const = 0;
 	virtual void CopyStyle( nlineno_t line_no, uint64_t field_mask, LineBuffer * line_buffer ) const = 0;
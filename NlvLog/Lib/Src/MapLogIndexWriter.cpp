@@ -447,6 +447,38 @@ private:
 	const char *m_Current{ nullptr };
 	bool m_Error{ false };
 
+	// leading (date/hour) text of the previous line, and its conversion
+	std::string m_PrefixText;
+	tm m_PrefixTm{};
+
+	// UTC at the start of the previous line's month
+	int m_MonthYear{ -1 }, m_Month{ -1 };
+	time_t m_MonthUtc{ -1 };
+
+	// seconds since the epoch; UTC is linear in the day of month and time of day,
+	// so only the start of each month need be converted by the C runtime
+	time_t CalcUtc( tm & tm ) {
+		if( (tm.tm_mon < 0) || (tm.tm_mon > 11) )
+			return _mkgmtime( &tm );
+
+		if( (tm.tm_year != m_MonthYear) || (tm.tm_mon != m_Month) )
+		{
+			struct tm month_start{};
+			month_start.tm_year = tm.tm_year;
+			month_start.tm_mon = tm.tm_mon;
+			month_start.tm_mday = 1;
+
+			m_MonthUtc = _mkgmtime( &month_start );
+			m_MonthYear = tm.tm_year;
+			m_Month = tm.tm_mon;
+		}
+
+		if( m_MonthUtc == -1 )
+			return -1;
+
+		return m_MonthUtc + (tm.tm_mday - 1) * 86400LL + tm.tm_hour * 3600LL + tm.tm_min * 60LL + tm.tm_sec;
+	}
+
 protected:
 	FieldWriterDateTime( const FieldDescriptor & field_desc, unsigned field_id )
 		: base_t{ field_desc, field_id } {}
@@ -669,9 +701,39 @@ protected:
 		return month;
 	}
 
+	// logfile timestamps are (nearly) monotonic, so consecutive lines usually share
+	// their leading date/hour text; when they do, re-use the previous line's
+	// conversion and resume parsing after the prefix
+	bool ReusePrefix( const char * first, const char * last, size_t prefix_len, tm * tm ) {
+		if( (m_PrefixText.size() != prefix_len) || (static_cast<size_t>(last - first) < prefix_len) )
+			return false;
+
+		if( memcmp( first, m_PrefixText.data(), prefix_len ) != 0 )
+			return false;
+
+		tm->tm_year = m_PrefixTm.tm_year;
+		tm->tm_mon = m_PrefixTm.tm_mon;
+		tm->tm_mday = m_PrefixTm.tm_mday;
+		tm->tm_hour = m_PrefixTm.tm_hour;
+		m_Current = first + prefix_len;
+		return true;
+	}
+
+	// record a freshly parsed prefix; only well-formed prefixes are eligible for re-use
+	void SavePrefix( const char * first, const char * last, size_t prefix_len, const tm & tm ) {
+		if( m_Error || (m_Current != first + prefix_len) || (static_cast<size_t>(last - first) < prefix_len) )
+		{
+			m_PrefixText.clear();
+			return;
+		}
+
+		m_PrefixText.assign( first, prefix_len );
+		m_PrefixTm = tm;
+	}
+
 	Error WriteDateTime( WriteContext & cxt, const char * first, const char * last, tm & tm, uint32_t ns = 0 )
 	{
-		const time_t utc{ _mkgmtime( &tm ) };
+		const time_t utc{ m_Error ? -1 : CalcUtc( tm ) };
 		if( m_Error || (utc == -1) || (m_Current != last) )
 			return TraceInfoCxt( cxt, "Date missing: line:%lld text:'%s'", cxt.f_LineNo, std::string{ first, last }.c_str() );
 
@@ -705,11 +767,18 @@ private:
 	Error WriteValue( WriteContext & cxt, const char * first, const char * last ) override
 	{
 		tm tm; InitState( first, &tm );
-		tm.tm_year = m_AssumedYear;
 
-		tm.tm_mon = GetMonthAbbr() - 1; ExpectChar( ' ' );
-		tm.tm_mday = CountedCharsToNumber<2>(); ExpectChar( ' ' );
-		tm.tm_hour = CountedCharsToNumber<2>(); ExpectChar( ':' );
+		// "Mar 31 23:"
+		constexpr size_t prefix_len{ 10 };
+		if( !ReusePrefix( first, last, prefix_len, &tm ) )
+		{
+			tm.tm_year = m_AssumedYear;
+			tm.tm_mon = GetMonthAbbr() - 1; ExpectChar( ' ' );
+			tm.tm_mday = CountedCharsToNumber<2>(); ExpectChar( ' ' );
+			tm.tm_hour = CountedCharsToNumber<2>(); ExpectChar( ':' );
+			SavePrefix( first, last, prefix_len, tm );
+		}
+
 		tm.tm_min = CountedCharsToNumber<2>(); ExpectChar( ':' );
 		tm.tm_sec = CountedCharsToNumber<2>();
 
@@ -784,13 +853,20 @@ private:
 	{
 		tm tm; InitState( first, &tm );
 
-		(c_International ? tm.tm_mday : tm.tm_mon) = CountedCharsToNumber<2>(); ExpectChar( '/' );
-		(c_International ? tm.tm_mon : tm.tm_mday) = CountedCharsToNumber<2>(); ExpectChar( '/' );
-		tm.tm_year = CountedCharsToNumber<4>() - c_GmtimeYearOffset; ExpectChar( '-' );
-		tm.tm_hour = CountedCharsToNumber<2>(); ExpectChar( ':' );
+		// "12/06/2017-18:"
+		constexpr size_t prefix_len{ 14 };
+		if( !ReusePrefix( first, last, prefix_len, &tm ) )
+		{
+			(c_International ? tm.tm_mday : tm.tm_mon) = CountedCharsToNumber<2>(); ExpectChar( '/' );
+			(c_International ? tm.tm_mon : tm.tm_mday) = CountedCharsToNumber<2>(); ExpectChar( '/' );
+			tm.tm_year = CountedCharsToNumber<4>() - c_GmtimeYearOffset; ExpectChar( '-' );
+			tm.tm_hour = CountedCharsToNumber<2>(); ExpectChar( ':' );
+			tm.tm_mon -= 1;
+			SavePrefix( first, last, prefix_len, tm );
+		}
+
 		tm.tm_min = CountedCharsToNumber<2>(); ExpectChar( ':' );
 		tm.tm_sec = CountedCharsToNumber<2>(); ExpectChar( '.' );
-		tm.tm_mon -= 1;
 
 		const uint32_t ms{ CountedCharsToNumber<3, uint32_t>() };
 		uint32_t us{ 0 };
@@ -842,10 +918,17 @@ private:
 	{
 		tm tm; InitState(first, &tm);
 
-		tm.tm_year = CountedCharsToNumber<4>() - c_GmtimeYearOffset; ExpectChar('-');
-		tm.tm_mon = CountedCharsToNumber<2>() - 1; ExpectChar('-');
-		tm.tm_mday = CountedCharsToNumber<2>(); ExpectChar("T ");
-		tm.tm_hour = CountedCharsToNumber<2>(); ExpectChar(':');
+		// "1997-07-16T19:"
+		constexpr size_t prefix_len{ 14 };
+		if( !ReusePrefix( first, last, prefix_len, &tm ) )
+		{
+			tm.tm_year = CountedCharsToNumber<4>() - c_GmtimeYearOffset; ExpectChar('-');
+			tm.tm_mon = CountedCharsToNumber<2>() - 1; ExpectChar('-');
+			tm.tm_mday = CountedCharsToNumber<2>(); ExpectChar("T ");
+			tm.tm_hour = CountedCharsToNumber<2>(); ExpectChar(':');
+			SavePrefix( first, last, prefix_len, tm );
+		}
+
 		tm.tm_min = CountedCharsToNumber<2>(); ExpectChar(':');
 		tm.tm_sec = CountedCharsToNumber<2>();
 		
@@ -881,7 +964,7 @@ private:
 
 		tm.tm_hour = CountedCharsToNumber<2>(); ExpectChar( ':' );
 		tm.tm_min = CountedCharsToNumber<2>(); ExpectChar( ':' );
-		tm.tm_sec = CountedCharsToNumber<2>(); ExpectChar( '.' );
+		tm.tm_sec = CountedCharsToNumber<2>();
 
 		const uint32_t ns{ FractionAsNanoSeconds() };
 		return WriteDateTime( cxt, first, last, tm, ns );
@@ -0,0 +1,512 @@
+//
+// Copyright (C) 2023 Niel Clausen. All rights reserved.
+//
+// This program is free software: you can redistribute it and/or modify
+// it under the terms of the GNU General Public License as published by
+// the Free Software Foundation, either version 3 of the License, or
+// (at your option) any later version.
+//
+// This program is distributed in the hope that it will be useful,
+// but WITHOUT ANY WARRANTY; without even the implied warranty of
+// MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+// GNU General Public License for more details.
+//
+// You should have received a copy of the GNU General Public License
+// along with this program. If not, see <https://www.gnu.org/licenses/>.
+//
+#include "StdAfx.h"
+
+// Application includes
+#include "LogAccessor.h"
+#include "Nline.h"
+
+// C++ includes
+#include <algorithm>
+#include <climits>
+#include <queue>
+
+
+
+/*-----------------------------------------------------------------------
+ * MergeViewAccessor, declarations
+ -----------------------------------------------------------------------*/
+
+// merge the lines of several source views into UTC time order; the merge
+// order is computed from the sources' indexes (timecodes and line positions)
+// alone, line text is only fetched from a source when requested
+//
+// the merge is lazy; the view's line count and text length are known from the
+// sources, so only a prefix of the view's lines is merged, and a k-way merge,
+// which resumes from each source's cursor, extends the prefix as later lines
+// are requested
+class MergeViewAccessor
+	:
+	public ViewProperties,
+	public ViewMap,
+	public ViewLineTranslation,
+	public ViewTimecode,
+	public ViewProvenance,
+	public ViewAccessor
+{
+private:
+	// lines merged beyond those requested; Scintilla's accesses are largely
+	// sequential, so the merge is extended in bands
+	static constexpr size_t c_PrefetchLines{ 1 << 16 };
+
+	struct Source
+	{
+		viewaccessor_ptr_t f_View;
+		std::shared_ptr<LineAdornmentsProvider> f_Adornments;
+		const LogSchemaAccessor * f_Schema;
+		const ViewMap * f_Map;
+		const ViewLineTranslation * f_LineTranslation;
+		const ViewTimecode * f_Timecode;
+
+		// merged line number for each of the source's merged lines
+		std::vector<nlineno_t> f_MergedLines;
+
+		// the source's next unmerged line
+		nlineno_t f_Cursor{ 0 };
+	};
+
+	std::vector<Source> m_Sources;
+
+	// the source and source (view) line number for each merged line
+	struct MergedLine
+	{
+		unsigned f_Source;
+		nlineno_t f_Line;
+	};
+
+	std::vector<MergedLine> m_MergedLines;
+
+	// sort key; the (first) timecode of the next block of lines in each source,
+	// with ties going to the earliest source; lines preceding a source's first
+	// timecoded line have no time, and are placed first
+	struct Next
+	{
+		bool f_Untimed;
+		NTimecode f_Timecode;
+		unsigned f_Source;
+
+		bool operator < ( const Next & rhs ) const {
+			if( f_Untimed != rhs.f_Untimed )
+				return rhs.f_Untimed;
+
+			const int64_t delta{ f_Untimed ? 0 : f_Timecode - rhs.f_Timecode };
+			return (delta > 0) || ((delta == 0) && (f_Source > rhs.f_Source));
+		}
+	};
+
+	// the next block in each unfinished source; empty once the merge is complete
+	std::priority_queue<Next> m_Queue;
+
+	// time ordered index of the view's merged lines; built on demand
+	mutable ViewTimecodeIndex m_TimecodeIndex;
+
+	void Reset( void );
+	void Push( unsigned source_id );
+	bool Append( unsigned source_id, nlineno_t source_line_no );
+	bool MergeBlock( void );
+	void Extend( size_t num_lines, nlineno_t pos );
+	void ExtendToSource( unsigned source_id, nlineno_t source_line_no );
+	void ExtendToTime( const NTimecode & utc );
+
+	// the merge is extended from the (const) accessors; it only caches
+	// the view's content, which is fixed between filters
+	MergeViewAccessor * Lazy( void ) const {
+		return const_cast<MergeViewAccessor *>( this );
+	}
+
+	const MergedLine & GetMerged( nlineno_t line_no ) const {
+		ExtendToLine( line_no );
+		return m_MergedLines[ line_no ];
+	}
+
+	selector_ptr_t GetSourceSelector( const Source & source, selector_ptr_a selector, bool empty_selects_all ) const;
+
+	const Source & GetSource( const MergedLine & merged ) const {
+		return m_Sources[ merged.f_Source ];
+	}
+
+public:
+	MergeViewAccessor( const std::vector<MergeViewSource> & sources );
+
+public:
+	// ViewProperties interfaces
+
+	ViewProperties * GetProperties( void ) override {
+		return this;
+	}
+
+	void SetFieldMask( uint64_t field_mask ) override;
+
+public:
+	// ViewMap interfaces
+
+	const ViewMap * GetMap( void ) override {
+		return this;
+	}
+
+	bool IsComplete( void ) const override {
+		return m_Queue.empty();
+	}
+
+	void ExtendToLine( nlineno_t line_no ) const override {
+		if( static_cast<size_t>( line_no ) >= m_MergedLines.size() )
+			Lazy()->Extend( static_cast<size_t>( line_no ) + 1, 0 );
+	}
+
+	void ExtendToPosition( nlineno_t pos ) const override {
+		if( pos >= m_Lines.back() )
+			Lazy()->Extend( 0, pos );
+	}
+
+	nlineno_t GetLineLength( nlineno_t line_no ) const override {
+		const MergedLine & merged{ GetMerged( line_no ) };
+		return GetSource( merged ).f_Map->GetLineLength( merged.f_Line );
+	}
+
+	const LineBuffer & GetLine( e_LineData type, nlineno_t line_no ) const override {
+		const MergedLine & merged{ GetMerged( line_no ) };
+		return GetSource( merged ).f_Map->GetLine( type, merged.f_Line );
+	}
+
+public:
+	// ViewLineTranslation interface
+
+	const ViewLineTranslation * GetLineTranslation( void ) override {
+		return this;
+	}
+
+	// log line numbers are those of each line's own logfile
+	nlineno_t ViewLineToLogLine( nlineno_t view_line_no ) const override {
+		const MergedLine & merged{ GetMerged( view_line_no ) };
+		return GetSource( merged ).f_LineTranslation->ViewLineToLogLine( merged.f_Line );
+	}
+
+	// log line numbers are taken to be from the primary logfile
+	nlineno_t LogLineToViewLine( nlineno_t log_line_no, bool exact = false ) const override;
+
+public:
+	// ViewTimecode interface
+
+	const ViewTimecode * GetTimecode( void ) override {
+		return this;
+	}
+
+	bool HasTimeCode( int line_no ) const override {
+		const MergedLine & merged{ GetMerged( line_no ) };
+		return GetSource( merged ).f_Timecode->HasTimeCode( merged.f_Line );
+	}
+
+	NTimecode GetUtcTimecode( int line_no ) const override {
+		const MergedLine & merged{ GetMerged( line_no ) };
+		return GetSource( merged ).f_Timecode->GetUtcTimecode( merged.f_Line );
+	}
+
+	int GetNearestUtcLine( const NTimecode & utc ) const override;
+
+public:
+	// ViewProvenance interface
+
+	const ViewProvenance * GetProvenance( void ) override {
+		return this;
+	}
+
+	unsigned GetSource( nlineno_t line_no ) const override {
+		return GetMerged( line_no ).f_Source;
+	}
+
+public:
+	// ViewAccessor interface
+
+	void VisitLine( Task & task, nlineno_t visit_line_no ) const override {
+		const MergedLine & merged{ GetMerged( visit_line_no ) };
+		GetSource( merged ).f_View->VisitLine( task, merged.f_Line );
+	}
+
+	void Filter( selector_ptr_a selector, LineAdornmentsProvider * adornments_provider, bool add_irregular ) override;
+	std::vector<nlineno_t> Search( selector_ptr_a selector, LineAdornmentsProvider * adornments_provider ) override;
+
+	nlineno_t GetNumLines( void ) const override {
+		return m_IsEmpty ? 0 : m_NumLinesOrOne;
+	}
+};
+
+
+
+/*-----------------------------------------------------------------------
+ * MergeViewAccessor, definitions
+ -----------------------------------------------------------------------*/
+
+MergeViewAccessor::MergeViewAccessor( const std::vector<MergeViewSource> & sources )
+{
+	if( sources.empty() )
+		throw std::runtime_error{ "MergeViewAccessor has no sources" };
+
+	for( const MergeViewSource & source : sources )
+	{
+		viewaccessor_ptr_t view{ source.f_View };
+		Source merge_source{ view, source.f_Adornments, source.f_Schema, view->GetMap(), view->GetLineTranslation(), view->GetTimecode() };
+		if( !merge_source.f_Map || !merge_source.f_LineTranslation || !merge_source.f_Timecode )
+			throw std::runtime_error{ "MergeViewAccessor source has no ViewMap/ViewLineTranslation/ViewTimecode" };
+
+		m_Sources.push_back( std::move( merge_source ) );
+	}
+
+	Reset();
+}
+
+
+// restart the merge; the view's metrics are the sums of the sources', so only
+// the first band of lines need be merged
+void MergeViewAccessor::Reset( void )
+{
+	PythonPerfTimer timer{ __FUNCTION__ };
+
+	m_MergedLines.clear();
+	m_Lines.assign( 1, 0 );
+	m_Queue = std::priority_queue<Next>{};
+
+	size_t num_lines{ 0 };
+	int64_t text_len{ 0 };
+	for( unsigned source_id = 0; source_id < m_Sources.size(); ++source_id )
+	{
+		Source & source{ m_Sources[ source_id ] };
+		source.f_MergedLines.clear();
+		source.f_Cursor = 0;
+
+		num_lines += source.f_View->GetNumLines();
+		text_len += source.f_Map->m_TextLen;
+		Push( source_id );
+	}
+
+	// view positions are Scintilla compatible (int) values; where the text is
+	// too long, merge to find where to truncate the view
+	if( text_len > INT_MAX )
+	{
+		while( MergeBlock() )
+			;
+		num_lines = m_MergedLines.size();
+		text_len = m_Lines.back();
+	}
+
+	m_TextLen = nlineno_cast( text_len );
+
+	// an empty document in Scintilla requires a line count of one
+	m_IsEmpty = (num_lines == 0);
+	m_NumLinesOrOne = m_IsEmpty ? 1 : nlineno_cast( num_lines );
+
+	Extend( 0, 0 );
+
+	m_TimecodeIndex.Invalidate();
+	m_Tracker.RecordEvent();
+	timer.Close( m_MergedLines.size() );
+}
+
+
+// queue the source's next block of lines
+void MergeViewAccessor::Push( unsigned source_id )
+{
+	const Source & source{ m_Sources[ source_id ] };
+	const nlineno_t cursor{ source.f_Cursor };
+	if( cursor >= source.f_View->GetNumLines() )
+		return;
+
+	const ViewTimecode & timecode{ *source.f_Timecode };
+	if( timecode.HasTimeCode( cursor ) )
+		m_Queue.push( Next{ false, timecode.GetUtcTimecode( cursor ), source_id } );
+	else
+		m_Queue.push( Next{ true, NTimecode{}, source_id } );
+}
+
+
+// add a source line to the merged lines, calculating its position from the
+// source's line positions; fails where the view's text would be too long
+bool MergeViewAccessor::Append( unsigned source_id, nlineno_t source_line_no )
+{
+	Source & source{ m_Sources[ source_id ] };
+	const std::vector<nlineno_t> & source_lines{ source.f_Map->m_Lines };
+	const int64_t end{ int64_t{ m_Lines.back() } + source_lines[ source_line_no + 1 ] - source_lines[ source_line_no ] };
+	if( end > INT_MAX )
+	{
+		TraceError( e_LineOffsetRange, "Merged view truncated at line:%zu; text too long", m_MergedLines.size() );
+		return false;
+	}
+
+	source.f_MergedLines.push_back( nlineno_cast( m_MergedLines.size() ) );
+	m_MergedLines.push_back( MergedLine{ source_id, source_line_no } );
+	m_Lines.push_back( nlineno_cast( end ) );
+	return true;
+}
+
+
+// one step of the k-way merge; each source's lines keep their relative order,
+// and a regular line is kept together with its irregular (continuation) lines
+bool MergeViewAccessor::MergeBlock( void )
+{
+	if( m_Queue.empty() )
+		return false;
+
+	const unsigned source_id{ m_Queue.top().f_Source };
+	m_Queue.pop();
+
+	Source & source{ m_Sources[ source_id ] };
+	const nlineno_t source_num_lines{ source.f_View->GetNumLines() };
+	nlineno_t & cursor{ source.f_Cursor };
+
+	do
+	{
+		if( !Append( source_id, cursor ) )
+		{
+			m_Queue = std::priority_queue<Next>{};
+			return false;
+		}
+		++cursor;
+	} while( (cursor < source_num_lines) && !source.f_Timecode->HasTimeCode( cursor ) );
+
+	Push( source_id );
+	return true;
+}
+
+
+// extend the merge to hold num_lines lines, and the line containing position
+// pos, followed by a prefetch band
+void MergeViewAccessor::Extend( size_t num_lines, nlineno_t pos )
+{
+	if( m_Queue.empty() )
+		return;
+
+	PythonPerfTimer timer{ __FUNCTION__ };
+	const size_t first_line{ m_MergedLines.size() };
+
+	while( ((m_MergedLines.size() < num_lines) || (m_Lines.back() <= pos)) && MergeBlock() )
+		;
+
+	const size_t prefetch_lines{ m_MergedLines.size() + c_PrefetchLines };
+	while( (m_MergedLines.size() < prefetch_lines) && MergeBlock() )
+		;
+
+	timer.Close( m_MergedLines.size() - first_line );
+}
+
+
+// extend the merge to hold the given source line
+void MergeViewAccessor::ExtendToSource( unsigned source_id, nlineno_t source_line_no )
+{
+	const Source & source{ m_Sources[ source_id ] };
+	while( (nlineno_cast( source.f_MergedLines.size() ) <= source_line_no) && MergeBlock() )
+		;
+}
+
+
+// extend the merge to hold every line at, or before, the given time, and the
+// line following
+void MergeViewAccessor::ExtendToTime( const NTimecode & utc )
+{
+	while( !m_Queue.empty() && (m_Queue.top().f_Untimed || ((m_Queue.top().f_Timecode - utc) <= 0)) )
+		MergeBlock();
+
+	MergeBlock();
+}
+
+
+nlineno_t MergeViewAccessor::LogLineToViewLine( nlineno_t log_line_no, bool exact ) const
+{
+	const Source & primary{ m_Sources.front() };
+	const nlineno_t source_line_no{ primary.f_LineTranslation->LogLineToViewLine( log_line_no, exact ) };
+	if( source_line_no >= 0 )
+		Lazy()->ExtendToSource( 0, source_line_no );
+
+	if( (source_line_no < 0) || (source_line_no >= nlineno_cast( primary.f_MergedLines.size() )) )
+		return exact ? -1 : 0;
+
+	return primary.f_MergedLines[ source_line_no ];
+}
+
+
+int MergeViewAccessor::GetNearestUtcLine( const NTimecode & utc ) const
+{
+	// where the sources are in time order, the lines after the merged
+	// prefix are all later than the target
+	Lazy()->ExtendToTime( utc );
+	return m_TimecodeIndex.GetNearestLine( *this, nlineno_cast( m_MergedLines.size() ), utc );
+}
+
+
+void MergeViewAccessor::SetFieldMask( uint64_t field_mask )
+{
+	for( Source & source : m_Sources )
+		source.f_View->GetProperties()->SetFieldMask( field_mask );
+
+	// line lengths change, so the line positions must be re-calculated
+	Reset();
+}
+
+
+// a logview filter is compiled against a schema, and enumeration values and the
+// UTC datum are specific to each logfile; so re-make the selector for each
+// source (the selector cache makes this cheap); other selectors are shared
+selector_ptr_t MergeViewAccessor::GetSourceSelector( const Source & source, selector_ptr_a selector, bool empty_selects_all ) const
+{
+	if( !selector || (source.f_Schema == nullptr) )
+		return selector;
+
+	const Match & match{ selector->m_Match };
+	if( (match.m_Type != Match::e_LogviewFilter) || match.m_Text.empty() )
+		return selector;
+
+	return Selector::MakeSelector( match, empty_selects_all, source.f_Schema );
+}
+
+
+void MergeViewAccessor::Filter( selector_ptr_a selector, LineAdornmentsProvider * adornments_provider, bool add_irregular )
+{
+	for( Source & source : m_Sources )
+	{
+		// a filter which is invalid for a source (e.g. an enumeration value that
+		// source's logfile does not have) has been reported; it selects no lines
+		selector_ptr_t source_selector{ GetSourceSelector( source, selector, true ) };
+		if( !source_selector )
+			source_selector = Selector::MakeSelector( Match{ Match::e_Literal, "", true }, false );
+
+		LineAdornmentsProvider * provider{ source.f_Adornments ? source.f_Adornments.get() : adornments_provider };
+		source.f_View->Filter( source_selector, provider, add_irregular );
+	}
+
+	Reset();
+}
+
+
+std::vector<nlineno_t> MergeViewAccessor::Search( selector_ptr_a selector, LineAdornmentsProvider * adornments_provider )
+{
+	std::vector<nlineno_t> found;
+	for( unsigned source_id = 0; source_id < m_Sources.size(); ++source_id )
+	{
+		Source & source{ m_Sources[ source_id ] };
+		const selector_ptr_t source_selector{ GetSourceSelector( source, selector, false ) };
+		if( selector && !source_selector )
+			continue;
+
+		LineAdornmentsProvider * provider{ source.f_Adornments ? source.f_Adornments.get() : adornments_provider };
+		const std::vector<nlineno_t> source_found{ source.f_View->Search( source_selector, provider ) };
+
+		// the merge must reach the source's last found line
+		if( !source_found.empty() )
+			ExtendToSource( source_id, *std::max_element( source_found.begin(), source_found.end() ) );
+
+		for( nlineno_t source_line_no : source_found )
+			if( source_line_no < nlineno_cast( source.f_MergedLines.size() ) )
+				found.push_back( source.f_MergedLines[ source_line_no ] );
+	}
+
+	std::sort( found.begin(), found.end() );
+	return found;
+}
+
+
+viewaccessor_ptr_t MakeMergeViewAccessor( const std::vector<MergeViewSource> & sources )
+{
+	return std::make_shared<MergeViewAccessor>( sources );
+}
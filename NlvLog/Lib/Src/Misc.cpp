@@ -19,8 +19,14 @@
 // Application includes
 #include "LogAccessor.h"
 #include "Nmisc.h"
+#include "Ntime.h"
 #include "Ntrace.h"
 
+// C++ includes
+#include <algorithm>
+#include <atomic>
+#include <climits>
+
 
 
 /*-----------------------------------------------------------------------
@@ -159,3 +165,345 @@ std::string FieldValue::AsString( void ) const
 	else
 		return std::string{ "<unknown>" };
 }
+
+
+
+/*-----------------------------------------------------------------------
+ * ViewTimecodeIndex
+ -----------------------------------------------------------------------*/
+
+bool ViewTimecodeIndex::IsCurrent( const ViewTimecode & timecode, int num_lines ) const
+{
+	if( !m_Valid || (num_lines != m_NumLines) )
+		return false;
+
+	// a timezone change shifts every timecode
+	return (m_DatumLine < 0) || ((timecode.GetUtcTimecode( m_DatumLine ) - m_Datum) == 0);
+}
+
+
+void ViewTimecodeIndex::Build( const ViewTimecode & timecode, int num_lines )
+{
+	m_Runs.clear();
+	m_Sorted.clear();
+	for( Recent & recent : m_Recent )
+		recent.f_InUse = false;
+
+	m_NumLines = num_lines;
+	m_DatumLine = -1;
+
+	// split the view into runs of non-decreasing timecodes; lines without a
+	// timecode belong to the preceding run
+	for( int line_no = 0; line_no < num_lines; ++line_no )
+	{
+		if( !timecode.HasTimeCode( line_no ) )
+		{
+			if( !m_Runs.empty() )
+				m_Runs.back().f_LastLine = line_no;
+			continue;
+		}
+
+		const NTimecode value{ timecode.GetUtcTimecode( line_no ) };
+		if( m_Runs.empty() || (value < m_Runs.back().f_LastTimecode) )
+		{
+			m_Runs.push_back( Run{ line_no, line_no, line_no, value, value } );
+			if( m_DatumLine < 0 )
+			{
+				m_DatumLine = line_no;
+				m_Datum = value;
+			}
+		}
+		else
+		{
+			Run & run{ m_Runs.back() };
+			run.f_LastLine = run.f_LastTimecodeLine = line_no;
+			run.f_LastTimecode = value;
+		}
+	}
+
+	// badly disordered; fall back to a fully sorted index
+	if( m_Runs.size() > c_MaxRuns )
+	{
+		for( const Run & run : m_Runs )
+			for( int line_no = run.f_FirstLine; line_no <= run.f_LastTimecodeLine; ++line_no )
+				if( timecode.HasTimeCode( line_no ) )
+					m_Sorted.emplace_back( timecode.GetUtcTimecode( line_no ) - m_Datum, line_no );
+
+		std::sort( m_Sorted.begin(), m_Sorted.end() );
+		m_Runs.clear();
+	}
+
+	m_Valid = true;
+}
+
+
+int ViewTimecodeIndex::SearchRuns( const ViewTimecode & timecode, const NTimecode & target ) const
+{
+	int best_line{ -1 };
+	int64_t best_delta{ 0 };
+
+	// ties go to the earliest line
+	auto consider = [&best_line, &best_delta, &target] ( int line_no, const NTimecode & value ) {
+		const int64_t delta{ value.Diff( target ) };
+		if( (best_line < 0) || (delta < best_delta) || ((delta == best_delta) && (line_no < best_line)) )
+		{
+			best_line = line_no;
+			best_delta = delta;
+		}
+	};
+
+	for( const Run & run : m_Runs )
+	{
+		// within the run, each line inherits the timecode of the nearest
+		// preceding timecoded line, so is monotonic; fetch the earliest line
+		// sharing line_no's (inherited) timecode
+		auto earliest = [&timecode, &run] ( int line_no, const NTimecode & value ) {
+			int first{ run.f_FirstLine };
+			while( first < line_no )
+			{
+				const int mid{ first + (line_no - first) / 2 };
+				if( timecode.GetNearestUtcTimecode( mid ) < value )
+					first = mid + 1;
+				else
+					line_no = mid;
+			}
+			return line_no;
+		};
+
+		if( !(run.f_FirstTimecode < target) )
+			consider( run.f_FirstLine, run.f_FirstTimecode );
+
+		else if( !(target < run.f_LastTimecode) )
+			consider( earliest( run.f_LastTimecodeLine, run.f_LastTimecode ), run.f_LastTimecode );
+
+		else
+		{
+			// invariant: value(lo) <= target < value(hi)
+			int lo{ run.f_FirstLine }, hi{ run.f_LastTimecodeLine };
+			while( (hi - lo) > 1 )
+			{
+				const int mid{ lo + (hi - lo) / 2 };
+				if( target < timecode.GetNearestUtcTimecode( mid ) )
+					hi = mid;
+				else
+					lo = mid;
+			}
+
+			// hi's inherited timecode differs from lo's, so hi is timecoded
+			const NTimecode lo_value{ timecode.GetNearestUtcTimecode( lo ) };
+			consider( earliest( lo, lo_value ), lo_value );
+			consider( hi, timecode.GetUtcTimecode( hi ) );
+		}
+	}
+
+	return best_line;
+}
+
+
+int ViewTimecodeIndex::SearchSorted( const NTimecode & target ) const
+{
+	const int64_t key{ target - m_Datum };
+	auto lower = [this] ( int64_t offset ) {
+		return std::lower_bound( m_Sorted.begin(), m_Sorted.end(), std::make_pair( offset, INT_MIN ) );
+	};
+
+	// the earliest line at, or after, the target
+	auto after{ lower( key ) };
+	int best_line{ -1 };
+	int64_t best_delta{ 0 };
+	if( after != m_Sorted.end() )
+	{
+		best_line = after->second;
+		best_delta = after->first - key;
+	}
+
+	// the earliest line with the latest timecode before the target
+	if( after != m_Sorted.begin() )
+	{
+		auto before{ lower( std::prev( after )->first ) };
+		const int64_t delta{ key - before->first };
+		if( (best_line < 0) || (delta < best_delta) || ((delta == best_delta) && (before->second < best_line)) )
+			best_line = before->second;
+	}
+
+	return best_line;
+}
+
+
+int ViewTimecodeIndex::GetNearestLine( const ViewTimecode & timecode, int num_lines, const NTimecode & target )
+{
+	if( !IsCurrent( timecode, num_lines ) )
+		Build( timecode, num_lines );
+
+	for( const Recent & recent : m_Recent )
+		if( recent.f_InUse && ((recent.f_Target - target) == 0) )
+			return recent.f_Line;
+
+	const int line_no{ m_Sorted.empty() ? SearchRuns( timecode, target ) : SearchSorted( target ) };
+
+	m_Recent[ m_NextRecent ] = Recent{ true, target, line_no };
+	m_NextRecent = (m_NextRecent + 1) % c_NumRecent;
+
+	return line_no;
+}
+
+
+
+/*-----------------------------------------------------------------------
+ * ViewMapIndex
+ -----------------------------------------------------------------------*/
+
+void ViewMapIndex::Build( const ViewMap & map )
+{
+	const nlineno_t num_lines{ map.m_NumLinesOrOne };
+	const size_t num_buckets{ static_cast<size_t>( map.m_TextLen >> c_BucketShift ) + 2 };
+
+	m_Buckets.clear();
+	m_Buckets.reserve( num_buckets );
+
+	// single pass; advance to the last line starting at, or before, each bucket
+	nlineno_t line_no{ 0 };
+	for( size_t bucket = 0; bucket < num_buckets; ++bucket )
+	{
+		const int64_t bucket_pos{ static_cast<int64_t>( bucket ) << c_BucketShift };
+		while( (line_no + 1 < num_lines) && (map.m_Lines[ line_no + 1 ] <= bucket_pos) )
+			++line_no;
+
+		m_Buckets.push_back( line_no );
+	}
+
+	m_LastLine = 0;
+}
+
+
+nlineno_t ViewMapIndex::PositionToLine( const ViewMap & map, const ChangeTracker & view_tracker, nlineno_t pos )
+{
+	const nlineno_t num_lines{ map.m_NumLinesOrOne };
+	if( num_lines <= 1 )
+		return num_lines - 1;
+
+	if( pos < 0 )
+		return 0;
+	else if( pos >= map.m_TextLen )
+		return num_lines - 1;
+
+	// a lazily built map is searched directly, until complete
+	map.ExtendToPosition( pos );
+	if( !map.IsComplete() )
+	{
+		const auto iline{ std::upper_bound( map.m_Lines.begin(), map.m_Lines.end(), pos ) };
+		return static_cast<nlineno_t>( iline - map.m_Lines.begin() ) - 1;
+	}
+
+	if( m_ViewTracker.CompareTo( view_tracker ) )
+		Build( map );
+
+	// sequential access; the same, or the next, line
+	if( InLine( map, m_LastLine, pos ) )
+		return m_LastLine;
+	else if( (m_LastLine + 1 < num_lines) && InLine( map, m_LastLine + 1, pos ) )
+		return ++m_LastLine;
+
+	// the answer lies between the lines holding the start of this bucket and the next
+	const size_t bucket{ static_cast<size_t>( pos >> c_BucketShift ) };
+	const nlineno_t first_line{ m_Buckets[ bucket ] };
+	const nlineno_t last_line{ m_Buckets[ bucket + 1 ] };
+
+	const auto ibegin{ map.m_Lines.begin() };
+	const auto iline{ std::upper_bound( ibegin + first_line, ibegin + last_line + 1, pos ) };
+	m_LastLine = static_cast<nlineno_t>( iline - ibegin ) - 1;
+
+	return m_LastLine;
+}
+
+
+
+/*-----------------------------------------------------------------------
+ * LogSchemaAccessor
+ -----------------------------------------------------------------------*/
+
+uint64_t LogSchemaAccessor::MakeSchemaId( void )
+{
+	// zero is reserved for "no schema"
+	static std::atomic<uint64_t> s_NextSchemaId{ 1 };
+	return s_NextSchemaId++;
+}
+
+
+LogSchemaAccessor::~LogSchemaAccessor( void )
+{
+	Selector::ForgetSchema( m_SchemaId );
+}
+
+
+
+/*-----------------------------------------------------------------------
+ * LineBitmap
+ -----------------------------------------------------------------------*/
+
+LineBitmap::LineBitmap( nlineno_t num_lines, bool value )
+	:
+	m_Words( (num_lines + 63) / 64, value ? ~uint64_t{ 0 } : 0 ),
+	m_NumLines{ num_lines }
+{
+	Trim();
+}
+
+
+void LineBitmap::Trim( void )
+{
+	const nlineno_t tail{ m_NumLines & 63 };
+	if( tail != 0 )
+		m_Words.back() &= (uint64_t{ 1 } << tail) - 1;
+}
+
+
+bool LineBitmap::IsEmpty( void ) const
+{
+	return std::all_of( m_Words.begin(), m_Words.end(), [] ( uint64_t word ) {
+		return word == 0;
+	} );
+}
+
+
+nlineno_t LineBitmap::Count( void ) const
+{
+	nlineno_t count{ 0 };
+	for( uint64_t word : m_Words )
+		for( ; word != 0; word &= word - 1 )
+			count += 1;
+
+	return count;
+}
+
+
+void LineBitmap::SetRange( nlineno_t first, nlineno_t last )
+{
+	last = std::min( last, m_NumLines );
+	for( ; (first < last) && ((first & 63) != 0); ++first )
+		Set( first );
+
+	for( ; (first + 64) <= last; first += 64 )
+		m_Words[ first >> 6 ] = ~uint64_t{ 0 };
+
+	for( ; first < last; ++first )
+		Set( first );
+}
+
+
+LineBitmap & LineBitmap::operator &= ( const LineBitmap & rhs )
+{
+	for( size_t i = 0; i < m_Words.size(); ++i )
+		m_Words[ i ] &= rhs.m_Words[ i ];
+
+	return *this;
+}
+
+
+LineBitmap & LineBitmap::operator |= ( const LineBitmap & rhs )
+{
+	for( size_t i = 0; i < m_Words.size(); ++i )
+		m_Words[ i ] |= rhs.m_Words[ i ];
+
+	return *this;
+}
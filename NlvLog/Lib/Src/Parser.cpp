@@ -32,6 +32,7 @@
 #include <boost/spirit/include/phoenix_fusion.hpp>
 
 // C++ includes
+#include <algorithm>
 #include <memory>
 
 
@@ -144,6 +145,7 @@ namespace phoenix = boost::phoenix;
 
 // forward declarations
 struct A_LogicalOrExpr;
+class LVFProgram;
 
 // parser iterator for reading source text
 using str_iterator = std::string::const_iterator;
@@ -456,6 +458,31 @@ struct FilterVisitor : public boost::static_visitor<bool>
 };
 
 
+// lower the term into the filter program
+struct CompileVisitor : public boost::static_visitor<int>
+{
+	LVFProgram & f_Program;
+	const int f_OnTrue, f_OnFalse;
+	CompileVisitor( LVFProgram & program, int on_true, int on_false )
+		: f_Program{ program }, f_OnTrue{ on_true }, f_OnFalse{ on_false } {}
+
+	template<typename T>
+	int operator() ( const T & child ) const {
+		return child.Compile( f_Program, f_OnTrue, f_OnFalse );
+	}
+};
+
+
+// estimate the relative cost of filtering with the term
+struct CostVisitor : public boost::static_visitor<unsigned>
+{
+	template<typename T>
+	unsigned operator() ( const T & child ) const {
+		return child.GetCost();
+	}
+};
+
+
 
 /*-----------------------------------------------------------------------
  * A_FieldName
@@ -554,10 +581,9 @@ struct A_TextValue
 	// the case sensitivity `qualifier`
 	boost::optional<E_Qualifier> a_Qualifier;
 
-	// the selector to implement the match; important: can't use unique_ptr
-	// here as it is incompatible with boost::variant, giving very mysterious
-	// compiler failures
-	using selector_ptr_t = std::shared_ptr<Selector>;
+	// the selector to implement the match; important: selector_ptr_t must not
+	// be a unique_ptr here as it is incompatible with boost::variant, giving
+	// very mysterious compiler failures
 	selector_ptr_t f_Selector;
 	bool m_CaseInsensitive{ false };
 
@@ -593,7 +619,7 @@ void A_TextValue::Analyse( const AnalyseContext & context )
 
 	m_CaseInsensitive = a_Qualifier ? (* a_Qualifier == e_CaseInsensitive) : false;
 	const Match descriptor{ type, a_StringText, !m_CaseInsensitive };
-	f_Selector = selector_ptr_t{ Selector::MakeSelector( descriptor, false ) };
+	f_Selector = Selector::MakeSelector( descriptor, false );
 }
 
 
@@ -641,6 +667,9 @@ struct A_TextMatchClause
 
 	void Analyse( const AnalyseContext & context );
 	bool Filter( const FilterContext & context ) const;
+
+	int Compile( LVFProgram & program, int on_true, int on_false ) const;
+	unsigned GetCost( void ) const;
 };
 BOOST_FUSION_ADAPT_STRUCT
 (
@@ -711,6 +740,9 @@ struct A_Adornment
 		}
 		return false;
 	}
+
+	int Compile( LVFProgram & program, int on_true, int on_false ) const;
+	unsigned GetCost( void ) const;
 };
 
 
@@ -1130,11 +1162,15 @@ struct A_FieldMatchClause
 	bool f_ImplicitIncludeMatch{ false };
 
 	// comparison operations
+	FieldValueType f_FieldType{ FieldValueType::invalid };
 	fieldop_ptr_t m_OpEq;
 	fieldop_ptr_t m_OpLtEq;
 
 	void Analyse( const AnalyseContext & context );
 	bool Filter( const FilterContext & context ) const;
+
+	int Compile( LVFProgram & program, int on_true, int on_false ) const;
+	unsigned GetCost( void ) const;
 };
 BOOST_FUSION_ADAPT_STRUCT
 (
@@ -1159,9 +1195,9 @@ void A_FieldMatchClause::Analyse( const AnalyseContext & context )
 	const size_t num_includes{ f_IncValues.size() + f_IncRanges.size() };
 	f_ImplicitIncludeMatch = (num_excludes != 0) && (num_includes == 0);
 
-	const FieldValueType type{ cxt.GetFieldType() };
-	m_OpEq = MakeFieldOperation( E_FieldCompareOp::Eq, type );
-	m_OpLtEq = MakeFieldOperation( E_FieldCompareOp::LtEq, type );
+	f_FieldType = cxt.GetFieldType();
+	m_OpEq = MakeFieldOperation( E_FieldCompareOp::Eq, f_FieldType );
+	m_OpLtEq = MakeFieldOperation( E_FieldCompareOp::LtEq, f_FieldType );
 }
 
 
@@ -1218,10 +1254,14 @@ struct A_FieldCompareClause
 	fieldvalue_t f_FieldValue;
 
 	// comparison function
+	FieldValueType f_FieldType{ FieldValueType::invalid };
 	fieldop_ptr_t f_FieldOp;
 
 	void Analyse( const AnalyseContext & context );
 	bool Filter( const FilterContext & context ) const;
+
+	int Compile( LVFProgram & program, int on_true, int on_false ) const;
+	unsigned GetCost( void ) const;
 };
 BOOST_FUSION_ADAPT_STRUCT
 (
@@ -1239,7 +1279,8 @@ void A_FieldCompareClause::Analyse( const AnalyseContext & context )
 	AnalyseContext cxt{ context };
 	cxt.f_FieldId = f_FieldId;
 	f_FieldValue = a_FieldValue.Analyse( cxt );
-	f_FieldOp = MakeFieldOperation( a_FieldCompareOp, cxt.GetFieldType() );
+	f_FieldType = cxt.GetFieldType();
+	f_FieldOp = MakeFieldOperation( a_FieldCompareOp, f_FieldType );
 }
 
 
@@ -1274,6 +1315,14 @@ struct A_MatchClause
 	bool Filter( const FilterContext & context ) const {
 		return boost::apply_visitor( FilterVisitor{ context }, a_MatchClause );
 	}
+
+	int Compile( LVFProgram & program, int on_true, int on_false ) const {
+		return boost::apply_visitor( CompileVisitor{ program, on_true, on_false }, a_MatchClause );
+	}
+
+	unsigned GetCost( void ) const {
+		return boost::apply_visitor( CostVisitor{}, a_MatchClause );
+	}
 };
 BOOST_FUSION_ADAPT_STRUCT
 (
@@ -1299,6 +1348,9 @@ struct A_PrimaryExpr
 
 	void Analyse( const AnalyseContext & context );
 	bool Filter( const FilterContext & context ) const;
+
+	int Compile( LVFProgram & program, int on_true, int on_false ) const;
+	unsigned GetCost( void ) const;
 };
 BOOST_FUSION_ADAPT_STRUCT(
 	A_PrimaryExpr,
@@ -1328,6 +1380,9 @@ struct A_LogicalNotExpr
 
 	void Analyse( const AnalyseContext & context );
 	bool Filter( const FilterContext & context ) const;
+
+	int Compile( LVFProgram & program, int on_true, int on_false ) const;
+	unsigned GetCost( void ) const;
 };
 BOOST_FUSION_ADAPT_STRUCT(
 	A_LogicalNotExpr,
@@ -1368,6 +1423,9 @@ struct A_LogicalAndExpr : public std::vector<A_LogicalNotExpr>
 {
 	void Analyse( const AnalyseContext & context );
 	bool Filter( const FilterContext & context ) const;
+
+	int Compile( LVFProgram & program, int on_true, int on_false ) const;
+	unsigned GetCost( void ) const;
 };
 
 
@@ -1403,6 +1461,9 @@ struct A_LogicalOrExpr : public std::vector<A_LogicalAndExpr>
 {
 	void Analyse( const AnalyseContext & context );
 	bool Filter( const FilterContext & context ) const;
+
+	int Compile( LVFProgram & program, int on_true, int on_false ) const;
+	unsigned GetCost( void ) const;
 };
 
 
@@ -1441,6 +1502,754 @@ bool A_PrimaryExpr::Filter( const FilterContext & context ) const
 
 
 
+/*-----------------------------------------------------------------------
+ * LVFProgram, declarations
+ -----------------------------------------------------------------------*/
+
+// the analysed syntax tree, lowered to a flat array of instructions; each
+// instruction performs a single test and then branches to one of two successors,
+// so the logical operators cost nothing at filter time; field IDs, field types
+// and constant values are all resolved when the program is built
+class LVFProgram
+{
+public:
+	// terminal successors; other successors are instruction indexes
+	static const int c_Accept{ -1 };
+	static const int c_Reject{ -2 };
+
+	// relative costs of evaluating a term
+	static const unsigned c_CostNumeric{ 1 };
+	static const unsigned c_CostAdornment{ 2 };
+	static const unsigned c_CostText{ 16 };
+
+private:
+	enum class E_OpCode : uint8_t
+	{
+		Annotated,
+		Bookmarked,
+		Text,
+		CompareUnsigned,
+		CompareSigned,
+		CompareFloat,
+		RangeUnsigned,
+		RangeSigned,
+		RangeFloat
+	};
+
+	// a constant value, in the field's native type
+	union Constant
+	{
+		uint64_t f_Unsigned;
+		int64_t f_Signed;
+		double f_Float;
+
+		template<typename T_VALUE>
+		T_VALUE Get( void ) const;
+	};
+
+	struct Range
+	{
+		Constant f_Lower;
+		Constant f_Upper;
+	};
+
+	struct Instruction
+	{
+		E_OpCode f_OpCode;
+
+		// successors, for when the test passes or fails
+		int f_OnTrue;
+		int f_OnFalse;
+
+		// the field to test; Text instructions use E_FieldIdentifier values
+		int f_FieldId{ 0 };
+
+		// Text instructions; the text matcher
+		const A_TextValue * f_TextValue{ nullptr };
+
+		// Compare instructions; the operator and (right hand) constant
+		E_FieldCompareOp f_CompareOp{ E_FieldCompareOp::Eq };
+		Constant f_Value{};
+
+		// Range instructions; m_Ranges[ f_First, f_Last ) holds the exclusive
+		// ranges, followed by the inclusive ranges
+		unsigned f_First{ 0 };
+		unsigned f_NumExcludes{ 0 };
+		unsigned f_Last{ 0 };
+		bool f_ImplicitInclude{ false };
+	};
+
+	std::vector<Instruction> m_Instructions;
+	std::vector<Range> m_Ranges;
+	int m_Entry{ c_Reject };
+
+	static E_OpCode MakeOpCode( E_OpCode unsigned_code, FieldValueType type );
+	static Constant MakeConstant( const fieldvalue_t & value, FieldValueType type );
+	void AddRanges( const fieldvalue_list_t & values, const fieldrange_list_t & ranges, FieldValueType type );
+	int Emit( const Instruction & instruction );
+
+	static bool IsCompare( E_OpCode op_code ) {
+		return (op_code == E_OpCode::CompareUnsigned) || (op_code == E_OpCode::CompareSigned) || (op_code == E_OpCode::CompareFloat);
+	}
+
+	static bool IsRange( E_OpCode op_code ) {
+		return (op_code == E_OpCode::RangeUnsigned) || (op_code == E_OpCode::RangeSigned) || (op_code == E_OpCode::RangeFloat);
+	}
+
+	template<typename T_VALUE>
+	static T_VALUE GetFieldValue( const Instruction & instruction, const FilterContext & context ) {
+		return context.f_Line.GetFieldValue( instruction.f_FieldId ).As<T_VALUE>();
+	}
+
+	// numeric tests, given the line's field value
+	template<typename T_VALUE>
+	static bool Compare( const Instruction & instruction, T_VALUE lhs );
+
+	template<typename T_VALUE>
+	bool InRange( const Instruction & instruction, T_VALUE value ) const;
+
+	template<typename T_VALUE>
+	bool Test( const Instruction & instruction, T_VALUE value ) const {
+		return IsCompare( instruction.f_OpCode ) ? Compare( instruction, value ) : InRange( instruction, value );
+	}
+
+	// numeric tests, given the range of the field's values
+	template<typename T_VALUE>
+	void TestZone( const Instruction & instruction, T_VALUE min, T_VALUE max, bool * possibly_true, bool * surely_true ) const;
+
+	template<typename T_VALUE>
+	void FindLines( const Instruction & instruction, const FieldIndex & field_index, LineBitmap * on_true, LineBitmap * on_false ) const;
+
+	bool Execute( const Instruction & instruction, const FilterContext & context ) const;
+
+public:
+	// instruction builders for the syntax tree's Compile methods; an instruction's
+	// successors must be emitted before the instruction itself, so the program is
+	// built back to front, and returned values are the instruction indexes
+	int EmitAdornment( E_Adornment adornment, int on_true, int on_false );
+	int EmitText( const A_TextValue & text_value, E_FieldIdentifier field_id, int on_true, int on_false );
+	int EmitCompare( unsigned field_id, FieldValueType type, E_FieldCompareOp op, const fieldvalue_t & value, int on_true, int on_false );
+	int EmitRange( const A_FieldMatchClause & clause, int on_true, int on_false );
+
+	// complete the program; execution starts at the entry instruction
+	void Finalise( int entry );
+
+	// determine whether the supplied context is matched
+	bool Run( const FilterContext & context ) const;
+
+	// find the lines which may be matched, using the field indexes
+	bool FindCandidates( const FieldIndexAccessor & index, nlineno_t num_lines, LineBitmap * candidates ) const;
+};
+
+
+template<>
+uint64_t LVFProgram::Constant::Get<uint64_t>( void ) const {
+	return f_Unsigned;
+}
+
+
+template<>
+int64_t LVFProgram::Constant::Get<int64_t>( void ) const {
+	return f_Signed;
+}
+
+
+template<>
+double LVFProgram::Constant::Get<double>( void ) const {
+	return f_Float;
+}
+
+
+
+/*-----------------------------------------------------------------------
+ * LVFProgram, compilation
+ -----------------------------------------------------------------------*/
+
+// order the terms of a logical expression by cost; terms have no side effects,
+// so cheap numeric tests can always be run before text (regular expression) matches
+template<typename T_TERM>
+std::vector<const T_TERM *> OrderByCost( const std::vector<T_TERM> & terms )
+{
+	std::vector<std::pair<unsigned, const T_TERM *>> costs;
+	for( const T_TERM & term : terms )
+		costs.emplace_back( term.GetCost(), &term );
+
+	std::stable_sort( costs.begin(), costs.end(),
+		[] ( const std::pair<unsigned, const T_TERM *> & lhs, const std::pair<unsigned, const T_TERM *> & rhs ) {
+			return lhs.first < rhs.first;
+		}
+	);
+
+	std::vector<const T_TERM *> ordered;
+	for( const std::pair<unsigned, const T_TERM *> & cost : costs )
+		ordered.push_back( cost.second );
+
+	return ordered;
+}
+
+
+int A_TextMatchClause::Compile( LVFProgram & program, int on_true, int on_false ) const
+{
+	return program.EmitText( a_TextValue, f_FieldId, on_true, on_false );
+}
+
+
+unsigned A_TextMatchClause::GetCost( void ) const
+{
+	return LVFProgram::c_CostText;
+}
+
+
+int A_Adornment::Compile( LVFProgram & program, int on_true, int on_false ) const
+{
+	return program.EmitAdornment( a_Adornment, on_true, on_false );
+}
+
+
+unsigned A_Adornment::GetCost( void ) const
+{
+	return LVFProgram::c_CostAdornment;
+}
+
+
+int A_FieldMatchClause::Compile( LVFProgram & program, int on_true, int on_false ) const
+{
+	return program.EmitRange( *this, on_true, on_false );
+}
+
+
+unsigned A_FieldMatchClause::GetCost( void ) const
+{
+	return LVFProgram::c_CostNumeric;
+}
+
+
+int A_FieldCompareClause::Compile( LVFProgram & program, int on_true, int on_false ) const
+{
+	return program.EmitCompare( f_FieldId, f_FieldType, a_FieldCompareOp, f_FieldValue, on_true, on_false );
+}
+
+
+unsigned A_FieldCompareClause::GetCost( void ) const
+{
+	return LVFProgram::c_CostNumeric;
+}
+
+
+int A_PrimaryExpr::Compile( LVFProgram & program, int on_true, int on_false ) const
+{
+	return boost::apply_visitor( CompileVisitor{ program, on_true, on_false }, a_PrimaryExpr );
+}
+
+
+unsigned A_PrimaryExpr::GetCost( void ) const
+{
+	return boost::apply_visitor( CostVisitor{}, a_PrimaryExpr );
+}
+
+
+// negation is free; just swap the successors
+int A_LogicalNotExpr::Compile( LVFProgram & program, int on_true, int on_false ) const
+{
+	switch( a_LogicalNotOp.value_or( E_UnaryOp::None ) )
+	{
+	case E_UnaryOp::Not:
+		return a_PrimaryExpr.Compile( program, on_false, on_true );
+	}
+
+	return a_PrimaryExpr.Compile( program, on_true, on_false );
+}
+
+
+unsigned A_LogicalNotExpr::GetCost( void ) const
+{
+	return a_PrimaryExpr.GetCost();
+}
+
+
+// each term passes control to the next on success; the last term's successors
+// are emitted first
+int A_LogicalAndExpr::Compile( LVFProgram & program, int on_true, int on_false ) const
+{
+	const std::vector<const A_LogicalNotExpr *> ordered{ OrderByCost( *this ) };
+
+	int next{ on_true };
+	for( auto it = ordered.rbegin(); it != ordered.rend(); ++it )
+		next = (*it)->Compile( program, next, on_false );
+
+	return next;
+}
+
+
+unsigned A_LogicalAndExpr::GetCost( void ) const
+{
+	unsigned cost{ 0 };
+	for( const A_LogicalNotExpr & expr : *this )
+		cost += expr.GetCost();
+
+	return cost;
+}
+
+
+// each term passes control to the next on failure
+int A_LogicalOrExpr::Compile( LVFProgram & program, int on_true, int on_false ) const
+{
+	const std::vector<const A_LogicalAndExpr *> ordered{ OrderByCost( *this ) };
+
+	int next{ on_false };
+	for( auto it = ordered.rbegin(); it != ordered.rend(); ++it )
+		next = (*it)->Compile( program, on_true, next );
+
+	return next;
+}
+
+
+unsigned A_LogicalOrExpr::GetCost( void ) const
+{
+	unsigned cost{ 0 };
+	for( const A_LogicalAndExpr & expr : *this )
+		cost += expr.GetCost();
+
+	return cost;
+}
+
+
+
+/*-----------------------------------------------------------------------
+ * LVFProgram, definitions
+ -----------------------------------------------------------------------*/
+
+// select the typed variant of a Compare or Range operation
+LVFProgram::E_OpCode LVFProgram::MakeOpCode( E_OpCode unsigned_code, FieldValueType type )
+{
+	const bool is_compare{ unsigned_code == E_OpCode::CompareUnsigned };
+	switch( type )
+	{
+	case FieldValueType::unsigned64:
+		return is_compare ? E_OpCode::CompareUnsigned : E_OpCode::RangeUnsigned;
+
+	case FieldValueType::signed64:
+		return is_compare ? E_OpCode::CompareSigned : E_OpCode::RangeSigned;
+
+	case FieldValueType::float64:
+		return is_compare ? E_OpCode::CompareFloat : E_OpCode::RangeFloat;
+	}
+
+	throw std::runtime_error{ "Invalid LVF field type" };
+}
+
+
+LVFProgram::Constant LVFProgram::MakeConstant( const fieldvalue_t & value, FieldValueType type )
+{
+	Constant constant{};
+	switch( type )
+	{
+	case FieldValueType::unsigned64:
+		constant.f_Unsigned = value.As<uint64_t>();
+		break;
+
+	case FieldValueType::signed64:
+		constant.f_Signed = value.As<int64_t>();
+		break;
+
+	case FieldValueType::float64:
+		constant.f_Float = value.As<double>();
+		break;
+
+	default:
+		throw std::runtime_error{ "Invalid LVF field type" };
+	}
+
+	return constant;
+}
+
+
+// single values are recorded as ranges of one value
+void LVFProgram::AddRanges( const fieldvalue_list_t & values, const fieldrange_list_t & ranges, FieldValueType type )
+{
+	for( const fieldvalue_t & value : values )
+	{
+		const Constant constant{ MakeConstant( value, type ) };
+		m_Ranges.push_back( Range{ constant, constant } );
+	}
+
+	for( const fieldrange_t & range : ranges )
+		m_Ranges.push_back( Range{ MakeConstant( range.first, type ), MakeConstant( range.second, type ) } );
+}
+
+
+int LVFProgram::Emit( const Instruction & instruction )
+{
+	m_Instructions.push_back( instruction );
+	return static_cast<int>(m_Instructions.size() - 1);
+}
+
+
+int LVFProgram::EmitAdornment( E_Adornment adornment, int on_true, int on_false )
+{
+	const E_OpCode op_code{ adornment == E_Adornment::Bookmark ? E_OpCode::Bookmarked : E_OpCode::Annotated };
+	return Emit( Instruction{ op_code, on_true, on_false } );
+}
+
+
+int LVFProgram::EmitText( const A_TextValue & text_value, E_FieldIdentifier field_id, int on_true, int on_false )
+{
+	Instruction instruction{ E_OpCode::Text, on_true, on_false };
+	instruction.f_FieldId = static_cast<int>(field_id);
+	instruction.f_TextValue = &text_value;
+	return Emit( instruction );
+}
+
+
+int LVFProgram::EmitCompare( unsigned field_id, FieldValueType type, E_FieldCompareOp op, const fieldvalue_t & value, int on_true, int on_false )
+{
+	Instruction instruction{ MakeOpCode( E_OpCode::CompareUnsigned, type ), on_true, on_false };
+	instruction.f_FieldId = static_cast<int>(field_id);
+	instruction.f_CompareOp = op;
+	instruction.f_Value = MakeConstant( value, type );
+	return Emit( instruction );
+}
+
+
+int LVFProgram::EmitRange( const A_FieldMatchClause & clause, int on_true, int on_false )
+{
+	Instruction instruction{ MakeOpCode( E_OpCode::RangeUnsigned, clause.f_FieldType ), on_true, on_false };
+	instruction.f_FieldId = static_cast<int>(clause.f_FieldId);
+
+	instruction.f_First = static_cast<unsigned>(m_Ranges.size());
+	AddRanges( clause.f_ExcValues, clause.f_ExcRanges, clause.f_FieldType );
+	instruction.f_NumExcludes = static_cast<unsigned>(m_Ranges.size()) - instruction.f_First;
+
+	AddRanges( clause.f_IncValues, clause.f_IncRanges, clause.f_FieldType );
+	instruction.f_Last = static_cast<unsigned>(m_Ranges.size());
+	instruction.f_ImplicitInclude = clause.f_ImplicitIncludeMatch;
+
+	return Emit( instruction );
+}
+
+
+// the program was built back to front; reverse it, so that execution runs
+// forward through memory
+void LVFProgram::Finalise( int entry )
+{
+	const int last{ static_cast<int>(m_Instructions.size()) - 1 };
+	auto relocate = [last] ( int pc ) {
+		return (pc < 0) ? pc : last - pc;
+	};
+
+	std::reverse( m_Instructions.begin(), m_Instructions.end() );
+	for( Instruction & instruction : m_Instructions )
+	{
+		instruction.f_OnTrue = relocate( instruction.f_OnTrue );
+		instruction.f_OnFalse = relocate( instruction.f_OnFalse );
+	}
+
+	m_Entry = relocate( entry );
+}
+
+
+template<typename T_VALUE>
+bool LVFProgram::Compare( const Instruction & instruction, T_VALUE lhs )
+{
+	const T_VALUE rhs{ instruction.f_Value.Get<T_VALUE>() };
+
+	switch( instruction.f_CompareOp )
+	{
+	case E_FieldCompareOp::Eq:
+		return lhs == rhs;
+
+	case E_FieldCompareOp::Lt:
+		return lhs < rhs;
+
+	case E_FieldCompareOp::LtEq:
+		return lhs <= rhs;
+
+	case E_FieldCompareOp::Gt:
+		return lhs > rhs;
+
+	case E_FieldCompareOp::GtEq:
+		return lhs >= rhs;
+
+	case E_FieldCompareOp::Ne:
+		return lhs != rhs;
+	}
+
+	return false;
+}
+
+
+// see A_FieldMatchClause::Filter
+template<typename T_VALUE>
+bool LVFProgram::InRange( const Instruction & instruction, T_VALUE value ) const
+{
+	const Range * range{ m_Ranges.data() + instruction.f_First };
+
+	auto contains = [value] ( const Range * range ) {
+		return (range->f_Lower.Get<T_VALUE>() <= value) && (value <= range->f_Upper.Get<T_VALUE>());
+	};
+
+	const Range * excludes_last{ range + instruction.f_NumExcludes };
+	for( ; range != excludes_last; ++range )
+		if( contains( range ) )
+			return false;
+
+	if( instruction.f_ImplicitInclude )
+		return true;
+
+	const Range * includes_last{ m_Ranges.data() + instruction.f_Last };
+	for( ; range != includes_last; ++range )
+		if( contains( range ) )
+			return true;
+
+	return false;
+}
+
+
+bool LVFProgram::Execute( const Instruction & instruction, const FilterContext & context ) const
+{
+	switch( instruction.f_OpCode )
+	{
+	case E_OpCode::Annotated:
+		return context.f_Adornments.IsAnnotated();
+
+	case E_OpCode::Bookmarked:
+		return context.f_Adornments.IsBookMarked();
+
+	case E_OpCode::Text:
+		return instruction.f_TextValue->Filter( context.f_Line, context.f_Adornments, static_cast<E_FieldIdentifier>(instruction.f_FieldId) );
+
+	case E_OpCode::CompareUnsigned:
+		return Compare( instruction, GetFieldValue<uint64_t>( instruction, context ) );
+
+	case E_OpCode::CompareSigned:
+		return Compare( instruction, GetFieldValue<int64_t>( instruction, context ) );
+
+	case E_OpCode::CompareFloat:
+		return Compare( instruction, GetFieldValue<double>( instruction, context ) );
+
+	case E_OpCode::RangeUnsigned:
+		return InRange( instruction, GetFieldValue<uint64_t>( instruction, context ) );
+
+	case E_OpCode::RangeSigned:
+		return InRange( instruction, GetFieldValue<int64_t>( instruction, context ) );
+
+	case E_OpCode::RangeFloat:
+		return InRange( instruction, GetFieldValue<double>( instruction, context ) );
+	}
+
+	return false;
+}
+
+
+bool LVFProgram::Run( const FilterContext & context ) const
+{
+	const Instruction * instructions{ m_Instructions.data() };
+
+	int pc{ m_Entry };
+	while( pc >= 0 )
+	{
+		const Instruction & instruction{ instructions[ pc ] };
+		pc = Execute( instruction, context ) ? instruction.f_OnTrue : instruction.f_OnFalse;
+	}
+
+	return pc == c_Accept;
+}
+
+
+// the possible outcomes of the test for a zone of lines; see Compare and InRange
+template<typename T_VALUE>
+void LVFProgram::TestZone( const Instruction & instruction, T_VALUE min, T_VALUE max, bool * possibly_true, bool * surely_true ) const
+{
+	if( IsCompare( instruction.f_OpCode ) )
+	{
+		const T_VALUE rhs{ instruction.f_Value.Get<T_VALUE>() };
+		switch( instruction.f_CompareOp )
+		{
+		case E_FieldCompareOp::Eq:
+			*possibly_true = (min <= rhs) && (rhs <= max);
+			*surely_true = (min == rhs) && (max == rhs);
+			break;
+
+		case E_FieldCompareOp::Lt:
+			*possibly_true = min < rhs;
+			*surely_true = max < rhs;
+			break;
+
+		case E_FieldCompareOp::LtEq:
+			*possibly_true = min <= rhs;
+			*surely_true = max <= rhs;
+			break;
+
+		case E_FieldCompareOp::Gt:
+			*possibly_true = max > rhs;
+			*surely_true = min > rhs;
+			break;
+
+		case E_FieldCompareOp::GtEq:
+			*possibly_true = max >= rhs;
+			*surely_true = min >= rhs;
+			break;
+
+		case E_FieldCompareOp::Ne:
+			*possibly_true = !((min == rhs) && (max == rhs));
+			*surely_true = (rhs < min) || (max < rhs);
+			break;
+		}
+
+		return;
+	}
+
+	auto overlaps = [min, max] ( const Range & range ) {
+		return (range.f_Lower.Get<T_VALUE>() <= max) && (min <= range.f_Upper.Get<T_VALUE>());
+	};
+
+	auto contains = [min, max] ( const Range & range ) {
+		return (range.f_Lower.Get<T_VALUE>() <= min) && (max <= range.f_Upper.Get<T_VALUE>());
+	};
+
+	const Range * first{ m_Ranges.data() + instruction.f_First };
+	const Range * excludes_last{ first + instruction.f_NumExcludes };
+	const Range * last{ m_Ranges.data() + instruction.f_Last };
+
+	*possibly_true = std::none_of( first, excludes_last, contains );
+	*surely_true = std::none_of( first, excludes_last, overlaps );
+
+	if( !instruction.f_ImplicitInclude )
+	{
+		*possibly_true = *possibly_true && std::any_of( excludes_last, last, overlaps );
+		*surely_true = *surely_true && std::any_of( excludes_last, last, contains );
+	}
+}
+
+
+// the lines for which the test may pass, and may fail
+template<typename T_VALUE>
+void LVFProgram::FindLines( const Instruction & instruction, const FieldIndex & field_index, LineBitmap * on_true, LineBitmap * on_false ) const
+{
+	// enumerations; the test is exact, and is run once per enumeration value
+	const std::vector<std::vector<nlineno_t>> & postings{ field_index.f_Postings };
+	for( size_t value = 0; value < postings.size(); ++value )
+	{
+		LineBitmap * lines{ Test( instruction, static_cast<T_VALUE>(value) ) ? on_true : on_false };
+		for( nlineno_t line_no : postings[ value ] )
+			lines->Set( line_no );
+	}
+
+	// zone maps
+	const nlineno_t zone_size{ nlineno_t{ 1 } << FieldIndex::c_ZoneShift };
+	for( size_t zone_id = 0; zone_id < field_index.f_Zones.size(); ++zone_id )
+	{
+		const FieldIndex::Zone & zone{ field_index.f_Zones[ zone_id ] };
+		if( zone.f_Empty )
+			continue;
+
+		bool possibly_true{ true }, surely_true{ false };
+		if( !zone.f_Unordered )
+			TestZone( instruction, zone.f_Min.As<T_VALUE>(), zone.f_Max.As<T_VALUE>(), &possibly_true, &surely_true );
+
+		const nlineno_t first{ nlineno_cast( zone_id ) << FieldIndex::c_ZoneShift };
+		if( possibly_true )
+			on_true->SetRange( first, first + zone_size );
+		if( !surely_true )
+			on_false->SetRange( first, first + zone_size );
+	}
+}
+
+
+// run the program over sets of lines, rather than single lines; each instruction
+// passes the lines reaching it on to its successors, narrowed by what the field
+// indexes reveal about its test; the lines reaching c_Accept are then a superset
+// of the lines matched by the program
+bool LVFProgram::FindCandidates( const FieldIndexAccessor & index, nlineno_t num_lines, LineBitmap * candidates ) const
+{
+	if( (num_lines <= 0) || (m_Entry < 0) )
+		return false;
+
+	std::vector<const FieldIndex *> field_indexes( m_Instructions.size(), nullptr );
+	bool indexed{ false };
+	for( size_t pc = 0; pc < m_Instructions.size(); ++pc )
+	{
+		const Instruction & instruction{ m_Instructions[ pc ] };
+		if( !IsCompare( instruction.f_OpCode ) && !IsRange( instruction.f_OpCode ) )
+			continue;
+
+		const FieldIndex * field_index{ index.GetFieldIndex( instruction.f_FieldId ) };
+		if( field_index && (field_index->f_NumLines == num_lines) )
+		{
+			field_indexes[ pc ] = field_index;
+			indexed = true;
+		}
+	}
+
+	if( !indexed )
+		return false;
+
+	// lines reaching each instruction; successors always follow their
+	// instruction, so a single pass suffices
+	std::vector<LineBitmap> reach( m_Instructions.size() );
+	reach[ m_Entry ] = LineBitmap{ num_lines, true };
+	LineBitmap accept{ num_lines, false };
+
+	auto propagate = [&reach, &accept] ( int successor, const LineBitmap & lines ) {
+		if( successor == c_Accept )
+			accept |= lines;
+
+		else if( successor >= 0 )
+		{
+			LineBitmap & successor_lines{ reach[ successor ] };
+			if( successor_lines.GetNumLines() == 0 )
+				successor_lines = lines;
+			else
+				successor_lines |= lines;
+		}
+	};
+
+	for( size_t pc = m_Entry; pc < m_Instructions.size(); ++pc )
+	{
+		const LineBitmap lines{ std::move( reach[ pc ] ) };
+		if( lines.GetNumLines() == 0 )
+			continue;
+
+		const Instruction & instruction{ m_Instructions[ pc ] };
+		const FieldIndex * field_index{ field_indexes[ pc ] };
+		if( field_index == nullptr )
+		{
+			propagate( instruction.f_OnTrue, lines );
+			propagate( instruction.f_OnFalse, lines );
+			continue;
+		}
+
+		LineBitmap on_true{ num_lines, false }, on_false{ num_lines, false };
+		switch( instruction.f_OpCode )
+		{
+		case E_OpCode::CompareUnsigned:
+		case E_OpCode::RangeUnsigned:
+			FindLines<uint64_t>( instruction, *field_index, &on_true, &on_false );
+			break;
+
+		case E_OpCode::CompareSigned:
+		case E_OpCode::RangeSigned:
+			FindLines<int64_t>( instruction, *field_index, &on_true, &on_false );
+			break;
+
+		case E_OpCode::CompareFloat:
+		case E_OpCode::RangeFloat:
+			FindLines<double>( instruction, *field_index, &on_true, &on_false );
+			break;
+		}
+
+		on_true &= lines;
+		on_false &= lines;
+		propagate( instruction.f_OnTrue, on_true );
+		propagate( instruction.f_OnFalse, on_false );
+	}
+
+	*candidates = std::move( accept );
+	return true;
+}
+
+
+
 /*-----------------------------------------------------------------------
  * P_FieldNameGrammar
  -----------------------------------------------------------------------*/
@@ -1972,14 +2781,18 @@ class LVF
 {
 private:
 	A_LogicalOrExpr m_SyntaxTree;
+	LVFProgram m_Program;
 
 public:
 	LVF( const std::string & definition, const LogSchemaAccessor & log_schema );
 	bool Filter( const LineAccessor & line, const LineAdornmentsAccessor & adornments ) const;
+	bool FilterSyntaxTree( const LineAccessor & line, const LineAdornmentsAccessor & adornments ) const;
+	bool FindCandidates( const FieldIndexAccessor & index, nlineno_t num_lines, LineBitmap * candidates ) const;
 };
 
 
-// parse the query definition into an expression tree
+// parse the query definition into an expression tree, and compile the
+// tree into a filter program
 LVF::LVF( const std::string & definition, const LogSchemaAccessor & log_schema )
 {
 	ErrorHandlerContext error_context{ definition.begin() };
@@ -1999,17 +2812,35 @@ LVF::LVF( const std::string & definition, const LogSchemaAccessor & log_schema )
 
 	AnalyseContext context{ log_schema };
 	m_SyntaxTree.Analyse( context );
+
+	const int entry{ m_SyntaxTree.Compile( m_Program, LVFProgram::c_Accept, LVFProgram::c_Reject ) };
+	m_Program.Finalise( entry );
 }
 
 
 // determine whether the supplied text is matched by the query
 bool LVF::Filter( const LineAccessor & line, const LineAdornmentsAccessor & adornments ) const
+{
+	FilterContext context{ line, adornments };
+	return m_Program.Run( context );
+}
+
+
+// as Filter, but evaluated by walking the syntax tree; the reference
+// implementation for the filter program
+bool LVF::FilterSyntaxTree( const LineAccessor & line, const LineAdornmentsAccessor & adornments ) const
 {
 	FilterContext context{ line, adornments };
 	return m_SyntaxTree.Filter( context );
 }
 
 
+bool LVF::FindCandidates( const FieldIndexAccessor & index, nlineno_t num_lines, LineBitmap * candidates ) const
+{
+	return m_Program.FindCandidates( index, num_lines, candidates );
+}
+
+
 
 /*-----------------------------------------------------------------------
  * SelectorLogviewFilter
@@ -2027,3 +2858,15 @@ bool SelectorLogviewFilter::Hit( const LineAccessor & line, const LineAdornments
 {
 	return m_Parser->Filter( line, adornments );
 }
+
+
+bool SelectorLogviewFilter::FindCandidates( const FieldIndexAccessor & index, int num_lines, LineBitmap * candidates ) const
+{
+	return m_Parser->FindCandidates( index, num_lines, candidates );
+}
+
+
+bool SelectorLogviewFilter::HitSyntaxTree( const LineAccessor & line, const LineAdornmentsAccessor & adornments ) const
+{
+	return m_Parser->FilterSyntaxTree( line, adornments );
+}
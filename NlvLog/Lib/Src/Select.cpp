@@ -18,8 +18,11 @@
 
 // C++ includes
 #include <cctype>
+#include <mutex>
+#include <tuple>
 
 // Nlog includes
+#include "Cache.h"
 #include "LogAccessor.h"
 
 // Application includes
@@ -74,7 +77,7 @@ private:
 
 	// call visitor for each line part matched by the literal expression
 	template<typename T_PRED>
-	void Visit( const char *first, const char *last, Visitor & visitor, T_PRED p )
+	void Visit( const char *first, const char *last, Visitor & visitor, T_PRED p ) const
 	{
 		const std::string & m_Literal{ m_Match.m_Text };
 		const size_t lit_size{ m_Literal.size() };
@@ -91,7 +94,7 @@ public:
 		: Selector{ match } {}
 
 	bool Hit( const char *first, const char *last ) const override;
-	void Visit( const char *first, const char *last, Visitor & visitor ) override;
+	void Visit( const char *first, const char *last, Visitor & visitor ) const override;
 };
 
 
@@ -111,7 +114,7 @@ bool MatchLiteral::Hit( const char *first, const char *last ) const
 }
 
 
-void MatchLiteral::Visit( const char *first, const char *last, Visitor & visitor )
+void MatchLiteral::Visit( const char *first, const char *last, Visitor & visitor ) const
 {
 	if( m_Match.m_Case )
 		Visit( first, last, visitor, CompareCharCase );
@@ -135,7 +138,7 @@ private:
 public:
 	MatchRegularExpression( const Match & match );
 	bool Hit( const char *first, const char *last ) const override;
-	void Visit( const char *first, const char *last, Visitor & visitor ) override;
+	void Visit( const char *first, const char *last, Visitor & visitor ) const override;
 };
 
 
@@ -162,7 +165,7 @@ bool MatchRegularExpression::Hit( const char *first, const char *last ) const
 
 
 // call visitor for each line part matched by the regular expression
-void MatchRegularExpression::Visit( const char *first, const char *last, Visitor & visitor )
+void MatchRegularExpression::Visit( const char *first, const char *last, Visitor & visitor ) const
 {
 	std::cmatch match;
 	const char *at{ first };
@@ -203,28 +206,111 @@ public:
 
 
 /*-----------------------------------------------------------------------
- * Selector
+ * SelectorCache
  -----------------------------------------------------------------------*/
 
-selector_ptr_t Selector::MakeSelector( const Match & match, bool empty_selects_all, const LogSchemaAccessor * schema )
+namespace
 {
-	try {
-		if( match.m_Text.empty() )
-			return std::make_unique<SelectUnconditional>( match, empty_selects_all );
-
-		switch( match.m_Type )
+	// process wide cache of compiled selectors; re-applying a filter, hiliter or
+	// marker, or switching between views, re-uses the parsed and compiled match
+	class SelectorCache
+	{
+	private:
+		struct Key
 		{
-		case Match::e_Literal:
-			return std::make_unique<MatchLiteral>( match );
+			Match::Type f_Type;
+			std::string f_Text;
+			bool f_Case;
+			bool f_HasDataPartition;
+			int f_DataPartition;
+			bool f_EmptySelectsAll;
+
+			// only logview filters depend on the schema; zero otherwise
+			uint64_t f_SchemaId;
+
+			bool operator < ( const Key & rhs ) const {
+				return std::tie( f_Type, f_Text, f_Case, f_HasDataPartition, f_DataPartition, f_EmptySelectsAll, f_SchemaId )
+					< std::tie( rhs.f_Type, rhs.f_Text, rhs.f_Case, rhs.f_HasDataPartition, rhs.f_DataPartition, rhs.f_EmptySelectsAll, rhs.f_SchemaId );
+			}
+		};
+
+		static const size_t c_CacheSize{ 64 };
+		static CacheStatistics s_Stats;
+
+		// a logview filter's construction makes selectors for its text matches,
+		// so the cache is re-entered on the same thread
+		std::recursive_mutex m_Mutex;
+		Cache<selector_ptr_t, Key> m_Cache{ s_Stats, c_CacheSize };
+
+	public:
+		template<typename T_CREATE>
+		selector_ptr_t Fetch( const Match & match, bool empty_selects_all, const LogSchemaAccessor * schema, T_CREATE create );
+
+		// drop the selectors compiled against a schema
+		void ForgetSchema( uint64_t schema_id );
+	};
 
-		case Match::e_RegularExpression:
-			return std::make_unique<MatchRegularExpression>( match );
 
-		case Match::e_LogviewFilter:
-			if( schema == nullptr )
-				throw std::runtime_error( "Nlog: Logfile schema missing" );
-			return std::make_unique<SelectorLogviewFilter>( match, *schema );
-		}
+	CacheStatistics SelectorCache::s_Stats{ "SelectorCache" };
+
+
+	template<typename T_CREATE>
+	selector_ptr_t SelectorCache::Fetch( const Match & match, bool empty_selects_all, const LogSchemaAccessor * schema, T_CREATE create )
+	{
+		const bool uses_schema{ (match.m_Type == Match::e_LogviewFilter) && (schema != nullptr) };
+		const Key key{
+			match.m_Type,
+			match.m_Text,
+			match.m_Case,
+			match.m_HasDataPartition,
+			match.m_DataPartition,
+			empty_selects_all,
+			uses_schema ? schema->m_SchemaId : 0
+		};
+
+		std::lock_guard<std::recursive_mutex> lock{ m_Mutex };
+		selector_ptr_t selector{ *m_Cache.Fetch( key, [&create] ( const Key & ) {
+			return create();
+		} ).second };
+
+		// don't retain failures; creation errors throw, so are never cached,
+		// and are reported (by MakeSelector) on each attempt
+		if( !selector )
+			m_Cache.Erase( key );
+
+		return selector;
+	}
+
+
+	void SelectorCache::ForgetSchema( uint64_t schema_id )
+	{
+		std::lock_guard<std::recursive_mutex> lock{ m_Mutex };
+		m_Cache.EraseIf( [schema_id] ( const Key & key ) {
+			return key.f_SchemaId == schema_id;
+		} );
+	}
+
+
+	// never destroyed; schemas may be released after static destruction
+	SelectorCache & GetSelectorCache( void )
+	{
+		static SelectorCache * s_SelectorCache{ new SelectorCache };
+		return *s_SelectorCache;
+	}
+}
+
+
+
+/*-----------------------------------------------------------------------
+ * Selector
+ -----------------------------------------------------------------------*/
+
+selector_ptr_t Selector::MakeSelector( const Match & match, bool empty_selects_all, const LogSchemaAccessor * schema )
+{
+	try {
+		return GetSelectorCache().Fetch( match, empty_selects_all, schema, [&] () {
+			return CreateSelector( match, empty_selects_all, schema );
+		} );
 	}
 	catch( const std::exception & ex )
 	{
@@ -233,3 +319,32 @@ selector_ptr_t Selector::MakeSelector( const Match & match, bool empty_selects_a
 
 	return nullptr;
 }
+
+
+void Selector::ForgetSchema( uint64_t schema_id )
+{
+	GetSelectorCache().ForgetSchema( schema_id );
+}
+
+
+selector_ptr_t Selector::CreateSelector( const Match & match, bool empty_selects_all, const LogSchemaAccessor * schema )
+{
+	if( match.m_Text.empty() )
+		return std::make_unique<SelectUnconditional>( match, empty_selects_all );
+
+	switch( match.m_Type )
+	{
+	case Match::e_Literal:
+		return std::make_unique<MatchLiteral>( match );
+
+	case Match::e_RegularExpression:
+		return std::make_unique<MatchRegularExpression>( match );
+
+	case Match::e_LogviewFilter:
+		if( schema == nullptr )
+			throw std::runtime_error( "Nlog: Logfile schema missing" );
+		return std::make_unique<SelectorLogviewFilter>( match, *schema );
+	}
+
+	return nullptr;
+}
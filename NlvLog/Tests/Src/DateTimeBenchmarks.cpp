@@ -0,0 +1,218 @@
+//
+// Copyright (C) 2023 Niel Clausen. All rights reserved.
+//
+// This program is free software: you can redistribute it and/or modify
+// it under the terms of the GNU General Public License as published by
+// the Free Software Foundation, either version 3 of the License, or
+// (at your option) any later version.
+//
+// This program is distributed in the hope that it will be useful,
+// but WITHOUT ANY WARRANTY; without even the implied warranty of
+// MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+// GNU General Public License for more details.
+//
+// You should have received a copy of the GNU General Public License
+// along with this program. If not, see <https://www.gnu.org/licenses/>.
+//
+#include "gtest/gtest.h"
+
+#include "LogAccessor.h"
+#include "Nmisc.h"
+#include "Ntime.h"
+#include "Ntrace.h"
+
+// C++ includes
+#include <chrono>
+#include <ctime>
+#include <filesystem>
+#include <fstream>
+#include <iostream>
+#include <string>
+
+// keep tests in a private namespace
+namespace {
+
+
+
+/*-----------------------------------------------------------------------
+ * U_DateTimeLog
+ -----------------------------------------------------------------------*/
+
+// formats the timestamp for a line; given the line's UTC and millisecond
+using formatter_t = std::string (*)( const tm & tm, unsigned ms );
+
+// a temporary logfile, holding a single date/time field followed by text
+struct U_DateTimeLog
+{
+	static constexpr int c_NumLines{ 200'000 };
+
+	// 2018-03-01 00:00:00 UTC
+	static constexpr time_t c_BaseUtc{ 1'519'862'400 };
+
+	std::filesystem::path m_Dir;
+	std::filesystem::path m_Path;
+
+	// line timestamps are either in sequence (four lines per second), or
+	// scattered (each line on a different day and hour, defeating any re-use
+	// of the previous line's date)
+	U_DateTimeLog( const std::string & name, formatter_t formatter, bool sequential )
+	{
+		m_Dir = std::filesystem::temp_directory_path() / "NlogBenchmarks";
+		std::filesystem::create_directories( m_Dir );
+		m_Path = m_Dir / (name + (sequential ? "-seq.log" : "-scat.log"));
+
+		std::ofstream strm{ m_Path, std::ios::binary };
+		for( int i = 0; i < c_NumLines; ++i )
+		{
+			const time_t utc{ c_BaseUtc + (sequential ? (i / 4) : ((i % 28) * 86400 + (i % 24) * 3600 + (i % 60))) };
+			tm tm; gmtime_s( &tm, &utc );
+
+			const unsigned ms{ sequential ? static_cast<unsigned>( (i % 4) * 250 ) : 0u };
+			strm << formatter( tm, ms ) << "|message text for line " << i << "\n";
+		}
+	}
+
+	~U_DateTimeLog( void ) {
+		std::error_code ec;
+		std::filesystem::remove_all( m_Dir, ec );
+	}
+
+	static std::string Format( const char * fmt, const tm & tm ) {
+		char buf[ 64 ];
+		strftime( buf, sizeof( buf ), fmt, &tm );
+		return buf;
+	}
+
+	static std::string Millis( unsigned ms ) {
+		char buf[ 8 ];
+		snprintf( buf, sizeof( buf ), ".%03u", ms );
+		return buf;
+	}
+};
+
+
+
+/*-----------------------------------------------------------------------
+ * DateTimeBenchmark
+ -----------------------------------------------------------------------*/
+
+struct DateTimeBenchmark : public ::testing::Test
+{
+	static void SetUpTestCase( void ) {
+		OnEvent::RunEvents( OnEvent::EventType::Startup );
+	}
+
+	static void TearDownTestCase( void ) {
+		OnEvent::RunEvents( OnEvent::EventType::Shutdown );
+	}
+
+	// index the logfile; returns the achieved line rate (lines/sec)
+	static double Index( const U_DateTimeLog & log, const std::string & type, bool check, bool fractional ) {
+		LogAccessorDescriptor descriptor;
+		descriptor.m_Name = "map";
+		descriptor.m_Guid = "{7D1DE6A6-2B4F-4C57-9A2C-0F2D6AF0B541}";
+		descriptor.m_TextOffsetsSize = 8;
+		descriptor.m_FieldDescriptors.push_back( FieldDescriptor{ true, "timestamp", type, "|", 1, 0, false, false, 0 } );
+
+		logaccessor_ptr_t accessor{ LogAccessorFactory::Create( descriptor ) };
+
+		const auto start{ std::chrono::steady_clock::now() };
+		const Error error{ accessor->Open( log.m_Path, nullptr ) };
+		const std::chrono::duration<double> elapsed{ std::chrono::steady_clock::now() - start };
+
+		EXPECT_TRUE( Ok( error ) );
+
+		// spot check the converted timecodes; lines are four to the second
+		constexpr int64_t ns_per_line{ NTimecode::c_NanoSecond / 4 };
+		if( check )
+		{
+			viewaccessor_ptr_t view{ accessor->CreateViewAccessor() };
+			const ViewTimecode * timecode{ view->GetTimecode() };
+			EXPECT_NE( nullptr, timecode );
+
+			if( timecode != nullptr )
+			{
+				const NTimecode first{ timecode->GetUtcTimecode( 0 ) };
+				for( int64_t line_no : { 1, 4, 1'000, 14'403, U_DateTimeLog::c_NumLines - 1 } )
+				{
+					const int64_t expect{ fractional ? (line_no * ns_per_line) : ((line_no / 4) * NTimecode::c_NanoSecond) };
+					EXPECT_EQ( expect, timecode->GetUtcTimecode( static_cast<int>( line_no ) ) - first );
+				}
+			}
+		}
+
+		return U_DateTimeLog::c_NumLines / elapsed.count();
+	}
+
+	// compare the sequential (date re-used) and scattered (fully parsed) index rates
+	static void Run( const std::string & type, formatter_t formatter, bool fractional = true ) {
+		const U_DateTimeLog sequential{ type, formatter, true };
+		const U_DateTimeLog scattered{ type, formatter, false };
+
+		const double seq_rate{ Index( sequential, type, true, fractional ) };
+		const double scat_rate{ Index( scattered, type, false, fractional ) };
+
+		std::cout << "[   BENCH  ] " << type
+			<< ": sequential " << seq_rate / 1e6 << " Mlines/s"
+			<< ", scattered " << scat_rate / 1e6 << " Mlines/s"
+			<< ", speedup x" << seq_rate / scat_rate << "\n";
+	}
+};
+
+
+TEST_F( DateTimeBenchmark, Unix )
+{
+	// whole seconds only
+	Run( "datetime_unix", []( const tm & tm, unsigned ) {
+		return U_DateTimeLog::Format( "%b %e %H:%M:%S", tm );
+	}, false );
+}
+
+
+TEST_F( DateTimeBenchmark, UsStd )
+{
+	Run( "datetime_us_std", []( const tm & tm, unsigned ms ) {
+		const int hour{ (tm.tm_hour % 12) == 0 ? 12 : (tm.tm_hour % 12) };
+		char buf[ 64 ];
+		snprintf( buf, sizeof( buf ), "%d/%d/%d %d:%02d:%02d.%03u %s",
+			tm.tm_mon + 1, tm.tm_mday, tm.tm_year + 1900, hour, tm.tm_min, tm.tm_sec, ms,
+			(tm.tm_hour < 12) ? "AM" : "PM" );
+		return std::string{ buf };
+	} );
+}
+
+
+TEST_F( DateTimeBenchmark, TraceFmtIntStd )
+{
+	Run( "datetime_tracefmt_int_std", []( const tm & tm, unsigned ms ) {
+		return U_DateTimeLog::Format( "%d/%m/%Y-%H:%M:%S", tm ) + U_DateTimeLog::Millis( ms );
+	} );
+}
+
+
+TEST_F( DateTimeBenchmark, TraceFmtUsHires )
+{
+	Run( "datetime_tracefmt_us_hires", []( const tm & tm, unsigned ms ) {
+		return U_DateTimeLog::Format( "%m/%d/%Y-%H:%M:%S", tm ) + U_DateTimeLog::Millis( ms ) + ".000000";
+	} );
+}
+
+
+TEST_F( DateTimeBenchmark, WebUTC )
+{
+	Run( "datetime_web_utc", []( const tm & tm, unsigned ms ) {
+		return U_DateTimeLog::Format( "%Y-%m-%dT%H:%M:%S", tm ) + U_DateTimeLog::Millis( ms ) + "Z";
+	} );
+}
+
+
+TEST_F( DateTimeBenchmark, TimeTraceFmt )
+{
+	Run( "datetime_tracefmt_no_date", []( const tm & tm, unsigned ms ) {
+		return U_DateTimeLog::Format( "%H:%M:%S", tm ) + U_DateTimeLog::Millis( ms );
+	} );
+}
+
+
+
+}	// namespace
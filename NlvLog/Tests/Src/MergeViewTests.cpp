@@ -0,0 +1,438 @@
+//
+// Copyright (C) 2023 Niel Clausen. All rights reserved.
+//
+// This program is free software: you can redistribute it and/or modify
+// it under the terms of the GNU General Public License as published by
+// the Free Software Foundation, either version 3 of the License, or
+// (at your option) any later version.
+//
+// This program is distributed in the hope that it will be useful,
+// but WITHOUT ANY WARRANTY; without even the implied warranty of
+// MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+// GNU General Public License for more details.
+//
+// You should have received a copy of the GNU General Public License
+// along with this program. If not, see <https://www.gnu.org/licenses/>.
+//
+#include "gtest/gtest.h"
+
+#include "LogAccessor.h"
+#include "Match.h"
+
+// keep tests in a private namespace
+namespace {
+
+
+
+/*-----------------------------------------------------------------------
+ * U_View
+ -----------------------------------------------------------------------*/
+
+// a fake view; each line has a timecode offset (or -1 for a continuation
+// line), and a fixed line length
+struct U_View
+	:
+	public ViewProperties,
+	public ViewMap,
+	public ViewLineTranslation,
+	public ViewTimecode,
+	public ViewAccessor
+{
+	std::vector<int64_t> f_Offsets;
+
+	// log line number of the view's first line
+	const nlineno_t f_LogBase;
+
+	// lines reported by Search
+	std::vector<nlineno_t> f_Found;
+
+	// the selector last used to filter or search the view
+	selector_ptr_t f_Selector;
+
+	U_View( std::vector<int64_t> offsets, nlineno_t line_length, nlineno_t log_base = 0 )
+		: f_Offsets{ std::move( offsets ) }, f_LogBase{ log_base }
+	{
+		for( size_t line_no = 0; line_no <= f_Offsets.size(); ++line_no )
+			m_Lines.push_back( static_cast<nlineno_t>( line_no ) * line_length );
+
+		m_TextLen = m_Lines.back();
+		m_IsEmpty = f_Offsets.empty();
+		m_NumLinesOrOne = m_IsEmpty ? 1 : static_cast<nlineno_t>( f_Offsets.size() );
+	}
+
+	void SetFieldMask( uint64_t ) override {}
+
+	nlineno_t GetLineLength( nlineno_t line_no ) const override {
+		return m_Lines[ line_no + 1 ] - m_Lines[ line_no ];
+	}
+
+	const LineBuffer & GetLine( e_LineData, nlineno_t ) const override {
+		throw std::runtime_error{ "not implemented" };
+	}
+
+	nlineno_t LogLineToViewLine( nlineno_t log_line_no, bool ) const override {
+		return log_line_no - f_LogBase;
+	}
+
+	nlineno_t ViewLineToLogLine( nlineno_t view_line_no ) const override {
+		return view_line_no + f_LogBase;
+	}
+
+	bool HasTimeCode( int line_no ) const override {
+		return f_Offsets[ line_no ] >= 0;
+	}
+
+	NTimecode GetUtcTimecode( int line_no ) const override {
+		return NTimecode{ 1, f_Offsets[ line_no ] };
+	}
+
+	int GetNearestUtcLine( const NTimecode & ) const override {
+		return -1;
+	}
+
+	void VisitLine( Task &, nlineno_t ) const override {}
+
+	nlineno_t GetNumLines( void ) const override {
+		return static_cast<nlineno_t>( f_Offsets.size() );
+	}
+
+	void Filter( selector_ptr_a selector, LineAdornmentsProvider *, bool ) override {
+		f_Selector = selector;
+	}
+
+	std::vector<nlineno_t> Search( selector_ptr_a selector, LineAdornmentsProvider * ) override {
+		f_Selector = selector;
+		return f_Found;
+	}
+
+	ViewProperties * GetProperties( void ) override {
+		return this;
+	}
+
+	const ViewMap * GetMap( void ) override {
+		return this;
+	}
+
+	const ViewLineTranslation * GetLineTranslation( void ) override {
+		return this;
+	}
+
+	const ViewTimecode * GetTimecode( void ) override {
+		return this;
+	}
+};
+
+
+
+/*-----------------------------------------------------------------------
+ * U_Schema
+ -----------------------------------------------------------------------*/
+
+// a schema with a single enumeration field; each logfile has its own
+// enumeration values
+struct U_Schema : public LogSchemaAccessor
+{
+	FieldDescriptor m_FieldDescriptor{ true, "level" };
+	std::vector<std::string> m_EnumValues;
+	NTimecodeBase m_TimecodeBase{ 1 };
+
+	U_Schema( std::initializer_list<std::string> enum_values )
+		: m_EnumValues{ enum_values } {}
+
+	size_t GetNumFields( void ) const override {
+		return 1;
+	}
+
+	const FieldDescriptor & GetFieldDescriptor( unsigned ) const override {
+		return m_FieldDescriptor;
+	}
+
+	FieldValueType GetFieldType( unsigned ) const override {
+		return FieldValueType::unsigned64;
+	}
+
+	uint16_t GetFieldEnumCount( unsigned ) const override {
+		return static_cast<uint16_t>( m_EnumValues.size() );
+	}
+
+	const char * GetFieldEnumName( unsigned, uint16_t enum_id ) const override {
+		return m_EnumValues[ enum_id ].c_str();
+	}
+
+	const NTimecodeBase & GetTimecodeBase( void ) const override {
+		return m_TimecodeBase;
+	}
+};
+
+
+
+/*-----------------------------------------------------------------------
+ * U_Line
+ -----------------------------------------------------------------------*/
+
+// a line with a single enumeration field value
+struct U_Line : public LineAccessor, public LineAdornmentsProvider
+{
+	const uint64_t m_EnumId;
+
+	U_Line( uint64_t enum_id )
+		: m_EnumId{ enum_id } {}
+
+	nlineno_t GetLineNo( void ) const override {
+		return 0;
+	}
+
+	nlineno_t GetLength( void ) const override {
+		return 0;
+	}
+
+	void GetText( const char ** first, const char ** last ) const override {
+		*first = *last = "";
+	}
+
+	bool IsRegular( void ) const override {
+		return true;
+	}
+
+	nlineno_t NextIrregularLineLength( void ) const override {
+		return -1;
+	}
+
+	void GetNonFieldText( const char ** first, const char ** last ) const override {
+		*first = *last = "";
+	}
+
+	void GetFieldText( unsigned, const char ** first, const char ** last ) const override {
+		*first = *last = "";
+	}
+
+	fieldvalue_t GetFieldValue( unsigned ) const override {
+		return m_EnumId;
+	}
+
+	bool IsBookMarked( int ) const override {
+		return false;
+	}
+
+	bool IsAnnotated( int ) const override {
+		return false;
+	}
+
+	void GetAnnotationText( int, const char ** first, const char ** last ) const override {
+		*first = *last = "";
+	}
+};
+
+
+
+/*-----------------------------------------------------------------------
+ * MergeViewTest
+ -----------------------------------------------------------------------*/
+
+struct MergeViewTest : public ::testing::Test
+{
+	std::shared_ptr<U_View> m_Primary;
+	std::shared_ptr<U_View> m_Secondary;
+	viewaccessor_ptr_t m_Merged;
+
+	void SetUp( void ) override {
+		// the primary has an untimed preamble and a continuation line, the
+		// secondary has a timecode tie with the primary
+		m_Primary = std::make_shared<U_View>( std::initializer_list<int64_t>{ -1, 10, -1, 30, 50 }, 10 );
+		m_Secondary = std::make_shared<U_View>( std::initializer_list<int64_t>{ 5, 30, 40, -1 }, 20, 100 );
+		m_Merged = MakeMergeViewAccessor( { MergeViewSource{ m_Primary }, MergeViewSource{ m_Secondary } } );
+	}
+
+	unsigned Source( nlineno_t line_no ) {
+		return m_Merged->GetProvenance()->GetSource( line_no );
+	}
+
+	nlineno_t LogLine( nlineno_t line_no ) {
+		return m_Merged->GetLineTranslation()->ViewLineToLogLine( line_no );
+	}
+
+	static bool Hit( selector_ptr_a selector, uint64_t enum_id ) {
+		U_Line line{ enum_id };
+		return selector->Hit( line, LineAdornmentsAccessor{ &line, 0 } );
+	}
+};
+
+
+TEST_F( MergeViewTest, Order )
+{
+	ASSERT_EQ( 9, m_Merged->GetNumLines() );
+
+	// ( source, log line ) for each merged line
+	const std::vector<std::pair<unsigned, nlineno_t>> expect{
+		{ 0, 0 },		// untimed preamble
+		{ 1, 100 },		// 5
+		{ 0, 1 },		// 10
+		{ 0, 2 },		// continuation
+		{ 0, 3 },		// 30; ties go to the primary
+		{ 1, 101 },		// 30
+		{ 1, 102 },		// 40
+		{ 1, 103 },		// continuation
+		{ 0, 4 }		// 50
+	};
+
+	for( nlineno_t line_no = 0; line_no < m_Merged->GetNumLines(); ++line_no )
+	{
+		EXPECT_EQ( expect[ line_no ].first, Source( line_no ) );
+		EXPECT_EQ( expect[ line_no ].second, LogLine( line_no ) );
+	}
+}
+
+
+TEST_F( MergeViewTest, Layout )
+{
+	const ViewMap * map{ m_Merged->GetMap() };
+	ASSERT_EQ( 10u, map->m_Lines.size() );
+
+	EXPECT_EQ( 0, map->m_Lines[ 0 ] );
+	EXPECT_EQ( 10, map->m_Lines[ 1 ] );
+	EXPECT_EQ( 30, map->m_Lines[ 2 ] );
+	EXPECT_EQ( 5 * 10 + 4 * 20, map->m_TextLen );
+	EXPECT_EQ( 20, map->GetLineLength( 1 ) );
+	EXPECT_FALSE( map->m_IsEmpty );
+}
+
+
+TEST_F( MergeViewTest, Translation )
+{
+	const ViewLineTranslation * translation{ m_Merged->GetLineTranslation() };
+
+	// log lines refer to the primary logfile
+	EXPECT_EQ( 0, translation->LogLineToViewLine( 0 ) );
+	EXPECT_EQ( 4, translation->LogLineToViewLine( 3 ) );
+	EXPECT_EQ( 8, translation->LogLineToViewLine( 4 ) );
+	EXPECT_EQ( -1, translation->LogLineToViewLine( 99, true ) );
+
+	EXPECT_TRUE( ViewProvenance::IsPrimary( m_Merged->GetProvenance(), 4 ) );
+	EXPECT_FALSE( ViewProvenance::IsPrimary( m_Merged->GetProvenance(), 5 ) );
+	EXPECT_TRUE( ViewProvenance::IsPrimary( nullptr, 5 ) );
+}
+
+
+TEST_F( MergeViewTest, Search )
+{
+	m_Primary->f_Found = { 1, 4 };
+	m_Secondary->f_Found = { 0, 2 };
+
+	const std::vector<nlineno_t> expect{ 1, 2, 6, 8 };
+	EXPECT_EQ( expect, m_Merged->Search( selector_ptr_a{}, nullptr ) );
+}
+
+
+TEST_F( MergeViewTest, EnumFilter )
+{
+	// the logfiles number the same enumeration values differently; each source
+	// is filtered with a selector compiled against its own schema
+	U_Schema primary_schema{ "__INVALID__", "e_Info", "e_Error" };
+	U_Schema secondary_schema{ "__INVALID__", "e_Error", "e_Info" };
+	viewaccessor_ptr_t merged{ MakeMergeViewAccessor( {
+		MergeViewSource{ m_Primary, nullptr, &primary_schema },
+		MergeViewSource{ m_Secondary, nullptr, &secondary_schema }
+	} ) };
+
+	const Match match{ Match::e_LogviewFilter, R"__(level in ["e_Error"])__", true };
+	merged->Filter( Selector::MakeSelector( match, true, &primary_schema ), nullptr, false );
+
+	ASSERT_TRUE( m_Primary->f_Selector && m_Secondary->f_Selector );
+	EXPECT_TRUE( Hit( m_Primary->f_Selector, 2 ) );
+	EXPECT_FALSE( Hit( m_Primary->f_Selector, 1 ) );
+	EXPECT_TRUE( Hit( m_Secondary->f_Selector, 1 ) );
+	EXPECT_FALSE( Hit( m_Secondary->f_Selector, 2 ) );
+}
+
+
+TEST_F( MergeViewTest, EnumMissing )
+{
+	// a filter which is invalid for a source selects none of its lines
+	U_Schema primary_schema{ "__INVALID__", "e_Info", "e_Error" };
+	U_Schema secondary_schema{ "__INVALID__", "e_Info" };
+	viewaccessor_ptr_t merged{ MakeMergeViewAccessor( {
+		MergeViewSource{ m_Primary, nullptr, &primary_schema },
+		MergeViewSource{ m_Secondary, nullptr, &secondary_schema }
+	} ) };
+
+	const Match match{ Match::e_LogviewFilter, R"__(level in ["e_Error"])__", true };
+	merged->Filter( Selector::MakeSelector( match, true, &primary_schema ), nullptr, false );
+
+	ASSERT_TRUE( m_Primary->f_Selector && m_Secondary->f_Selector );
+	EXPECT_TRUE( Hit( m_Primary->f_Selector, 2 ) );
+	EXPECT_FALSE( Hit( m_Secondary->f_Selector, 1 ) );
+
+	// and is skipped when searching
+	m_Primary->f_Found = { 1 };
+	m_Secondary->f_Found = { 0 };
+	m_Secondary->f_Selector.reset();
+	EXPECT_EQ( std::vector<nlineno_t>{ 2 }, merged->Search( Selector::MakeSelector( match, false, &primary_schema ), nullptr ) );
+	EXPECT_FALSE( m_Secondary->f_Selector );
+}
+
+
+TEST_F( MergeViewTest, Nearest )
+{
+	const ViewTimecode * timecode{ m_Merged->GetTimecode() };
+
+	EXPECT_EQ( 1, timecode->GetNearestUtcLine( NTimecode{ 1, 0 } ) );
+	EXPECT_EQ( 2, timecode->GetNearestUtcLine( NTimecode{ 1, 9 } ) );
+	EXPECT_EQ( 4, timecode->GetNearestUtcLine( NTimecode{ 1, 30 } ) );
+	EXPECT_EQ( 6, timecode->GetNearestUtcLine( NTimecode{ 1, 41 } ) );
+	EXPECT_EQ( 8, timecode->GetNearestUtcLine( NTimecode{ 1, 100 } ) );
+}
+
+
+TEST_F( MergeViewTest, Lazy )
+{
+	// two interleaved sources, each longer than the merge's prefetch band
+	const nlineno_t num_lines{ 200000 };
+	std::vector<int64_t> even, odd;
+	for( nlineno_t line_no = 0; line_no < num_lines; ++line_no )
+	{
+		even.push_back( 2 * line_no );
+		odd.push_back( 2 * line_no + 1 );
+	}
+
+	viewaccessor_ptr_t merged{ MakeMergeViewAccessor( {
+		MergeViewSource{ std::make_shared<U_View>( even, 10 ) },
+		MergeViewSource{ std::make_shared<U_View>( odd, 20 ) }
+	} ) };
+	const ViewMap * map{ merged->GetMap() };
+
+	// the view's metrics are known, but only a prefix of its lines is merged
+	EXPECT_EQ( 2 * num_lines, merged->GetNumLines() );
+	EXPECT_EQ( num_lines * 30, map->m_TextLen );
+	EXPECT_FALSE( map->IsComplete() );
+	EXPECT_LT( map->m_Lines.size(), static_cast<size_t>( num_lines ) );
+
+	// requesting a later line extends the merge
+	map->ExtendToLine( num_lines );
+	ASSERT_GT( map->m_Lines.size(), static_cast<size_t>( num_lines + 1 ) );
+	EXPECT_EQ( (num_lines / 2) * 30, map->m_Lines[ num_lines ] );
+	EXPECT_EQ( 1u, merged->GetProvenance()->GetSource( num_lines + 1 ) );
+	EXPECT_FALSE( map->IsComplete() );
+
+	// as does a position lookup
+	ViewMapIndex index;
+	EXPECT_EQ( 2 * num_lines - 1, index.PositionToLine( *map, merged->GetProperties()->GetTracker(), map->m_TextLen - 1 ) );
+	EXPECT_TRUE( map->IsComplete() );
+	EXPECT_EQ( static_cast<size_t>( 2 * num_lines + 1 ), map->m_Lines.size() );
+	EXPECT_EQ( map->m_TextLen, map->m_Lines.back() );
+}
+
+
+TEST_F( MergeViewTest, Empty )
+{
+	viewaccessor_ptr_t merged{ MakeMergeViewAccessor( {
+		MergeViewSource{ std::make_shared<U_View>( std::initializer_list<int64_t>{}, 10 ) }
+	} ) };
+
+	EXPECT_EQ( 0, merged->GetNumLines() );
+	EXPECT_TRUE( merged->GetMap()->m_IsEmpty );
+	EXPECT_EQ( 1, merged->GetMap()->m_NumLinesOrOne );
+}
+
+
+
+}	// namespace
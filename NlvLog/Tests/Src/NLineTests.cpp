@@ -0,0 +1,90 @@
+//
+// Copyright (C) 2023 Niel Clausen. All rights reserved.
+//
+// This program is free software: you can redistribute it and/or modify
+// it under the terms of the GNU General Public License as published by
+// the Free Software Foundation, either version 3 of the License, or
+// (at your option) any later version.
+//
+// This program is distributed in the hope that it will be useful,
+// but WITHOUT ANY WARRANTY; without even the implied warranty of
+// MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+// GNU General Public License for more details.
+//
+// You should have received a copy of the GNU General Public License
+// along with this program. If not, see <https://www.gnu.org/licenses/>.
+//
+#include "gtest/gtest.h"
+
+#include "LogAccessor.h"
+#include "Nline.h"
+
+// keep tests in a private namespace
+namespace {
+
+
+
+/*-----------------------------------------------------------------------
+ * NLineTest
+ -----------------------------------------------------------------------*/
+
+struct NLineTest : public ::testing::Test
+{
+	// brute force equivalent of GetNextLine
+	static int Expect( const std::vector<int> & lines, int line_no, bool forward ) {
+		int ret{ -1 };
+		for( int line : lines )
+		{
+			if( forward && (line > line_no) )
+				return line;
+			else if( !forward && (line < line_no) )
+				ret = line;
+		}
+
+		return ret;
+	}
+
+	// compare the set, map and vector variants against the brute force result
+	static void Check( const std::vector<int> & lines ) {
+		const std::set<int> set{ lines.begin(), lines.end() };
+
+		std::map<int, int> map;
+		for( int line : lines )
+			map[ line ] = 0;
+
+		for( bool forward : { true, false } )
+			for( int line_no = -2; line_no < 40; ++line_no )
+			{
+				const int expect{ Expect( lines, line_no, forward ) };
+				EXPECT_EQ( expect, NLine::GetNextLine( set, line_no, forward ) );
+				EXPECT_EQ( expect, NLine::GetNextLine( map, line_no, forward ) );
+
+				if( !lines.empty() )
+					EXPECT_EQ( expect, NLine::GetNextLine( lines, line_no, forward ) );
+			}
+	}
+};
+
+
+TEST_F( NLineTest, Empty )
+{
+	Check( {} );
+}
+
+
+TEST_F( NLineTest, Single )
+{
+	Check( { 0 } );
+	Check( { 17 } );
+}
+
+
+TEST_F( NLineTest, Many )
+{
+	Check( { 0, 1, 2, 10, 11, 20, 30, 38 } );
+	Check( { 3, 5, 7, 9, 11, 13 } );
+}
+
+
+
+}	// namespace
@@ -0,0 +1,516 @@
+//
+// Copyright (C) 2023 Niel Clausen. All rights reserved.
+//
+// This program is free software: you can redistribute it and/or modify
+// it under the terms of the GNU General Public License as published by
+// the Free Software Foundation, either version 3 of the License, or
+// (at your option) any later version.
+//
+// This program is distributed in the hope that it will be useful,
+// but WITHOUT ANY WARRANTY; without even the implied warranty of
+// MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+// GNU General Public License for more details.
+//
+// You should have received a copy of the GNU General Public License
+// along with this program. If not, see <https://www.gnu.org/licenses/>.
+//
+#include "gtest/gtest.h"
+
+#include "LogAccessor.h"
+#include "Match.h"
+#include "Parser.h"
+
+// C++ includes
+#include <chrono>
+#include <iostream>
+#include <random>
+
+// keep tests in a private namespace
+namespace {
+
+
+
+/*-----------------------------------------------------------------------
+ * U_MythSchema
+ -----------------------------------------------------------------------*/
+
+const time_t c_RefUtcDatum{ 1514817582 };    // Mon, 1  Jan 2018 14:39:42 GMT+00:00
+const int64_t c_NanoSecond{ 1'000'000'000 };
+
+// field IDs, per schema.mythtv.xml
+enum E_MythField : unsigned
+{
+	e_DateTime,
+	e_Machine,
+	e_ModuleA,
+	e_ModuleB,
+	e_Process,
+	e_Category,
+	e_Thread,
+	e_Emitter,
+	e_Function,
+	e_NumFields
+};
+
+
+// a MythTV like logfile schema
+struct U_MythSchema : public LogSchemaAccessor
+{
+	struct U_Field
+	{
+		FieldDescriptor m_FieldDescriptor;
+		FieldValueType m_Type;
+		std::vector<std::string> m_EnumValues;
+
+		U_Field( const char * name, FieldValueType type, std::initializer_list<const char *> enum_values = {} )
+			: m_FieldDescriptor{ true, name }, m_Type{ type }
+		{
+			if( enum_values.size() != 0 )
+				m_EnumValues.emplace_back( "__INVALID__" );
+
+			for( const char * value : enum_values )
+				m_EnumValues.emplace_back( value );
+		}
+	};
+	std::vector<U_Field> m_Fields;
+
+	U_MythSchema( void ) {
+		m_Fields.emplace_back( U_Field{ "DateTime", FieldValueType::signed64 } );
+		m_Fields.emplace_back( U_Field{ "Machine", FieldValueType::unsigned64, { "mythbox", "frontend" } } );
+		m_Fields.emplace_back( U_Field{ "Module_A", FieldValueType::unsigned64, { "mythbackend", "mythfrontend" } } );
+		m_Fields.emplace_back( U_Field{ "Module_B", FieldValueType::unsigned64, { "mythbackend", "mythfrontend", "mythjobqueue" } } );
+		m_Fields.emplace_back( U_Field{ "Process", FieldValueType::unsigned64 } );
+		m_Fields.emplace_back( U_Field{ "Category", FieldValueType::unsigned64, { "I", "N", "W", "E" } } );
+		m_Fields.emplace_back( U_Field{ "Thread", FieldValueType::unsigned64, { "CoreContext", "Scheduler", "Expire", "HTTP0", "HTTP1", "TVRecEvent" } } );
+		m_Fields.emplace_back( U_Field{ "Emitter", FieldValueType::unsigned64 } );
+		m_Fields.emplace_back( U_Field{ "Function", FieldValueType::unsigned64, { "Run", "HandleRecording", "ExpireRecordings", "Update" } } );
+	}
+
+	size_t GetNumFields( void ) const override {
+		return m_Fields.size();
+	}
+
+	const FieldDescriptor & GetFieldDescriptor( unsigned field_id ) const override {
+		return m_Fields[ field_id ].m_FieldDescriptor;
+	}
+
+	FieldValueType GetFieldType( unsigned field_id ) const override {
+		return m_Fields[ field_id ].m_Type;
+	}
+
+	uint16_t GetFieldEnumCount( unsigned field_id ) const override {
+		return static_cast<uint16_t>(m_Fields[ field_id ].m_EnumValues.size());
+	}
+
+	const char * GetFieldEnumName( unsigned field_id, uint16_t enum_id ) const override {
+		return m_Fields[ field_id ].m_EnumValues[ enum_id ].c_str();
+	}
+
+	NTimecodeBase m_TimecodeBase{ c_RefUtcDatum };
+	const NTimecodeBase & GetTimecodeBase( void ) const override {
+		return m_TimecodeBase;
+	}
+};
+
+
+
+/*-----------------------------------------------------------------------
+ * U_MythLines
+ -----------------------------------------------------------------------*/
+
+// pseudo-random MythTV like log lines
+struct U_MythLines : public LineAccessor, public LineAdornmentsProvider
+{
+	struct U_Line
+	{
+		fieldvalue_t f_Values[ e_NumFields ];
+		const std::string * f_Text;
+	};
+	std::vector<U_Line> m_Lines;
+
+	const U_MythSchema & m_Schema;
+	const std::vector<std::string> m_Messages{
+		"Scheduled 132 items in 0.1 = 0.01 match + 0.08 check + 0.01 place",
+		"Finished recording Doctor Who: channel 4101",
+		"Expiring 2 recordings, 1.2 GB free",
+		"Failed to open device /dev/dvb/adapter0/frontend0",
+		"Service Unavailable: HTTP request timed out after 5000ms",
+		"Updating status for recording 1004 to Recorded"
+	};
+
+	// the line being filtered
+	const U_Line * m_Line{ nullptr };
+	nlineno_t m_LineNo{ 0 };
+
+	U_MythLines( const U_MythSchema & schema, size_t num_lines )
+		: m_Schema{ schema }
+	{
+		std::mt19937 gen{ 47 };
+		auto random = [&gen] ( unsigned first, unsigned last ) -> uint64_t {
+			return std::uniform_int_distribution<unsigned>{ first, last }( gen );
+		};
+
+		// lines span four hours; a step of ~60ms
+		const int64_t step{ (4 * 3600 * c_NanoSecond) / static_cast<int64_t>(num_lines + 1) };
+		int64_t offset{ 0 };
+
+		m_Lines.resize( num_lines );
+		for( U_Line & line : m_Lines )
+		{
+			offset += step;
+			line.f_Values[ e_DateTime ] = offset;
+			line.f_Values[ e_Machine ] = random( 1, 2 );
+			line.f_Values[ e_ModuleA ] = random( 1, 2 );
+			line.f_Values[ e_ModuleB ] = random( 1, 3 );
+			line.f_Values[ e_Process ] = random( 1'000, 3'000 );
+			line.f_Values[ e_Category ] = random( 1, 4 );
+			line.f_Values[ e_Thread ] = random( 1, 6 );
+			line.f_Values[ e_Emitter ] = uint64_t{ 0 };
+			line.f_Values[ e_Function ] = random( 1, 4 );
+			line.f_Text = &m_Messages[ random( 0, static_cast<unsigned>(m_Messages.size() - 1) ) ];
+		}
+	}
+
+	void Select( nlineno_t line_no ) {
+		m_LineNo = line_no;
+		m_Line = &m_Lines[ line_no ];
+	}
+
+	nlineno_t GetLineNo( void ) const override {
+		return m_LineNo;
+	}
+
+	nlineno_t GetLength( void ) const override {
+		return nlineno_cast( m_Line->f_Text->size() );
+	}
+
+	bool IsRegular( void ) const override {
+		return true;
+	}
+
+	nlineno_t NextIrregularLineLength( void ) const override {
+		return -1;
+	}
+
+	void GetText( const char ** first, const char ** last ) const override {
+		*first = m_Line->f_Text->c_str();
+		*last = *first + m_Line->f_Text->size();
+	}
+
+	void GetNonFieldText( const char ** first, const char ** last ) const override {
+		GetText( first, last );
+	}
+
+	// enumeration fields only
+	void GetFieldText( unsigned field_id, const char ** first, const char ** last ) const override {
+		const uint16_t enum_id{ static_cast<uint16_t>(m_Line->f_Values[ field_id ].As<uint64_t>()) };
+		*first = m_Schema.GetFieldEnumName( field_id, enum_id );
+		*last = *first + strlen( *first );
+	}
+
+	fieldvalue_t GetFieldValue( unsigned field_id ) const override {
+		return m_Line->f_Values[ field_id ];
+	}
+
+	// every 16th line is bookmarked, every 50th annotated
+	bool IsBookMarked( nlineno_t line_no ) const override {
+		return (line_no % 16) == 0;
+	}
+
+	bool IsAnnotated( nlineno_t line_no ) const override {
+		return (line_no % 50) == 0;
+	}
+
+	void GetAnnotationText( nlineno_t, const char ** first, const char ** last ) const override {
+		static const std::string text{ "check this" };
+		*first = text.c_str();
+		*last = *first + text.size();
+	}
+};
+
+
+
+/*-----------------------------------------------------------------------
+ * U_MythIndex
+ -----------------------------------------------------------------------*/
+
+// secondary field indexes for the lines; per MapLogAccessor, enumeration fields
+// have posting lists and other numeric fields have zone maps
+struct U_MythIndex : public FieldIndexAccessor
+{
+	std::vector<FieldIndex> m_Indexes;
+
+	template<typename T_VALUE>
+	static void MakeZones( const U_MythLines & lines, unsigned field_id, FieldIndex & field_index ) {
+		const size_t zone_size{ size_t{ 1 } << FieldIndex::c_ZoneShift };
+		field_index.f_Zones.resize( (lines.m_Lines.size() + zone_size - 1) / zone_size );
+
+		for( size_t line_no = 0; line_no < lines.m_Lines.size(); ++line_no )
+		{
+			FieldIndex::Zone & zone{ field_index.f_Zones[ line_no >> FieldIndex::c_ZoneShift ] };
+			const fieldvalue_t value{ lines.m_Lines[ line_no ].f_Values[ field_id ] };
+			if( zone.f_Empty || (value.As<T_VALUE>() < zone.f_Min.As<T_VALUE>()) )
+				zone.f_Min = value;
+			if( zone.f_Empty || (value.As<T_VALUE>() > zone.f_Max.As<T_VALUE>()) )
+				zone.f_Max = value;
+			zone.f_Empty = false;
+		}
+	}
+
+	U_MythIndex( const U_MythSchema & schema, const U_MythLines & lines )
+		: m_Indexes( e_NumFields )
+	{
+		for( unsigned field_id = 0; field_id < e_NumFields; ++field_id )
+		{
+			FieldIndex & field_index{ m_Indexes[ field_id ] };
+			field_index.f_NumLines = nlineno_cast( lines.m_Lines.size() );
+
+			const uint16_t enum_count{ schema.GetFieldEnumCount( field_id ) };
+			if( enum_count != 0 )
+			{
+				field_index.f_Postings.resize( enum_count );
+				for( size_t line_no = 0; line_no < lines.m_Lines.size(); ++line_no )
+				{
+					const uint64_t value{ lines.m_Lines[ line_no ].f_Values[ field_id ].As<uint64_t>() };
+					field_index.f_Postings[ value ].push_back( nlineno_cast( line_no ) );
+				}
+			}
+
+			else if( schema.GetFieldType( field_id ) == FieldValueType::signed64 )
+				MakeZones<int64_t>( lines, field_id, field_index );
+
+			else
+				MakeZones<uint64_t>( lines, field_id, field_index );
+		}
+	}
+
+	const FieldIndex * GetFieldIndex( unsigned field_id ) const override {
+		return &m_Indexes[ field_id ];
+	}
+};
+
+
+
+/*-----------------------------------------------------------------------
+ * LVFProgramTest
+ -----------------------------------------------------------------------*/
+
+// representative filters; the text clauses are mostly written first, as
+// users tend to, so the compiled program's re-ordering is exercised
+const std::vector<const char *> c_MythFilters{
+	R"__(Category = "E")__",
+	R"__(Category in ["W", "E"] and Module_B = "mythbackend")__",
+	R"__(log ~= /fail|unavailable/i and Category in ["W", "E"])__",
+	R"__(log ~= "recording" and Thread in ["Scheduler", "Expire"] and Process in [1500 .. 2000])__",
+	R"__(Thread ~= /HTTP/ or Function = "HandleRecording")__",
+	R"__(not (Machine = "frontend" or Category = "I") and not bookmarked)__",
+	R"__(DateTime >= 15:00:00 and DateTime < 16:30:00 and Process in [^1000 .. 1999, ^2500])__",
+	R"__((annotated or bookmarked) || (log ~= /Doctor.*Who/ && Module_A = "mythbackend"))__"
+};
+
+
+using filter_ptr_t = std::shared_ptr<const SelectorLogviewFilter>;
+
+struct LVFProgramTest : public ::testing::Test
+{
+	U_MythSchema m_Schema;
+
+	filter_ptr_t MakeFilter( const char * definition ) {
+		selector_ptr_t selector{ Selector::MakeSelector( Match{ Match::e_LogviewFilter, definition, true }, true, &m_Schema ) };
+		EXPECT_NE( nullptr, selector ) << definition;
+
+		return std::dynamic_pointer_cast<const SelectorLogviewFilter>( selector );
+	}
+};
+
+
+// the program must agree with the syntax tree for every line
+TEST_F( LVFProgramTest, Equivalence )
+{
+	U_MythLines lines{ m_Schema, 20'000 };
+
+	for( const char * definition : c_MythFilters )
+	{
+		filter_ptr_t filter{ MakeFilter( definition ) };
+		ASSERT_NE( nullptr, filter );
+
+		size_t hits{ 0 };
+		for( nlineno_t line_no = 0; line_no < nlineno_cast( lines.m_Lines.size() ); ++line_no )
+		{
+			lines.Select( line_no );
+			LineAdornmentsAccessor adornments{ &lines, line_no };
+
+			const bool hit{ filter->Hit( lines, adornments ) };
+			EXPECT_EQ( filter->HitSyntaxTree( lines, adornments ), hit ) << definition << " line:" << line_no;
+			hits += hit ? 1 : 0;
+		}
+
+		// filters should neither select nothing, nor everything
+		EXPECT_NE( 0u, hits ) << definition;
+		EXPECT_NE( lines.m_Lines.size(), hits ) << definition;
+	}
+}
+
+
+// the candidate lines found from the field indexes must include every hit
+TEST_F( LVFProgramTest, Candidates )
+{
+	U_MythLines lines{ m_Schema, 20'000 };
+	U_MythIndex index{ m_Schema, lines };
+	const nlineno_t num_lines{ nlineno_cast( lines.m_Lines.size() ) };
+
+	for( const char * definition : c_MythFilters )
+	{
+		filter_ptr_t filter{ MakeFilter( definition ) };
+		ASSERT_NE( nullptr, filter );
+
+		LineBitmap candidates;
+		if( !filter->FindCandidates( index, num_lines, &candidates ) )
+			continue;
+
+		ASSERT_EQ( num_lines, candidates.GetNumLines() );
+		nlineno_t hits{ 0 };
+		for( nlineno_t line_no = 0; line_no < num_lines; ++line_no )
+		{
+			lines.Select( line_no );
+			if( filter->Hit( lines, LineAdornmentsAccessor{ &lines, line_no } ) )
+			{
+				EXPECT_TRUE( candidates.Test( line_no ) ) << definition << " line:" << line_no;
+				hits += 1;
+			}
+		}
+
+		EXPECT_LE( hits, candidates.Count() ) << definition;
+	}
+
+	// enumeration matches are exact, a text match can't be narrowed
+	const std::vector<std::pair<const char *, bool>> exact{
+		{ R"__(Category = "E")__", true },
+		{ R"__(not Thread in ["Scheduler", "Expire"])__", true },
+		{ R"__(log ~= "recording")__", false }
+	};
+
+	for( const std::pair<const char *, bool> & test : exact )
+	{
+		filter_ptr_t filter{ MakeFilter( test.first ) };
+		ASSERT_NE( nullptr, filter );
+
+		LineBitmap candidates;
+		ASSERT_EQ( test.second, filter->FindCandidates( index, num_lines, &candidates ) ) << test.first;
+		if( !test.second )
+			continue;
+
+		for( nlineno_t line_no = 0; line_no < num_lines; ++line_no )
+		{
+			lines.Select( line_no );
+			EXPECT_EQ( filter->Hit( lines, LineAdornmentsAccessor{ &lines, line_no } ), candidates.Test( line_no ) ) << test.first;
+		}
+	}
+}
+
+
+
+/*-----------------------------------------------------------------------
+ * LVFProgramBenchmark
+ -----------------------------------------------------------------------*/
+
+struct LVFProgramBenchmark : public LVFProgramTest
+{
+	static constexpr size_t c_NumLines{ 500'000 };
+
+	// returns lines/sec
+	template<typename T_HIT>
+	static double Time( U_MythLines & lines, T_HIT hit, size_t & count ) {
+		const auto start{ std::chrono::steady_clock::now() };
+		for( nlineno_t line_no = 0; line_no < nlineno_cast( lines.m_Lines.size() ); ++line_no )
+		{
+			lines.Select( line_no );
+			if( hit( LineAdornmentsAccessor{ &lines, line_no } ) )
+				count += 1;
+		}
+
+		const std::chrono::duration<double> elapsed{ std::chrono::steady_clock::now() - start };
+		return lines.m_Lines.size() / elapsed.count();
+	}
+};
+
+
+// compare the syntax tree (visitor) evaluation with the compiled program
+TEST_F( LVFProgramBenchmark, MythFilters )
+{
+	U_MythLines lines{ m_Schema, c_NumLines };
+
+	for( const char * definition : c_MythFilters )
+	{
+		filter_ptr_t filter{ MakeFilter( definition ) };
+		ASSERT_NE( nullptr, filter );
+
+		size_t tree_count{ 0 };
+		const double tree_rate{ Time( lines, [&lines, &filter] ( const LineAdornmentsAccessor & adornments ) {
+			return filter->HitSyntaxTree( lines, adornments );
+		}, tree_count ) };
+
+		size_t program_count{ 0 };
+		const double program_rate{ Time( lines, [&lines, &filter] ( const LineAdornmentsAccessor & adornments ) {
+			return filter->Hit( lines, adornments );
+		}, program_count ) };
+
+		EXPECT_EQ( tree_count, program_count );
+
+		std::cout << "[   BENCH  ] " << definition
+			<< "\n[   BENCH  ]   syntax tree " << tree_rate / 1e6 << " Mlines/s"
+			<< ", program " << program_rate / 1e6 << " Mlines/s"
+			<< ", speedup x" << program_rate / tree_rate << "\n";
+	}
+}
+
+
+// compare filtering every line with filtering only the candidate lines
+TEST_F( LVFProgramBenchmark, Candidates )
+{
+	U_MythLines lines{ m_Schema, c_NumLines };
+	U_MythIndex index{ m_Schema, lines };
+	const nlineno_t num_lines{ nlineno_cast( lines.m_Lines.size() ) };
+
+	for( const char * definition : c_MythFilters )
+	{
+		filter_ptr_t filter{ MakeFilter( definition ) };
+		ASSERT_NE( nullptr, filter );
+
+		size_t scan_count{ 0 };
+		const double scan_rate{ Time( lines, [&lines, &filter] ( const LineAdornmentsAccessor & adornments ) {
+			return filter->Hit( lines, adornments );
+		}, scan_count ) };
+
+		// includes the cost of finding the candidates
+		LineBitmap candidates;
+		bool narrowed{ false };
+		size_t index_count{ 0 };
+		const auto start{ std::chrono::steady_clock::now() };
+		narrowed = filter->FindCandidates( index, num_lines, &candidates );
+		for( nlineno_t line_no = 0; line_no < num_lines; ++line_no )
+		{
+			if( narrowed && !candidates.Test( line_no ) )
+				continue;
+
+			lines.Select( line_no );
+			if( filter->Hit( lines, LineAdornmentsAccessor{ &lines, line_no } ) )
+				index_count += 1;
+		}
+
+		const std::chrono::duration<double> elapsed{ std::chrono::steady_clock::now() - start };
+		const double index_rate{ num_lines / elapsed.count() };
+
+		EXPECT_EQ( scan_count, index_count );
+
+		std::cout << "[   BENCH  ] " << definition
+			<< "\n[   BENCH  ]   scan " << scan_rate / 1e6 << " Mlines/s"
+			<< ", indexed " << index_rate / 1e6 << " Mlines/s"
+			<< " (candidates " << (narrowed ? candidates.Count() : num_lines) << "/" << num_lines << ")"
+			<< ", speedup x" << index_rate / scan_rate << "\n";
+	}
+}
+
+
+
+}	// namespace
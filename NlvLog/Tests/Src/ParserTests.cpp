@@ -246,7 +246,6 @@ struct U_LogSchemaAccessor : public LogSchemaAccessor
 
 struct U_Selector
 {
-	using selector_ptr_t = std::shared_ptr<Selector>;
 	selector_ptr_t m_Selector;
 
 	U_Selector( const U_LogSchemaAccessor & schema, Match::Type type, const char * definition, bool match_case = true, bool succeeds = true )
@@ -316,6 +315,66 @@ TEST_F( SelectTrue, EmptyDescriptor )
 }
 
 
+
+/*-----------------------------------------------------------------------
+ * UT SelectorCache
+ -----------------------------------------------------------------------*/
+
+struct SelectorCacheTest
+	: public TestCommon {};
+
+TEST_F( SelectorCacheTest, Shared )
+{
+	U_Selector first{ m_LogSchema, Match::e_RegularExpression, "lit.*ral" };
+	U_Selector second{ m_LogSchema, Match::e_RegularExpression, "lit.*ral" };
+	U_Selector nocase{ m_LogSchema, Match::e_RegularExpression, "lit.*ral", false };
+
+	EXPECT_EQ( first.m_Selector, second.m_Selector );
+	EXPECT_NE( first.m_Selector, nocase.m_Selector );
+	EXPECT_FALSE( first.Hit( "LITERAL" ) );
+	EXPECT_TRUE( nocase.Hit( "LITERAL" ) );
+}
+
+
+TEST_F( SelectorCacheTest, Schema )
+{
+	// logview filters depend on the schema instance; other selectors do not
+	U_LogSchemaAccessor other_schema;
+
+	U_SelectorLFV filter{ m_LogSchema, R"__(log ~= "literal")__" };
+	EXPECT_EQ( filter.m_Selector, (U_SelectorLFV{ m_LogSchema, R"__(log ~= "literal")__" }.m_Selector) );
+	EXPECT_NE( filter.m_Selector, (U_SelectorLFV{ other_schema, R"__(log ~= "literal")__" }.m_Selector) );
+
+	U_Selector literal{ m_LogSchema, Match::e_Literal, "literal" };
+	EXPECT_EQ( literal.m_Selector, (U_Selector{ other_schema, Match::e_Literal, "literal" }.m_Selector) );
+}
+
+
+TEST_F( SelectorCacheTest, Failure )
+{
+	// failures are not cached; each attempt reports its errors
+	for( int attempt = 0; attempt < 2; ++attempt )
+	{
+		U_SelectorLFV selector{ m_LogSchema, R"__(log ~= /literal")__", false };
+		EXPECT_FALSE( U_CaptureTraceMessages::s_TraceMessages.empty() ) << "attempt:" << attempt;
+		U_CaptureTraceMessages::s_TraceMessages.clear();
+	}
+}
+
+
+TEST_F( SelectorCacheTest, Release )
+{
+	// a schema's cached selectors are released with the schema
+	std::weak_ptr<const Selector> cached;
+	{
+		U_LogSchemaAccessor other_schema;
+		cached = U_SelectorLFV{ other_schema, R"__(log ~= "literal")__" }.m_Selector;
+		EXPECT_FALSE( cached.expired() );
+	}
+	EXPECT_TRUE( cached.expired() );
+}
+
+
 /*-----------------------------------------------------------------------
  * UT UserAdornmentsClause
  -----------------------------------------------------------------------*/
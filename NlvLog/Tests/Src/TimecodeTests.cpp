@@ -84,4 +84,92 @@ TEST_F( TimecodeTest, MixedDatumB )
 	EXPECT_TRUE( a < b );
 }
 
+
+
+/*-----------------------------------------------------------------------
+ * ViewTimecodeIndex
+ -----------------------------------------------------------------------*/
+
+// a view whose lines have the given (ns) offsets; negative for no timecode
+struct U_ViewTimecode : public ViewTimecode
+{
+	std::vector<int64_t> f_Offsets;
+
+	U_ViewTimecode( std::initializer_list<int64_t> offsets )
+		: f_Offsets{ offsets } {}
+
+	bool HasTimeCode( int line_no ) const override {
+		return f_Offsets[ line_no ] >= 0;
+	}
+
+	NTimecode GetUtcTimecode( int line_no ) const override {
+		return NTimecode{ 1, f_Offsets[ line_no ] };
+	}
+
+	int GetNearestUtcLine( const NTimecode & /* utc */ ) const override {
+		return -1;
+	}
+
+	int Nearest( ViewTimecodeIndex & index, int64_t offset ) const {
+		return index.GetNearestLine( *this, static_cast<int>( f_Offsets.size() ), NTimecode{ 1, offset } );
+	}
+};
+
+
+struct ViewTimecodeIndexTest : public ::testing::Test
+{
+};
+
+
+TEST_F( ViewTimecodeIndexTest, Empty )
+{
+	U_ViewTimecode view{ -1, -1 };
+	ViewTimecodeIndex index;
+
+	EXPECT_EQ( -1, view.Nearest( index, 100 ) );
+}
+
+
+TEST_F( ViewTimecodeIndexTest, Monotonic )
+{
+	U_ViewTimecode view{ -1, 10, 20, -1, 20, 30, -1, 40 };
+	ViewTimecodeIndex index;
+
+	EXPECT_EQ( 1, view.Nearest( index, 0 ) );
+	EXPECT_EQ( 1, view.Nearest( index, 14 ) );
+	EXPECT_EQ( 2, view.Nearest( index, 16 ) );
+	EXPECT_EQ( 2, view.Nearest( index, 20 ) );
+	EXPECT_EQ( 5, view.Nearest( index, 34 ) );
+	EXPECT_EQ( 7, view.Nearest( index, 36 ) );
+	EXPECT_EQ( 7, view.Nearest( index, 1000 ) );
+}
+
+
+TEST_F( ViewTimecodeIndexTest, NonMonotonic )
+{
+	// clock stepped back at line 3
+	U_ViewTimecode view{ 10, 20, 30, 15, 25, 35 };
+	ViewTimecodeIndex index;
+
+	EXPECT_EQ( 3, view.Nearest( index, 16 ) );
+	EXPECT_EQ( 1, view.Nearest( index, 21 ) );
+	EXPECT_EQ( 4, view.Nearest( index, 24 ) );
+	EXPECT_EQ( 5, view.Nearest( index, 34 ) );
+}
+
+
+TEST_F( ViewTimecodeIndexTest, Disordered )
+{
+	// more runs than the index will search; falls back to a sorted index
+	U_ViewTimecode view{};
+	for( int64_t i = 0; i < 1000; ++i )
+		view.f_Offsets.push_back( (i * 7919) % 1000 );
+
+	ViewTimecodeIndex index;
+	for( int64_t offset : { 0, 1, 500, 999 } )
+		EXPECT_EQ( offset, view.f_Offsets[ view.Nearest( index, offset ) ] );
+
+	EXPECT_EQ( 0, view.Nearest( index, -5 ) );
+}
+
 }
\ No newline at end of file
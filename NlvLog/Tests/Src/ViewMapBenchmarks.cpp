@@ -0,0 +1,220 @@
+//
+// Copyright (C) 2023 Niel Clausen. All rights reserved.
+//
+// This program is free software: you can redistribute it and/or modify
+// it under the terms of the GNU General Public License as published by
+// the Free Software Foundation, either version 3 of the License, or
+// (at your option) any later version.
+//
+// This program is distributed in the hope that it will be useful,
+// but WITHOUT ANY WARRANTY; without even the implied warranty of
+// MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+// GNU General Public License for more details.
+//
+// You should have received a copy of the GNU General Public License
+// along with this program. If not, see <https://www.gnu.org/licenses/>.
+//
+#include "gtest/gtest.h"
+
+#include "LogAccessor.h"
+#include "Nline.h"
+
+// C++ includes
+#include <chrono>
+#include <iostream>
+#include <random>
+
+// keep tests in a private namespace
+namespace {
+
+
+
+/*-----------------------------------------------------------------------
+ * U_ViewMap
+ -----------------------------------------------------------------------*/
+
+// a view map with pseudo-random line lengths
+struct U_ViewMap : public ViewMap, public ViewProperties
+{
+	U_ViewMap( nlineno_t num_lines, nlineno_t min_length, nlineno_t max_length )
+	{
+		std::mt19937 gen{ 42 };
+		std::uniform_int_distribution<nlineno_t> length{ min_length, max_length };
+
+		m_Lines.reserve( num_lines + 1 );
+		nlineno_t pos{ 0 };
+		for( nlineno_t line_no = 0; line_no < num_lines; ++line_no )
+		{
+			m_Lines.push_back( pos );
+			pos += length( gen );
+		}
+
+		m_Lines.push_back( pos );
+		m_TextLen = pos;
+		m_IsEmpty = num_lines == 0;
+		m_NumLinesOrOne = m_IsEmpty ? 1 : num_lines;
+	}
+
+	nlineno_t GetLineLength( nlineno_t line_no ) const override {
+		return m_Lines[ line_no + 1 ] - m_Lines[ line_no ];
+	}
+
+	const LineBuffer & GetLine( e_LineData, nlineno_t ) const override {
+		throw std::runtime_error{ "not implemented" };
+	}
+
+	// e.g. a re-filter
+	void SetFieldMask( uint64_t ) override {
+		m_Tracker.RecordEvent();
+	}
+
+	nlineno_t Lookup( nlineno_t pos ) const {
+		return NLine::Lookup( m_Lines, m_NumLinesOrOne, pos );
+	}
+};
+
+
+
+/*-----------------------------------------------------------------------
+ * ViewMapIndexTest
+ -----------------------------------------------------------------------*/
+
+struct ViewMapIndexTest : public ::testing::Test
+{
+	static void Check( U_ViewMap & map, const std::vector<nlineno_t> & positions ) {
+		ViewMapIndex index;
+		for( nlineno_t pos : positions )
+			EXPECT_EQ( map.Lookup( pos ), index.PositionToLine( map, map.GetTracker(), pos ) ) << "pos:" << pos;
+	}
+};
+
+
+TEST_F( ViewMapIndexTest, Empty )
+{
+	U_ViewMap map{ 0, 1, 1 };
+	Check( map, { -1, 0, 1 } );
+}
+
+
+TEST_F( ViewMapIndexTest, Ranges )
+{
+	// lines shorter and longer than a bucket
+	for( nlineno_t max_length : { 1, 80, 4096, 20'000 } )
+	{
+		U_ViewMap map{ 2'000, 1, max_length };
+
+		std::vector<nlineno_t> positions{ -5, 0, map.m_TextLen - 1, map.m_TextLen, map.m_TextLen + 5 };
+		for( nlineno_t pos = 0; pos < map.m_TextLen; pos += 7 )
+			positions.push_back( pos );
+
+		std::mt19937 gen{ 7 };
+		std::uniform_int_distribution<nlineno_t> random{ 0, map.m_TextLen - 1 };
+		for( int i = 0; i < 5'000; ++i )
+			positions.push_back( random( gen ) );
+
+		Check( map, positions );
+	}
+}
+
+
+TEST_F( ViewMapIndexTest, Change )
+{
+	U_ViewMap map{ 1'000, 10, 100 };
+	ViewMapIndex index;
+	EXPECT_EQ( map.Lookup( 5'000 ), index.PositionToLine( map, map.GetTracker(), 5'000 ) );
+
+	// shift all lines; the index must notice
+	for( nlineno_t & pos : map.m_Lines )
+		pos *= 2;
+	map.m_TextLen *= 2;
+	map.SetFieldMask( 0 );
+
+	for( nlineno_t pos : { 5'000, 5'001, 60'000 } )
+		EXPECT_EQ( map.Lookup( pos ), index.PositionToLine( map, map.GetTracker(), pos ) );
+}
+
+
+
+/*-----------------------------------------------------------------------
+ * ViewMapBenchmark
+ -----------------------------------------------------------------------*/
+
+struct ViewMapBenchmark : public ::testing::Test
+{
+	static constexpr nlineno_t c_NumLines{ 10'000'000 };
+	static constexpr int c_NumPaints{ 2'000 };
+	static constexpr int c_LinesPerPaint{ 60 };
+
+	// returns lookups/sec
+	template<typename T_LOOKUP>
+	static double Time( const std::vector<nlineno_t> & positions, T_LOOKUP lookup, int64_t & checksum ) {
+		const auto start{ std::chrono::steady_clock::now() };
+		for( nlineno_t pos : positions )
+			checksum += lookup( pos );
+
+		const std::chrono::duration<double> elapsed{ std::chrono::steady_clock::now() - start };
+		return positions.size() / elapsed.count();
+	}
+
+	// compare binary search with the index
+	static void Run( const char * name, const U_ViewMap & map, const std::vector<nlineno_t> & positions ) {
+		int64_t search_checksum{ 0 };
+		const double search_rate{ Time( positions, [&map] ( nlineno_t pos ) {
+			return map.Lookup( pos );
+		}, search_checksum ) };
+
+		int64_t index_checksum{ 0 };
+		ViewMapIndex index;
+		const double index_rate{ Time( positions, [&map, &index] ( nlineno_t pos ) {
+			return index.PositionToLine( map, map.GetTracker(), pos );
+		}, index_checksum ) };
+
+		EXPECT_EQ( search_checksum, index_checksum );
+
+		std::cout << "[   BENCH  ] " << name
+			<< ": binary search " << search_rate / 1e6 << " Mlookups/s"
+			<< ", indexed " << index_rate / 1e6 << " Mlookups/s"
+			<< ", speedup x" << index_rate / search_rate << "\n";
+	}
+};
+
+
+// Scintilla painting a window: a random scroll, then per-character access
+// (CharAt/StyleAt) along each visible line
+TEST_F( ViewMapBenchmark, Paint )
+{
+	U_ViewMap map{ c_NumLines, 20, 200 };
+
+	std::mt19937 gen{ 1 };
+	std::uniform_int_distribution<nlineno_t> scroll{ 0, c_NumLines - c_LinesPerPaint - 1 };
+
+	std::vector<nlineno_t> positions;
+	for( int paint = 0; paint < c_NumPaints; ++paint )
+	{
+		const nlineno_t top{ scroll( gen ) };
+		for( nlineno_t pos = map.m_Lines[ top ]; pos < map.m_Lines[ top + c_LinesPerPaint ]; ++pos )
+			positions.push_back( pos );
+	}
+
+	Run( "Paint", map, positions );
+}
+
+
+// random access; e.g. LineFromPosition for selections and scroll bar drags
+TEST_F( ViewMapBenchmark, Random )
+{
+	U_ViewMap map{ c_NumLines, 20, 200 };
+
+	std::mt19937 gen{ 2 };
+	std::uniform_int_distribution<nlineno_t> random{ 0, map.m_TextLen - 1 };
+
+	std::vector<nlineno_t> positions( 10'000'000 );
+	for( nlineno_t & pos : positions )
+		pos = random( gen );
+
+	Run( "Random", map, positions );
+}
+
+
+
+}	// namespace
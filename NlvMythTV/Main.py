@@ -16,15 +16,34 @@
 #
 
 # Python imports
+import fnmatch
+import os
 from pathlib import Path
 
 
 ## LAUNCHER ################################################
 
 def OnDirectorySearch(dir):
+    """
+    Yield MythTV logs; a generator, so the launcher can stream results and
+    cancel the search. The whole tree is searched (the launcher limits the
+    number of logs found); directory symlinks are not followed.
+    """
     schema_guid = "6E4169C7-97D2-4F98-9BB9-AB9CCA90AC70"
     builder_guid = "50F34148-43D8-452E-B2E3-CDF0FCE90DD4"
-    return [(dir/p, schema_guid, builder_guid) for p in dir.rglob("myth*.log")]
+
+    pending = [str(dir)]
+    while len(pending) != 0:
+        path = pending.pop()
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks = False):
+                        pending.append(entry.path)
+                    elif fnmatch.fnmatch(entry.name, "myth*.log"):
+                        yield (Path(entry.path), schema_guid, builder_guid)
+        except OSError:
+            pass
 
 
 def OnFileConvert(file):
@@ -161,13 +161,16 @@ if __name__ == '__main__':
         install_requires = [
           'NlvWxPython==__WXPYTHONVER__',
           'comtypes',
+          'importlib_metadata; python_version < "3.8"',
+          'numpy',
           'pywin32==300' # there's something broken with newer pywin32 and older Python; pin to 300 for the time being
         ],
 
         entry_points={
             'console_scripts': [
                 'nlvc=NlvCore.Main:main',
-                'launchc=NlvCore.Launch:main'
+                'launchc=NlvCore.Launch:main',
+                'nlv-analyse=NlvCore.Analyse:main'
             ],
             'gui_scripts': [
                 'nlvw=NlvCore.Main:main',